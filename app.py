@@ -1,24 +1,125 @@
 import os
+import hmac
 import json
-from flask import Flask, request, jsonify, render_template, send_from_directory, url_for
-from werkzeug.utils import secure_filename
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, g, request, jsonify, render_template, send_from_directory, url_for
 from dotenv import load_dotenv
 from flask_cors import CORS
+from inference import get_model
+from ingest import ImageIngest, UploadRejected
 from scanner import WidgetScanner
+from storage import OutputStore
+from result_store import ResultStore
+import serialization
+import video
+from lexicon import PROJECT_NAME
+from memory import MemoryMonitor
+from model_registry import ModelRegistry
+from ocr_cache import OCRCache
+from ocr_pool import OCRPool, ResourcePlan, configure_threads
+from ocr_profiles import OCRProfiles
+from phash import ScreenIndex
+from work_queue import open_queue, wait_for
 
 # Cargar variables de entorno
 load_dotenv()
 
 # Configuración
 ROBOFLOW_API_KEY = os.getenv("ROBOFLOW_API_KEY")
-MODEL_ID = "ui_component_flutter/14"  # Nuevo model_id que funciona correctamente según test_api_key.py
+MODEL_ID = os.getenv("MODEL_ID", "ui_component_flutter/14")  # Nuevo model_id que funciona correctamente según test_api_key.py
+# Estado de las versiones del modelo (activa, candidata y sombra) compartido por los workers
+MODEL_STATE_FILE = os.getenv("MODEL_STATE_FILE", "model_state.json")
 UPLOAD_FOLDER = 'uploads'
 OUTPUT_FOLDER = 'output_results'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
 
-# Crear directorios si no existen
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+# Retención de archivos: antigüedad máxima (segundos) y tamaño total máximo (bytes) por directorio
+def _env_number(name):
+    value = os.getenv(name)
+    return float(value) if value else None
+
+UPLOAD_TTL = _env_number("UPLOAD_TTL_SECONDS")
+UPLOAD_MAX_BYTES = _env_number("UPLOAD_MAX_BYTES")
+OUTPUT_TTL = _env_number("OUTPUT_TTL_SECONDS")
+OUTPUT_MAX_BYTES = _env_number("OUTPUT_MAX_BYTES")
+SWEEP_INTERVAL = _env_number("STORE_SWEEP_INTERVAL") or 60
+
+# Base de datos de resultados para consultas (fuera de output_results para que el barrido no la elimine)
+RESULTS_DB = os.getenv("RESULTS_DB", "results.sqlite")
+result_store = ResultStore(RESULTS_DB)
+
+# Almacenes de archivos (crean los directorios si no existen); los escaneos cuyos archivos
+# expulsa el barrido se eliminan también de la base de resultados
+upload_store = OutputStore(UPLOAD_FOLDER, ttl_seconds=UPLOAD_TTL, max_bytes=UPLOAD_MAX_BYTES)
+output_store = OutputStore(OUTPUT_FOLDER, ttl_seconds=OUTPUT_TTL, max_bytes=OUTPUT_MAX_BYTES,
+                           on_remove=result_store.delete_files)
+upload_store.start_sweeper(SWEEP_INTERVAL)
+output_store.start_sweeper(SWEEP_INTERVAL)
+
+# Videos: tamaño máximo de la subida y número máximo de pantallas escaneadas por video
+VIDEO_MAX_BYTES = int(_env_number("VIDEO_MAX_BYTES") or 200 * 1024 * 1024)
+VIDEO_MAX_SCREENS = int(_env_number("VIDEO_MAX_SCREENS") or 50)
+
+# Caché de lecturas OCR por contenido del recorte: entradas en memoria (0 = sin caché),
+# archivo SQLite compartido entre workers (opcional) y altura de normalización (opcional)
+OCR_CACHE_SIZE = int(os.getenv("OCR_CACHE_SIZE", 4096))
+OCR_CACHE_DB = os.getenv("OCR_CACHE_DB") or None
+OCR_CACHE_NORMALIZE_HEIGHT = int(_env_number("OCR_CACHE_NORMALIZE_HEIGHT") or 0) or None
+ocr_cache = (OCRCache(OCR_CACHE_SIZE, path=OCR_CACHE_DB, normalize_height=OCR_CACHE_NORMALIZE_HEIGHT)
+             if OCR_CACHE_SIZE > 0 or OCR_CACHE_DB else None)
+
+# Perfiles de OCR (idiomas, reconocedor cuantizado o completo, allowlist) y el de cada proyecto
+OCR_PROFILES_FILE = os.getenv("OCR_PROFILES_FILE", "ocr_profiles.json")
+ocr_profiles = OCRProfiles.from_file(OCR_PROFILES_FILE)
+
+# Pantallas casi idénticas (hash perceptual): distancia de Hamming máxima (negativa = desactivado)
+NEAR_DUPLICATE_DISTANCE = int(os.getenv("NEAR_DUPLICATE_DISTANCE", 4))
+screen_index = (ScreenIndex(loader=result_store.screen_hashes, max_distance=NEAR_DUPLICATE_DISTANCE)
+                if NEAR_DUPLICATE_DISTANCE >= 0 else None)
+
+# Memoria por petición: RSS a partir del cual el worker se recicla (SIGTERM; gunicorn arranca otro),
+# aumento de RSS de una petición a partir del cual se llama a malloc_trim y marcos de tracemalloc
+# al arrancar (0 = desactivado; se puede activar después con /admin/memory?trace=start)
+MEMORY_RECYCLE_MB = _env_number("MEMORY_RECYCLE_MB")
+MEMORY_TRIM_MB = _env_number("MEMORY_TRIM_MB")
+MEMORY_TRACE_FRAMES = int(os.getenv("MEMORY_TRACE_FRAMES", 0))
+memory_monitor = MemoryMonitor(
+    recycle_bytes=int(MEMORY_RECYCLE_MB * 2 ** 20) if MEMORY_RECYCLE_MB else None,
+    trim_bytes=int(MEMORY_TRIM_MB * 2 ** 20) if MEMORY_TRIM_MB is not None else None,
+)
+if MEMORY_TRACE_FRAMES > 0:
+    memory_monitor.start_tracing(MEMORY_TRACE_FRAMES)
+
+# Imágenes subidas: tamaño máximo del archivo, megapíxeles máximos según la cabecera, memoria
+# estimada máxima para decodificarlas (MiB) y lado mayor de trabajo (opcional; las imágenes
+# mayores se decodifican a 1/2, 1/4 u 1/8 con IMREAD_REDUCED_*; el reporte da las coordenadas
+# en la imagen subida)
+IMAGE_MAX_BYTES = int(_env_number("IMAGE_MAX_BYTES") or 16 * 1024 * 1024)
+IMAGE_MAX_MEGAPIXELS = _env_number("IMAGE_MAX_MEGAPIXELS") or 40
+IMAGE_DECODE_MAX_MB = _env_number("IMAGE_DECODE_MAX_MB") or 256
+IMAGE_WORKING_SIDE = int(_env_number("IMAGE_WORKING_SIDE") or 0) or None
+image_ingest = ImageIngest(max_bytes=IMAGE_MAX_BYTES, max_pixels=int(IMAGE_MAX_MEGAPIXELS * 1e6),
+                           max_decode_bytes=int(IMAGE_DECODE_MAX_MB * 2 ** 20), working_side=IMAGE_WORKING_SIDE)
+
+# Escaneo en este proceso (local) o en nodos de escaneo (queue): con queue, /api/scan guarda la
+# imagen y encola el trabajo; los nodos (worker.py) lo escanean y el resultado se consulta en
+# /api/jobs/<job_id>. Cola compartida (sqlite:///ruta o redis://host:puerto/db), plazo de
+# visibilidad sin latido (segundos), intentos por trabajo y trabajos por lote de cada nodo
+SCAN_MODE = os.getenv("SCAN_MODE", "local")
+WORK_QUEUE_URL = os.getenv("WORK_QUEUE_URL", "sqlite:///work_queue.sqlite")
+WORK_QUEUE_OPTIONS = {
+    "visibility_timeout": _env_number("WORK_QUEUE_VISIBILITY_SECONDS") or 60,
+    "max_attempts": int(_env_number("WORK_QUEUE_MAX_ATTEMPTS") or 3),
+}
+WORK_QUEUE_BATCH = int(_env_number("WORK_QUEUE_BATCH") or 4)
+work_queue = open_queue(WORK_QUEUE_URL, **WORK_QUEUE_OPTIONS) if SCAN_MODE == "queue" else None
+
+# Token de los endpoints /admin (cabecera X-Admin-Token); sin token están desactivados
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN") or None
+
+# OCR pendiente de los escaneos con límite de tiempo (un hilo para no competir con las peticiones)
+background_ocr = ThreadPoolExecutor(max_workers=1, thread_name_prefix='background-ocr')
 
 # Inicializar Flask
 app = Flask(__name__)
@@ -44,6 +145,24 @@ def add_cors_headers(response):
     response.headers.add('Access-Control-Allow-Credentials', 'true')
     return response
 
+# Memoria de cada petición (RSS antes y después) y reciclaje del worker por umbral
+@app.before_request
+def begin_memory_tracking():
+    if request.method != 'OPTIONS':
+        g.memory_state = memory_monitor.begin()
+
+@app.teardown_request
+def end_memory_tracking(exc):
+    state = g.pop('memory_state', None)
+    if state is not None:
+        memory_monitor.end(request.endpoint or request.path, state)
+
+# Cambios de versión del modelo hechos desde otro worker
+@app.before_request
+def sync_model_versions():
+    if model_registry is not None:
+        model_registry.sync()
+
 # Manejar solicitudes OPTIONS para preflight CORS para /api/scan
 @app.route('/api/scan', methods=['OPTIONS'])
 def handle_api_scan_options():
@@ -65,48 +184,243 @@ def handle_options(path):
     response.headers.add('Access-Control-Allow-Credentials', 'true')
     return response
 
-# Inicializar el escáner
-try:
-    scanner = WidgetScanner(
-        model_id=MODEL_ID,
-        api_key=ROBOFLOW_API_KEY,
-        output_dir=OUTPUT_FOLDER
-    )
-    MODEL_LOADED = True
-    print(f"✅ Modelo cargado exitosamente: {MODEL_ID}")
-except Exception as e:
-    print(f"⚠️ Error al cargar el modelo: {str(e)}")
-    print("La aplicación se ejecutará en modo limitado. No se podrán escanear imágenes.")
-    print("\nPosibles soluciones:")
-    print("1. Verifica que la API key en el archivo .env sea correcta")
-    print("2. Asegúrate de tener acceso al modelo especificado en Roboflow")
-    print("3. Modifica el MODEL_ID en app.py si es necesario")
-    print("4. Ejecuta test_api_key.py para verificar la API key y obtener sugerencias de model_id")
+# Reparto de núcleos entre OpenCV, torch y los workers de OCR (CPU_CORES, OCR_WORKERS, OCR_THREADS)
+resource_plan = ResourcePlan.from_env()
+if resource_plan.ocr_workers and work_queue is None:
+    configure_threads(cv2_threads=resource_plan.cv2_threads)
+    ocr_reader = OCRPool(resource_plan.ocr_workers, resource_plan.ocr_threads, preload=ocr_profiles.resolve())
+else:
+    configure_threads(torch_threads=resource_plan.ocr_threads, cv2_threads=resource_plan.cv2_threads)
+    ocr_reader = None
+
+def load_model(model_id):
+    """Carga una versión del modelo de Roboflow (en el hilo de carga del registro)"""
+    return get_model(model_id=model_id, api_key=ROBOFLOW_API_KEY)
+
+def activate_model(model_id, model):
+    """Instala otra versión del modelo: las peticiones nuevas usan una copia del escáner con ella"""
+    global scanner
+    scanner = scanner.with_model(model_id, model)
+
+# Inicializar el escáner (con la versión promocionada, si la hay)
+model_registry = None
+if work_queue is not None:
+    # Nodo de API: el modelo y el OCR se cargan en los nodos de escaneo
+    scanner = None
     MODEL_LOADED = False
+    print(f"✅ Escaneos encolados en {WORK_QUEUE_URL} (SCAN_MODE=queue)")
+else:
+    try:
+        def create_scanner(model_id):
+            return WidgetScanner(
+                model_id=model_id,
+                api_key=ROBOFLOW_API_KEY,
+                output_dir=output_store,
+                reader=ocr_reader,
+                ocr_cache=ocr_cache,
+                screen_index=screen_index,
+                ingest=image_ingest,
+                ocr_profiles=ocr_profiles
+            )
+
+        promoted_id = ModelRegistry.read_state(MODEL_STATE_FILE).get("active")
+        try:
+            scanner = create_scanner(promoted_id or MODEL_ID)
+        except Exception as e:
+            # Una versión promocionada que ya no carga no deja al worker sin modelo
+            if not promoted_id or promoted_id == MODEL_ID:
+                raise
+            print(f"⚠️ No se pudo cargar la versión promocionada {promoted_id}: {str(e)}. Se usa {MODEL_ID}")
+            scanner = create_scanner(MODEL_ID)
+        # El lector del perfil por defecto se carga al arrancar; los demás, al pedirlos
+        if ocr_reader is not None:
+            ocr_reader.start()
+        else:
+            ocr_profiles.reader(ocr_profiles.resolve())
+        model_registry = ModelRegistry(load_model, scanner.model_id, scanner.model, state_path=MODEL_STATE_FILE,
+                                       on_activate=activate_model)
+        MODEL_LOADED = True
+        print(f"✅ Modelo cargado exitosamente: {scanner.model_id}")
+        print(f"✅ Recursos: {resource_plan}")
+    except Exception as e:
+        print(f"⚠️ Error al cargar el modelo: {str(e)}")
+        print("La aplicación se ejecutará en modo limitado. No se podrán escanear imágenes.")
+        print("\nPosibles soluciones:")
+        print("1. Verifica que la API key en el archivo .env sea correcta")
+        print("2. Asegúrate de tener acceso al modelo especificado en Roboflow")
+        print("3. Define MODEL_ID en el archivo .env si es necesario")
+        print("4. Ejecuta test_api_key.py para verificar la API key y obtener sugerencias de model_id")
+        MODEL_LOADED = False
 
 def allowed_file(filename):
     """Verifica si el archivo tiene una extensión permitida"""
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def encoded_response(body, fmt):
+    """Crea la respuesta con el tipo MIME del formato y compresión gzip si el cliente la admite"""
+    body, encoding = serialization.maybe_compress(body, request.headers.get('Accept-Encoding'))
+    response = Response(body, mimetype=serialization.MIME_TYPES[fmt])
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept, Accept-Encoding'
+    return response
+
+def admin_error():
+    """Comprueba el token de administración; devuelve la respuesta de error o None"""
+    if ADMIN_TOKEN is None:
+        return jsonify({'error': 'Endpoints de administración desactivados (definir ADMIN_TOKEN)'}), 404
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN):
+        return jsonify({'error': 'Token de administración no válido'}), 401
+    return None
+
+def current_model_id():
+    return model_registry.active_id if model_registry is not None else MODEL_ID
+
+def model_not_loaded_response():
+    """Respuesta de la API cuando el modelo no está disponible"""
+    return jsonify({
+        'error': 'El modelo no está disponible. Por favor, verifica la configuración de la API key y el model_id.',
+        'model_status': 'not_loaded',
+        'model_id': current_model_id()
+    }), 503
+
+QUEUE_MODE_ERROR = ('Con SCAN_MODE=queue este nodo no carga el modelo: solo /api/scan (encolado) y '
+                    '/api/jobs/<job_id> están disponibles')
+
+def queue_mode_response():
+    """Respuesta de la API para los escaneos que no se encolan (`SCAN_MODE=queue`)"""
+    return jsonify({'error': QUEUE_MODE_ERROR, 'scan_mode': SCAN_MODE}), 501
+
+def api_uploaded_file():
+    """Valida el archivo de una petición de la API; devuelve (archivo, None) o (None, respuesta de error)"""
+    # Verificar si hay un archivo en la solicitud
+    if 'file' not in request.files:
+        return None, (jsonify({'error': 'No se seleccionó ningún archivo'}), 400)
+
+    file = request.files['file']
+
+    # Verificar si el usuario seleccionó un archivo
+    if file.filename == '':
+        return None, (jsonify({'error': 'No se seleccionó ningún archivo'}), 400)
+
+    # Verificar si el archivo es válido
+    if not allowed_file(file.filename):
+        return None, (jsonify({'error': 'Tipo de archivo no permitido'}), 400)
+
+    return file, None
+
+def requested_ocr_profile():
+    """Perfil de OCR pedido (`ocr_profile`); devuelve (nombre o None, None) o (None, respuesta de error)"""
+    name = request.values.get('ocr_profile') or None
+    if name is not None and name not in ocr_profiles.profiles:
+        return None, (jsonify({'error': f'Perfil de OCR desconocido: {name}',
+                               'profiles': sorted(ocr_profiles.profiles)}), 400)
+    return name, None
+
+def result_files(result, upload_filename):
+    """URLs de los archivos de un escaneo"""
+    base_url = request.host_url.rstrip('/')
+    return {
+        'original_image': f"{base_url}/uploads/{upload_filename}",
+        'annotated_image': f"{base_url}/output/{output_store.relative(result.image_path)}",
+        'json_file': f"{base_url}/output/{output_store.relative(result.json_path)}"
+    }
+
+def scan_options():
+    """
+    Lee de la petición los recortes (`regions`) y las clases (`classes`) a escanear.
+
+    `regions` es JSON: un rectángulo `[x1, y1, x2, y2]` o una lista de ellos.
+    `classes` es una lista separada por comas (o JSON). Lanza `ValueError` si no son válidos
+    (ver `WidgetScanner.parse_scan_options`).
+    """
+    return WidgetScanner.parse_scan_options(request.values.get('regions'), request.values.get('classes'))
+
+def load_report(scan_id):
+    """Carga el reporte JSON de un escaneo guardado (None si no existe o ya fue eliminado)"""
+    scan = result_store.get_scan(scan_id)
+    if scan is None or not os.path.exists(scan['json_path']):
+        # Puede estar aún en la cola de escritura (o su reporte completo, si el parcial ya se eliminó)
+        result_store.flush()
+        scan = result_store.get_scan(scan_id)
+    if scan is None or not os.path.exists(scan['json_path']):
+        return None
+    with open(scan['json_path'], encoding='utf-8') as f:
+        return json.load(f)
+
 @app.route('/')
 def index():
     """Página principal con formulario de carga de imágenes"""
-    return render_template('index.html', model_loaded=MODEL_LOADED, model_id=MODEL_ID)
+    return render_template('index.html', model_loaded=MODEL_LOADED, model_id=current_model_id())
+
+def serve_artifact(store, folder, filename):
+    """
+    Sirve un archivo del almacén con validación condicional (ETag, If-None-Match) y rangos.
+
+    Los archivos direccionados por contenido son inmutables: llevan un ETag fuerte
+    (su hash) y ``Cache-Control: immutable``. Con ``?size=thumb`` se sirve una
+    miniatura JPEG de la imagen.
+    """
+    # Rutas que salen del almacén (`..`, absolutas): ni miniatura, ni touch, ni envío
+    if store.resolve(filename) is None:
+        return jsonify({'error': 'Archivo no encontrado'}), 404
+    if request.args.get('size') == 'thumb':
+        thumb = store.thumbnail(filename)
+        if thumb is None:
+            return jsonify({'error': 'Archivo no encontrado'}), 404
+        filename = thumb
+
+    store.touch(filename)
+    etag = store.content_etag(filename)
+    if etag is None:
+        return send_from_directory(folder, filename)
+
+    response = send_from_directory(folder, filename, etag=etag, max_age=31536000, conditional=True)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
 
-@app.route('/uploads/<filename>')
+@app.route('/uploads/<path:filename>')
 def uploaded_file(filename):
     """Sirve archivos subidos"""
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    return serve_artifact(upload_store, app.config['UPLOAD_FOLDER'], filename)
 
-@app.route('/output/<filename>')
+@app.route('/output/<path:filename>')
 def output_file(filename):
     """Sirve archivos de resultados"""
-    return send_from_directory(app.config['OUTPUT_FOLDER'], filename)
+    return serve_artifact(output_store, app.config['OUTPUT_FOLDER'], filename)
+
+def upload_extension(file):
+    """
+    Extensión del archivo subido (ya validada por `allowed_file` o por la lista de videos).
+
+    Se toma del nombre original: el nombre en disco es el hash del contenido, y `secure_filename`
+    puede dejar sin punto nombres válidos (`图片.png` -> `png`).
+    """
+    return file.filename.rsplit('.', 1)[1].lower()
+
+def save_upload(file):
+    """Guarda el archivo subido con nombre direccionado por contenido; devuelve su ruta y su ruta relativa"""
+    extension = upload_extension(file)
+    file_path = upload_store.put_stream(file.stream, suffix=f".{extension}")
+    return file_path, upload_store.relative(file_path)
+
+def save_image_upload(file):
+    """
+    Guarda una imagen subida comprobando su tamaño y sus dimensiones antes de decodificarla.
+
+    Lanza ``UploadRejected`` (con el código HTTP en ``status``) si supera los límites.
+    """
+    extension = upload_extension(file)
+    file_path, _ = image_ingest.receive(file.stream, upload_store, suffix=f".{extension}")
+    return file_path, upload_store.relative(file_path)
 
 @app.route('/scan', methods=['POST'])
 def scan_image():
     """Endpoint para escanear una imagen desde la interfaz web"""
+    if work_queue is not None:
+        return render_template('error.html', error=QUEUE_MODE_ERROR), 501
     # Verificar si el modelo está cargado
     if not MODEL_LOADED:
         return render_template('error.html', error='El modelo no está disponible. Por favor, verifica la configuración de la API key y el model_id.'), 503
@@ -124,17 +438,20 @@ def scan_image():
     # Verificar si el archivo es válido
     if file and allowed_file(file.filename):
         # Guardar el archivo
-        filename = secure_filename(file.filename)
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
+        try:
+            file_path, filename = save_image_upload(file)
+        except UploadRejected as e:
+            return render_template('error.html', error=str(e)), e.status
 
         try:
             # Escanear la imagen
-            report, json_path, image_path = scanner.scan_image(file_path)
+            result = scanner.scan(file_path)
+            result_store.add(result)
+            report = result.report
 
-            # Extraer solo los nombres de archivo de las rutas completas
-            json_filename = os.path.basename(json_path)
-            image_filename = os.path.basename(image_path)
+            # Rutas relativas al directorio de resultados
+            json_filename = output_store.relative(result.json_path)
+            image_filename = output_store.relative(result.image_path)
 
             # Renderizar la página de resultados
             return render_template(
@@ -150,62 +467,392 @@ def scan_image():
 
     return render_template('error.html', error='Tipo de archivo no permitido'), 400
 
+def shadow_scan(file_path):
+    """Envía un escaneo a la comparación en sombra con la versión candidata del modelo (si la hay)"""
+    if model_registry is None:
+        return
+    current = scanner
+    model_registry.shadow(lambda model_id, model, image: current.with_model(model_id, model).detect(image)[0],
+                          lambda: current.read_image(file_path)[0])
+
+def complete_in_background(result):
+    """Termina en segundo plano el OCR pendiente de un escaneo y guarda el resultado completo"""
+    def run():
+        try:
+            result_store.add(result.completion())
+        except Exception as e:
+            print(f"⚠️ Error al completar el escaneo {result.scan_id}: {str(e)}")
+
+    background_ocr.submit(run)
+
+def job_response(job):
+    """
+    Respuesta de un trabajo encolado: el reporte si terminó (como `/api/scan`), el error si
+    falló o 202 con su estado mientras espera o se escanea.
+    """
+    status = {'job_id': job.id, 'status': job.status, 'attempts': job.attempts}
+    if job.status == 'failed':
+        return jsonify({'error': job.error, **status}), 500
+    if job.status != 'done':
+        status['status_url'] = url_for('api_get_job', job_id=job.id, _external=True)
+        return jsonify(status), 202
+
+    json_path = os.path.join(output_store.root, job.result['json_file'])
+    if not os.path.exists(json_path):
+        return jsonify({'error': 'El reporte ya fue eliminado', **status}), 410
+    with open(json_path, 'rb') as f:
+        report_json = f.read()
+    base_url = request.host_url.rstrip('/')
+    files = {
+        'original_image': f"{base_url}/uploads/{job.payload['file']}",
+        'annotated_image': f"{base_url}/output/{job.result['image_file']}",
+        'json_file': f"{base_url}/output/{job.result['json_file']}"
+    }
+    fmt = serialization.negotiate_format(request.headers.get('Accept'))
+    body = serialization.api_response_body(json.loads(report_json), report_json, files, fmt,
+                                           extra={**status, 'scan_id': job.result['scan_id']})
+    return encoded_response(body, fmt)
+
 @app.route('/api/scan', methods=['POST'])
 def api_scan_image():
-    """API endpoint para escanear una imagen"""
-    # Verificar si el modelo está cargado
+    """
+    API endpoint para escanear una imagen.
+
+    Parámetro opcional `deadline_ms` (formulario o query): tiempo máximo de respuesta.
+    El OCR se hace por prioridad hasta el límite; los componentes sin leer se devuelven
+    con `pending` y se completan en segundo plano (consultar `/api/results/<scan_id>`).
+
+    Parámetros opcionales `regions` y `classes` para escanear solo parte de la imagen
+    (ver `scan_options`), `project` para corregir el OCR con el vocabulario del proyecto
+    y `ocr_profile` para elegir el perfil de OCR (por defecto, el del proyecto).
+
+    Con `SCAN_MODE=queue` el escaneo se encola y se responde 202 con `job_id` (consultar
+    `/api/jobs/<job_id>`); con `wait_ms` se espera el resultado hasta ese tiempo. En ese modo
+    `deadline_ms` se rechaza (400).
+    """
+    started = time.monotonic()
+    # Verificar si el modelo está cargado (en modo cola escanean los nodos de escaneo)
+    if not MODEL_LOADED and work_queue is None:
+        return model_not_loaded_response()
+
+    deadline_ms = request.values.get('deadline_ms', type=float)
+    if deadline_ms is not None and work_queue is not None:
+        # El tiempo en cola no se puede acotar: el límite de respuesta es `wait_ms`
+        return jsonify({'error': 'deadline_ms no está disponible con SCAN_MODE=queue; usar wait_ms'}), 400
+    deadline = started + deadline_ms / 1000.0 if deadline_ms is not None else None
+    try:
+        regions, classes = scan_options()
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
+    project = request.values.get('project') or None
+    if project and not PROJECT_NAME.match(project):
+        return jsonify({'error': f'Nombre de proyecto no válido: {project}'}), 400
+    ocr_profile, error = requested_ocr_profile()
+    if error:
+        return error
+
+    # Verificar el archivo de la solicitud
+    file, error = api_uploaded_file()
+    if error:
+        return error
+
+    # Guardar el archivo
+    try:
+        file_path, filename = save_image_upload(file)
+    except UploadRejected as e:
+        return jsonify({'error': str(e)}), e.status
+
+    if work_queue is not None:
+        job_id = work_queue.enqueue({'file': filename, 'regions': regions, 'classes': classes, 'project': project,
+                                     'ocr_profile': ocr_profile})
+        wait_ms = request.values.get('wait_ms', type=float)
+        return job_response(wait_for(work_queue, job_id, wait_ms / 1000.0) if wait_ms else work_queue.get(job_id))
+
+    try:
+        # Escanear la imagen
+        result = scanner.scan(file_path, deadline=deadline, regions=regions, classes=classes, project=project,
+                              ocr_profile=ocr_profile)
+        result_store.add(result)
+        if result.completion is not None:
+            complete_in_background(result)
+        shadow_scan(file_path)
+
+        # Formato según la cabecera Accept; en JSON se reutilizan los bytes del archivo
+        fmt = serialization.negotiate_format(request.headers.get('Accept'))
+        body = serialization.api_response_body(result.report, result.report_json, result_files(result, filename), fmt)
+        return encoded_response(body, fmt)
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/scan/incremental', methods=['POST'])
+def api_scan_incremental():
+    """
+    API endpoint para re-escanear una captura sucesiva de la misma pantalla.
+
+    Recibe la nueva imagen (`file`) y el ID del escaneo anterior (`previous_id`);
+    solo se analizan las regiones que cambiaron. La respuesta incluye `changes`.
+    Parámetros opcionales `project` y `ocr_profile`; por defecto, los del escaneo anterior.
+    """
+    if work_queue is not None:
+        return queue_mode_response()
+    if not MODEL_LOADED:
+        return model_not_loaded_response()
+
+    previous_id = request.form.get('previous_id')
+    if not previous_id:
+        return jsonify({'error': 'Falta el parámetro previous_id'}), 400
+    project = request.values.get('project') or None
+    if project and not PROJECT_NAME.match(project):
+        return jsonify({'error': f'Nombre de proyecto no válido: {project}'}), 400
+    ocr_profile, error = requested_ocr_profile()
+    if error:
+        return error
+
+    file, error = api_uploaded_file()
+    if error:
+        return error
+
+    previous_report = load_report(previous_id)
+    if previous_report is None:
+        return jsonify({'error': f'Escaneo anterior no encontrado: {previous_id}'}), 404
+
+    try:
+        file_path, filename = save_image_upload(file)
+    except UploadRejected as e:
+        return jsonify({'error': str(e)}), e.status
+
+    try:
+        result, changes = scanner.scan_incremental(file_path, previous_report, project, ocr_profile)
+        result_store.add(result)
+
+        fmt = serialization.negotiate_format(request.headers.get('Accept'))
+        body = serialization.api_response_body(result.report, result.report_json, result_files(result, filename),
+                                               fmt, extra={'changes': changes})
+        return encoded_response(body, fmt)
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/scan/stream', methods=['POST'])
+def api_scan_stream():
+    """
+    API endpoint para escanear una imagen recibiendo resultados parciales (Server-Sent Events).
+
+    Eventos, en orden: `detections` (cajas sin relacionar, justo después de la
+    inferencia), un `component` por componente en cuanto tiene sus textos, `files`
+    (URLs de la imagen anotada y del JSON) y `done` (ID del escaneo). Si algo falla
+    se envía `error`. Parámetro opcional `ocr_profile` (perfil de OCR).
+    """
+    if work_queue is not None:
+        return queue_mode_response()
     if not MODEL_LOADED:
-        return jsonify({
-            'error': 'El modelo no está disponible. Por favor, verifica la configuración de la API key y el model_id.',
-            'model_status': 'not_loaded',
-            'model_id': MODEL_ID
-        }), 503
+        return model_not_loaded_response()
+
+    ocr_profile, error = requested_ocr_profile()
+    if error:
+        return error
+
+    file, error = api_uploaded_file()
+    if error:
+        return error
+
+    try:
+        file_path, filename = save_image_upload(file)
+    except UploadRejected as e:
+        return jsonify({'error': str(e)}), e.status
+    # Las URLs se calculan aquí: el hilo del escaneo no tiene contexto de petición
+    base_url = request.host_url.rstrip('/')
+
+    def on_saved(result):
+        result_store.add(result)
+        return {
+            'original_image': f"{base_url}/uploads/{filename}",
+            'annotated_image': f"{base_url}/output/{output_store.relative(result.image_path)}",
+            'json_file': f"{base_url}/output/{output_store.relative(result.json_path)}"
+        }
+
+    events = serialization.sse_stream(
+        lambda on_event: scanner.scan(file_path, on_event=on_event, ocr_profile=ocr_profile), on_saved)
+    response = Response(events, mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Sin buffer en proxies (nginx)
+    return response
 
-    # Verificar si hay un archivo en la solicitud
-    if 'file' not in request.files:
-        return jsonify({'error': 'No se seleccionó ningún archivo'}), 400
+@app.route('/api/scan/video', methods=['POST'])
+def api_scan_video():
+    """
+    API endpoint para escanear una grabación de pantalla.
+
+    Devuelve un reporte por cada pantalla distinta del video, con el segundo en que
+    aparece (`start`) y en que cambia (`end`). Parámetro opcional `sample_interval`
+    (segundos entre fotogramas analizados).
+    """
+    if work_queue is not None:
+        return queue_mode_response()
+    if not MODEL_LOADED:
+        return model_not_loaded_response()
 
-    file = request.files['file']
+    # Los videos tienen su propio límite de tamaño
+    request.max_content_length = VIDEO_MAX_BYTES
 
-    # Verificar si el usuario seleccionó un archivo
-    if file.filename == '':
+    file = request.files.get('file')
+    if file is None or file.filename == '':
         return jsonify({'error': 'No se seleccionó ningún archivo'}), 400
-
-    # Verificar si el archivo es válido
-    if file and allowed_file(file.filename):
-        # Guardar el archivo
-        filename = secure_filename(file.filename)
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
-
-        try:
-            # Escanear la imagen
-            report, json_path, image_path = scanner.scan_image(file_path)
-
-            # Extraer solo los nombres de archivo de las rutas completas
-            json_filename = os.path.basename(json_path)
-            image_filename = os.path.basename(image_path)
-
-            # Construir URLs para los archivos generados
-            base_url = request.host_url.rstrip('/')
-
-            # Preparar respuesta JSON
-            response = {
-                'success': True,
-                'report': report,
-                'files': {
-                    'original_image': f"{base_url}/uploads/{filename}",
-                    'annotated_image': f"{base_url}/output/{image_filename}",
-                    'json_file': f"{base_url}/output/{json_filename}"
-                }
-            }
-
-            return jsonify(response)
-
-        except Exception as e:
-            return jsonify({'error': str(e)}), 500
-
-    return jsonify({'error': 'Tipo de archivo no permitido'}), 400
+    if '.' not in file.filename or file.filename.rsplit('.', 1)[1].lower() not in video.VIDEO_EXTENSIONS:
+        return jsonify({'error': 'Tipo de video no permitido'}), 400
+
+    sample_interval = request.form.get('sample_interval', video.SAMPLE_INTERVAL, type=float)
+    file_path, filename = save_upload(file)
+
+    try:
+        screens = []
+        for result in video.scan_video(scanner, file_path, frame_store=upload_store,
+                                       sample_interval=max(sample_interval, 0.0), max_screens=VIDEO_MAX_SCREENS):
+            result_store.add(result)
+            frame = upload_store.relative(result.report['metadata']['source_image'])
+            screens.append((result, result_files(result, frame)))
+
+        fmt = serialization.negotiate_format(request.headers.get('Accept'))
+        video_url = f"{request.host_url.rstrip('/')}/uploads/{filename}"
+        return encoded_response(serialization.video_response_body(video_url, screens, fmt), fmt)
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/results/search', methods=['GET'])
+def api_search_results():
+    """Busca componentes en los escaneos guardados (tipo, texto, celdas, modelo y fechas)"""
+    args = request.args
+    try:
+        matches = result_store.search(
+            component_type=args.get('type'),
+            text=args.get('text'),
+            min_cells=args.get('min_cells', type=int),
+            model_id=args.get('model'),
+            since=args.get('since', type=float),
+            until=args.get('until', type=float),
+            limit=min(args.get('limit', 100, type=int), 1000)
+        )
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+    base_url = request.host_url.rstrip('/')
+    for match in matches:
+        match['json_file'] = f"{base_url}/output/{output_store.relative(match.pop('json_path'))}"
+        match['annotated_image'] = f"{base_url}/output/{output_store.relative(match.pop('image_path'))}"
+    return jsonify({'count': len(matches), 'results': matches})
+
+@app.route('/api/results/<scan_id>', methods=['GET'])
+def api_get_result(scan_id):
+    """Devuelve los datos de un escaneo guardado (con `?report=1`, también su reporte)"""
+    scan = result_store.get_scan(scan_id)
+    if scan is None:
+        return jsonify({'error': 'Escaneo no encontrado'}), 404
+    if request.args.get('report', type=int):
+        scan['report'] = load_report(scan_id)
+    base_url = request.host_url.rstrip('/')
+    scan['json_file'] = f"{base_url}/output/{output_store.relative(scan.pop('json_path'))}"
+    scan['annotated_image'] = f"{base_url}/output/{output_store.relative(scan.pop('image_path'))}"
+    return jsonify(scan)
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def api_get_job(job_id):
+    """Estado de un escaneo encolado (`SCAN_MODE=queue`); al terminar, su reporte"""
+    job = work_queue.get(job_id) if work_queue is not None else None
+    if job is None:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    return job_response(job)
+
+@app.route('/api/metrics', methods=['GET'])
+def api_metrics():
+    """Métricas del proceso: caché de OCR, memoria, imágenes recibidas, reparto de núcleos y cola de trabajos"""
+    return jsonify({
+        'pid': os.getpid(),
+        'ocr_cache': ocr_cache.stats() if ocr_cache is not None else None,
+        'screen_index': len(screen_index) if screen_index is not None else None,
+        'memory': memory_monitor.stats(ocr_reader.pids() if ocr_reader is not None else ()),
+        'ingest': image_ingest.stats(),
+        'ocr_profiles': ocr_profiles.as_dict(),
+        'resources': resource_plan.as_dict(),
+        'scan_mode': SCAN_MODE,
+        'work_queue': work_queue.stats() if work_queue is not None else None,
+    })
+
+@app.route('/admin/memory', methods=['GET'])
+def admin_memory():
+    """
+    Memoria del worker que atiende la petición (requiere `X-Admin-Token`).
+
+    Devuelve el resumen de `/api/metrics`, las últimas peticiones (RSS antes/después) y,
+    con tracemalloc activo, los `top` puntos del código con más memoria asignada
+    (`group`: lineno, filename o traceback). Con `compare=1` se devuelve lo que creció
+    desde la llamada anterior. `trace=start` (con `frames`) o `trace=stop` activan o
+    desactivan tracemalloc (ralentiza el proceso mientras está activo).
+    """
+    error = admin_error()
+    if error:
+        return error
+    trace = request.args.get('trace')
+    if trace == 'start':
+        memory_monitor.start_tracing(request.args.get('frames', 1, type=int))
+    elif trace == 'stop':
+        memory_monitor.stop_tracing()
+    group = request.args.get('group', 'lineno')
+    if group not in ('lineno', 'filename', 'traceback'):
+        return jsonify({'error': f'Agrupación no válida: {group}'}), 400
+    return jsonify({
+        'memory': memory_monitor.stats(ocr_reader.pids() if ocr_reader is not None else ()),
+        'recent': memory_monitor.history(),
+        'top': memory_monitor.top(request.args.get('top', 20, type=int), group,
+                                  compare=bool(request.args.get('compare', type=int))),
+    })
+
+@app.route('/admin/models', methods=['GET'])
+def admin_models():
+    """Versiones del modelo: activa, anterior, candidata, cargas y comparación en sombra (de este worker)"""
+    error = admin_error()
+    if error:
+        return error
+    if model_registry is None:
+        return model_not_loaded_response()
+    return jsonify(model_registry.status())
+
+@app.route('/admin/models/candidate', methods=['POST'])
+def admin_model_candidate():
+    """
+    Carga en segundo plano una versión candidata (`model_id`) y le envía en sombra la
+    fracción `shadow_ratio` (0-1) de los escaneos de `/api/scan`. Sin `model_id` se retira.
+    """
+    error = admin_error()
+    if error:
+        return error
+    if model_registry is None:
+        return model_not_loaded_response()
+    data = request.get_json(silent=True) or request.form
+    try:
+        shadow_ratio = float(data.get('shadow_ratio', 0.0))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'shadow_ratio debe ser un número entre 0 y 1'}), 400
+    return jsonify(model_registry.set_candidate(data.get('model_id') or None, shadow_ratio)), 202
+
+@app.route('/admin/models/promote', methods=['POST'])
+def admin_model_promote():
+    """
+    Activa una versión (`model_id`; por defecto la candidata) en todos los workers. Si aún se
+    está cargando, se activa al terminar; las peticiones en curso acaban con la versión anterior.
+    """
+    error = admin_error()
+    if error:
+        return error
+    if model_registry is None:
+        return model_not_loaded_response()
+    data = request.get_json(silent=True) or request.form
+    try:
+        version = model_registry.promote(data.get('model_id') or None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(model_registry.status()), 200 if version.model_id == model_registry.active_id else 202
 
 if __name__ == '__main__':
     # Get port from environment variable or default to 1000
@@ -0,0 +1,156 @@
+import numpy as np
+import supervision as sv
+
+
+class DetectionSet:
+    """
+    Detecciones de una imagen en formato compacto, respaldado por arrays NumPy.
+
+    Se usa en todas las etapas del escaneo (post-procesamiento, relaciones, OCR y
+    tablas); el reporte JSON solo se genera al final a partir de esta estructura.
+
+    Atributos:
+        xyxy (numpy.ndarray): Cajas [x1, y1, x2, y2], ``float32`` de forma (N, 4)
+        confidence (numpy.ndarray): Confianza de cada detección, ``float64`` (se copia tal cual al reporte)
+        class_id (numpy.ndarray): ID de clase del modelo, ``int16``
+        labels (tuple): Nombres de clase distintos presentes en la imagen
+        label_id (numpy.ndarray): Posición de la clase de cada detección en ``labels``
+        text_index (numpy.ndarray): Índice en ``texts`` del OCR de cada detección (-1 si no tiene)
+        texts (list): Resultados de OCR
+    """
+
+    __slots__ = ("xyxy", "confidence", "class_id", "labels", "label_id", "text_index", "texts")
+
+    def __init__(self, xyxy, confidence, class_id, class_names):
+        """
+        Args:
+            xyxy (numpy.ndarray): Cajas de las detecciones, forma (N, 4)
+            confidence (numpy.ndarray): Confianza de cada detección
+            class_id (numpy.ndarray): ID de clase de cada detección
+            class_names (list): Nombre de clase de cada detección
+        """
+        self.xyxy = np.ascontiguousarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        self.confidence = np.asarray(confidence, dtype=np.float64).reshape(-1)
+        self.class_id = np.asarray(class_id, dtype=np.int16).reshape(-1)
+        labels, label_id = np.unique(np.asarray(class_names, dtype=str), return_inverse=True)
+        self.labels = tuple(str(label) for label in labels)
+        self.label_id = label_id.astype(np.int16).reshape(-1)
+        self.text_index = np.full(len(self.xyxy), -1, dtype=np.int32)
+        self.texts = []
+
+    @classmethod
+    def from_supervision(cls, detections):
+        """Crea el conjunto a partir de un ``sv.Detections`` con ``data['class_name']``."""
+        class_names = detections.data.get('class_name', np.empty(0, dtype=str))
+        return cls(detections.xyxy, detections.confidence, detections.class_id, class_names)
+
+    @classmethod
+    def from_layout(cls, layout):
+        """
+        Reconstruye las detecciones (con sus textos) a partir del árbol ``layout`` de un reporte.
+
+        Args:
+            layout (list): Nodos raíz de ``report["layout"]``
+
+        Returns:
+            DetectionSet: Una detección por nodo del árbol
+        """
+        nodes = []
+        stack = list(reversed(layout))
+        while stack:
+            node = stack.pop()
+            nodes.append(node)
+            stack.extend(reversed(node.get("children", [])))
+
+        boxes = [[n["coordinates"][k] for k in ("x1", "y1", "x2", "y2")] for n in nodes]
+        dets = cls(np.array(boxes, dtype=np.float32).reshape(-1, 4), [n.get("confidence", 0.0) for n in nodes],
+                   np.zeros(len(nodes)), [n["type"] for n in nodes])
+        for i, node in enumerate(nodes):
+            if "text" in node:
+                dets.set_text(i, node["text"])
+        return dets
+
+    @classmethod
+    def concat(cls, sets):
+        """Une varios conjuntos de detecciones (conservando sus textos)."""
+        merged = cls(np.concatenate([s.xyxy for s in sets]).reshape(-1, 4),
+                     np.concatenate([s.confidence for s in sets]),
+                     np.concatenate([s.class_id for s in sets]),
+                     [name for s in sets for name in s.class_names])
+        offset = 0
+        for s in sets:
+            for i in np.flatnonzero(s.text_index >= 0).tolist():
+                merged.set_text(offset + i, s.text(i))
+            offset += len(s)
+        return merged
+
+    def subset(self, mask):
+        """Detecciones seleccionadas por una máscara o lista de índices (conservando sus textos)."""
+        indices = np.arange(len(self))[mask]
+        result = DetectionSet(self.xyxy[indices], self.confidence[indices], self.class_id[indices],
+                              [self.labels[i] for i in self.label_id[indices].tolist()])
+        for pos, i in enumerate(indices.tolist()):
+            if self.has_text(i):
+                result.set_text(pos, self.text(i))
+        return result
+
+    def scaled(self, factor):
+        """
+        Las mismas detecciones con las cajas multiplicadas por ``factor``.
+
+        Comparte los textos con este conjunto: los que se lean después aparecen en los dos.
+        """
+        result = DetectionSet.__new__(DetectionSet)
+        result.xyxy = self.xyxy * np.float32(factor)
+        result.confidence, result.class_id = self.confidence, self.class_id
+        result.labels, result.label_id = self.labels, self.label_id
+        result.text_index, result.texts = self.text_index, self.texts
+        return result
+
+    def to_supervision(self):
+        """Convierte el conjunto en ``sv.Detections`` (para los anotadores de supervision)."""
+        return sv.Detections(
+            xyxy=self.xyxy.astype(np.float64),
+            confidence=self.confidence,
+            class_id=self.class_id.astype(int),
+            data={'class_name': np.array(self.class_names)}
+        )
+
+    def __len__(self):
+        return len(self.xyxy)
+
+    @property
+    def class_names(self):
+        """Nombre de clase de cada detección."""
+        return [self.labels[i] for i in self.label_id.tolist()]
+
+    def class_name(self, idx):
+        """Nombre de clase de la detección ``idx``."""
+        return self.labels[self.label_id[idx]]
+
+    def mask(self, class_names):
+        """Máscara booleana de las detecciones cuya clase está en ``class_names``."""
+        ids = [i for i, label in enumerate(self.labels) if label in class_names]
+        return np.isin(self.label_id, ids)
+
+    def has_text(self, idx):
+        return self.text_index[idx] >= 0
+
+    def text(self, idx):
+        """Texto OCR de la detección ``idx`` (``None`` si aún no tiene)."""
+        pos = self.text_index[idx]
+        return self.texts[pos] if pos >= 0 else None
+
+    def set_text(self, idx, text):
+        """Guarda el texto OCR de la detección ``idx``."""
+        self.text_index[idx] = len(self.texts)
+        self.texts.append(text)
+
+    def clear_text(self, idx):
+        """Descarta el texto OCR de la detección ``idx`` (se volverá a extraer)."""
+        self.text_index[idx] = -1
+
+    def coordinates(self, idx):
+        """Coordenadas de la detección ``idx`` en el formato del reporte."""
+        x1, y1, x2, y2 = self.xyxy[idx].tolist()
+        return {"x1": int(x1), "y1": int(y1), "x2": int(x2), "y2": int(y2)}
@@ -0,0 +1,29 @@
+"""
+Configuración de gunicorn (se carga automáticamente con ``gunicorn app:app``).
+
+Los procesos y los hilos salen del mismo reparto de núcleos que usa la aplicación
+(``ocr_pool.ResourcePlan``): basta con fijar ``CPU_CORES`` (por defecto, los núcleos
+disponibles) y, opcionalmente, ``WEB_CONCURRENCY``, ``OCR_WORKERS`` y ``OCR_THREADS``.
+"""
+import os
+
+from ocr_pool import THREAD_ENV_VARS, ResourcePlan
+
+plan = ResourcePlan.from_env()
+
+workers = plan.web_workers
+threads = plan.web_threads
+# Cargar el modelo y los lectores OCR tarda más que el timeout por defecto
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+# Reciclaje de workers cada N peticiones (0 = nunca; con margen aleatorio para que no coincidan).
+# Por memoria: MEMORY_RECYCLE_MB (ver memory.MemoryMonitor)
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = max_requests // 10
+
+# Antes de que los workers importen torch: sin esto cada proceso usaría todos los núcleos
+for name in THREAD_ENV_VARS:
+    os.environ.setdefault(name, str(plan.cv2_threads if plan.ocr_workers else plan.ocr_threads))
+
+
+def when_ready(server):
+    server.log.info(f"Plan de recursos: {plan}")
@@ -0,0 +1,203 @@
+import cv2
+import numpy as np
+
+from postprocess import pairwise_iou
+
+
+# Diferencia mínima de intensidad (0-255) para considerar que un píxel cambió
+DIFF_THRESHOLD = 25
+# Margen (px) alrededor de cada cambio que se vuelve a analizar
+REGION_MARGIN = 24
+# Área mínima (px) de un cambio para tenerlo en cuenta (filtra ruido de compresión)
+MIN_CHANGE_AREA = 12
+# Si cambia más de esta fracción de la imagen se hace un escaneo completo
+MAX_CHANGED_FRACTION = 0.5
+# Distancia (px) al borde de una región a partir de la cual una detección se considera cortada
+EDGE_TOLERANCE = 2
+
+
+def merge_boxes(boxes):
+    """
+    Une cajas que se solapan hasta que ninguna se solape con otra.
+
+    Args:
+        boxes (numpy.ndarray): Cajas [x1, y1, x2, y2], forma (N, 4)
+
+    Returns:
+        numpy.ndarray: Cajas unidas
+    """
+    boxes = [list(b) for b in np.asarray(boxes).reshape(-1, 4).tolist()]
+    merged = True
+    while merged:
+        merged = False
+        result = []
+        for box in boxes:
+            for other in result:
+                if box[0] <= other[2] and box[2] >= other[0] and box[1] <= other[3] and box[3] >= other[1]:
+                    other[0], other[1] = min(other[0], box[0]), min(other[1], box[1])
+                    other[2], other[3] = max(other[2], box[2]), max(other[3], box[3])
+                    merged = True
+                    break
+            else:
+                result.append(box)
+        boxes = result
+    return np.array(boxes, dtype=np.int64).reshape(-1, 4)
+
+
+def changed_regions(previous, current, threshold=DIFF_THRESHOLD, margin=REGION_MARGIN, min_area=MIN_CHANGE_AREA):
+    """
+    Calcula las regiones que cambiaron entre dos capturas del mismo tamaño.
+
+    Args:
+        previous (numpy.ndarray): Imagen BGR anterior
+        current (numpy.ndarray): Imagen BGR nueva
+        threshold (int): Diferencia mínima de intensidad
+        margin (int): Margen añadido alrededor de cada cambio
+        min_area (int): Área mínima de un cambio
+
+    Returns:
+        numpy.ndarray: Regiones [x1, y1, x2, y2] (sin solapes, recortadas a la imagen)
+    """
+    diff = cv2.absdiff(cv2.cvtColor(previous, cv2.COLOR_BGR2GRAY), cv2.cvtColor(current, cv2.COLOR_BGR2GRAY))
+    _, mask = cv2.threshold(diff, threshold, 255, cv2.THRESH_BINARY)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+
+    h, w = current.shape[:2]
+    boxes = []
+    for x, y, bw, bh, area in stats[1:count].tolist():
+        if area >= min_area:
+            boxes.append([max(0, x - margin), max(0, y - margin), min(w, x + bw + margin), min(h, y + bh + margin)])
+    return merge_boxes(boxes)
+
+
+def area_fraction(regions, shape):
+    """Fracción de la imagen cubierta por las regiones (sin solapes)."""
+    regions = np.asarray(regions).reshape(-1, 4)
+    area = ((regions[:, 2] - regions[:, 0]) * (regions[:, 3] - regions[:, 1])).sum()
+    return float(area) / float(shape[0] * shape[1])
+
+
+def split_detections(dets, regions):
+    """
+    Clasifica las detecciones anteriores respecto a las regiones cambiadas.
+
+    Args:
+        dets (DetectionSet): Detecciones del escaneo anterior
+        regions (numpy.ndarray): Regiones cambiadas
+
+    Returns:
+        numpy.ndarray: Máscara de las que se reutilizan (no están completamente dentro de una región)
+        numpy.ndarray: Máscara de las que se reutilizan pero tocan una región (su OCR se repite)
+    """
+    boxes = dets.xyxy[:, None, :]
+    regions = np.asarray(regions, dtype=np.float32).reshape(1, -1, 4)
+    inside = (
+            (boxes[..., 0] >= regions[..., 0]) & (boxes[..., 1] >= regions[..., 1]) &
+            (boxes[..., 2] <= regions[..., 2]) & (boxes[..., 3] <= regions[..., 3])
+    ).any(axis=1)
+    touches = (
+            (boxes[..., 0] < regions[..., 2]) & (boxes[..., 2] > regions[..., 0]) &
+            (boxes[..., 1] < regions[..., 3]) & (boxes[..., 3] > regions[..., 1])
+    ).any(axis=1)
+    return ~inside, touches & ~inside
+
+
+def inside_region(xyxy, region, shape, edge=EDGE_TOLERANCE):
+    """
+    Máscara de las detecciones de un recorte que no están cortadas por su borde.
+
+    Un borde del recorte que coincide con el de la imagen no corta nada.
+
+    Args:
+        xyxy (numpy.ndarray): Cajas en coordenadas de la imagen completa
+        region (tuple): Región recortada [x1, y1, x2, y2]
+        shape (tuple): Forma de la imagen completa
+
+    Returns:
+        numpy.ndarray: Máscara booleana
+    """
+    x1, y1, x2, y2 = region
+    h, w = shape[:2]
+    ok = np.ones(len(xyxy), dtype=bool)
+    if x1 > 0:
+        ok &= xyxy[:, 0] > x1 + edge
+    if y1 > 0:
+        ok &= xyxy[:, 1] > y1 + edge
+    if x2 < w:
+        ok &= xyxy[:, 2] < x2 - edge
+    if y2 < h:
+        ok &= xyxy[:, 3] < y2 - edge
+    return ok
+
+
+def match_detections(a, b, iou_threshold=0.5):
+    """
+    Empareja dos conjuntos de detecciones de la misma imagen por clase e IoU.
+
+    El emparejamiento es voraz (mayor IoU primero) y cada detección forma como mucho
+    una pareja, con otra de su misma clase.
+
+    Args:
+        a (DetectionSet): Primer conjunto
+        b (DetectionSet): Segundo conjunto
+        iou_threshold (float): IoU mínimo de una pareja
+
+    Returns:
+        list: Parejas ``(índice en a, índice en b)``
+    """
+    pairs = []
+    matched_a = np.zeros(len(a), dtype=bool)
+    matched_b = np.zeros(len(b), dtype=bool)
+    a_names = np.array(a.class_names, dtype=str)
+    b_names = np.array(b.class_names, dtype=str)
+
+    for class_name in sorted(set(a_names.tolist()) & set(b_names.tolist())):
+        a_idx = np.flatnonzero(a_names == class_name)
+        b_idx = np.flatnonzero(b_names == class_name)
+        iou = pairwise_iou(a.xyxy[a_idx].astype(np.float64), b.xyxy[b_idx].astype(np.float64))
+        for flat in np.argsort(-iou, axis=None).tolist():
+            i, j = divmod(flat, len(b_idx))
+            if iou[i, j] < iou_threshold:
+                break
+            p, c = int(a_idx[i]), int(b_idx[j])
+            if matched_a[p] or matched_b[c]:
+                continue
+            matched_a[p] = matched_b[c] = True
+            pairs.append((p, c))
+    return pairs
+
+
+def diff_detections(previous, current, iou_threshold=0.5):
+    """
+    Compara dos conjuntos de detecciones de la misma pantalla.
+
+    Las detecciones se emparejan por clase e IoU (``match_detections``); las que no
+    tienen pareja son ``added``/``removed`` y las emparejadas con distinto texto son
+    ``text_changed``.
+
+    Args:
+        previous (DetectionSet): Detecciones anteriores
+        current (DetectionSet): Detecciones nuevas
+        iou_threshold (float): IoU mínimo para emparejar
+
+    Returns:
+        list: Un ``dict`` por cambio con ``change``, ``type``, ``coordinates`` y, si aplica, ``text``
+    """
+    changes = []
+    matched_prev = np.zeros(len(previous), dtype=bool)
+    matched_cur = np.zeros(len(current), dtype=bool)
+    for p, c in match_detections(previous, current, iou_threshold):
+        matched_prev[p] = matched_cur[c] = True
+        if previous.text(p) != current.text(c):
+            changes.append({"change": "text_changed", "type": current.class_name(c),
+                            "coordinates": current.coordinates(c),
+                            "previous_text": previous.text(p), "text": current.text(c)})
+
+    for p in np.flatnonzero(~matched_prev).tolist():
+        changes.append({"change": "removed", "type": previous.class_name(p), "coordinates": previous.coordinates(p)})
+    for c in np.flatnonzero(~matched_cur).tolist():
+        change = {"change": "added", "type": current.class_name(c), "coordinates": current.coordinates(c)}
+        if current.has_text(c):
+            change["text"] = current.text(c)
+        changes.append(change)
+    return changes
@@ -0,0 +1,319 @@
+import os
+import struct
+import threading
+
+import cv2
+
+# Bytes iniciales que se leen como máximo para encontrar el tamaño (los JPEG pueden
+# llevar EXIF y miniaturas antes del marcador SOF)
+HEADER_LIMIT = 256 * 1024
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Marcadores SOF de JPEG (los que llevan alto y ancho); C4, C8 y CC son otros segmentos
+JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+# Decodificación a resolución reducida (libjpeg escala al decodificar; PNG se decodifica
+# completo y después se reduce)
+REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+def image_size(data):
+    """
+    Formato y dimensiones de una imagen PNG o JPEG a partir de sus primeros bytes.
+
+    Args:
+        data (bytes): Comienzo del archivo
+
+    Returns:
+        tuple: ``(formato, ancho, alto)`` con formato ``png`` o ``jpeg``, o ``None`` si
+        los bytes no alcanzan o no son una imagen reconocible
+    """
+    if data.startswith(PNG_SIGNATURE):
+        if len(data) < 24 or data[12:16] != b"IHDR":
+            return None
+        width, height = struct.unpack(">II", data[16:24])
+        return "png", width, height
+
+    if not data.startswith(b"\xff\xd8"):
+        return None
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:  # Relleno entre marcadores
+            pos += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:  # Marcadores sin segmento
+            pos += 2
+            continue
+        length = struct.unpack(">H", data[pos + 2:pos + 4])[0]
+        if marker in JPEG_SOF:
+            if pos + 9 > len(data):
+                return None
+            height, width = struct.unpack(">HH", data[pos + 5:pos + 9])
+            return "jpeg", width, height
+        if marker == 0xDA:  # Inicio de los datos sin haber encontrado SOF
+            return None
+        pos += 2 + length
+    return None
+
+
+class UploadRejected(ValueError):
+    """Subida rechazada antes de decodificarla; ``status`` es el código HTTP (400 o 413)."""
+
+    def __init__(self, message, status=413):
+        super().__init__(message)
+        self.status = status
+
+
+class DecodePlan:
+    """Cómo se decodifica una imagen: factor de reducción y memoria estimada."""
+
+    __slots__ = ("format", "width", "height", "file_bytes", "factor", "peak_bytes", "reason")
+
+    def __init__(self, format, width, height, file_bytes, factor=1, peak_bytes=0, reason=None):
+        self.format = format
+        self.width = width
+        self.height = height
+        self.file_bytes = file_bytes
+        self.factor = factor
+        self.peak_bytes = peak_bytes
+        self.reason = reason  # ``working`` (resolución de trabajo) o ``memory`` (límite de memoria)
+
+    @property
+    def flag(self):
+        return REDUCED_FLAGS[self.factor]
+
+    @property
+    def size(self):
+        """Tamaño de la imagen decodificada (ancho, alto)."""
+        return -(-self.width // self.factor), -(-self.height // self.factor)
+
+    def as_dict(self):
+        return {
+            "format": self.format,
+            "original_size": [self.width, self.height],
+            "factor": self.factor,
+            "scale": 1 / self.factor,
+            "reason": self.reason,
+        }
+
+
+class ImageIngest:
+    """
+    Recepción y decodificación de imágenes con memoria acotada.
+
+    La subida se copia al almacén por bloques con un límite de bytes; las dimensiones
+    se leen de la cabecera (PNG ``IHDR`` o JPEG ``SOF``) antes de copiar el resto, así
+    que una imagen demasiado grande se rechaza sin decodificarla.
+
+    La decodificación se planifica antes de hacerla: con ``working_side`` la imagen se
+    decodifica con ``IMREAD_REDUCED_*`` al mayor factor (2, 4 u 8) que deja su lado
+    mayor en al menos ``working_side`` píxeles, y si la memoria estimada (archivo más
+    imagen decodificada) supera ``max_decode_bytes`` un JPEG se reduce hasta caber; un
+    PNG se decodifica siempre completo, así que se rechaza.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024, max_pixels=40_000_000, max_decode_bytes=None,
+                 working_side=None, chunk_size=256 * 1024):
+        """
+        Args:
+            max_bytes (int): Tamaño máximo del archivo
+            max_pixels (int): Píxeles máximos según la cabecera (protección frente a imágenes
+                que ocupan poco comprimidas y muchísimo decodificadas)
+            max_decode_bytes (int): Memoria estimada máxima para decodificar una imagen (opcional)
+            working_side (int): Lado mayor mínimo con el que se trabaja; permite decodificar
+                a resolución reducida las imágenes mayores (opcional)
+            chunk_size (int): Tamaño de cada lectura de la subida
+        """
+        self.max_bytes = max_bytes
+        self.max_pixels = max_pixels
+        self.max_decode_bytes = max_decode_bytes
+        self.working_side = working_side
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self._stats = {"accepted": 0, "rejected": 0, "reduced": 0, "max_decoded_bytes": 0, "max_peak_bytes": 0}
+
+    def plan(self, format, width, height, file_bytes=0):
+        """
+        Planifica la decodificación de una imagen o la rechaza.
+
+        Args:
+            format (str): ``png`` o ``jpeg``
+            width (int): Ancho según la cabecera
+            height (int): Alto según la cabecera
+            file_bytes (int): Tamaño del archivo (``imread`` lo carga entero)
+
+        Returns:
+            DecodePlan: Factor de reducción y memoria estimada
+
+        Raises:
+            UploadRejected: Si la imagen no cabe en los límites
+        """
+        if width <= 0 or height <= 0:
+            raise UploadRejected(f"Dimensiones no válidas: {width}x{height}", status=400)
+        if width * height > self.max_pixels:
+            raise UploadRejected(f"Imagen demasiado grande: {width}x{height} "
+                                 f"(máximo {self.max_pixels / 1e6:.0f} megapíxeles)")
+
+        factor, reason = 1, None
+        if self.working_side:
+            for candidate in (8, 4, 2):
+                if max(width, height) // candidate >= self.working_side:
+                    factor, reason = candidate, "working"
+                    break
+        plan = DecodePlan(format, width, height, file_bytes, factor, reason=reason)
+        plan.peak_bytes = self.peak_bytes(plan)
+        if self.max_decode_bytes is not None and plan.peak_bytes > self.max_decode_bytes:
+            if format == "jpeg":
+                while plan.factor < 8 and plan.peak_bytes > self.max_decode_bytes:
+                    plan.factor *= 2
+                    plan.reason = "memory"
+                    plan.peak_bytes = self.peak_bytes(plan)
+            if plan.peak_bytes > self.max_decode_bytes:
+                raise UploadRejected(f"Imagen demasiado grande para decodificarla: {width}x{height} "
+                                     f"(~{plan.peak_bytes / 2 ** 20:.0f} MiB, máximo "
+                                     f"{self.max_decode_bytes / 2 ** 20:.0f} MiB)")
+        return plan
+
+    @staticmethod
+    def peak_bytes(plan):
+        """Memoria estimada al decodificar: el archivo más la imagen BGR (completa si es PNG)."""
+        width, height = plan.size
+        decoded = width * height * 3
+        if plan.format == "png" and plan.factor > 1:
+            decoded += plan.width * plan.height * 3
+        return plan.file_bytes + decoded
+
+    def receive(self, stream, store, suffix=""):
+        """
+        Copia una subida al almacén comprobando su tamaño y sus dimensiones.
+
+        Args:
+            stream: Objeto con ``read(n)`` (por ejemplo, ``FileStorage.stream``)
+            store (OutputStore): Almacén de destino
+            suffix (str): Extensión, con punto
+
+        Returns:
+            str: Ruta del archivo
+            DecodePlan: Plan de decodificación
+
+        Raises:
+            UploadRejected: Si el archivo no es una imagen PNG/JPEG o supera los límites
+        """
+        upload = _CappedStream(stream, self.max_bytes, self.chunk_size)
+        try:
+            header = upload.peek(HEADER_LIMIT)
+            size = image_size(header)
+            if size is None:
+                raise UploadRejected("No se pudieron leer las dimensiones de la imagen (PNG o JPEG)", status=400)
+            # El tamaño del archivo todavía no se conoce: se planifica sin él y se repite al final
+            self.plan(*size)
+            path = store.put_stream(upload, suffix=suffix, chunk_size=self.chunk_size)
+        except UploadRejected:
+            self._count("rejected")
+            raise
+        try:
+            plan = self.plan(*size, file_bytes=upload.received)
+        except UploadRejected:
+            self._count("rejected")
+            os.remove(path)
+            raise
+        self._count("accepted")
+        return path, plan
+
+    def decode(self, path):
+        """
+        Decodifica una imagen según su plan.
+
+        Args:
+            path (str): Ruta de la imagen
+
+        Returns:
+            numpy.ndarray: Imagen BGR (reducida por ``plan.factor``)
+            DecodePlan: Plan aplicado
+
+        Raises:
+            FileNotFoundError: Si no se puede leer la imagen
+            UploadRejected: Si supera los límites
+        """
+        try:
+            with open(path, "rb") as f:
+                header = f.read(HEADER_LIMIT)
+            file_bytes = os.path.getsize(path)
+        except OSError:
+            raise FileNotFoundError(f"Imagen no encontrada: {path}")
+        size = image_size(header)
+        if size is None:
+            # Formato sin cabecera reconocible: decodificación normal
+            image = cv2.imread(path)
+            if image is None:
+                raise FileNotFoundError(f"Imagen no encontrada: {path}")
+            return image, None
+
+        plan = self.plan(*size, file_bytes=file_bytes)
+        image = cv2.imread(path, plan.flag)
+        if image is None:
+            raise FileNotFoundError(f"Imagen no encontrada: {path}")
+        with self._lock:
+            self._stats["max_decoded_bytes"] = max(self._stats["max_decoded_bytes"], image.nbytes)
+            self._stats["max_peak_bytes"] = max(self._stats["max_peak_bytes"], plan.peak_bytes)
+            if plan.factor > 1:
+                self._stats["reduced"] += 1
+        return image, plan
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self):
+        """Subidas aceptadas y rechazadas, decodificaciones reducidas y máximos de memoria."""
+        with self._lock:
+            return {
+                **self._stats,
+                "max_bytes": self.max_bytes,
+                "max_pixels": self.max_pixels,
+                "max_decode_bytes": self.max_decode_bytes,
+                "working_side": self.working_side,
+            }
+
+
+class _CappedStream:
+    """Flujo con límite de bytes que permite leer la cabecera antes de copiar el resto."""
+
+    __slots__ = ("stream", "max_bytes", "chunk_size", "received", "_head")
+
+    def __init__(self, stream, max_bytes, chunk_size):
+        self.stream = stream
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.received = 0
+        self._head = b""
+
+    def _read(self, n):
+        chunk = self.stream.read(n)
+        self.received += len(chunk)
+        if self.max_bytes is not None and self.received > self.max_bytes:
+            raise UploadRejected(f"Archivo demasiado grande (máximo {self.max_bytes / 2 ** 20:.0f} MB)")
+        return chunk
+
+    def peek(self, limit):
+        """Lee hasta encontrar las dimensiones, ``limit`` bytes o el final; ``read`` los devuelve después."""
+        while len(self._head) < limit and image_size(self._head) is None:
+            chunk = self._read(min(self.chunk_size, limit - len(self._head)))
+            if not chunk:
+                break
+            self._head += chunk
+        return self._head
+
+    def read(self, n=-1):
+        if self._head:
+            head, self._head = self._head, b""
+            return head
+        return self._read(n if n is not None and n >= 0 else self.chunk_size)
@@ -0,0 +1,209 @@
+import numpy as np
+
+
+# Número de cajas por hoja / hijos por nodo del índice espacial
+LEAF_SIZE = 16
+
+
+def _as_margins(margin):
+    """Normaliza un margen escalar o (izq, arriba, der, abajo) a un array de 4 valores."""
+    if np.isscalar(margin):
+        return np.full(4, float(margin))
+    return np.asarray(margin, dtype=np.float64).reshape(4)
+
+
+class BoxIndex:
+    """
+    Índice espacial estático para cajas [x1, y1, x2, y2].
+
+    Es un R-tree empaquetado con STR (Sort-Tile-Recursive): las cajas se ordenan en
+    franjas verticales y dentro de cada franja por su centro ``y``; cada nivel agrupa
+    ``LEAF_SIZE`` nodos consecutivos del nivel inferior. La construcción es
+    O(n log n) y cada consulta recorre solo los nodos que intersectan la ventana.
+    """
+
+    def __init__(self, xyxy, leaf_size=LEAF_SIZE):
+        """
+        Construye el índice.
+
+        Args:
+            xyxy (numpy.ndarray): Cajas a indexar, forma (N, 4)
+            leaf_size (int): Cajas por hoja y ramificación de los nodos internos
+        """
+        self.xyxy = np.asarray(xyxy, dtype=np.float64).reshape(-1, 4)
+        self.leaf_size = leaf_size
+        n = len(self.xyxy)
+
+        # Orden STR: franjas por centro x y, dentro de cada franja, por centro y
+        centers_x = (self.xyxy[:, 0] + self.xyxy[:, 2]) / 2
+        centers_y = (self.xyxy[:, 1] + self.xyxy[:, 3]) / 2
+        n_leaves = max(1, -(-n // leaf_size))
+        slice_size = leaf_size * max(1, int(np.ceil(np.sqrt(n_leaves))))
+        by_x = np.argsort(centers_x, kind="stable")
+        slice_id = np.empty(n, dtype=np.intp)
+        slice_id[by_x] = np.arange(n) // slice_size
+        self.order = np.lexsort((centers_y, slice_id))
+
+        # Niveles: cada uno guarda las cajas envolventes de sus nodos
+        self.levels = []
+        boxes = self.xyxy[self.order]
+        while True:
+            starts = np.arange(0, len(boxes), leaf_size)
+            if len(boxes) == 0:
+                break
+            level = np.stack([
+                np.minimum.reduceat(boxes[:, 0], starts),
+                np.minimum.reduceat(boxes[:, 1], starts),
+                np.maximum.reduceat(boxes[:, 2], starts),
+                np.maximum.reduceat(boxes[:, 3], starts),
+            ], axis=1)
+            self.levels.append(level)
+            if len(level) == 1:
+                break
+            boxes = level
+
+    def __len__(self):
+        return len(self.xyxy)
+
+    @staticmethod
+    def _intersects(boxes, window):
+        return (
+                (boxes[:, 0] <= window[2]) & (boxes[:, 2] >= window[0]) &
+                (boxes[:, 1] <= window[3]) & (boxes[:, 3] >= window[1])
+        )
+
+    def query(self, box, margin=0):
+        """
+        Devuelve las cajas que intersectan la ventana ``box`` ampliada con ``margin``.
+
+        Args:
+            box (list): Caja de consulta [x1, y1, x2, y2]
+            margin (float | tuple): Margen escalar o (izq, arriba, der, abajo);
+                admite ``float('inf')`` para ventanas no acotadas
+
+        Returns:
+            numpy.ndarray: Índices (en el orden original) de las cajas encontradas
+        """
+        if not self.levels:
+            return np.empty(0, dtype=np.intp)
+
+        m = _as_margins(margin)
+        x1, y1, x2, y2 = np.asarray(box, dtype=np.float64)
+        window = np.array([x1 - m[0], y1 - m[1], x2 + m[2], y2 + m[3]])
+
+        # Recorrido descendente: en cada nivel solo se expanden los nodos que intersectan
+        nodes = np.arange(len(self.levels[-1]))
+        for depth in range(len(self.levels) - 1, -1, -1):
+            nodes = nodes[self._intersects(self.levels[depth][nodes], window)]
+            if nodes.size == 0:
+                return np.empty(0, dtype=np.intp)
+            size = len(self.levels[depth - 1]) if depth > 0 else len(self.xyxy)
+            children = (nodes[:, None] * self.leaf_size + np.arange(self.leaf_size)).ravel()
+            nodes = children[children < size]
+
+        candidates = self.order[nodes]
+        return np.sort(candidates[self._intersects(self.xyxy[candidates], window)])
+
+
+class LayoutTreeBuilder:
+    """
+    Construye el árbol de anidamiento de todas las detecciones de una imagen.
+
+    Por defecto una caja es hija de la caja más pequeña que la contiene. Sobre esa
+    regla geométrica se pueden registrar restricciones específicas por pareja de
+    clases (por ejemplo ``WidgetScanner.is_related``), con el margen de búsqueda
+    que necesita cada una.
+    """
+
+    def __init__(self, tolerance=2):
+        """
+        Args:
+            tolerance (float): Tolerancia en píxeles para la contención por defecto
+        """
+        self.tolerance = tolerance
+        self.rules = {}
+
+    def register(self, parent_type, child_type, predicate, margin=0):
+        """
+        Registra una restricción para una pareja de clases.
+
+        Args:
+            parent_type (str): Clase del componente principal
+            child_type (str): Clase del subcomponente
+            predicate (callable): ``predicate(parent_bbox, child_bbox, parent_type, child_type) -> bool``
+            margin (float | tuple): Cuánto puede salirse el hijo de la caja del padre
+                (izq, arriba, der, abajo)
+        """
+        self.rules[(parent_type, child_type)] = (predicate, _as_margins(margin))
+
+    def _search_margin(self, child_type):
+        """Margen de búsqueda alrededor del hijo (margen del padre reflejado)."""
+        margin = np.full(4, float(self.tolerance))
+        for (_, c_type), (_, m) in self.rules.items():
+            if c_type == child_type:
+                margin = np.maximum(margin, m[[2, 3, 0, 1]])
+        return margin
+
+    def _is_valid(self, parent_bbox, child_bbox, parent_type, child_type):
+        rule = self.rules.get((parent_type, child_type))
+        if rule is not None:
+            return bool(rule[0](parent_bbox, child_bbox, parent_type, child_type))
+        t = self.tolerance
+        return (
+                child_bbox[0] >= parent_bbox[0] - t and child_bbox[1] >= parent_bbox[1] - t and
+                child_bbox[2] <= parent_bbox[2] + t and child_bbox[3] <= parent_bbox[3] + t
+        )
+
+    def build_parents(self, xyxy, class_names, index=None):
+        """
+        Calcula el padre de cada detección.
+
+        Para evitar ciclos el padre siempre tiene mayor área que el hijo (a igualdad
+        de área, menor índice). Entre los candidatos válidos se elige el de menor área.
+
+        Args:
+            xyxy (numpy.ndarray): Cajas de las detecciones, forma (N, 4)
+            class_names (list): Clase de cada detección
+            index (BoxIndex): Índice ya construido sobre ``xyxy`` (opcional)
+
+        Returns:
+            numpy.ndarray: Índice del padre de cada detección, o -1 si es raíz
+        """
+        boxes = np.asarray(xyxy, dtype=np.float64).reshape(-1, 4)
+        if index is None:
+            index = BoxIndex(boxes)
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        box_list = boxes.tolist()
+        margins = {c_type: self._search_margin(c_type) for c_type in set(class_names)}
+
+        parents = np.full(len(boxes), -1, dtype=np.intp)
+        for i, child_type in enumerate(class_names):
+            candidates = index.query(boxes[i], margins[child_type])
+            larger = (areas[candidates] > areas[i]) | ((areas[candidates] == areas[i]) & (candidates < i))
+            candidates = candidates[larger]
+            for p in candidates[np.argsort(areas[candidates], kind="stable")].tolist():
+                if self._is_valid(box_list[p], box_list[i], class_names[p], child_type):
+                    parents[i] = p
+                    break
+        return parents
+
+    @staticmethod
+    def to_tree(nodes, parents):
+        """
+        Convierte la lista plana de nodos en un árbol anidado con ``children``.
+
+        Args:
+            nodes (list): Un ``dict`` por detección (se copia al añadir ``children``)
+            parents (numpy.ndarray): Padre de cada nodo según ``build_parents``
+
+        Returns:
+            list: Nodos raíz, cada uno con sus descendientes en ``children``
+        """
+        tree_nodes = [dict(node, children=[]) for node in nodes]
+        roots = []
+        for i, parent in enumerate(parents.tolist()):
+            if parent < 0:
+                roots.append(tree_nodes[i])
+            else:
+                tree_nodes[parent]["children"].append(tree_nodes[i])
+        return roots
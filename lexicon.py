@@ -0,0 +1,262 @@
+import os
+import re
+import threading
+import time
+import unicodedata
+
+# Distancia de edición máxima para corregir un texto
+MAX_DISTANCE = 2
+# Longitud del prefijo indexado (como en SymSpell): acota el número de borrados por entrada
+PREFIX_LENGTH = 7
+# Puntuación final que no cuenta para comparar ("Nombre:" ~ "Nombre")
+TRAILING_PUNCTUATION = ":?.,;¿¡!"
+# Nombres de proyecto válidos (también son nombres de archivo)
+PROJECT_NAME = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def normalize(text):
+    """Clave de comparación: minúsculas, sin tildes y sin puntuación final."""
+    text = unicodedata.normalize("NFKD", text.strip().casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return text.rstrip(TRAILING_PUNCTUATION).strip()
+
+
+def deletes(key, max_distance):
+    """Todas las variantes de ``key`` con hasta ``max_distance`` caracteres borrados (incluida ``key``)."""
+    result = {key}
+    frontier = {key}
+    for _ in range(max_distance):
+        frontier = {word[:i] + word[i + 1:] for word in frontier for i in range(len(word))} - result
+        result |= frontier
+    return result
+
+
+def edit_distance(a, b, max_distance):
+    """
+    Distancia de Damerau-Levenshtein (alineamiento óptimo) entre dos cadenas.
+
+    Returns:
+        int: La distancia, o ``max_distance + 1`` si la supera
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class Lexicon:
+    """
+    Vocabulario de textos esperados en la interfaz, con índice de borrado simétrico (SymSpell).
+
+    Para cada entrada se precalculan las variantes de su prefijo con hasta
+    ``max_distance`` caracteres borrados. Buscar un texto solo requiere generar sus
+    propias variantes y comprobar la distancia real con las pocas entradas que
+    comparten alguna, así que el coste no depende del tamaño del vocabulario.
+    """
+
+    def __init__(self, entries, max_distance=MAX_DISTANCE, prefix_length=PREFIX_LENGTH, cache_size=10000):
+        """
+        Args:
+            entries (dict | list): Textos esperados (con su frecuencia si es un ``dict``)
+            max_distance (int): Distancia de edición máxima para corregir
+            prefix_length (int): Longitud del prefijo indexado
+            cache_size (int): Búsquedas recordadas
+        """
+        if not isinstance(entries, dict):
+            entries = {entry: 1 for entry in entries}
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.cache_size = cache_size
+        self._cache = {}
+        self.entries = {}  # clave normalizada -> (texto, frecuencia)
+        for text, count in entries.items():
+            key = normalize(text)
+            if key and (key not in self.entries or count > self.entries[key][1]):
+                self.entries[key] = (text, count)
+
+        self.index = {}
+        for key in self.entries:
+            for variant in deletes(key[:prefix_length], max_distance):
+                self.index.setdefault(variant, []).append(key)
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        """
+        Carga un vocabulario: una entrada por línea, opcionalmente ``texto<TAB>frecuencia``.
+
+        Las líneas vacías y las que empiezan por ``#`` se ignoran.
+        """
+        entries = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.rstrip("\n")
+                if not line.strip() or line.lstrip().startswith("#"):
+                    continue
+                text, _, count = line.partition("\t")
+                entries[text.strip()] = int(count) if count.strip().isdigit() else 1
+        return cls(entries, **kwargs)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def allowed_distance(self, key, max_distance=None):
+        """Distancia permitida según la longitud: nada hasta 2 caracteres, 1 hasta 4 y luego ``max_distance``."""
+        max_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        if len(key) <= 2:
+            return 0
+        return min(max_distance, 1 if len(key) <= 4 else 2)
+
+    def lookup(self, text, max_distance=None):
+        """
+        Busca la entrada más parecida a un texto.
+
+        Args:
+            text (str): Texto leído por OCR
+            max_distance (int): Distancia máxima (por defecto la del vocabulario)
+
+        Returns:
+            tuple: ``(entrada, distancia)`` o ``None`` si ninguna está lo bastante cerca
+        """
+        key = normalize(text)
+        if not key or key.isdigit():
+            return None
+        limit = self.allowed_distance(key, max_distance)
+        if (key, limit) in self._cache:
+            return self._cache[(key, limit)]
+
+        best = None
+        seen = set()
+        for variant in deletes(key[:self.prefix_length], limit):
+            for candidate in self.index.get(variant, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                distance = edit_distance(key, candidate, limit)
+                if distance > limit:
+                    continue
+                entry, count = self.entries[candidate]
+                # Menor distancia y, a igualdad, la entrada más frecuente
+                if best is None or (distance, -count) < (best[1], -best[2]):
+                    best = (entry, distance, count)
+
+        result = (best[0], best[1]) if best else None
+        if len(self._cache) >= self.cache_size:
+            self._cache.clear()
+        self._cache[(key, limit)] = result
+        return result
+
+    def correct(self, text):
+        """
+        Ajusta un texto de OCR al vocabulario.
+
+        Primero se busca el texto completo (etiquetas de varias palabras); si no hay
+        coincidencia se corrige cada palabra por separado, con un solo error como
+        máximo para no alterar texto libre. Lo que no se parece a ninguna entrada se
+        deja igual.
+
+        Args:
+            text (str): Texto leído por OCR
+
+        Returns:
+            str: Texto corregido
+        """
+        if not text:
+            return text
+        match = self.lookup(text)
+        if match is not None:
+            return self._with_punctuation(text, match[0])
+
+        words = text.split()
+        if len(words) < 2:
+            return text
+        corrected = []
+        for word in words:
+            match = self.lookup(word, max_distance=1)
+            # Una palabra que ya está en el vocabulario se deja tal cual (sin cambiar mayúsculas)
+            corrected.append(self._with_punctuation(word, match[0]) if match and match[1] > 0 else word)
+        return " ".join(corrected)
+
+    @staticmethod
+    def _with_punctuation(original, entry):
+        # Conserva la puntuación final leída si la entrada no tiene la suya ("Nombre" + ":")
+        if entry.rstrip(TRAILING_PUNCTUATION) != entry:
+            return entry
+        stripped = original.rstrip()
+        return entry + stripped[len(stripped.rstrip(TRAILING_PUNCTUATION)):]
+
+
+class LexiconStore:
+    """
+    Vocabularios por proyecto (``<directorio>/<proyecto>.txt``), recargados en caliente.
+
+    Cada proceso comprueba la fecha de modificación del archivo como mucho una vez
+    cada ``check_interval`` segundos y, si cambió, reconstruye el índice y lo
+    sustituye; así se pueden editar los vocabularios sin reiniciar los workers.
+    """
+
+    def __init__(self, directory, default_project="default", check_interval=2.0, **lexicon_options):
+        """
+        Args:
+            directory (str): Directorio con los archivos de vocabulario
+            default_project (str): Proyecto usado cuando no se indica ninguno
+            check_interval (float): Segundos mínimos entre comprobaciones de cada archivo
+            **lexicon_options: Opciones de ``Lexicon`` (``max_distance``...)
+        """
+        self.directory = directory
+        self.default_project = default_project
+        self.check_interval = check_interval
+        self.lexicon_options = lexicon_options
+        self._lock = threading.Lock()
+        self._loaded = {}  # proyecto -> (mtime, lexicon, instante de la última comprobación)
+
+    def path_for(self, project):
+        """Ruta del vocabulario de un proyecto; lanza ``ValueError`` si el nombre no es válido."""
+        if not PROJECT_NAME.match(project):
+            raise ValueError(f"Nombre de proyecto no válido: {project}")
+        return os.path.join(self.directory, f"{project}.txt")
+
+    def get(self, project=None):
+        """
+        Vocabulario de un proyecto (recargado si su archivo cambió).
+
+        Args:
+            project (str): Nombre del proyecto (por defecto ``default_project``)
+
+        Returns:
+            Lexicon: El vocabulario, o ``None`` si el proyecto no tiene archivo
+        """
+        project = project or self.default_project
+        path = self.path_for(project)
+        now = time.monotonic()
+        cached = self._loaded.get(project)
+        if cached is not None and now - cached[2] < self.check_interval:
+            return cached[1]
+
+        with self._lock:
+            cached = self._loaded.get(project)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                self._loaded[project] = (None, None, now)
+                return None
+            if cached is not None and cached[0] == mtime:
+                self._loaded[project] = (mtime, cached[1], now)
+                return cached[1]
+            try:
+                lexicon = Lexicon.from_file(path, **self.lexicon_options)
+            except (OSError, ValueError, UnicodeDecodeError) as e:
+                print(f"⚠️ Error al cargar el vocabulario {path}: {str(e)}")
+                lexicon = cached[1] if cached else None
+            self._loaded[project] = (mtime, lexicon, now)
+            return lexicon
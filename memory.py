@@ -0,0 +1,241 @@
+import ctypes
+import ctypes.util
+import gc
+import os
+import signal
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+# Tamaño de página para convertir /proc/<pid>/statm a bytes
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_bytes(pid="self"):
+    """
+    Memoria residente (RSS) de un proceso en bytes, o ``None`` si no se puede leer.
+
+    Se lee ``/proc/<pid>/statm`` (Linux); en otros sistemas solo está disponible la
+    del propio proceso y es el pico (``ru_maxrss``), no la actual.
+    """
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        if pid != "self":
+            return None
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except (ImportError, OSError):
+        return None
+
+
+def peak_rss_bytes():
+    """Pico de memoria residente del proceso (``VmHWM``) en bytes, o ``None``."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _load_libc():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6")
+        libc.malloc_trim.argtypes = [ctypes.c_size_t]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+_libc = None
+
+
+def trim():
+    """
+    Devuelve al sistema la memoria libre del heap de C (``malloc_trim``, solo glibc).
+
+    Tras liberar las copias de una captura grande, glibc suele conservar esas páginas
+    (fragmentación) y el RSS no baja; esto las libera. Devuelve ``True`` si se pudo llamar.
+    """
+    global _libc
+    if _libc is None:
+        _libc = _load_libc() or False
+    if not _libc:
+        return False
+    _libc.malloc_trim(0)
+    return True
+
+
+class MemoryMonitor:
+    """
+    Memoria del proceso por petición y reciclaje del worker por umbral.
+
+    ``begin``/``end`` miden el RSS antes y después de cada petición (y el pico del
+    proceso, que solo sube si la petición lo superó); se guardan las últimas
+    ``history`` mediciones y los totales por ruta. Con tracemalloc activo, ``top``
+    devuelve los puntos del código que más memoria de Python/NumPy tienen asignada.
+
+    Con ``recycle_bytes``, cuando el RSS supera el umbral al terminar una petición el
+    proceso se envía ``SIGTERM`` (una sola vez): gunicorn termina las peticiones en
+    curso de ese worker y arranca otro.
+    """
+
+    def __init__(self, recycle_bytes=None, trim_bytes=None, history=200):
+        """
+        Args:
+            recycle_bytes (int): RSS a partir del cual el worker se recicla (opcional)
+            trim_bytes (int): Aumento de RSS de una petición a partir del cual se llama a ``trim`` (opcional)
+            history (int): Peticiones recientes que se conservan
+        """
+        self.recycle_bytes = recycle_bytes
+        self.trim_bytes = trim_bytes
+        self.started = time.time()
+        self.baseline = rss_bytes()
+        self.recent = deque(maxlen=history)
+        self.routes = {}  # ruta -> {"requests", "rss_delta", "max_rss_delta"}
+        self.recycling = False
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def begin(self):
+        """Estado de la memoria al empezar una petición (se pasa a ``end``)."""
+        return time.monotonic(), rss_bytes(), peak_rss_bytes()
+
+    def end(self, route, state):
+        """
+        Registra una petición terminada y, si procede, libera memoria o recicla el worker.
+
+        Args:
+            route (str): Nombre de la ruta (por ejemplo, el endpoint de Flask)
+            state (tuple): Resultado de ``begin``
+
+        Returns:
+            dict: Medición de la petición (bytes)
+        """
+        started, before, peak_before = state
+        after, peak_after = rss_bytes(), peak_rss_bytes()
+        delta = after - before if after is not None and before is not None else None
+        entry = {
+            "route": route,
+            "time": round(time.time(), 3),
+            "seconds": round(time.monotonic() - started, 4),
+            "rss": after,
+            "rss_delta": delta,
+            "peak_delta": (peak_after - peak_before
+                           if peak_after is not None and peak_before is not None else None),
+        }
+        if self.trim_bytes is not None and delta is not None and delta >= self.trim_bytes and trim():
+            entry["trimmed_to"] = rss_bytes()
+            after = entry["trimmed_to"]
+
+        with self._lock:
+            self.recent.append(entry)
+            stats = self.routes.setdefault(route, {"requests": 0, "rss_delta": 0, "max_rss_delta": 0})
+            stats["requests"] += 1
+            if delta is not None:
+                stats["rss_delta"] += delta
+                stats["max_rss_delta"] = max(stats["max_rss_delta"], delta)
+            recycle = (self.recycle_bytes is not None and after is not None and after >= self.recycle_bytes
+                       and not self.recycling)
+            if recycle:
+                self.recycling = True
+        if recycle:
+            self.recycle(after)
+        return entry
+
+    def recycle(self, rss):
+        """Pide al proceso que termine (``SIGTERM``); gunicorn lo sustituye por uno nuevo."""
+        print(f"⚠️ Memoria del worker {os.getpid()} en {rss / 2 ** 20:.0f} MiB "
+              f"(umbral {self.recycle_bytes / 2 ** 20:.0f} MiB); se recicla")
+        os.kill(os.getpid(), signal.SIGTERM)
+
+    @staticmethod
+    def start_tracing(frames=1):
+        """Activa tracemalloc (con ``frames`` marcos por asignación); no hace nada si ya está activo."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    @staticmethod
+    def stop_tracing():
+        tracemalloc.stop()
+
+    def top(self, limit=20, group_by="lineno", compare=False):
+        """
+        Puntos del código con más memoria asignada según tracemalloc.
+
+        Args:
+            limit (int): Número de entradas
+            group_by (str): ``lineno``, ``filename`` o ``traceback``
+            compare (bool): Diferencias respecto a la instantánea de la llamada anterior
+                (lo que creció entre ambas) en lugar de totales
+
+        Returns:
+            list: ``dict`` con ``size``, ``count`` (y ``size_diff``/``count_diff`` al comparar)
+            y ``traceback`` (lista de ``archivo:línea``); vacía si tracemalloc no está activo
+        """
+        if not tracemalloc.is_tracing():
+            return []
+        gc.collect()
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        with self._lock:
+            previous, self._snapshot = self._snapshot, snapshot
+        if compare and previous is not None:
+            stats = snapshot.compare_to(previous, group_by)
+        else:
+            stats = snapshot.statistics(group_by)
+
+        entries = []
+        for stat in stats[:limit]:
+            entry = {
+                "size": stat.size,
+                "count": stat.count,
+                "traceback": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+            }
+            if compare and previous is not None:
+                entry["size_diff"] = stat.size_diff
+                entry["count_diff"] = stat.count_diff
+            entries.append(entry)
+        return entries
+
+    def stats(self, children=()):
+        """
+        Resumen de la memoria del proceso.
+
+        Args:
+            children (iterable): PID de procesos hijos a incluir (por ejemplo, los del pool de OCR)
+
+        Returns:
+            dict: RSS actual, pico y al arrancar, totales por ruta, umbral de reciclaje y tracemalloc
+        """
+        tracing = tracemalloc.is_tracing()
+        with self._lock:
+            routes = {route: dict(values) for route, values in self.routes.items()}
+        return {
+            "pid": os.getpid(),
+            "uptime": round(time.time() - self.started, 1),
+            "rss": rss_bytes(),
+            "peak_rss": peak_rss_bytes(),
+            "baseline_rss": self.baseline,
+            "routes": routes,
+            "children": {str(pid): rss_bytes(pid) for pid in children},
+            "recycle_bytes": self.recycle_bytes,
+            "recycling": self.recycling,
+            "tracemalloc": {
+                "tracing": tracing,
+                "current": tracemalloc.get_traced_memory()[0] if tracing else None,
+                "peak": tracemalloc.get_traced_memory()[1] if tracing else None,
+            },
+        }
+
+    def history(self):
+        with self._lock:
+            return list(self.recent)
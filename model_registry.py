@@ -0,0 +1,366 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from incremental import match_detections
+
+# Estados de una versión del modelo
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+# IoU mínimo para considerar que dos versiones detectaron el mismo widget
+SHADOW_IOU = 0.5
+
+
+def compare_detections(active, candidate, min_iou=SHADOW_IOU):
+    """
+    Compara las detecciones de dos versiones sobre la misma imagen.
+
+    Cada detección se empareja como mucho con una de la otra versión de la misma
+    clase (mayor IoU primero; ver ``incremental.match_detections``).
+
+    Args:
+        active (DetectionSet): Detecciones de la versión activa
+        candidate (DetectionSet): Detecciones de la candidata
+        min_iou (float): IoU mínimo de una pareja
+
+    Returns:
+        dict: ``active`` y ``candidate`` (número de detecciones), ``matched``,
+        ``agreement`` (emparejadas / máximo de ambas) y ``classes`` (diferencia
+        candidata - activa por clase, solo las que cambian)
+    """
+    active_names, candidate_names = active.class_names, candidate.class_names
+    matched = len(match_detections(active, candidate, min_iou))
+
+    counts = {}
+    for name in active_names:
+        counts[name] = counts.get(name, 0) - 1
+    for name in candidate_names:
+        counts[name] = counts.get(name, 0) + 1
+    most = max(len(active_names), len(candidate_names))
+    return {
+        "active": len(active_names),
+        "candidate": len(candidate_names),
+        "matched": matched,
+        "agreement": round(matched / most, 4) if most else 1.0,
+        "classes": {name: diff for name, diff in sorted(counts.items()) if diff},
+    }
+
+
+def percentile(values, q):
+    """Percentil ``q`` (0-100) por el rango más cercano, o ``None`` sin valores."""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))] if values else None
+
+
+class ModelVersion:
+    """
+    Versión del modelo de detección.
+
+    Atributos:
+        model_id (str): ID en Roboflow (``workspace/version``)
+        status (str): ``loading``, ``ready`` o ``failed``
+        model: Modelo cargado (con ``infer``) o ``None``
+        error (str): Error de la carga, si falló
+        load_seconds (float): Duración de la carga
+    """
+
+    __slots__ = ("model_id", "status", "model", "error", "load_seconds")
+
+    def __init__(self, model_id, status=LOADING, model=None):
+        self.model_id = model_id
+        self.status = status
+        self.model = model
+        self.error = None
+        self.load_seconds = None
+
+    def as_dict(self):
+        return {"status": self.status, "error": self.error, "load_seconds": self.load_seconds}
+
+
+class ModelRegistry:
+    """
+    Versiones del modelo de detección: activa, candidata en sombra y cambio sin cortes.
+
+    - Una versión nueva se carga en un hilo en segundo plano mientras la activa sigue
+      atendiendo las peticiones.
+    - Con ``shadow_ratio``, esa fracción de los escaneos se repite en segundo plano con
+      la activa y la candidata sobre la misma imagen para comparar detecciones y latencia.
+    - Al promocionarla, ``on_activate(model_id, model)`` la instala de una sola vez; las
+      peticiones en curso terminan con la versión con la que empezaron. La anterior se
+      conserva cargada para poder volver a ella al instante.
+
+    El estado deseado (activa, candidata y fracción de sombra) se guarda en
+    ``state_path``, compartido por todos los workers: cada uno lo relee como mucho una
+    vez cada ``check_interval`` segundos (``sync``) y aplica los cambios, y un worker
+    nuevo arranca ya con la versión promocionada. Las comparaciones son de cada worker.
+    """
+
+    def __init__(self, loader, active_id, active_model, state_path=None, check_interval=2.0, history=500,
+                 max_pending=2, on_activate=None):
+        """
+        Args:
+            loader (callable): Recibe un ``model_id`` y devuelve el modelo cargado
+            active_id (str): Versión activa al arrancar
+            active_model: Modelo ya cargado de esa versión
+            state_path (str): Archivo JSON con el estado deseado (opcional)
+            check_interval (float): Segundos mínimos entre lecturas de ``state_path``
+            history (int): Comparaciones en sombra que se conservan
+            max_pending (int): Comparaciones en cola como máximo (el resto se descartan)
+            on_activate (callable): Recibe ``(model_id, model)`` al cambiar la versión activa
+        """
+        self.loader = loader
+        self.state_path = state_path
+        self.check_interval = check_interval
+        self.max_pending = max_pending
+        self.on_activate = on_activate
+        self.versions = {active_id: ModelVersion(active_id, READY, active_model)}
+        self.active_id = active_id
+        self.previous_id = None
+        self.candidate_id = None
+        self.shadow_ratio = 0.0
+        self._desired_active = active_id
+        self._compared_id = None
+        self.samples = deque(maxlen=history)
+        self.dropped = 0
+        self.errors = 0
+        self._credit = 0.0
+        self._pending = 0
+        self._lock = threading.RLock()
+        self._checked = None
+        self._mtime = None
+        self._shadow = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+
+    @staticmethod
+    def read_state(path):
+        """Estado deseado guardado en ``path`` (``{}`` si no existe o no se puede leer)."""
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_state(self):
+        # Solo se guarda como activa una versión ya cargada: una que no carga no debe llegar a
+        # los workers que arranquen después
+        if not self.state_path:
+            return
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"active": self.active_id, "candidate": self.candidate_id,
+                       "shadow_ratio": self.shadow_ratio}, f)
+        os.replace(tmp_path, self.state_path)
+        self._mtime = os.stat(self.state_path).st_mtime_ns
+
+    def load(self, model_id):
+        """Empieza a cargar una versión en segundo plano (si no está cargada o cargándose)."""
+        with self._lock:
+            version = self.versions.get(model_id)
+            if version is not None and version.status != FAILED:
+                return version
+            version = self.versions[model_id] = ModelVersion(model_id)
+        threading.Thread(target=self._load, args=(version,), name=f"load-{model_id}", daemon=True).start()
+        return version
+
+    def _load(self, version):
+        start = time.monotonic()
+        try:
+            model = self.loader(version.model_id)
+        except Exception as e:
+            print(f"⚠️ Error al cargar el modelo {version.model_id}: {str(e)}")
+            with self._lock:
+                version.status, version.error = FAILED, str(e)
+                if self._desired_active == version.model_id:
+                    # La promoción pendiente se descarta: sigue la versión activa
+                    print(f"⚠️ Promoción de {version.model_id} cancelada; sigue activo {self.active_id}")
+                    self._desired_active = self.active_id
+            return
+        with self._lock:
+            version.model, version.status = model, READY
+            version.load_seconds = round(time.monotonic() - start, 2)
+            print(f"✅ Modelo cargado en segundo plano: {version.model_id} ({version.load_seconds} s)")
+            # Una promoción pedida mientras se cargaba se aplica ahora
+            if self._desired_active == version.model_id:
+                self._activate(version)
+                # Se publica para los demás workers (si la promoción se pidió en este)
+                if self.state_path and self.read_state(self.state_path).get("active") != self.active_id:
+                    self._write_state()
+
+    def set_candidate(self, model_id, shadow_ratio=0.0):
+        """
+        Carga una versión candidata y le envía ``shadow_ratio`` de los escaneos en sombra.
+
+        Con ``model_id=None`` se retira la candidata.
+        """
+        with self._lock:
+            self._set_candidate(model_id, shadow_ratio)
+            self._write_state()
+        return self.status()
+
+    def _set_candidate(self, model_id, shadow_ratio):
+        if model_id == self.active_id:
+            model_id = None
+        self.candidate_id = model_id
+        self.shadow_ratio = min(1.0, max(0.0, float(shadow_ratio))) if model_id else 0.0
+        if self.candidate_id != self._compared_id:
+            self.samples.clear()
+            self._compared_id = self.candidate_id
+        if model_id:
+            self.load(model_id)
+
+    def promote(self, model_id=None):
+        """
+        Convierte en activa una versión (por defecto, la candidata).
+
+        Si aún se está cargando, se activa en cuanto termine; mientras tanto sigue la actual.
+        Los demás workers la reciben (``state_path``) cuando ya está cargada; si la carga
+        falla, la promoción se cancela.
+
+        Returns:
+            ModelVersion: La versión pedida
+        """
+        with self._lock:
+            model_id = model_id or self.candidate_id
+            if not model_id:
+                raise ValueError("No hay versión candidata que promocionar")
+            version = self._promote(model_id)
+            self._write_state()
+        return version
+
+    def _promote(self, model_id):
+        self._desired_active = model_id
+        if model_id == self.candidate_id:
+            self.candidate_id, self.shadow_ratio = None, 0.0
+        version = self.load(model_id)
+        if version.status == READY:
+            self._activate(version)
+        return version
+
+    def _activate(self, version):
+        if version.model_id == self.active_id:
+            return
+        if self.on_activate is not None:
+            self.on_activate(version.model_id, version.model)
+        # Se conserva la anterior para volver atrás; las más antiguas se descargan
+        for model_id in list(self.versions):
+            if model_id not in (version.model_id, self.active_id, self.candidate_id):
+                del self.versions[model_id]
+        self.previous_id, self.active_id = self.active_id, version.model_id
+        print(f"✅ Modelo activo: {self.active_id} (anterior: {self.previous_id})")
+
+    def sync(self, force=False):
+        """Aplica los cambios de ``state_path`` hechos por otros workers."""
+        if not self.state_path:
+            return
+        now = time.monotonic()
+        if not force and self._checked is not None and now - self._checked < self.check_interval:
+            return
+        self._checked = now
+        try:
+            mtime = os.stat(self.state_path).st_mtime_ns
+        except OSError:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            self._mtime = mtime
+            state = self.read_state(self.state_path)
+            if state.get("active") and state["active"] != self.active_id:
+                self._promote(state["active"])
+            if state.get("candidate") != self.candidate_id or state.get("shadow_ratio", 0.0) != self.shadow_ratio:
+                self._set_candidate(state.get("candidate"), state.get("shadow_ratio", 0.0))
+
+    def shadow(self, detect, image_loader):
+        """
+        Envía un escaneo a la comparación en sombra según ``shadow_ratio``.
+
+        La comparación se hace en un hilo aparte, después de responder: carga la imagen
+        con ``image_loader()`` y ejecuta ``detect(model_id, model, imagen)`` (inferencia y
+        post-procesamiento) con la versión activa y con la candidata, midiendo cada una.
+
+        Returns:
+            bool: ``True`` si el escaneo se encoló
+        """
+        with self._lock:
+            candidate = self.versions.get(self.candidate_id) if self.candidate_id else None
+            if candidate is None or candidate.status != READY or self.shadow_ratio <= 0:
+                return False
+            # Reparto determinista: una de cada 1 / shadow_ratio peticiones
+            self._credit += self.shadow_ratio
+            if self._credit < 1.0:
+                return False
+            self._credit -= 1.0
+            if self._pending >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending += 1
+            active = self.versions[self.active_id]
+        self._shadow.submit(self._compare, active, candidate, detect, image_loader)
+        return True
+
+    def _compare(self, active, candidate, detect, image_loader):
+        try:
+            image = image_loader()
+            start = time.perf_counter()
+            active_dets = detect(active.model_id, active.model, image)
+            active_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            candidate_dets = detect(candidate.model_id, candidate.model, image)
+            candidate_ms = (time.perf_counter() - start) * 1000
+            sample = compare_detections(active_dets, candidate_dets)
+            sample.update(active_ms=round(active_ms, 2), candidate_ms=round(candidate_ms, 2),
+                          candidate_id=candidate.model_id)
+            with self._lock:
+                if candidate.model_id == self.candidate_id:
+                    self.samples.append(sample)
+        except Exception as e:
+            print(f"⚠️ Error en la comparación en sombra: {str(e)}")
+            with self._lock:
+                self.errors += 1
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def wait_shadow(self):
+        """Espera a que terminen las comparaciones encoladas."""
+        self._shadow.submit(lambda: None).result()
+
+    def shadow_summary(self):
+        """Resumen de las comparaciones en sombra de la candidata actual."""
+        with self._lock:
+            samples = list(self.samples)
+            dropped, errors = self.dropped, self.errors
+        classes = {}
+        for sample in samples:
+            for name, diff in sample["classes"].items():
+                classes[name] = classes.get(name, 0) + diff
+        return {
+            "samples": len(samples),
+            "dropped": dropped,
+            "errors": errors,
+            "active_ms": {"p50": percentile([s["active_ms"] for s in samples], 50),
+                          "p90": percentile([s["active_ms"] for s in samples], 90)},
+            "candidate_ms": {"p50": percentile([s["candidate_ms"] for s in samples], 50),
+                             "p90": percentile([s["candidate_ms"] for s in samples], 90)},
+            "agreement": {"mean": round(sum(s["agreement"] for s in samples) / len(samples), 4) if samples else None,
+                          "min": min((s["agreement"] for s in samples), default=None)},
+            # Diferencia media de detecciones por imagen (candidata - activa)
+            "classes": {name: round(diff / len(samples), 3) for name, diff in sorted(classes.items()) if diff},
+        }
+
+    def status(self):
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "active": self.active_id,
+                "previous": self.previous_id,
+                "candidate": self.candidate_id,
+                "shadow_ratio": self.shadow_ratio,
+                "pending_activation": self._desired_active if self._desired_active != self.active_id else None,
+                "versions": {model_id: version.as_dict() for model_id, version in self.versions.items()},
+                "shadow": self.shadow_summary(),
+            }
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ocr (
+    key TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ocr_created ON ocr(created_at);
+"""
+
+# Bytes aproximados de cada entrada además de su clave y sus textos (nodo del OrderedDict, lista...)
+ENTRY_OVERHEAD = 200
+
+
+class OCRCache:
+    """
+    Caché LRU de lecturas OCR, indexada por el contenido del recorte.
+
+    La clave es un hash de los píxeles del recorte ya preprocesado (binarizado) y de
+    la configuración de ``readtext``, así que dos recortes idénticos (el título del
+    AppBar, "Guardar", las cabeceras de una tabla) se leen una sola vez aunque
+    aparezcan en escaneos distintos. Se guarda la lectura cruda, antes de las
+    correcciones, para que el vocabulario de cada proyecto se siga aplicando.
+
+    Con ``normalize_height`` el recorte se reescala a esa altura antes del hash, de
+    modo que el mismo texto renderizado a tamaños ligeramente distintos comparte
+    entrada. Con ``path`` las lecturas se guardan también en un SQLite local que
+    comparten todos los workers: un fallo en memoria se busca ahí antes de leer.
+    """
+
+    def __init__(self, max_entries=4096, path=None, max_disk_entries=100000, normalize_height=None):
+        """
+        Args:
+            max_entries (int): Entradas máximas en memoria
+            path (str): Archivo SQLite compartido (opcional)
+            max_disk_entries (int): Entradas máximas en el archivo (se borran las más antiguas)
+            normalize_height (int): Altura a la que se reescala el recorte para el hash (opcional)
+        """
+        self.max_entries = max_entries
+        self.path = path
+        self.max_disk_entries = max_disk_entries
+        self.normalize_height = normalize_height
+        self._entries = OrderedDict()  # clave -> (resultado, bytes)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._inserts = 0
+        self.bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if path:
+            conn = self._connection()
+            conn.executescript(SCHEMA)
+            conn.commit()
+
+    def _connection(self):
+        """Conexión propia de cada hilo."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def key(self, image, config):
+        """
+        Clave de un recorte preprocesado y una configuración de ``readtext``.
+
+        Args:
+            image (numpy.ndarray): Recorte tal como se pasa a ``readtext``
+            config (dict): Opciones de ``readtext``
+
+        Returns:
+            str: Hash hexadecimal
+        """
+        h = hashlib.blake2b(json.dumps(config, sort_keys=True, ensure_ascii=False).encode(), digest_size=16)
+        if self.normalize_height and image.shape[0] > 0 and image.shape[0] != self.normalize_height:
+            width = max(1, round(image.shape[1] * self.normalize_height / image.shape[0]))
+            image = cv2.resize(image, (width, self.normalize_height), interpolation=cv2.INTER_AREA)
+            if image.dtype == np.uint8:
+                # Volver a binarizar: el reescalado deja grises en los bordes
+                image = np.where(image >= 128, 255, 0).astype(np.uint8)
+        image = np.ascontiguousarray(image)
+        h.update(str(image.shape).encode())
+        h.update(image.data)
+        return h.hexdigest()
+
+    def get(self, key):
+        """Lectura guardada para una clave, o ``None`` (buscando también en el archivo compartido)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+        result = self._disk_get(key) if self.path else None
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, result)
+        return result
+
+    def put(self, key, result):
+        """Guarda la lectura (lista de textos de ``readtext``) de una clave."""
+        result = list(result)
+        with self._lock:
+            self._remember(key, result)
+        if self.path:
+            self._disk_put(key, result)
+
+    def _remember(self, key, result):
+        if self.max_entries <= 0:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.bytes -= previous[1]
+        size = ENTRY_OVERHEAD + sys.getsizeof(key) + sum(sys.getsizeof(text) for text in result)
+        self._entries[key] = (result, size)
+        self.bytes += size
+        while len(self._entries) > self.max_entries:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.bytes -= evicted
+
+    def _disk_get(self, key):
+        try:
+            row = self._connection().execute("SELECT result FROM ocr WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            print(f"⚠️ Error al leer la caché de OCR {self.path}: {str(e)}")
+            return None
+        return json.loads(row[0]) if row else None
+
+    def _disk_put(self, key, result):
+        conn = self._connection()
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO ocr VALUES (?, ?, ?)",
+                             (key, json.dumps(result, ensure_ascii=False), time.time()))
+                self._inserts += 1
+                # Recorte periódico de las entradas más antiguas
+                if self._inserts % 256 == 0:
+                    conn.execute(
+                        "DELETE FROM ocr WHERE key IN (SELECT key FROM ocr ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                        (self.max_disk_entries,)
+                    )
+        except sqlite3.Error as e:
+            print(f"⚠️ Error al guardar en la caché de OCR {self.path}: {str(e)}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        """Métricas de la caché: aciertos (memoria y archivo), fallos, tasa de aciertos y memoria."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "disk": self.path,
+            }
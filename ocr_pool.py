@@ -0,0 +1,267 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import ocr_profiles
+
+# Idiomas del lector OCR
+OCR_LANGUAGES = ("es", "en")
+# Núcleos por proceso web cuando no se indica WEB_CONCURRENCY
+CORES_PER_WEB_WORKER = 8
+# Variables que fijan los hilos de las librerías numéricas; deben definirse antes de importar torch
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+def available_cores():
+    """Núcleos que puede usar este proceso (respeta la afinidad de CPU del contenedor)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _env_int(name):
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+class ResourcePlan:
+    """
+    Reparto de núcleos entre los procesos web, los hilos de OpenCV y los workers de OCR.
+
+    Sin reparto, gunicorn, torch (hilos intra-op de EasyOCR) y OpenCV usan cada uno
+    tantos hilos como núcleos y varios escaneos simultáneos compiten por la CPU. El
+    plan asigna a cada proceso web una porción de ``cores / web_workers`` núcleos:
+    ``ocr_workers`` procesos de OCR con ``ocr_threads`` hilos de torch cada uno, y el
+    resto para el hilo de la petición (decodificación, OpenCV y detección).
+
+    Atributos:
+        cores (int): Núcleos totales
+        web_workers (int): Procesos de gunicorn
+        web_threads (int): Hilos por proceso de gunicorn
+        ocr_workers (int): Procesos de OCR por proceso web (0 = OCR en el hilo de la petición)
+        ocr_threads (int): Hilos de torch por lector OCR
+        cv2_threads (int): Hilos de OpenCV por proceso web
+    """
+
+    __slots__ = ("cores", "web_workers", "web_threads", "ocr_workers", "ocr_threads", "cv2_threads")
+
+    def __init__(self, cores, web_workers, web_threads, ocr_workers, ocr_threads, cv2_threads):
+        self.cores = cores
+        self.web_workers = web_workers
+        self.web_threads = web_threads
+        self.ocr_workers = ocr_workers
+        self.ocr_threads = ocr_threads
+        self.cv2_threads = cv2_threads
+
+    @classmethod
+    def from_cores(cls, cores, web_workers=None, ocr_workers=None, ocr_threads=None):
+        """
+        Calcula el plan para un número de núcleos.
+
+        Por defecto hay un proceso web cada ``CORES_PER_WEB_WORKER`` núcleos; en cada
+        porción se reserva un núcleo para el hilo de la petición y el resto se reparte
+        en lectores de 1 hilo (porciones de hasta 4 núcleos) o de 2 hilos (más grandes:
+        menos lectores en memoria y torch aún escala bien con 2 hilos).
+
+        Args:
+            cores (int): Núcleos totales
+            web_workers (int): Procesos web (opcional)
+            ocr_workers (int): Procesos de OCR por proceso web (opcional)
+            ocr_threads (int): Hilos de torch por lector (opcional)
+
+        Returns:
+            ResourcePlan: El plan
+        """
+        cores = max(1, int(cores))
+        web_workers = max(1, web_workers or cores // CORES_PER_WEB_WORKER)
+        share = max(1, cores // web_workers)
+        threads = max(1, ocr_threads or (1 if share <= 4 else 2))
+        if ocr_workers is None:
+            ocr_workers = (share - 1) // threads
+        ocr_workers = max(0, ocr_workers)
+
+        if ocr_workers == 0:
+            # OCR en el hilo de la petición: torch y OpenCV usan toda la porción
+            return cls(cores, web_workers, 1, 0, ocr_threads or share, share)
+
+        ocr_threads = threads
+        cv2_threads = max(1, share - ocr_workers * ocr_threads)
+        if web_workers * (ocr_workers * ocr_threads + 1) > cores:
+            print(f"⚠️ El plan usa más hilos que núcleos ({cores}): "
+                  f"{web_workers} web x ({ocr_workers} OCR x {ocr_threads} hilos + 1)")
+        # Dos peticiones por proceso: mientras una espera el OCR, la otra detecta
+        return cls(cores, web_workers, 2, ocr_workers, ocr_threads, cv2_threads)
+
+    @classmethod
+    def from_env(cls):
+        """
+        Plan según las variables de entorno: ``CPU_CORES`` (por defecto los núcleos
+        disponibles) y, opcionalmente, ``WEB_CONCURRENCY``, ``OCR_WORKERS`` y ``OCR_THREADS``.
+        """
+        return cls.from_cores(_env_int("CPU_CORES") or available_cores(), web_workers=_env_int("WEB_CONCURRENCY"),
+                              ocr_workers=_env_int("OCR_WORKERS"), ocr_threads=_env_int("OCR_THREADS"))
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return "ResourcePlan(" + ", ".join(f"{k}={v}" for k, v in self.as_dict().items()) + ")"
+
+
+def configure_threads(torch_threads=None, cv2_threads=None):
+    """
+    Limita los hilos de torch y OpenCV en el proceso actual.
+
+    Las variables de ``THREAD_ENV_VARS`` solo tienen efecto si torch aún no se ha importado.
+    """
+    if torch_threads:
+        for name in THREAD_ENV_VARS:
+            os.environ[name] = str(torch_threads)
+        try:
+            import torch
+            torch.set_num_threads(torch_threads)
+        except ImportError:
+            pass
+    if cv2_threads:
+        import cv2
+        cv2.setNumThreads(cv2_threads)
+
+
+def easyocr_reader(languages, gpu=None):
+    """Crea un lector de EasyOCR (fábrica por defecto de los workers); sin ``gpu``, CUDA si está disponible."""
+    import easyocr
+    return easyocr.Reader(list(languages)) if gpu is None else easyocr.Reader(list(languages), gpu=gpu)
+
+
+# Lector del proceso worker (uno por proceso, creado por _init_worker) y fábrica de los
+# lectores por perfil (``ocr_profiles.get_reader``, creados al usarse)
+_reader = None
+_profile_factory = None
+
+
+def _cpu_factory(profile_factory):
+    """Fábrica que crea los lectores de los perfiles sin GPU (ver ``OCRProfile.on_cpu``)."""
+    return lambda profile: profile_factory(profile.on_cpu())
+
+
+def _init_worker(reader_factory, languages, threads, profile_factory=None, preload=None, cpu_only=False):
+    global _reader, _profile_factory
+    configure_threads(torch_threads=threads, cv2_threads=1)
+    # CUDA no se puede iniciar en un proceso creado con fork si el padre ya lo usa
+    _profile_factory = _cpu_factory(profile_factory) if cpu_only and profile_factory is not None else profile_factory
+    if preload is not None:
+        ocr_profiles.get_reader(preload, _profile_factory)
+    elif cpu_only and reader_factory is easyocr_reader:
+        _reader = reader_factory(languages, gpu=False)
+    else:
+        _reader = reader_factory(languages)
+
+
+def _readtext(image, options, profile=None):
+    if profile is None:
+        return _reader.readtext(image, **options)
+    return ocr_profiles.get_reader(profile, _profile_factory).readtext(image, **options)
+
+
+def _ready():
+    return os.getpid()
+
+
+class OCRPool:
+    """
+    Procesos de OCR, cada uno con su propio lector (``easyocr.Reader``).
+
+    Tiene el mismo ``readtext`` que el lector (bloqueante) y además ``submit``, que
+    devuelve un ``Future``; ``WidgetScanner.run_ocr`` lo usa para leer en paralelo
+    todos los textos de un escaneo. Si un worker muere (por ejemplo, por falta de
+    memoria) el pool se vuelve a crear en la siguiente lectura.
+
+    Con perfiles de OCR (``ocr_profiles``), cada lectura indica su perfil y cada proceso
+    crea el lector de ese perfil la primera vez que lo necesita; ``preload`` se carga al
+    arrancar el proceso.
+
+    Por defecto los procesos se crean con ``forkserver``: el pool vive en un proceso
+    web con hilos (gunicorn) y se vuelve a crear desde el hilo de una petición si un
+    worker muere, y un ``fork`` desde ahí puede heredar un lock tomado por otro hilo y
+    bloquearse. Los procesos parten de un servidor limpio que solo importa este
+    módulo (no la aplicación ni el modelo de detección) y pueden usar la GPU. Con
+    ``start_method="fork"`` el arranque es más rápido, pero solo es seguro si el pool
+    se crea antes de lanzar hilos, y sus lectores no usan la GPU: CUDA no se puede
+    iniciar en un proceso creado con ``fork`` si el padre ya lo inició.
+    """
+
+    def __init__(self, workers, threads=1, languages=OCR_LANGUAGES, reader_factory=easyocr_reader,
+                 start_method=None, profile_factory=ocr_profiles.easyocr_reader, preload=None):
+        """
+        Args:
+            workers (int): Número de procesos
+            threads (int): Hilos de torch de cada lector
+            languages (tuple): Idiomas del lector
+            reader_factory (callable): Función (de nivel de módulo) que recibe ``languages``
+                y devuelve un objeto con ``readtext``
+            start_method (str): Método de inicio de multiprocessing (por defecto ``OCR_START_METHOD`` o
+                ``forkserver``)
+            profile_factory (callable): Función (de nivel de módulo) que crea el lector de un ``OCRProfile``
+            preload (OCRProfile): Perfil cuyo lector se carga al arrancar cada proceso en lugar
+                del de ``languages`` (opcional)
+        """
+        self.workers = workers
+        self.threads = threads
+        self.languages = tuple(languages)
+        self.reader_factory = reader_factory
+        self.start_method = start_method or os.getenv("OCR_START_METHOD", "forkserver")
+        self.profile_factory = profile_factory
+        self.preload = preload
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=_init_worker,
+                    initargs=(self.reader_factory, self.languages, self.threads, self.profile_factory,
+                              self.preload, self.start_method == "fork"),
+                )
+            return self._executor
+
+    def start(self):
+        """
+        Arranca los workers para que los lectores se carguen al iniciar y no en la
+        primera petición (se crean todos a la vez); devuelve los PID que respondieron.
+        """
+        pool = self._pool()
+        return sorted({future.result() for future in [pool.submit(_ready) for _ in range(self.workers)]})
+
+    def submit(self, image, profile=None, **options):
+        """Encola una lectura (con el lector de ``profile``, si se indica); devuelve un ``Future`` con el resultado."""
+        pool = self._pool()
+        try:
+            return pool.submit(_readtext, image, options, profile)
+        except BrokenProcessPool:
+            print("⚠️ Un worker de OCR terminó inesperadamente; se reinicia el pool")
+            with self._lock:
+                if self._executor is pool:
+                    self._executor = None
+            pool.shutdown(wait=False, cancel_futures=True)
+            return self._pool().submit(_readtext, image, options, profile)
+
+    def readtext(self, image, profile=None, **options):
+        return self.submit(image, profile, **options).result()
+
+    def pids(self):
+        """PID de los procesos del pool que están en marcha."""
+        with self._lock:
+            executor = self._executor
+        return sorted(getattr(executor, "_processes", None) or {}) if executor is not None else []
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,222 @@
+import json
+import os
+import threading
+import time
+
+from lexicon import PROJECT_NAME
+from memory import rss_bytes
+
+# Perfiles incluidos: los de ``OCR_PROFILES_FILE`` se añaden a estos o los sustituyen.
+# EasyOCR cuantiza el reconocedor en CPU por defecto (``quantize``); ``full`` usa el de
+# precisión completa. Con un solo idioma el reconocedor estándar es más pequeño
+# (``english_g2`` para inglés) y no confunde caracteres de otros alfabetos. Sin ``gpu``
+# EasyOCR usa CUDA si está disponible (y entonces no cuantiza).
+DEFAULT_PROFILES = {
+    "default": {"languages": ["es", "en"]},
+    "en": {"languages": ["en"]},
+    "es": {"languages": ["es"]},
+    "full": {"languages": ["es", "en"], "quantize": False},
+}
+
+
+class OCRProfile:
+    """
+    Configuración de un lector OCR: idiomas, reconocedor y caracteres permitidos.
+
+    Atributos:
+        name (str): Nombre del perfil
+        languages (tuple): Idiomas de ``easyocr.Reader``
+        quantize (bool): Reconocedor cuantizado (int8 dinámico en CPU) o de precisión completa
+        gpu (bool): Usar CUDA (``None`` = lo que decida EasyOCR: la GPU si está disponible)
+        recog_network (str): Red de reconocimiento (``None`` = la estándar para los idiomas)
+        allowlist (str): Caracteres permitidos en ``readtext`` (``None`` = los de ``OCR_CONFIG``)
+    """
+
+    __slots__ = ("name", "languages", "quantize", "gpu", "recog_network", "allowlist")
+
+    def __init__(self, name, languages=("es", "en"), quantize=True, gpu=None, recog_network=None, allowlist=None):
+        self.name = name
+        self.languages = tuple(languages)
+        self.quantize = bool(quantize)
+        self.gpu = None if gpu is None else bool(gpu)
+        self.recog_network = recog_network
+        self.allowlist = allowlist
+
+    @classmethod
+    def from_dict(cls, name, data):
+        unknown = set(data) - {"languages", "quantize", "gpu", "recog_network", "allowlist"}
+        if unknown:
+            raise ValueError(f"Opciones desconocidas en el perfil de OCR {name}: {', '.join(sorted(unknown))}")
+        if not data.get("languages"):
+            raise ValueError(f"El perfil de OCR {name} no tiene idiomas")
+        return cls(name, **data)
+
+    @property
+    def key(self):
+        """Identifica el lector que crea el perfil (dos perfiles iguales comparten lector)."""
+        return (self.languages, self.quantize, self.gpu, self.recog_network)
+
+    def on_cpu(self):
+        """El mismo perfil sin GPU (para procesos creados con ``fork``, donde CUDA no se puede iniciar)."""
+        if self.gpu is False:
+            return self
+        return OCRProfile(self.name, self.languages, self.quantize, False, self.recog_network, self.allowlist)
+
+    def reader_options(self):
+        """Argumentos de ``easyocr.Reader``."""
+        options = {"lang_list": list(self.languages), "quantize": self.quantize, "verbose": False}
+        if self.gpu is not None:
+            options["gpu"] = self.gpu
+        if self.recog_network:
+            options["recog_network"] = self.recog_network
+        return options
+
+    def readtext_options(self, base):
+        """Opciones de ``readtext``: ``base`` con la ``allowlist`` del perfil, si tiene."""
+        return base if self.allowlist is None else {**base, "allowlist": self.allowlist}
+
+    def cache_options(self, options):
+        """Opciones para la clave de ``ocr_cache``: un mismo recorte se lee distinto con otro reconocedor."""
+        return {**options, "languages": list(self.languages), "quantize": self.quantize,
+                "recog_network": self.recog_network}
+
+    def as_dict(self):
+        return {"languages": list(self.languages), "quantize": self.quantize, "gpu": self.gpu,
+                "recog_network": self.recog_network, "allowlist": self.allowlist}
+
+    def __repr__(self):
+        return f"OCRProfile({self.name!r}, languages={self.languages}, quantize={self.quantize})"
+
+
+def easyocr_reader(profile):
+    """Crea el lector de EasyOCR de un perfil (fábrica por defecto)."""
+    import easyocr
+    return easyocr.Reader(**profile.reader_options())
+
+
+# Lectores de este proceso por ``OCRProfile.key``: se crean la primera vez que se usan
+_readers = {}
+_loads = {}  # key -> {"profile", "seconds", "rss_delta"}
+_readers_lock = threading.Lock()
+
+
+def get_reader(profile, factory=easyocr_reader):
+    """
+    Lector de un perfil en este proceso (se crea la primera vez y se conserva).
+
+    La carga se hace con un cerrojo: dos peticiones que piden a la vez un perfil
+    nuevo esperan a un solo lector. Los perfiles ya cargados no lo toman.
+
+    Args:
+        profile (OCRProfile): Perfil
+        factory (callable): Recibe el perfil y devuelve un objeto con ``readtext``
+
+    Returns:
+        Lector del perfil
+    """
+    reader = _readers.get(profile.key)
+    if reader is not None:
+        return reader
+    with _readers_lock:
+        reader = _readers.get(profile.key)
+        if reader is None:
+            before, start = rss_bytes(), time.perf_counter()
+            reader = factory(profile)
+            after = rss_bytes()
+            _loads[profile.key] = {
+                "profile": profile.name,
+                "seconds": round(time.perf_counter() - start, 3),
+                "rss_delta": after - before if after is not None and before is not None else None,
+            }
+            _readers[profile.key] = reader
+            print(f"✅ Lector OCR cargado: {profile.name} ({', '.join(profile.languages)}) "
+                  f"en {_loads[profile.key]['seconds']:.1f} s")
+    return reader
+
+
+def loaded_readers():
+    """Lectores cargados en este proceso: perfil, segundos de carga y aumento de RSS."""
+    with _readers_lock:
+        return [dict(load) for load in _loads.values()]
+
+
+def clear_readers():
+    """Descarta los lectores de este proceso (se vuelven a crear al usarlos)."""
+    with _readers_lock:
+        _readers.clear()
+        _loads.clear()
+
+
+class OCRProfiles:
+    """
+    Perfiles de OCR disponibles y el que usa cada proyecto.
+
+    El perfil de un escaneo es, por orden: el pedido en la petición, el asignado al
+    proyecto y ``default``. Los lectores se crean en cada proceso al usarse por primera
+    vez (``get_reader``), así que un perfil que nadie pide no ocupa memoria.
+    """
+
+    def __init__(self, profiles=None, projects=None, default="default", factory=easyocr_reader):
+        """
+        Args:
+            profiles (dict): Nombre -> opciones de ``OCRProfile`` (se añaden a ``DEFAULT_PROFILES``)
+            projects (dict): Proyecto -> nombre del perfil
+            default (str): Perfil de los proyectos sin asignar
+            factory (callable): Crea el lector de un perfil (de nivel de módulo, para los procesos del pool)
+        """
+        self.factory = factory
+        definitions = {**DEFAULT_PROFILES, **(profiles or {})}
+        self.profiles = {name: OCRProfile.from_dict(name, data) for name, data in definitions.items()}
+        self.projects = dict(projects or {})
+        self.default = default
+        for project, name in [(None, default)] + list(self.projects.items()):
+            if name not in self.profiles:
+                raise ValueError(f"Perfil de OCR desconocido: {name}"
+                                 + (f" (proyecto {project})" if project else ""))
+            if project is not None and not PROJECT_NAME.match(project):
+                raise ValueError(f"Nombre de proyecto no válido: {project}")
+
+    @classmethod
+    def from_file(cls, path, factory=easyocr_reader):
+        """
+        Carga los perfiles de un archivo JSON ``{"default", "profiles", "projects"}``.
+
+        Sin archivo se usan los perfiles incluidos y ``default`` para todos los proyectos.
+        """
+        if not path or not os.path.exists(path):
+            return cls(factory=factory)
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("profiles"), data.get("projects"), data.get("default", "default"), factory)
+
+    def resolve(self, name=None, project=None):
+        """
+        Perfil de un escaneo.
+
+        Args:
+            name (str): Perfil pedido (opcional)
+            project (str): Proyecto del escaneo (opcional)
+
+        Returns:
+            OCRProfile: El perfil
+
+        Raises:
+            ValueError: Si el perfil pedido no existe
+        """
+        if name:
+            if name not in self.profiles:
+                raise ValueError(f"Perfil de OCR desconocido: {name}")
+            return self.profiles[name]
+        return self.profiles[self.projects.get(project, self.default)]
+
+    def reader(self, profile):
+        """Lector del perfil en este proceso (ver ``get_reader``)."""
+        return get_reader(profile, self.factory)
+
+    def as_dict(self):
+        return {
+            "default": self.default,
+            "profiles": {name: profile.as_dict() for name, profile in self.profiles.items()},
+            "projects": dict(self.projects),
+            "loaded": loaded_readers(),
+        }
@@ -0,0 +1,207 @@
+import itertools
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# Lado de la cuadrícula del hash (HASH_SIZE x HASH_SIZE bits)
+HASH_SIZE = 8
+# Distancia de Hamming máxima para considerar dos capturas la misma pantalla
+MAX_DISTANCE = 4
+# Bits de cada trozo del índice (multi-index hashing)
+CHUNK_BITS = 16
+
+
+def dhash(image, hash_size=HASH_SIZE):
+    """
+    Hash perceptual por diferencias (dHash) de una imagen.
+
+    La imagen se reduce a ``(hash_size + 1) x hash_size`` en gris y cada bit indica si
+    un píxel es más claro que su vecino de la derecha. Cambios pequeños (el reloj de la
+    barra de estado, un cursor, recompresión JPEG) cambian pocos bits o ninguno.
+
+    Args:
+        image (numpy.ndarray): Imagen BGR o en gris
+        hash_size (int): Lado de la cuadrícula
+
+    Returns:
+        int: Hash de ``hash_size * hash_size`` bits
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big") >> (-len(bits) % 8)
+
+
+def hamming(a, b):
+    """Número de bits distintos entre dos hashes."""
+    return (a ^ b).bit_count()
+
+
+def to_hex(value, bits=HASH_SIZE * HASH_SIZE):
+    return f"{value:0{bits // 4}x}"
+
+
+class HashIndex:
+    """
+    Índice de hashes para buscar el más cercano en distancia de Hamming (multi-index hashing).
+
+    El hash se divide en ``m`` trozos de unos ``CHUNK_BITS`` bits, cada uno con su propia
+    tabla. Si dos hashes difieren en ``d`` bits o menos, al menos un trozo difiere en
+    ``d // m`` bits o menos (principio del palomar), así que basta comparar con los
+    hashes de las entradas de cada tabla a esa distancia del trozo buscado: unos pocos
+    cientos de candidatos aun con cientos de miles de pantallas indexadas.
+    """
+
+    def __init__(self, bits=HASH_SIZE * HASH_SIZE, max_distance=MAX_DISTANCE, chunk_bits=CHUNK_BITS):
+        """
+        Args:
+            bits (int): Bits de cada hash
+            max_distance (int): Distancia máxima de las búsquedas
+            chunk_bits (int): Bits aproximados de cada trozo
+        """
+        self.bits = bits
+        self.max_distance = max_distance
+        chunks = max(1, round(bits / chunk_bits))
+        self._chunks = []  # (desplazamiento, máscara, variantes a probar) de cada trozo
+        start = 0
+        for i in range(chunks):
+            width = bits // chunks + (1 if i < bits % chunks else 0)
+            self._chunks.append((start, (1 << width) - 1, self._flip_masks(width, max_distance // chunks)))
+            start += width
+        self._tables = [{} for _ in self._chunks]
+        self._values = {}  # hash -> valor (el último añadido)
+
+    @staticmethod
+    def _flip_masks(width, radius):
+        """Máscaras XOR con hasta ``radius`` bits de ``width`` activados (ordenadas por bits activados)."""
+        masks = [0]
+        for count in range(1, radius + 1):
+            masks += [sum(1 << bit for bit in bits) for bits in itertools.combinations(range(width), count)]
+        return masks
+
+    def __len__(self):
+        return len(self._values)
+
+    def add(self, value_hash, value):
+        """Indexa un hash; si ya estaba, sustituye su valor."""
+        if value_hash not in self._values:
+            for table, (shift, mask, _) in zip(self._tables, self._chunks):
+                table.setdefault((value_hash >> shift) & mask, set()).add(value_hash)
+        self._values[value_hash] = value
+
+    def remove(self, value_hash):
+        if self._values.pop(value_hash, None) is None:
+            return
+        for table, (shift, mask, _) in zip(self._tables, self._chunks):
+            key = (value_hash >> shift) & mask
+            bucket = table[key]
+            bucket.discard(value_hash)
+            if not bucket:
+                del table[key]
+
+    def nearest(self, value_hash, max_distance=None):
+        """
+        Busca el hash indexado más cercano.
+
+        Args:
+            value_hash (int): Hash buscado
+            max_distance (int): Distancia máxima (como mucho la del índice)
+
+        Returns:
+            tuple: ``(hash, valor, distancia)`` o ``None`` si ninguno está lo bastante cerca
+        """
+        limit = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        if value_hash in self._values:
+            return value_hash, self._values[value_hash], 0
+
+        best, best_distance = None, limit + 1
+        for table, (shift, mask, flips) in zip(self._tables, self._chunks):
+            key = (value_hash >> shift) & mask
+            for flip in flips:
+                bucket = table.get(key ^ flip)
+                if bucket is None:
+                    continue
+                for candidate in bucket:
+                    distance = (candidate ^ value_hash).bit_count()
+                    if distance < best_distance:
+                        best, best_distance = candidate, distance
+                        if distance == 1:
+                            return best, self._values[best], 1
+        if best is None:
+            return None
+        return best, self._values[best], best_distance
+
+
+class ScreenIndex:
+    """
+    Pantallas ya escaneadas, indexadas por su hash perceptual.
+
+    Cada valor es ``(scan_id, json_path)``. Con ``loader`` el índice se completa con
+    los hashes guardados por otros procesos (``ResultStore.screen_hashes``), como
+    mucho una vez cada ``check_interval`` segundos.
+    """
+
+    def __init__(self, loader=None, max_distance=MAX_DISTANCE, hash_size=HASH_SIZE, check_interval=2.0):
+        """
+        Args:
+            loader (callable): Recibe el último id leído y devuelve filas ``(id, hash_hex, scan_id, json_path)``
+            max_distance (int): Distancia de Hamming máxima para considerar dos capturas la misma pantalla
+            hash_size (int): Lado de la cuadrícula del hash
+            check_interval (float): Segundos mínimos entre lecturas de ``loader``
+        """
+        self.loader = loader
+        self.hash_size = hash_size
+        self.check_interval = check_interval
+        self.index = HashIndex(hash_size * hash_size, max_distance)
+        self._lock = threading.Lock()
+        self._last_id = 0
+        self._checked = None
+
+    def __len__(self):
+        return len(self.index)
+
+    def signature(self, image):
+        return dhash(image, self.hash_size)
+
+    def to_hex(self, signature):
+        return to_hex(signature, self.hash_size * self.hash_size)
+
+    def refresh(self, force=False):
+        """Añade los hashes nuevos de ``loader``."""
+        if self.loader is None:
+            return
+        now = time.monotonic()
+        if not force and self._checked is not None and now - self._checked < self.check_interval:
+            return
+        with self._lock:
+            self._checked = now
+            try:
+                rows = self.loader(self._last_id)
+            except Exception as e:
+                print(f"⚠️ Error al cargar el índice de pantallas: {str(e)}")
+                return
+            for row_id, hash_hex, scan_id, json_path in rows:
+                self.index.add(int(hash_hex, 16), (scan_id, json_path))
+                self._last_id = max(self._last_id, row_id)
+
+    def lookup(self, signature):
+        """
+        Pantalla indexada más parecida.
+
+        Returns:
+            tuple: ``(hash, (scan_id, json_path), distancia)`` o ``None``
+        """
+        self.refresh()
+        with self._lock:
+            return self.index.nearest(signature)
+
+    def add(self, signature, scan_id, json_path):
+        with self._lock:
+            self.index.add(signature, (scan_id, json_path))
+
+    def discard(self, signature):
+        """Quita una pantalla cuyo reporte ya no existe."""
+        with self._lock:
+            self.index.remove(signature)
@@ -0,0 +1,154 @@
+import numpy as np
+
+
+# Configuración por defecto del post-procesamiento de detecciones
+DEFAULT_POSTPROCESSING = {
+    # Confianza mínima por clase (además del umbral global de model.infer)
+    "min_confidence": {},
+    # NMS por clase: umbral de IoU a partir del cual dos cajas de la misma clase son duplicadas
+    "nms": {
+        "AppBar": 0.5,
+        "AppBar_icon": 0.5,
+        "AppBar_title": 0.5,
+        "button": 0.5,
+        "button_text": 0.5,
+        "TextField": 0.5,
+        "texfield_label": 0.5,
+        "texfield_hinttext": 0.5,
+        "checkbox": 0.5,
+        "radio": 0.5,
+        "Dropdown_menu": 0.5,
+        "Table": 0.5,
+        "celda": 0.6,
+        "celda_text": 0.6,
+    },
+    # Número máximo de detecciones por clase (se conservan las de mayor confianza)
+    "max_per_class": {
+        "AppBar": 1,
+        "AppBar_icon": 1,
+        "AppBar_title": 1,
+    },
+    # Supresión entre clases: (clase suprimida, clase contenedora, fracción mínima cubierta)
+    "suppress_inside": [
+        ("Text", "button_text", 0.9),
+        ("Text", "AppBar_title", 0.9),
+        ("Text", "texfield_label", 0.9),
+        ("Text", "texfield_hinttext", 0.9),
+        ("Text", "checkbox_text", 0.9),
+        ("Text", "radio_text", 0.9),
+        ("Text", "celda_text", 0.9),
+    ],
+}
+
+
+def pairwise_iou(boxes_a, boxes_b):
+    """
+    Calcula la matriz de IoU entre dos conjuntos de cajas.
+
+    Args:
+        boxes_a (numpy.ndarray): Cajas [x1, y1, x2, y2], forma (N, 4)
+        boxes_b (numpy.ndarray): Cajas [x1, y1, x2, y2], forma (M, 4)
+
+    Returns:
+        numpy.ndarray: IoU de cada pareja, forma (N, M)
+    """
+    inter = intersection_area(boxes_a, boxes_b)
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def intersection_area(boxes_a, boxes_b):
+    """Área de intersección de cada pareja de cajas, forma (N, M)."""
+    w = np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2]) - np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    h = np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3]) - np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    return np.clip(w, 0, None) * np.clip(h, 0, None)
+
+
+class PostProcessor:
+    """
+    Etapa declarativa de post-procesamiento de detecciones, previa al OCR.
+
+    Aplica en orden: confianza mínima por clase, NMS por clase, número máximo por
+    clase y supresión entre clases. Cada regla trabaja sobre arrays y devuelve
+    cuántas detecciones eliminó.
+    """
+
+    def __init__(self, config=None):
+        """
+        Args:
+            config (dict): Configuración con las claves de ``DEFAULT_POSTPROCESSING``;
+                las claves ausentes toman el valor por defecto
+        """
+        self.config = dict(DEFAULT_POSTPROCESSING, **(config or {}))
+
+    def run(self, xyxy, confidence, class_names):
+        """
+        Ejecuta todas las reglas.
+
+        Args:
+            xyxy (numpy.ndarray): Cajas de las detecciones, forma (N, 4)
+            confidence (numpy.ndarray): Confianza de cada detección
+            class_names (numpy.ndarray): Clase de cada detección
+
+        Returns:
+            numpy.ndarray: Máscara booleana de las detecciones que se conservan
+            dict: Número de detecciones eliminadas por cada regla
+        """
+        xyxy = np.asarray(xyxy, dtype=np.float64).reshape(-1, 4)
+        confidence = np.asarray(confidence, dtype=np.float64)
+        class_names = np.asarray(class_names).astype(str)
+        keep = np.ones(len(xyxy), dtype=bool)
+        pruned = {}
+
+        for rule in (self._min_confidence, self._nms, self._max_per_class, self._suppress_inside):
+            before = int(keep.sum())
+            keep &= rule(xyxy, confidence, class_names, keep)
+            pruned[rule.__name__.lstrip("_")] = before - int(keep.sum())
+
+        return keep, pruned
+
+    def _min_confidence(self, xyxy, confidence, class_names, keep):
+        thresholds = self.config["min_confidence"]
+        if not thresholds:
+            return keep
+        minimum = np.array([thresholds.get(name, 0.0) for name in class_names], dtype=np.float64)
+        return confidence >= minimum
+
+    def _nms(self, xyxy, confidence, class_names, keep):
+        result = keep.copy()
+        for class_name, threshold in self.config["nms"].items():
+            members = np.flatnonzero(keep & (class_names == class_name))
+            if members.size < 2:
+                continue
+            members = members[np.argsort(-confidence[members], kind="stable")]
+            overlaps = pairwise_iou(xyxy[members], xyxy[members]) > threshold
+            # NMS voraz sobre la matriz de IoU precalculada
+            alive = np.ones(members.size, dtype=bool)
+            for i in range(members.size):
+                if alive[i]:
+                    alive[i + 1:] &= ~overlaps[i, i + 1:]
+            result[members[~alive]] = False
+        return result
+
+    def _max_per_class(self, xyxy, confidence, class_names, keep):
+        result = keep.copy()
+        for class_name, limit in self.config["max_per_class"].items():
+            members = np.flatnonzero(keep & (class_names == class_name))
+            if members.size > limit:
+                ranked = members[np.argsort(-confidence[members], kind="stable")]
+                result[ranked[limit:]] = False
+        return result
+
+    def _suppress_inside(self, xyxy, confidence, class_names, keep):
+        result = keep.copy()
+        areas = (xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1])
+        for suppressed_class, container_class, min_coverage in self.config["suppress_inside"]:
+            inner = np.flatnonzero(result & (class_names == suppressed_class))
+            outer = np.flatnonzero(keep & (class_names == container_class))
+            if inner.size == 0 or outer.size == 0:
+                continue
+            covered = intersection_area(xyxy[inner], xyxy[outer]) / np.maximum(areas[inner], 1)[:, None]
+            result[inner[(covered >= min_coverage).any(axis=1)]] = False
+        return result
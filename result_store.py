@@ -0,0 +1,342 @@
+import queue
+import sqlite3
+import threading
+import time
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    model_id TEXT,
+    source_image TEXT,
+    json_path TEXT,
+    image_path TEXT,
+    component_count INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_scans_created ON scans(created_at);
+CREATE INDEX IF NOT EXISTS idx_scans_model ON scans(model_id, created_at);
+
+CREATE TABLE IF NOT EXISTS components (
+    id INTEGER PRIMARY KEY,
+    scan_id TEXT NOT NULL REFERENCES scans(id) ON DELETE CASCADE,
+    parent_id INTEGER,
+    component_type TEXT NOT NULL,
+    type TEXT NOT NULL,
+    text TEXT,
+    x1 INTEGER, y1 INTEGER, x2 INTEGER, y2 INTEGER,
+    confidence REAL,
+    cell_count INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_components_type ON components(component_type, cell_count);
+CREATE INDEX IF NOT EXISTS idx_components_scan ON components(scan_id);
+
+CREATE TABLE IF NOT EXISTS screen_hashes (
+    id INTEGER PRIMARY KEY,
+    scan_id TEXT NOT NULL UNIQUE,
+    hash TEXT NOT NULL
+);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS components_fts USING fts5(
+    text, content='components', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+
+def _component_rows(scan_id, report):
+    """
+    Aplana un reporte en filas de ``components``.
+
+    Cada fila guarda ``component_type`` (el tipo del componente principal) para poder
+    buscar, por ejemplo, "un ``button`` cuyo texto sea Guardar" sin uniones.
+
+    Returns:
+        list: Tuplas ``(scan_id, índice_padre, component_type, type, text, x1, y1, x2, y2, confianza, celdas)``;
+        ``índice_padre`` es la posición de la fila padre dentro de la misma lista
+    """
+    rows = []
+
+    def add(parent, component_type, item, cell_count=None):
+        c = item["coordinates"]
+        rows.append((scan_id, parent, component_type, item["type"], item.get("text"),
+                     c["x1"], c["y1"], c["x2"], c["y2"], item.get("confidence"), cell_count))
+        return len(rows) - 1
+
+    for component in report.get("components", []):
+        c_type = component["type"]
+        table_rows = component.get("estructure", {}).get("children", [])
+        cells = [cell for row in table_rows for cell in row["children"]]
+        parent = add(None, c_type, component, len(cells) if "estructure" in component else None)
+        for sub in component.get("subcomponents", []):
+            add(parent, c_type, sub)
+        for cell in cells:
+            if cell.get("child"):
+                add(parent, c_type, dict(cell["child"], type="cell_text"))
+    return rows
+
+
+class ResultStore:
+    """
+    Base de datos SQLite con los reportes de escaneo, indexada para consultas.
+
+    Las escrituras se encolan y un hilo en segundo plano las inserta por lotes en
+    una sola transacción, fuera del camino de la petición. Usa WAL para que varios
+    procesos (workers de gunicorn) puedan escribir y leer a la vez.
+    """
+
+    def __init__(self, path, batch_size=50, flush_interval=1.0):
+        """
+        Args:
+            path (str): Ruta del archivo SQLite
+            batch_size (int): Reportes máximos por transacción
+            flush_interval (float): Segundos máximos que un reporte espera en la cola
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._local = threading.local()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        try:
+            conn.executescript(FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            # SQLite sin FTS5: la búsqueda de texto cae a LIKE
+            self.fts = False
+        conn.commit()
+
+    def _connection(self):
+        """Conexión propia de cada hilo."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def add(self, result, created_at=None):
+        """
+        Encola un escaneo para guardarlo (no bloquea).
+
+        Args:
+            result (ScanResult): Resultado de ``WidgetScanner.scan``
+            created_at (float): Instante del escaneo (por defecto ahora)
+        """
+        self._ensure_writer()
+        self._queue.put((result, time.time() if created_at is None else created_at))
+
+    def write_batch(self, items):
+        """
+        Inserta varios escaneos en una sola transacción.
+
+        Args:
+            items (list): Tuplas ``(ScanResult, created_at)``
+        """
+        conn = self._connection()
+        with conn:
+            for result, created_at in items:
+                report = result.report
+                metadata = report.get("metadata", {})
+                scan_id = result.scan_id or metadata.get("scan_id")
+                self._delete_components(conn, scan_id)
+                previous = conn.execute("SELECT json_path FROM scans WHERE id = ?", (scan_id,)).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO scans VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (scan_id, created_at, metadata.get("model_used"), metadata.get("source_image"),
+                     result.json_path, result.image_path, len(report.get("components", [])))
+                )
+
+                # Se insertan en orden para resolver el id del padre de cada fila
+                row_ids = []
+                for row in _component_rows(scan_id, report):
+                    parent = row_ids[row[1]] if row[1] is not None else None
+                    cursor = conn.execute(
+                        "INSERT INTO components (scan_id, parent_id, component_type, type, text, x1, y1, x2, y2, "
+                        "confidence, cell_count) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (row[0], parent) + row[2:]
+                    )
+                    row_ids.append(cursor.lastrowid)
+                    if self.fts and row[4]:
+                        conn.execute("INSERT INTO components_fts(rowid, text) VALUES (?, ?)",
+                                     (cursor.lastrowid, row[4]))
+
+                # Hash perceptual de la captura (índice de pantallas casi idénticas). Si el reporte cambió
+                # de ruta (un escaneo parcial ya completado) la fila se vuelve a insertar con un id nuevo:
+                # los índices de los demás procesos solo leen ids posteriores al último que vieron
+                if previous is not None and previous[0] != result.json_path:
+                    conn.execute("DELETE FROM screen_hashes WHERE scan_id = ?", (scan_id,))
+                if metadata.get("phash"):
+                    conn.execute("INSERT OR IGNORE INTO screen_hashes (scan_id, hash) VALUES (?, ?)",
+                                 (scan_id, metadata["phash"]))
+
+    def _ensure_writer(self):
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._write_loop, name="result-store-writer", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self.write_batch(batch)
+            except Exception as e:
+                print(f"⚠️ Error al guardar {len(batch)} reportes en {self.path}: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self):
+        """Espera a que todos los reportes encolados estén guardados."""
+        if self._writer is not None:
+            self._queue.join()
+
+    def search(self, component_type=None, text=None, min_cells=None, model_id=None, since=None, until=None,
+               limit=100):
+        """
+        Busca componentes que cumplan todos los filtros indicados.
+
+        Args:
+            component_type (str): Tipo del componente principal (``Table``, ``button``...)
+            text (str): Texto (búsqueda de texto completo sobre el OCR)
+            min_cells (int): Número mínimo de celdas (solo tablas)
+            model_id (str): Modelo usado en el escaneo
+            since (float): Escaneos a partir de este instante (epoch)
+            until (float): Escaneos hasta este instante (epoch)
+            limit (int): Número máximo de resultados
+
+        Returns:
+            list: Un ``dict`` por componente encontrado, con los datos de su escaneo
+        """
+        clauses, params = [], []
+        joins = ""
+        if text:
+            if self.fts:
+                joins = "JOIN components_fts f ON f.rowid = c.id"
+                clauses.append("components_fts MATCH ?")
+                params.append(" ".join('"' + token.replace('"', '""') + '"' for token in text.split()))
+            else:
+                clauses.append("c.text LIKE ?")
+                params.append(f"%{text}%")
+        if component_type:
+            clauses.append("c.component_type = ?")
+            params.append(component_type)
+        if min_cells is not None:
+            clauses.append("c.cell_count >= ?")
+            params.append(int(min_cells))
+        if model_id:
+            clauses.append("s.model_id = ?")
+            params.append(model_id)
+        if since is not None:
+            clauses.append("s.created_at >= ?")
+            params.append(float(since))
+        if until is not None:
+            clauses.append("s.created_at <= ?")
+            params.append(float(until))
+
+        where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+        sql = (
+            "SELECT c.id, c.scan_id, c.parent_id, c.component_type, c.type, c.text, c.x1, c.y1, c.x2, c.y2, "
+            "c.confidence, c.cell_count, s.created_at, s.model_id, s.source_image, s.json_path, s.image_path "
+            f"FROM components c {joins} JOIN scans s ON s.id = c.scan_id {where} "
+            "ORDER BY s.created_at DESC, c.id LIMIT ?"
+        )
+        rows = self._connection().execute(sql, params + [int(limit)]).fetchall()
+        return [{
+            "scan_id": row["scan_id"],
+            "created_at": row["created_at"],
+            "model_id": row["model_id"],
+            "source_image": row["source_image"],
+            "json_path": row["json_path"],
+            "image_path": row["image_path"],
+            "component": {
+                "component_type": row["component_type"],
+                "type": row["type"],
+                "text": row["text"],
+                "coordinates": {"x1": row["x1"], "y1": row["y1"], "x2": row["x2"], "y2": row["y2"]},
+                "confidence": row["confidence"],
+                "cell_count": row["cell_count"],
+                "is_subcomponent": row["parent_id"] is not None,
+            },
+        } for row in rows]
+
+    def get_scan(self, scan_id):
+        """Datos de un escaneo (``None`` si no existe)."""
+        row = self._connection().execute("SELECT * FROM scans WHERE id = ?", (scan_id,)).fetchone()
+        return dict(row) if row else None
+
+    def screen_hashes(self, after=0):
+        """
+        Hashes perceptuales guardados después de un id (para ``phash.ScreenIndex``).
+
+        Returns:
+            list: Tuplas ``(id, hash_hex, scan_id, json_path)`` en orden de inserción
+        """
+        rows = self._connection().execute(
+            "SELECT h.id, h.hash, h.scan_id, s.json_path FROM screen_hashes h JOIN scans s ON s.id = h.scan_id "
+            "WHERE h.id > ? ORDER BY h.id", (int(after),)
+        ).fetchall()
+        return [tuple(row) for row in rows]
+
+    def delete_scans(self, scan_ids):
+        """Elimina escaneos (por ejemplo, cuando sus archivos se expulsan del almacén)."""
+        conn = self._connection()
+        with conn:
+            for scan_id in scan_ids:
+                self._delete_components(conn, scan_id)
+                conn.execute("DELETE FROM screen_hashes WHERE scan_id = ?", (scan_id,))
+                conn.execute("DELETE FROM scans WHERE id = ?", (scan_id,))
+
+    def delete_files(self, paths, chunk_size=500):
+        """
+        Elimina los escaneos cuyo reporte o imagen anotada ya no está en el almacén.
+
+        Se usa como ``on_remove`` de ``OutputStore``: recibe las rutas que expulsó el barrido.
+
+        Args:
+            paths (list): Rutas de archivos eliminados
+            chunk_size (int): Rutas por consulta
+
+        Returns:
+            int: Escaneos eliminados
+        """
+        paths = list(paths)
+        scan_ids = set()
+        conn = self._connection()
+        for i in range(0, len(paths), chunk_size):
+            chunk = paths[i:i + chunk_size]
+            marks = ", ".join("?" * len(chunk))
+            rows = conn.execute(f"SELECT id FROM scans WHERE json_path IN ({marks}) OR image_path IN ({marks})",
+                                chunk + chunk).fetchall()
+            scan_ids.update(row["id"] for row in rows)
+        if scan_ids:
+            self.delete_scans(scan_ids)
+        return len(scan_ids)
+
+    def _delete_components(self, conn, scan_id):
+        if self.fts:
+            # El índice FTS es de contenido externo: hay que borrar sus entradas explícitamente
+            conn.execute(
+                "INSERT INTO components_fts(components_fts, rowid, text) "
+                "SELECT 'delete', id, text FROM components WHERE scan_id = ? AND text IS NOT NULL",
+                (scan_id,)
+            )
+        conn.execute("DELETE FROM components WHERE scan_id = ?", (scan_id,))
@@ -1,13 +1,54 @@
 import supervision as sv
+import copy
 import cv2
-import os
+import functools
 import json
+import os
 import re
+import time
 import easyocr
 import numpy as np
+from concurrent.futures import wait
 from datetime import datetime
 from inference import get_model
 
+import incremental
+import serialization
+import table_engine
+from detections import DetectionSet
+from layout_tree import BoxIndex, LayoutTreeBuilder
+from lexicon import LexiconStore
+from postprocess import PostProcessor
+from storage import OutputStore
+
+# Directorio de vocabularios por proyecto (ver lexicon.LexiconStore)
+LEXICON_DIR = os.getenv("LEXICON_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "lexicons"))
+
+
+class ScanResult:
+    """
+    Resultado de un escaneo.
+
+    Atributos:
+        report (dict): Reporte con los componentes detectados
+        report_json (bytes): El reporte codificado en JSON compacto (el mismo contenido del archivo)
+        json_path (str): Ruta del archivo JSON generado
+        image_path (str): Ruta de la imagen anotada
+        scan_id (str): ID único del escaneo
+        completion (callable): Si el OCR quedó incompleto por el límite de tiempo, función que
+            lo termina y devuelve el ``ScanResult`` completo (mismo ``scan_id``); si no, ``None``
+    """
+
+    __slots__ = ("report", "report_json", "json_path", "image_path", "scan_id", "completion")
+
+    def __init__(self, report, report_json, json_path, image_path, scan_id=None, completion=None):
+        self.report = report
+        self.report_json = report_json
+        self.json_path = json_path
+        self.image_path = image_path
+        self.scan_id = scan_id
+        self.completion = completion
+
 
 class WidgetScanner:
     """
@@ -31,25 +72,119 @@ class WidgetScanner:
                       "radio_text", "value_1", "value_2", "value_3", "value_4", "value_5", "value_6", "value_7",
                       "celda_text"]
 
-    def __init__(self, model_id, api_key, output_dir="output_results"):
+    # Prioridad del OCR cuando hay límite de tiempo (menor = antes; el resto usa 1)
+    OCR_PRIORITY = {
+        "AppBar_title": 0, "button_text": 0, "texfield_label": 0, "checkbox_text": 0, "radio_text": 0,
+        "celda_text": 2, **{f"value_{i}": 2 for i in range(1, 8)},
+    }
+
+    # Umbrales de ``model.infer`` (confianza mínima e IoU del NMS del modelo)
+    INFERENCE_CONFIG = {"confidence": 0.5, "iou_threshold": 0.7}
+
+    # Configuración de ``readtext`` hiper-específica para estas capturas
+    OCR_CONFIG = {
+        'detail': 0,
+        'text_threshold': 0.65,
+        'width_ths': 1.2,
+        'allowlist': 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZáéíóúÁÉÍÓÚñÑ:´@#.,0123456789',
+        'min_size': 20,  # Filtrar ruido pequeño
+        'slope_ths': 0.1  # Para texto bien horizontal
+    }
+
+    # Mapeo de nombres para el JSON
+    NAME_MAPPING = {
+        "texfield_label": "label",
+        "texfield_hinttext": "hint",
+        "button_text": "text",
+        "AppBar_title": "title",
+        "AppBar_icon": "icon",
+        "checkbox_text": "text",
+        "radio_text": "text",
+        "celda": "cell",
+        "celda_text": "cell_text",
+    }
+
+    # Ventana de búsqueda (izq, arriba, der, abajo) de cada relación de is_related:
+    # cuánto puede salirse el subcomponente de la caja del componente principal
+    RELATION_MARGINS = {
+        ("TextField", "texfield_label"): (150, 45, 150, 45),
+        ("TextField", "texfield_hinttext"): (10, 5, 10, 5),
+        ("button", "button_text"): 0,
+        ("AppBar", "AppBar_title"): 0,
+        ("AppBar", "AppBar_icon"): (float("inf"), float("inf"), 0, float("inf")),
+        ("checkbox", "checkbox_text"): 0,
+        ("radio", "radio_text"): 0,
+        **{("Dropdown_menu", f"value_{i}"): (0, 0, 0, float("inf")) for i in range(1, 8)},
+        ("Table", "celda"): 10,
+        ("celda", "celda_text"): 5,
+    }
+
+    def __init__(self, model_id, api_key, output_dir="output_results", postprocessing=None, model=None,
+                 reader=None, lexicons=None, ocr_cache=None, screen_index=None, inference_config=None,
+                 ocr_config=None, input_scale=1.0, skip_ocr=False, ingest=None, ocr_profiles=None):
         """
         Inicializa el escáner de widgets.
 
         Args:
             model_id (str): ID del modelo en formato 'workspace/model_name/version' o 'workspace/version'
             api_key (str): API key de Roboflow
-            output_dir (str): Directorio para guardar resultados
+            output_dir (str | OutputStore): Directorio (o almacén ya configurado) para guardar resultados
+            postprocessing (dict): Reglas de post-procesamiento (ver ``postprocess.DEFAULT_POSTPROCESSING``)
+            model: Modelo ya cargado con método ``infer`` (opcional; evita ``get_model``)
+            reader: Lector OCR ya creado con método ``readtext`` (opcional; con un ``ocr_pool.OCRPool``
+                los textos de cada escaneo se leen en paralelo)
+            lexicons (LexiconStore): Vocabularios para corregir el OCR (por defecto los de ``LEXICON_DIR``)
+            ocr_cache (OCRCache): Caché de lecturas por contenido del recorte (opcional; ver ``ocr_cache``)
+            screen_index (ScreenIndex): Índice de pantallas ya escaneadas por hash perceptual (opcional;
+                una captura casi idéntica a una indexada se re-escanea de forma incremental)
+            inference_config (dict): Cambios a ``INFERENCE_CONFIG`` (``confidence``, ``iou_threshold``)
+            ocr_config (dict): Cambios a ``OCR_CONFIG`` (opciones de ``readtext``)
+            input_scale (float): Escala de la imagen que recibe el modelo (las cajas se devuelven en
+                la imagen original; el OCR siempre lee la imagen original)
+            skip_ocr (bool): No leer textos (solo detecciones y relaciones)
+            ingest (ImageIngest): Decodificación con memoria acotada y resolución de trabajo (opcional;
+                ver ``ingest``); las coordenadas del reporte son siempre las de la imagen subida
+            ocr_profiles (OCRProfiles): Perfiles de OCR por petición o proyecto (opcional; ver
+                ``ocr_profiles``). Sin ``reader``, el lector de cada perfil se crea al usarlo por
+                primera vez; con un ``OCRPool``, en cada proceso del pool
         """
         self.model_id = model_id
         self.api_key = api_key
-        self.output_dir = output_dir
-        self.model = get_model(model_id=model_id, api_key=api_key)
-
-        # Inicializar EasyOCR (es costoso inicializarlo)
-        self.reader = easyocr.Reader(['es', 'en'])  # Español e inglés
+        self.store = output_dir if isinstance(output_dir, OutputStore) else OutputStore(output_dir)
+        self.output_dir = self.store.root
+        self.model = model if model is not None else get_model(model_id=model_id, api_key=api_key)
+        self.layout_builder = self.build_layout_builder()
+        self.postprocessor = PostProcessor(postprocessing)
+        # Duración media (segundos) de una lectura OCR y de guardar reporte e imagen anotada,
+        # para respetar los límites de tiempo
+        self.ocr_seconds = 0.0
+        self.save_seconds = 0.0
+
+        # Inicializar EasyOCR (es costoso inicializarlo); con perfiles se crea al usarlo
+        if reader is None and ocr_profiles is None:
+            reader = easyocr.Reader(['es', 'en'])  # Español e inglés
+        self.reader = reader
+        self.ocr_profiles = ocr_profiles
+        self.lexicons = lexicons if lexicons is not None else LexiconStore(LEXICON_DIR)
+        self.ocr_cache = ocr_cache
+        self.screen_index = screen_index
+        self.inference_config = {**self.INFERENCE_CONFIG, **(inference_config or {})}
+        self.ocr_config = {**self.OCR_CONFIG, **(ocr_config or {})}
+        self.input_scale = input_scale
+        self.skip_ocr = skip_ocr
+        self.ingest = ingest
+
+    def with_model(self, model_id, model):
+        """
+        Copia del escáner con otro modelo de detección (para cambiar de versión sin cortes).
 
-        # Crear directorio de salida si no existe
-        os.makedirs(output_dir, exist_ok=True)
+        Comparte el lector OCR, las cachés, el almacén y los vocabularios; las peticiones
+        que ya tienen la copia anterior terminan con su modelo.
+        """
+        scanner = copy.copy(self)
+        scanner.model_id = model_id
+        scanner.model = model
+        return scanner
 
     def is_related(self, parent_bbox, child_bbox, parent_type, child_type):
         """
@@ -140,7 +275,7 @@ class WidgetScanner:
         # 8. Para cualquier otro caso
         return False
 
-    def extract_ui_text(self, image, bbox, component_type):
+    def extract_ui_text(self, image, bbox, component_type, lexicon=None, profile=None):
         """
         Extracción de texto con ajuste fino para caracteres similares.
 
@@ -148,284 +283,703 @@ class WidgetScanner:
             image (numpy.ndarray): Imagen de la que extraer el texto
             bbox (list): Coordenadas del componente [x1, y1, x2, y2]
             component_type (str): Tipo del componente
+            lexicon (Lexicon): Vocabulario al que se ajusta el texto leído (opcional)
+            profile (OCRProfile): Perfil de OCR (opcional; ver ``ocr_readtext``)
 
         Returns:
             str: Texto extraído del componente
         """
         print(f"Llamada a extract_ui_text: {component_type} ({bbox})")
         try:
-            x1, y1, x2, y2 = map(int, bbox)
-            roi = image[y1:y2, x1:x2]
-
-            # 1. Preprocesamiento ligero pero efectivo
-            gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
-            _, processed = cv2.threshold(gray, 180, 255, cv2.THRESH_BINARY_INV)
-
-            # 2. Configuración hiper-específica para tu caso
-            ocr_config = {
-                'detail': 0,
-                'text_threshold': 0.65,
-                'width_ths': 1.2,
-                'allowlist': 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZáéíóúÁÉÍÓÚñÑ:´@#.,0123456789',
-                'min_size': 20,  # Filtrar ruido pequeño
-                'slope_ths': 0.1  # Para texto bien horizontal
-            }
-
-            # 3. Ejecución con post-procesamiento inteligente
-            results = self.reader.readtext(processed, **ocr_config)
-            raw_text = " ".join(results).strip()
-
-            # 4. Correcciones basadas en patrones visuales
-            correction_rules = {
-                r'Trtulo\b': 'Título',
-                r'Titulo?': 'Título',
-                r'TextFel\b': 'TextField',
-                r'IatField\b': 'TextField:',
-                r'3utho\b': 'Button',
-                r'Botlov\b': 'Button',
-                r'3u4hon': 'Button',
-                r'Passwuord:': 'Password:',
-                r'Uscorio\b': 'Usuario:',
-                r'Espalcl\b': 'Español',
-                r'Jvsies\b': 'Ingles',
-                r'Chic\b': 'Chino',
-                r'ceaJ\b': 'Acepto',
-                r'Civdad\b': 'Ciudad',
-                r'SanfaGe\b': 'Santa Cruz',
-                r'SantaGe': 'Santa Cruz',
-                r'LaPe:': 'La Paz',
-                r'LaPe3': 'La Paz',
-                r'Crcha\b': 'Cocha',
-                r'Apailndo:': 'Apellido:',
-                r'Aombe': 'Nombre:',
-                r'Nomke:': 'Nombre:',
-                r'logv4\b': 'Login',
-                r'logv4': 'Login',
-                r'Jugcaar': 'Login',
-                r'Gusrdar': 'Guardar',
-                r'Edtar': 'Editar',
-                r'Jusscaar\b': 'Ingresar',
-                r'Usveno': 'Usuario:',
-                r'Conbasea:': 'Contraseña:',
-                r'Covhasaa:': 'Contraseña:',
-                r'Contrase\u00f1a:': 'Contraseña:',
-                r'5i': 'Si',
-                r'Mo': 'No',
-                r'Cvestionario\b': 'Cuestionario',
-                r'Oczoacen2': 'Ocupación:',
-                r'2 Trabeja\b': 'Trabaja?',
-                r'T\u00edtulo': 'Titulo',
-                r'Csluda2\b': 'Estudia?',
-                r'Edad': 'Edad:',
-                r'Glad': 'Edad:',
-                r'Edlar\b': 'Editar',
-                r'Guysdar\b': 'Guardar',
-                r'Nambr': 'Nombre',
-                r'Nambn': 'Nombre',
-                r'Hlow': 'Nombre:',
-                r'Dukescua Recpercz\b': 'Recuperar Contraseña',
-                r'Ouakescu Recpesez': 'Recuperar Contraseña',
-                r'Ldad': 'Edad:',
-                r'Eld': 'Edad',
-                r'Zjercou': 'Dirección:',
-                r'Diracoa:.': 'Dirección:',
-                r'Direcci\u00f3n:': 'Dirección:',
-                r'Dsecco': 'Dirección:',
-                r'Idicme\b': 'Idioma',
-                r'csPañcl\b': 'Español',
-                r'cs2ancl': 'Español',
-                r'Espa\u00f1ol': 'Español',
-                r'Chinc': 'China',
-                r'Aceo1': 'Acepto',
-                r'Imales\b': 'Ingles',
-                r'Ihale 3': 'Ingles',
-                r'Jvsics': 'Ingles',
-                r'Raibic\b': 'Recibir',
-                r'Possucrd:': 'Password:',
-                r'Pssucrd:': 'Password:',
-                r'Consvlle\b': 'Consulta',
-                r'Hed:ca\b': 'Medica',
-                r'S:': 'Si',
-                r'Wo:': 'No',
-                r'to Regis\b': 'Registro',
-                r'Cveslionario': 'Cuestionario',
-                r'Enuiar\b': 'Enviar',
-                r'Env:er': 'Enviar',
-                r'Can#dad:': 'Cantidad:',
-                r'Pcducho:': 'Producto:',
-                r'Prcducho:': 'Producto:',
-                r'RaSic': 'Recibir',
-                r'EMvic2\b': 'Envio?',
-                r'odocto\b': 'Producto',
-                r'Fiossk\b': 'Gloogle',
-                r'FacsbmK\b': 'Facebook',
-                r'We::': 'Email:',
-                r'logv\b': 'Login',
-                r'Cuevt\b': 'Cuenta',
-                r'2 Trabeje': 'Cuenta',
-                r'Ancrro\b': 'Ahorro',
-                r'Ocuoacen': 'Ocupación:',
-                r'Cstuda2': 'Estudia?',
-                r'C:': 'Ci:',
-                r'Crrec\b': 'Correo',
-                r'Coentas\b': 'Cuentas',
-                r'Nombe': 'Nombre',
-                r'Acllido': 'Apellido:',
-                r'Enuio2\b': 'Envio?',
-                r'A pellido': 'Apellido',
-                r'Consvll2\b': 'Consulta',
-                r'5í\b': 'Si',
-                r'Casult\b': 'Consulta',
-                r'Uombr2': 'Nombre',
-                r'Ncmbre': 'Nombre:',
-                r'Asisfevcia2 Rre\b': 'Pre Asistencia?',
-                r'Cuevfa\b': 'Cuenta',
-                r'Enuio\b': 'Envio?',
-                r'Nombxe': 'Nombre',
-                r'C\b': 'Ci:',
-                r'Allido': 'Apellido:',
-                r'Ci:uenta\b': 'Cuenta',
-                r'Ci:redito\b': 'Credito',
-                r'Ci:orreo\b': 'Correo',
-                r'Ci:uentas\b': 'Cuentas',
-                r'horro\b': 'Ahorro',
-                r'Gioerder\b': 'Guardar',
-                r'Bxo:': 'Bio:',
-                r'SihoWeb:': 'Sitio Web:',
-                r'Ncmbrc:': 'Nombre:',
-                r'Ed:Yar\b': 'Editar',
-                r'Duscer\b': 'Buscar',
-                r'Busquede\b': 'Búsqueda',
-                r'FechaZual:': 'Fecha Inicia:',
-                r'alaSraClau:': 'Palabra Clave:',
-                r'FecheJuicie': 'Fecha Final:',
-                r'Invlar\b': 'Invitar',
-                r'Aviqo\b': 'Amigo',
-                r'Coveo:': 'Correo:',
-                r'Correc': 'Correo',
-            }
-            for pattern, correction in correction_rules.items():
-                raw_text = re.sub(pattern, correction, raw_text)
-
-            return raw_text if raw_text else ""
+            # 1-3. Preprocesamiento y lectura
+            results = self.read_text(self.ocr_input(image, bbox), profile)
+            return self.correct_text(" ".join(results).strip(), lexicon)
 
         except Exception as e:
             print(f"⚠️ Error mínimo: {str(e)}")
             return ""
 
+    @staticmethod
+    def ocr_input(image, bbox):
+        """Recorte binarizado de una caja, listo para ``readtext``."""
+        x1, y1, x2, y2 = map(int, bbox)
+        roi = image[y1:y2, x1:x2]
+
+        # 1. Preprocesamiento ligero pero efectivo
+        gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+        _, processed = cv2.threshold(gray, 180, 255, cv2.THRESH_BINARY_INV)
+        return processed
+
+    def read_text(self, processed, profile=None):
+        """Lee un recorte preprocesado; con ``ocr_cache``, un recorte ya leído no pasa por el lector."""
+        readtext, options = self.ocr_readtext(profile)
+        if self.ocr_cache is None:
+            return readtext(processed, **options)
+        key = self.ocr_cache.key(processed, self.ocr_cache_options(options, profile))
+        results = self.ocr_cache.get(key)
+        if results is None:
+            results = readtext(processed, **options)
+            self.ocr_cache.put(key, results)
+        return results
+
+    def ocr_readtext(self, profile=None):
+        """
+        Función ``readtext`` y sus opciones para un perfil de OCR.
+
+        Sin perfil se usan ``reader`` y ``ocr_config``. Con perfil, su ``allowlist``
+        sustituye a la de ``ocr_config`` y se lee con el lector del perfil: el de este
+        proceso (``OCRProfiles.reader``) si el escáner no tiene ``reader``, o el de cada
+        proceso de un ``OCRPool``. Un ``reader`` que no es un pool se usa tal cual.
+        """
+        if profile is None:
+            return self.reader.readtext, self.ocr_config
+        options = profile.readtext_options(self.ocr_config)
+        if self.reader is None:
+            return self.ocr_profiles.reader(profile).readtext, options
+        if hasattr(self.reader, "submit"):
+            return functools.partial(self.reader.readtext, profile=profile), options
+        return self.reader.readtext, options
+
+    @staticmethod
+    def ocr_cache_options(options, profile=None):
+        return options if profile is None else profile.cache_options(options)
+
+    def resolve_ocr_profile(self, project=None, ocr_profile=None):
+        """Perfil de OCR de un escaneo (``None`` sin ``ocr_profiles``); lanza ``ValueError`` si no existe."""
+        if self.ocr_profiles is None:
+            return None
+        return self.ocr_profiles.resolve(ocr_profile, project)
+
+    def correct_text(self, raw_text, lexicon=None):
+        """
+        Corrige un texto leído por OCR: reglas fijas y, si se indica, vocabulario del proyecto.
+
+        Args:
+            raw_text (str): Texto leído
+            lexicon (Lexicon): Vocabulario al que se ajusta el texto (opcional)
+
+        Returns:
+            str: Texto corregido
+        """
+        # 4. Correcciones basadas en patrones visuales
+        correction_rules = {
+            r'Trtulo\b': 'Título',
+            r'Titulo?': 'Título',
+            r'TextFel\b': 'TextField',
+            r'IatField\b': 'TextField:',
+            r'3utho\b': 'Button',
+            r'Botlov\b': 'Button',
+            r'3u4hon': 'Button',
+            r'Passwuord:': 'Password:',
+            r'Uscorio\b': 'Usuario:',
+            r'Espalcl\b': 'Español',
+            r'Jvsies\b': 'Ingles',
+            r'Chic\b': 'Chino',
+            r'ceaJ\b': 'Acepto',
+            r'Civdad\b': 'Ciudad',
+            r'SanfaGe\b': 'Santa Cruz',
+            r'SantaGe': 'Santa Cruz',
+            r'LaPe:': 'La Paz',
+            r'LaPe3': 'La Paz',
+            r'Crcha\b': 'Cocha',
+            r'Apailndo:': 'Apellido:',
+            r'Aombe': 'Nombre:',
+            r'Nomke:': 'Nombre:',
+            r'logv4\b': 'Login',
+            r'logv4': 'Login',
+            r'Jugcaar': 'Login',
+            r'Gusrdar': 'Guardar',
+            r'Edtar': 'Editar',
+            r'Jusscaar\b': 'Ingresar',
+            r'Usveno': 'Usuario:',
+            r'Conbasea:': 'Contraseña:',
+            r'Covhasaa:': 'Contraseña:',
+            r'Contrase\u00f1a:': 'Contraseña:',
+            r'5i': 'Si',
+            r'Mo': 'No',
+            r'Cvestionario\b': 'Cuestionario',
+            r'Oczoacen2': 'Ocupación:',
+            r'2 Trabeja\b': 'Trabaja?',
+            r'T\u00edtulo': 'Titulo',
+            r'Csluda2\b': 'Estudia?',
+            r'Edad': 'Edad:',
+            r'Glad': 'Edad:',
+            r'Edlar\b': 'Editar',
+            r'Guysdar\b': 'Guardar',
+            r'Nambr': 'Nombre',
+            r'Nambn': 'Nombre',
+            r'Hlow': 'Nombre:',
+            r'Dukescua Recpercz\b': 'Recuperar Contraseña',
+            r'Ouakescu Recpesez': 'Recuperar Contraseña',
+            r'Ldad': 'Edad:',
+            r'Eld': 'Edad',
+            r'Zjercou': 'Dirección:',
+            r'Diracoa:.': 'Dirección:',
+            r'Direcci\u00f3n:': 'Dirección:',
+            r'Dsecco': 'Dirección:',
+            r'Idicme\b': 'Idioma',
+            r'csPañcl\b': 'Español',
+            r'cs2ancl': 'Español',
+            r'Espa\u00f1ol': 'Español',
+            r'Chinc': 'China',
+            r'Aceo1': 'Acepto',
+            r'Imales\b': 'Ingles',
+            r'Ihale 3': 'Ingles',
+            r'Jvsics': 'Ingles',
+            r'Raibic\b': 'Recibir',
+            r'Possucrd:': 'Password:',
+            r'Pssucrd:': 'Password:',
+            r'Consvlle\b': 'Consulta',
+            r'Hed:ca\b': 'Medica',
+            r'S:': 'Si',
+            r'Wo:': 'No',
+            r'to Regis\b': 'Registro',
+            r'Cveslionario': 'Cuestionario',
+            r'Enuiar\b': 'Enviar',
+            r'Env:er': 'Enviar',
+            r'Can#dad:': 'Cantidad:',
+            r'Pcducho:': 'Producto:',
+            r'Prcducho:': 'Producto:',
+            r'RaSic': 'Recibir',
+            r'EMvic2\b': 'Envio?',
+            r'odocto\b': 'Producto',
+            r'Fiossk\b': 'Gloogle',
+            r'FacsbmK\b': 'Facebook',
+            r'We::': 'Email:',
+            r'logv\b': 'Login',
+            r'Cuevt\b': 'Cuenta',
+            r'2 Trabeje': 'Cuenta',
+            r'Ancrro\b': 'Ahorro',
+            r'Ocuoacen': 'Ocupación:',
+            r'Cstuda2': 'Estudia?',
+            r'C:': 'Ci:',
+            r'Crrec\b': 'Correo',
+            r'Coentas\b': 'Cuentas',
+            r'Nombe': 'Nombre',
+            r'Acllido': 'Apellido:',
+            r'Enuio2\b': 'Envio?',
+            r'A pellido': 'Apellido',
+            r'Consvll2\b': 'Consulta',
+            r'5í\b': 'Si',
+            r'Casult\b': 'Consulta',
+            r'Uombr2': 'Nombre',
+            r'Ncmbre': 'Nombre:',
+            r'Asisfevcia2 Rre\b': 'Pre Asistencia?',
+            r'Cuevfa\b': 'Cuenta',
+            r'Enuio\b': 'Envio?',
+            r'Nombxe': 'Nombre',
+            r'C\b': 'Ci:',
+            r'Allido': 'Apellido:',
+            r'Ci:uenta\b': 'Cuenta',
+            r'Ci:redito\b': 'Credito',
+            r'Ci:orreo\b': 'Correo',
+            r'Ci:uentas\b': 'Cuentas',
+            r'horro\b': 'Ahorro',
+            r'Gioerder\b': 'Guardar',
+            r'Bxo:': 'Bio:',
+            r'SihoWeb:': 'Sitio Web:',
+            r'Ncmbrc:': 'Nombre:',
+            r'Ed:Yar\b': 'Editar',
+            r'Duscer\b': 'Buscar',
+            r'Busquede\b': 'Búsqueda',
+            r'FechaZual:': 'Fecha Inicia:',
+            r'alaSraClau:': 'Palabra Clave:',
+            r'FecheJuicie': 'Fecha Final:',
+            r'Invlar\b': 'Invitar',
+            r'Aviqo\b': 'Amigo',
+            r'Coveo:': 'Correo:',
+            r'Correc': 'Correo',
+        }
+        for pattern, correction in correction_rules.items():
+            raw_text = re.sub(pattern, correction, raw_text)
+
+        # 5. Ajuste al vocabulario del proyecto (entrada más cercana por distancia de edición)
+        if lexicon is not None and raw_text:
+            raw_text = lexicon.correct(raw_text)
+
+        return raw_text if raw_text else ""
+
     @staticmethod
     def organize_table_cells(cells):
-        """Organiza celdas respetando:
-        1. Primera celda multi-columna (original).
-        2. Posiciones absolutas de columnas (nuevo para celdas faltantes).
-        3. Cálculo automático de column_span (original).
+        """Organiza celdas en filas y columnas usando ``table_engine``:
+        1. Filas y columnas por agrupamiento 1-D de los bordes ``y1``/``x1``.
+        2. Cálculo automático de ``row_span`` y ``column_span``.
+        3. Primer ``celda_text`` de cada celda como hijo ``Text``.
         """
         if not cells:
             return []
 
-        # --- 1. Agrupación por filas (original) ---
-        sorted_cells = sorted(cells, key=lambda c: (c['coordinates']['y1'], c['coordinates']['x1']))
-        ROW_THRESHOLD = 20
+        cell_xyxy = np.array([
+            [c['coordinates']['x1'], c['coordinates']['y1'], c['coordinates']['x2'], c['coordinates']['y2']]
+            for c in cells
+        ])
+        children = []
+        for cell in cells:
+            child = None
+            if cell.get('subcomponents'):
+                text_data = cell['subcomponents'][0]
+                child = {
+                    'type': 'Text',
+                    'text': text_data.get('text', ''),
+                    'coordinates': text_data['coordinates']
+                }
+            children.append(child)
+
+        return table_engine.organize_table(cell_xyxy, children)
+
+    def build_layout_builder(self):
+        """
+        Crea el constructor del árbol de anidamiento con las reglas de ``is_related``.
+
+        Returns:
+            LayoutTreeBuilder: Constructor con una restricción por cada pareja de clases conocida
+        """
+        builder = LayoutTreeBuilder()
+        for (parent_type, child_type), margin in self.RELATION_MARGINS.items():
+            builder.register(parent_type, child_type, self.is_related, margin)
+        return builder
+
+    def find_related(self, index, class_names, parent_idx, child_types):
+        """
+        Busca los subcomponentes relacionados con un componente usando el índice espacial.
+
+        Solo se evalúa ``is_related`` sobre las cajas que caen en la ventana de búsqueda
+        del componente (su caja ampliada con ``RELATION_MARGINS``).
 
-        rows = []
-        current_row = []
+        Args:
+            index (BoxIndex): Índice espacial de todas las detecciones
+            class_names (list): Clase de cada detección
+            parent_idx (int): Índice del componente principal
+            child_types (list): Clases de subcomponente aceptadas
+
+        Returns:
+            list: Índices de los subcomponentes relacionados, en orden de detección
+        """
+        parent_type = class_names[parent_idx]
+        parent_bbox = index.xyxy[parent_idx].tolist()
+        margin = np.zeros(4)
+        for child_type in child_types:
+            margin = np.maximum(margin, self.RELATION_MARGINS.get((parent_type, child_type), 0))
+
+        return [
+            i for i in index.query(parent_bbox, margin).tolist()
+            if class_names[i] in child_types
+            and self.is_related(parent_bbox, index.xyxy[i].tolist(), parent_type, class_names[i])
+        ]
+
+    def infer(self, image):
+        """
+        Ejecuta el modelo sobre una imagen (sin post-procesamiento).
+
+        Args:
+            image (numpy.ndarray): Imagen BGR
 
-        for cell in sorted_cells:
-            if not current_row:
-                current_row.append(cell)
+        Con ``input_scale`` distinta de 1 el modelo recibe la imagen reescalada y las cajas
+        se llevan de vuelta a la escala original.
+
+        Returns:
+            DetectionSet: Detecciones del modelo
+        """
+        if self.input_scale == 1.0:
+            results = self.model.infer(image, **self.inference_config)[0]
+            return DetectionSet.from_supervision(sv.Detections.from_inference(results))
+
+        scaled = self.scale_input(image, self.input_scale)
+        results = self.model.infer(scaled, **self.inference_config)[0]
+        dets = DetectionSet.from_supervision(sv.Detections.from_inference(results))
+        sx, sy = image.shape[1] / scaled.shape[1], image.shape[0] / scaled.shape[0]
+        dets.xyxy *= np.array([sx, sy, sx, sy], dtype=np.float32)
+        return dets
+
+    @staticmethod
+    def scale_input(image, scale):
+        """Imagen reescalada para el modelo (``INTER_AREA``, al menos 1 píxel por lado)."""
+        h, w = image.shape[:2]
+        size = (max(1, round(w * scale)), max(1, round(h * scale)))
+        return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+    def postprocess(self, dets):
+        """Aplica el post-procesamiento por clase (duplicados, NMS, supresión) antes de cualquier OCR."""
+        keep, pruned = self.postprocessor.run(dets.xyxy, dets.confidence, dets.class_names)
+        return dets.subset(keep), pruned
+
+    def infer_region(self, image, region):
+        """
+        Ejecuta el modelo sobre un recorte de la imagen.
+
+        Args:
+            image (numpy.ndarray): Imagen BGR completa
+            region (tuple): Recorte [x1, y1, x2, y2] (ya ajustado a la imagen)
+
+        Returns:
+            DetectionSet: Detecciones en coordenadas de la imagen completa
+        """
+        x1, y1, x2, y2 = region
+        dets = self.infer(image[y1:y2, x1:x2])
+        dets.xyxy += np.array([x1, y1, x1, y1], dtype=np.float32)
+        return dets
+
+    @staticmethod
+    def parse_scan_options(regions=None, classes=None):
+        """
+        Interpreta los recortes y las clases a escanear tal como llegan en una petición.
+
+        Args:
+            regions (str): JSON con un rectángulo ``[x1, y1, x2, y2]`` o una lista de ellos
+            classes (str): Lista de clases separada por comas (o JSON)
+
+        Returns:
+            list: Recortes, o ``None`` para la imagen completa
+            list: Clases, o ``None`` para todas
+
+        Raises:
+            ValueError: Si los recortes o las clases no son válidos
+        """
+        if regions:
+            try:
+                regions = json.loads(regions)
+            except json.JSONDecodeError:
+                raise ValueError('regions debe ser JSON: [x1, y1, x2, y2] o una lista de rectángulos')
+            if not isinstance(regions, list):
+                raise ValueError('Cada región debe ser [x1, y1, x2, y2]')
+            if regions and not isinstance(regions[0], list):
+                regions = [regions]
+            if not regions or any(not isinstance(r, list) or len(r) != 4
+                                  or not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in r)
+                                  for r in regions):
+                raise ValueError('Cada región debe ser [x1, y1, x2, y2]')
+            if any(r[2] <= r[0] or r[3] <= r[1] for r in regions):
+                raise ValueError('Cada región debe cumplir x2 > x1 e y2 > y1')
+        else:
+            regions = None
+
+        if classes:
+            if classes.lstrip().startswith('['):
+                try:
+                    classes = json.loads(classes)
+                except json.JSONDecodeError:
+                    raise ValueError('classes debe ser una lista separada por comas o JSON')
             else:
-                y_diff = abs(cell['coordinates']['y1'] - current_row[0]['coordinates']['y1'])
-                if y_diff < ROW_THRESHOLD:
-                    current_row.append(cell)
-                else:
-                    rows.append(sorted(current_row, key=lambda c: c['coordinates']['x1']))
-                    current_row = [cell]
+                classes = classes.split(',')
+            if not isinstance(classes, list) or not all(isinstance(c, str) for c in classes):
+                raise ValueError('classes debe ser una lista de nombres de clase')
+            classes = [c.strip() for c in classes if c.strip()]
+        return regions, classes or None
 
-        if current_row:
-            rows.append(sorted(current_row, key=lambda c: c['coordinates']['x1']))
+    @staticmethod
+    def clip_regions(regions, shape):
+        """
+        Ajusta los recortes a la imagen y descarta los vacíos.
 
-        # --- 2. Detección de columnas (original + referencia de coordenadas X) ---
-        if not rows:
-            return []
+        Args:
+            regions (list): Recortes [x1, y1, x2, y2]
+            shape (tuple): Forma de la imagen
+
+        Returns:
+            list: Recortes ``[x1, y1, x2, y2]`` enteros dentro de la imagen
+        """
+        h, w = shape[:2]
+        clipped = []
+        for region in regions:
+            x1, y1, x2, y2 = (int(round(float(v))) for v in region)
+            x1, x2 = max(0, min(x1, x2)), min(w, max(x1, x2))
+            y1, y2 = max(0, min(y1, y2)), min(h, max(y1, y2))
+            if x2 > x1 and y2 > y1:
+                clipped.append([x1, y1, x2, y2])
+        if not clipped:
+            raise ValueError("Ningún recorte está dentro de la imagen")
+        return clipped
+
+    def expand_classes(self, classes):
+        """Clases pedidas más los subcomponentes que necesitan para relacionarse (por ejemplo ``button_text``)."""
+        expanded = set(classes)
+        for name in classes:
+            expanded.update(self.COMPONENT_HIERARCHY.get(name, []))
+        return expanded
+
+    def detect(self, image, regions=None, classes=None):
+        """
+        Ejecuta el modelo y el post-procesamiento sobre una imagen.
 
-        first_row_cells = rows[0]
-        first_cell = first_row_cells[0]
-        total_width = first_row_cells[-1]['coordinates']['x2'] - first_row_cells[0]['coordinates']['x1']
-
-        # Caso especial: primera celda multi-columna (original)
-        if len(first_row_cells) == 1 and (
-                first_cell['coordinates']['x2'] - first_cell['coordinates']['x1']) >= total_width * 0.8:
-            num_columns = 3
-            column_width = total_width / num_columns
-            # Generamos referencia de columnas artificialmente
-            reference_columns = [first_cell['coordinates']['x1'] + i * column_width for i in range(num_columns)]
-            reference_columns.append(first_cell['coordinates']['x2'])
+        Args:
+            image (numpy.ndarray): Imagen BGR
+            regions (list): Recortes [x1, y1, x2, y2] a analizar (por defecto la imagen completa)
+            classes (list): Clases a conservar (con sus subcomponentes); por defecto todas
+
+        Returns:
+            DetectionSet: Detecciones conservadas (en coordenadas de la imagen completa)
+            dict: Detecciones eliminadas por cada regla de post-procesamiento
+        """
+        if regions is None:
+            dets = self.infer(image)
         else:
-            # Caso normal: columnas basadas en la primera fila
-            num_columns = len(first_row_cells)
-            column_width = total_width / num_columns
-            reference_columns = [cell['coordinates']['x1'] for cell in first_row_cells]
-            reference_columns.append(first_row_cells[-1]['coordinates']['x2'])
-
-        # --- 3. Asignación de columnas (combina lógica original + nuevo col_index) ---
-        organized_rows = []
-
-        for row_idx, row in enumerate(rows):
-            row_data = {
-                'type': 'TableRow',
-                'coordinates': {
-                    'x1': min(c['coordinates']['x1'] for c in row),
-                    'y1': min(c['coordinates']['y1'] for c in row),
-                    'x2': max(c['coordinates']['x2'] for c in row),
-                    'y2': max(c['coordinates']['y2'] for c in row)
-                },
-                'children': []
-            }
+            dets = DetectionSet.concat([self.infer_region(image, region) for region in regions])
+        dets, pruned = self.postprocess(dets)
+        if classes:
+            # Se filtra antes de relaciones y OCR: las clases descartadas no cuestan nada más
+            dets = dets.subset(dets.mask(self.expand_classes(classes)))
+        return dets, pruned
+
+    @staticmethod
+    def detection_list(dets):
+        """Detecciones sin relacionar (tipo, coordenadas y confianza), para mostrarlas cuanto antes."""
+        confidences = dets.confidence.tolist()
+        return [{"type": name, "coordinates": dets.coordinates(i), "confidence": confidences[i]}
+                for i, name in enumerate(dets.class_names)]
+
+    def resolve_relations(self, dets):
+        """
+        Relaciona cada componente principal con sus subcomponentes y estructura las tablas.
+
+        Args:
+            dets (DetectionSet): Detecciones de la imagen
+
+        Returns:
+            list: Una entrada ``(índice, subcomponentes)`` por componente principal, donde
+            ``subcomponentes`` es un array de índices o, para las tablas, una tupla
+            ``(celdas, rejilla, texto_de_cada_celda)``
+            numpy.ndarray: Padre de cada detección en el árbol de anidamiento
+        """
+        class_names = dets.class_names
+        index = BoxIndex(dets.xyxy)
+        components = []
+
+        for c_idx in np.flatnonzero(dets.mask(self.COMPONENT_HIERARCHY)).tolist():
+            c_type = class_names[c_idx]
+            if c_type == "Table":
+                cells = np.array(self.find_related(index, class_names, c_idx, ["celda"]), dtype=np.intp)
+                # Los textos solo pueden estar dentro de celdas cercanas a la tabla
+                candidates = index.query(dets.xyxy[c_idx], 15)
+                text_indices = candidates[dets.mask(["celda_text"])[candidates]]
+
+                # Rejilla de la tabla y asignación de textos por búsqueda ordenada
+                grid = table_engine.build_grid(dets.xyxy[cells])
+                owners = table_engine.assign_texts(dets.xyxy[cells], dets.xyxy[text_indices], grid)
+
+                # Solo el primer texto de cada celda se usa (y se pasa por OCR)
+                cell_texts = np.full(len(cells), -1, dtype=np.intp)
+                assigned = np.flatnonzero(owners >= 0)
+                owner_cells, first = np.unique(owners[assigned], return_index=True)
+                cell_texts[owner_cells] = text_indices[assigned[first]]
+                components.append((c_idx, (cells, grid, cell_texts)))
+            else:
+                subs = self.find_related(index, class_names, c_idx, self.COMPONENT_HIERARCHY[c_type])
+                components.append((c_idx, np.array(subs, dtype=np.intp)))
+
+        parents = self.layout_builder.build_parents(dets.xyxy, class_names, index)
+        return components, parents
+
+    def ocr_targets(self, dets, components):
+        """
+        Lista las detecciones que necesitan OCR, sin repetidos y en orden de aparición.
+
+        Args:
+            dets (DetectionSet): Detecciones de la imagen
+            components (list): Resultado de ``resolve_relations``
+
+        Returns:
+            list: Índices de detección a pasar por OCR (ninguno con ``skip_ocr``)
+        """
+        if self.skip_ocr:
+            return []
+        ocr_mask = dets.mask(self.OCR_COMPONENTS)
+        targets = []
+        for c_idx, subs in components:
+            if isinstance(subs, tuple):
+                cell_texts = subs[2]
+                targets.extend(cell_texts[cell_texts >= 0].tolist())
+            else:
+                targets.extend(subs[ocr_mask[subs]].tolist())
+            if ocr_mask[c_idx]:
+                targets.append(c_idx)
+        return list(dict.fromkeys(targets))
 
-            for cell in sorted(row, key=lambda c: c['coordinates']['x1']):
-                cell_x1 = cell['coordinates']['x1']
-                cell_x2 = cell['coordinates']['x2']
-
-                # --- A) Cálculo de col_index (nuevo: basado en referencia_columns) ---
-                col_index = 0
-                min_distance = float('inf')
-                for i, ref_x in enumerate(reference_columns[:-1]):
-                    distance = abs(cell_x1 - ref_x)
-                    if distance < min_distance:
-                        min_distance = distance
-                        col_index = i
-
-                # --- B) Cálculo de column_span (original) ---
-                col_span = round((cell_x2 - cell_x1) / column_width)
-                col_span = max(1, min(col_span, num_columns - col_index))  # Asegura no pasarse
-
-                # --- C) Caso especial: primera celda multi-columna (original) ---
-                if row_idx == 0 and len(row) == 1:
-                    col_span = num_columns
-                    col_index = 0
-
-                # --- Construcción de la celda (original) ---
-                cell_widget = {
-                    'type': 'TableCell',
-                    'column': col_index,
-                    'column_span': col_span,
-                    'coordinates': cell['coordinates'],
-                    'child': None
+    def run_ocr(self, image, dets, targets, deadline=None, lexicon=None, profile=None):
+        """
+        Extrae el texto de cada detección de ``targets`` que aún no lo tenga.
+
+        Con ``deadline`` los textos se leen en el orden de ``OCR_PRIORITY`` y se deja de
+        leer cuando la siguiente lectura, según la duración media de las anteriores,
+        terminaría después del límite.
+
+        Args:
+            image (numpy.ndarray): Imagen BGR
+            dets (DetectionSet): Detecciones de la imagen
+            targets (list): Índices de detección a leer
+            deadline (float): Instante límite (``time.monotonic()``); opcional
+            lexicon (Lexicon): Vocabulario para corregir los textos; opcional
+            profile (OCRProfile): Perfil de OCR; opcional
+
+        Returns:
+            list: Índices que quedaron sin leer (vacía si no hay límite)
+        """
+        targets = [idx for idx in targets if not dets.has_text(idx)]
+        if deadline is not None:
+            targets.sort(key=lambda idx: self.OCR_PRIORITY.get(dets.class_name(idx), 1))
+        if hasattr(self.reader, "submit"):
+            return self.run_ocr_parallel(image, dets, targets, deadline, lexicon, profile)
+
+        for pos, idx in enumerate(targets):
+            start = time.monotonic()
+            if deadline is not None and start + self.ocr_seconds > deadline:
+                return targets[pos:]
+            dets.set_text(idx, self.extract_ui_text(image, dets.xyxy[idx], dets.class_name(idx), lexicon, profile))
+            self.ocr_seconds = self.moving_average(self.ocr_seconds, time.monotonic() - start)
+        return []
+
+    def run_ocr_parallel(self, image, dets, targets, deadline=None, lexicon=None, profile=None):
+        """
+        Como ``run_ocr``, pero encolando todas las lecturas en un pool (``ocr_pool.OCRPool``).
+
+        Los recortes se preparan aquí (los que ya están en ``ocr_cache`` no se encolan) y
+        se leen en los procesos del pool; con ``deadline`` se espera hasta el límite y
+        las lecturas sin terminar se cancelan. Con ``profile`` cada proceso del pool usa el
+        lector de ese perfil.
+
+        Returns:
+            list: Índices que quedaron sin leer
+        """
+        options = self.ocr_config if profile is None else profile.readtext_options(self.ocr_config)
+        cache_options = self.ocr_cache_options(options, profile)
+        results = {}
+        futures = {}
+        for idx in targets:
+            try:
+                processed = self.ocr_input(image, dets.xyxy[idx])
+                key = self.ocr_cache.key(processed, cache_options) if self.ocr_cache is not None else None
+                cached = self.ocr_cache.get(key) if key is not None else None
+                if cached is not None:
+                    results[idx] = cached
+                else:
+                    futures[idx] = (self.reader.submit(processed, profile=profile, **options), key)
+            except Exception as e:
+                print(f"⚠️ Error mínimo: {str(e)}")
+                results[idx] = []
+
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        done, _ = wait([future for future, _ in futures.values()], timeout=timeout)
+
+        pending = []
+        for idx in targets:
+            if idx in futures:
+                future, key = futures[idx]
+                if future not in done:
+                    future.cancel()
+                    pending.append(idx)
+                    continue
+                try:
+                    results[idx] = future.result()
+                    if key is not None:
+                        self.ocr_cache.put(key, results[idx])
+                except Exception as e:
+                    print(f"⚠️ Error mínimo: {str(e)}")
+                    results[idx] = []
+            dets.set_text(idx, self.correct_text(" ".join(results[idx]).strip(), lexicon))
+        return pending
+
+    @staticmethod
+    def moving_average(average, value, weight=0.2):
+        """Media móvil exponencial (la primera medida se toma tal cual)."""
+        return value if average == 0.0 else (1 - weight) * average + weight * value
+
+    def build_component(self, dets, c_idx, subs, class_names=None, confidences=None, pending=()):
+        """
+        Serializa un componente principal (con sus subcomponentes o su tabla).
+
+        Args:
+            dets (DetectionSet): Detecciones con sus textos OCR
+            c_idx (int): Índice del componente
+            subs: Subcomponentes según ``resolve_relations``
+            class_names (list): ``dets.class_names`` (opcional, para no recalcularlo)
+            confidences (list): Confianzas como lista (opcional)
+            pending (set): Detecciones cuyo OCR está pendiente; se marcan con ``pending``
+
+        Returns:
+            dict: Componente en el formato del reporte
+        """
+        class_names = dets.class_names if class_names is None else class_names
+        confidences = dets.confidence.tolist() if confidences is None else confidences
+        c_type = class_names[c_idx]
+        component = {
+            "type": c_type,
+            "coordinates": dets.coordinates(c_idx),
+            "confidence": confidences[c_idx],
+        }
+
+        if isinstance(subs, tuple):
+            cells, grid, cell_texts = subs
+            cell_children = [
+                None if t_idx < 0 else {
+                    "type": "Text",
+                    "text": dets.text(t_idx),
+                    "coordinates": dets.coordinates(t_idx),
+                    **({"pending": True} if t_idx in pending else {})
                 }
+                for t_idx in cell_texts.tolist()
+            ]
+            # Organizar celdas en filas y columnas
+            component["estructure"] = {
+                "type": "Table",
+                "children": table_engine.organize_table(dets.xyxy[cells], cell_children, grid)
+            }
+        else:
+            component["subcomponents"] = []
+            for s_idx in subs.tolist():
+                s_type = class_names[s_idx]
+                subcomponent_data = {
+                    "type": self.NAME_MAPPING.get(s_type, s_type),
+                    "coordinates": dets.coordinates(s_idx),
+                    "confidence": confidences[s_idx]
+                }
+                if dets.has_text(s_idx):
+                    subcomponent_data["text"] = dets.text(s_idx)
+                elif s_idx in pending:
+                    subcomponent_data["pending"] = True
+                component["subcomponents"].append(subcomponent_data)
+
+        if dets.has_text(c_idx):
+            component["text"] = dets.text(c_idx)
+
+        if pending:
+            related = subs[2] if isinstance(subs, tuple) else subs
+            if c_idx in pending or any(i in pending for i in related.tolist()):
+                component["pending"] = True
 
-                if cell.get('subcomponents'):
-                    text_data = cell['subcomponents'][0]
-                    cell_widget['child'] = {
-                        'type': 'Text',
-                        'text': text_data.get('text', ''),
-                        'coordinates': text_data['coordinates']
-                    }
+        return component
 
-                row_data['children'].append(cell_widget)
+    def build_report(self, dets, components, parents, metadata, pending=()):
+        """
+        Serializa las detecciones al esquema del reporte JSON.
 
-            organized_rows.append(row_data)
+        Args:
+            dets (DetectionSet): Detecciones con sus textos OCR
+            components (list): Resultado de ``resolve_relations``
+            parents (numpy.ndarray): Padre de cada detección en el árbol de anidamiento
+            metadata (dict): Metadatos del reporte
+            pending (set): Detecciones cuyo OCR está pendiente
 
-        return organized_rows
+        Returns:
+            dict: Reporte con ``metadata``, ``components`` y ``layout``
+        """
+        class_names = dets.class_names
+        confidences = dets.confidence.tolist()
+        report = {"metadata": metadata, "components": []}
+
+        for c_idx, subs in components:
+            report["components"].append(self.build_component(dets, c_idx, subs, class_names, confidences, pending))
+
+        # Árbol de anidamiento completo (junto a la lista plana de componentes)
+        nodes = []
+        for i, c_type in enumerate(class_names):
+            node = {"type": c_type, "coordinates": dets.coordinates(i), "confidence": confidences[i]}
+            if dets.has_text(i):
+                node["text"] = dets.text(i)
+            elif i in pending:
+                node["pending"] = True
+            nodes.append(node)
+        report["layout"] = LayoutTreeBuilder.to_tree(nodes, parents)
+
+        return report
 
     def scan_image(self, image_path):
         """
@@ -439,186 +993,431 @@ class WidgetScanner:
             str: Ruta del archivo JSON generado
             str: Ruta de la imagen anotada
         """
+        result = self.scan(image_path)
+        return result.report, result.json_path, result.image_path
+
+    @staticmethod
+    def load_image(image_path):
+        """Carga una imagen BGR; lanza ``FileNotFoundError`` si no se puede leer."""
+        image = cv2.imread(image_path)
+        if image is None:
+            raise FileNotFoundError(f"Imagen no encontrada: {image_path}")
+        return image
+
+    def read_image(self, image_path):
+        """
+        Carga una imagen BGR, con ``ingest`` si está configurado.
+
+        Returns:
+            numpy.ndarray: Imagen (reducida si el plan de decodificación lo indica)
+            dict: ``metadata.ingest`` si la imagen se decodificó reducida, o ``None``
+        """
+        if self.ingest is None:
+            return self.load_image(image_path), None
+        image, plan = self.ingest.decode(image_path)
+        return image, plan.as_dict() if plan is not None and plan.factor > 1 else None
+
+    @staticmethod
+    def decode_factor(metadata):
+        """
+        Factor de reducción de la imagen escaneada (``metadata.ingest``; 1 si no se redujo).
+
+        Las detecciones y el OCR trabajan sobre la imagen decodificada; las coordenadas
+        del reporte se multiplican por este factor para darlas en la imagen subida.
+        """
+        return ((metadata or {}).get("ingest") or {}).get("factor", 1)
+
+    def scan(self, image_path, on_event=None, deadline=None, regions=None, classes=None, project=None,
+             ocr_profile=None):
+        """
+        Escanea una imagen y devuelve también el reporte ya codificado.
+
+        El reporte se codifica una sola vez; los mismos bytes se escriben en el
+        archivo JSON y se pueden reutilizar como cuerpo de la respuesta HTTP.
+
+        Args:
+            image_path (str): Ruta de la imagen a escanear
+            on_event (callable): Recibe ``(evento, datos)`` a medida que avanza el escaneo
+                (ver ``finish_scan``); opcional
+            deadline (float): Instante límite (``time.monotonic()``) para el OCR (ver ``finish_scan``)
+            regions (list): Recortes [x1, y1, x2, y2] a analizar; por defecto la imagen completa
+            classes (list): Clases a conservar (con sus subcomponentes); por defecto todas
+            project (str): Proyecto cuyo vocabulario corrige el OCR; por defecto ``default``
+            ocr_profile (str): Perfil de OCR (con ``ocr_profiles``); por defecto el del proyecto
+
+        Returns:
+            ScanResult: Reporte, reporte codificado y rutas de los archivos generados
+        """
 
         try:
-            # 1. Cargar imagen
-            image = cv2.imread(image_path)
-            if image is None:
-                raise FileNotFoundError(f"Imagen no encontrada: {image_path}")
-
-            # 2. Inferencia
-            results = self.model.infer(image, confidence=0.5, iou_threshold=0.7)[0]
-            detections = sv.Detections.from_inference(results)
-
-            # --- INICIO: Nuevo bloque para filtrar AppBar duplicados ---
-            appbar_icon_indices = [
-                i for i, class_name in enumerate(detections.data['class_name'])
-                if class_name == "AppBar_icon"  # Asegúrate que coincida con el nombre de Roboflow
-            ]
-            if len(appbar_icon_indices) > 1:
-                # Conservar solo el AppBar_icon con mayor confianza
-                best_idx = max(
-                    appbar_icon_indices,
-                    key=lambda i: detections.confidence[i]
-                )
-
-                # Filtrar detecciones (eliminar otros AppBars)
-                mask = np.ones(len(detections), dtype=bool)
-                mask[appbar_icon_indices] = False
-                mask[best_idx] = True  # Mantener el mejor AppBar
-
-                detections = sv.Detections(
-                    xyxy=detections.xyxy[mask],
-                    confidence=detections.confidence[mask],
-                    class_id=detections.class_id[mask],
-                    data={'class_name': np.array(detections.data['class_name'])[mask]}
-                )
-            # --- FIN: Bloque de filtrado ---
-
-            # 3. Estructura del reporte
-            report = {
-                "metadata": {
-                    "analysis_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "source_image": image_path,
-                    "model_used": self.model_id
-                },
-                "components": []
-            }
+            # 1. Cargar imagen (PNG no admite decodificar solo una parte)
+            image, ingest = self.read_image(image_path)
 
-            # Mapeo de nombres para el JSON
-            NAME_MAPPING = {
-                "texfield_label": "label",
-                "texfield_hinttext": "hint",
-                "button_text": "text",
-                "AppBar_title": "title",
-                "AppBar_icon": "icon",
-                "checkbox_text": "text",
-                "radio_text": "text",
-                "celda": "cell",
-                "celda_text": "cell_text",
-            }
+        except Exception as e:
+            raise Exception(f"Error al escanear imagen: {str(e)}")
 
-            # Procesar componentes principales
-            main_detections = [
-                (bbox, conf, class_id, class_name)
-                for bbox, conf, class_id, class_name in zip(
-                    detections.xyxy, detections.confidence,
-                    detections.class_id, detections.data['class_name']
-                ) if class_name in self.COMPONENT_HIERARCHY
-            ]
+        metadata = {}
+        if ingest is not None:
+            # Imagen decodificada reducida: las regiones se piden en la imagen original
+            metadata["ingest"] = ingest
+            if regions is not None:
+                regions = [[v * ingest["scale"] for v in region] for region in regions]
+
+        if self.screen_index is None or regions is not None or classes:
+            # 2-5. Inferencia, relaciones, OCR, reporte y archivos. Un escaneo parcial (regiones o
+            # clases) no se indexa: su reporte no sirve para reutilizarlo con la pantalla completa
+            return self.scan_array(image, image_path, metadata, on_event=on_event, deadline=deadline,
+                                   regions=regions, classes=classes, project=project, ocr_profile=ocr_profile)
+
+        signature = self.screen_index.signature(image)
+        metadata["phash"] = self.screen_index.to_hex(signature)
+        result = self.scan_near_duplicate(image, image_path, signature, metadata, on_event, deadline, project,
+                                          ocr_profile)
+        if result is None:
+            result = self.scan_array(image, image_path, metadata, on_event=on_event, deadline=deadline,
+                                     project=project, ocr_profile=ocr_profile)
+        self.screen_index.add(signature, result.scan_id, result.json_path)
+        if result.completion is not None:
+            # El reporte completo sustituye al parcial también en el índice de pantallas
+            completion = result.completion
+
+            def complete():
+                completed = completion()
+                self.screen_index.add(signature, completed.scan_id, completed.json_path)
+                return completed
+            result.completion = complete
+        return result
+
+    def scan_near_duplicate(self, image, image_path, signature, extra_metadata=None, on_event=None, deadline=None,
+                            project=None, ocr_profile=None):
+        """
+        Reutiliza el escaneo de una pantalla casi idéntica (``screen_index``), si la hay.
 
-            # Procesar subcomponentes
-            sub_detections = [
-                (bbox, conf, class_id, class_name)
-                for bbox, conf, class_id, class_name in zip(
-                    detections.xyxy, detections.confidence,
-                    detections.class_id, detections.data['class_name']
-                ) if any(class_name in subs for subs in self.COMPONENT_HIERARCHY.values())
-            ]
+        La captura se re-escanea con ``scan_incremental_array`` sobre el reporte de esa
+        pantalla: solo las regiones que difieren pasan por el modelo y el OCR.
+
+        Returns:
+            ScanResult: El escaneo (``metadata.near_duplicate`` indica la pantalla y la
+            distancia), o ``None`` si no hay ninguna pantalla lo bastante parecida
+        """
+        match = self.screen_index.lookup(signature)
+        if match is None:
+            return None
+        match_hash, (scan_id, json_path), distance = match
+        try:
+            with open(json_path, "rb") as f:
+                previous_report = json.loads(f.read())
+        except (OSError, ValueError):
+            # El reporte ya se expulsó del almacén
+            self.screen_index.discard(match_hash)
+            return None
+        if previous_report.get("metadata", {}).get("model_used") != self.model_id:
+            # Detecciones de otra versión del modelo: no se reutilizan
+            return None
+        if previous_report.get("metadata", {}).get("project") != (project or None):
+            # Textos corregidos con el vocabulario de otro proyecto
+            return None
+        profile = self.resolve_ocr_profile(project, ocr_profile)
+        if previous_report.get("metadata", {}).get("ocr_profile") != (profile.name if profile else None):
+            # Textos leídos con otro perfil de OCR
+            return None
+
+        metadata = {**(extra_metadata or {}), "near_duplicate": {"scan_id": scan_id, "distance": distance}}
+        result, _ = self.scan_incremental_array(image, image_path, previous_report, metadata, on_event, deadline,
+                                                project, ocr_profile)
+        return result
+
+    def scan_array(self, image, source_image=None, extra_metadata=None, on_event=None, deadline=None, regions=None,
+                   classes=None, project=None, ocr_profile=None):
+        """
+        Escanea una imagen ya decodificada (por ejemplo, un fotograma de video).
+
+        Args:
+            image (numpy.ndarray): Imagen BGR
+            source_image (str): Ruta donde está guardada la imagen (para ``metadata.source_image``)
+            extra_metadata (dict): Campos adicionales para ``metadata``
+            on_event (callable): Recibe ``(evento, datos)`` a medida que avanza el escaneo; opcional
+            deadline (float): Instante límite (``time.monotonic()``) para el OCR; opcional
+            regions (list): Recortes [x1, y1, x2, y2] a analizar; solo esas zonas pasan por el
+                modelo y el OCR, y las coordenadas se devuelven en la imagen completa
+            classes (list): Clases a conservar (con sus subcomponentes); por defecto todas
+            project (str): Proyecto cuyo vocabulario corrige el OCR; por defecto ``default``
+            ocr_profile (str): Perfil de OCR (con ``ocr_profiles``); por defecto el del proyecto
 
-            for c_bbox, c_conf, c_id, c_type in main_detections:
-                component = {
-                    "type": c_type,
-                    "coordinates": {
-                        "x1": int(c_bbox[0]),
-                        "y1": int(c_bbox[1]),
-                        "x2": int(c_bbox[2]),
-                        "y2": int(c_bbox[3])
-                    },  # list(map(int, c_bbox)),
-                    "confidence": float(c_conf),
-                    # "subcomponents": []
+        Returns:
+            ScanResult: Reporte, reporte codificado y rutas de los archivos generados
+        """
+        try:
+            metadata = dict(extra_metadata or {})
+            if regions is not None:
+                regions = self.clip_regions(regions, image.shape)
+            if regions is not None or classes:
+                factor = self.decode_factor(metadata)
+                metadata["roi"] = {
+                    "regions": [[v * factor for v in region] for region in regions] if regions is not None else None,
+                    "classes": sorted(classes) if classes else None
                 }
 
-                # Procesamiento especial para tablas
-                if c_type == "Table":
-                    table_cells = []
-                    for s_bbox, s_conf, s_id, s_type in sub_detections:
-                        if s_type == "celda" and self.is_related(c_bbox, s_bbox, c_type, s_type):
-                            cell_data = {
-                                "type": "celda",
-                                "coordinates": {
-                                    "x1": int(s_bbox[0]),
-                                    "y1": int(s_bbox[1]),
-                                    "x2": int(s_bbox[2]),
-                                    "y2": int(s_bbox[3])
-                                },
-                                "confidence": float(s_conf),
-                                "subcomponents": []
-                            }
-
-                            # Buscar texto en la celda
-                            for txt_bbox, txt_conf, txt_id, txt_type in sub_detections:
-                                if txt_type == "celda_text" and self.is_related(s_bbox, txt_bbox, "celda", txt_type):
-                                    text_data = {
-                                        "type": "celda_text",
-                                        "coordinates": {
-                                            "x1": int(txt_bbox[0]),
-                                            "y1": int(txt_bbox[1]),
-                                            "x2": int(txt_bbox[2]),
-                                            "y2": int(txt_bbox[3])
-                                        },
-                                        "confidence": float(txt_conf),
-                                        "text": self.extract_ui_text(image, txt_bbox, txt_type)
-                                    }
-                                    cell_data["subcomponents"].append(text_data)
-
-                            table_cells.append(cell_data)
-
-                    # Organizar celdas en filas y columnas
-                    component["estructure"] = {
-                        "type": "Table",
-                        "children": self.organize_table_cells(table_cells)
-                    }
-                else:
-                    # Procesamiento normal para otros componentes
-                    component["subcomponents"] = []
-                    for s_bbox, s_conf, s_id, s_type in sub_detections:
-                        if s_type in self.COMPONENT_HIERARCHY.get(c_type, []):
-                            if self.is_related(c_bbox, s_bbox, c_type, s_type):
-                                subcomponent_data = {
-                                    "type": NAME_MAPPING.get(s_type, s_type),
-                                    "coordinates": {
-                                        "x1": int(s_bbox[0]),
-                                        "y1": int(s_bbox[1]),
-                                        "x2": int(s_bbox[2]),
-                                        "y2": int(s_bbox[3])
-                                    },
-                                    "confidence": float(s_conf)
-                                }
-
-                                if s_type in self.OCR_COMPONENTS:
-                                    subcomponent_data["text"] = self.extract_ui_text(image, s_bbox, s_type)
-                                component["subcomponents"].append(subcomponent_data)
-
-                # Extraer texto para componentes principales
-                if c_type in self.OCR_COMPONENTS:
-                    component["text"] = self.extract_ui_text(image, c_bbox, c_type)
-
-                report["components"].append(component)
-
-            # 4. Guardar JSON
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            json_filename = os.path.join(self.output_dir, f"ui_analysis_{timestamp}.json")
-            with open(json_filename, 'w', encoding='utf-8') as f:
-                json.dump(report, f, indent=2, ensure_ascii=False)
-
-            # 5. Visualización
-            box_annotator = sv.BoxAnnotator(thickness=2, color=sv.Color(r=0, g=255, b=0))
-            label_annotator = sv.LabelAnnotator(text_scale=0.7, text_color=sv.Color.BLACK)
-
-            labels = [
-                f"{class_name} {confidence:.2f}"
-                for class_name, confidence in
-                zip(detections.data['class_name'], detections.confidence)
-            ]
+            # 2. Inferencia y post-procesamiento
+            dets, pruned = self.detect(image, regions, classes)
+
+            # 3-5. Relaciones, OCR, reporte y archivos
+            return self.finish_scan(image, source_image, dets, {"postprocessing": pruned, **metadata},
+                                    on_event, deadline, project, ocr_profile)
+
+        except Exception as e:
+            raise Exception(f"Error al escanear imagen: {str(e)}")
+
+    def finish_scan(self, image, image_path, dets, extra_metadata=None, on_event=None, deadline=None, project=None,
+                    ocr_profile=None):
+        """
+        Completa un escaneo a partir de sus detecciones: relaciones, OCR, reporte y archivos.
+
+        Las detecciones que ya tienen texto no se vuelven a pasar por OCR.
+
+        Con ``metadata.ingest`` (imagen decodificada reducida) las coordenadas del reporte
+        y de los eventos se dan en la imagen subida; la imagen anotada es la decodificada.
+
+        Con ``on_event`` se notifican, en este orden: ``detections`` (lista de cajas),
+        un ``component`` por componente en cuanto su OCR termina y ``saved`` con el
+        ``ScanResult`` una vez escritos los archivos.
+
+        Con ``deadline`` el OCR se hace por prioridad hasta el límite; los componentes
+        sin leer se marcan ``pending``, ``metadata.ocr`` indica si el reporte está completo
+        y ``ScanResult.completion`` permite terminarlo después.
+
+        Args:
+            image (numpy.ndarray): Imagen BGR escaneada
+            image_path (str): Ruta de la imagen
+            dets (DetectionSet): Detecciones ya post-procesadas
+            extra_metadata (dict): Campos adicionales para ``metadata``
+            on_event (callable): Recibe ``(evento, datos)``; opcional
+            deadline (float): Instante límite (``time.monotonic()``) para el OCR; opcional
+            project (str): Proyecto cuyo vocabulario corrige el OCR; por defecto ``default``
+            ocr_profile (str): Perfil de OCR (con ``ocr_profiles``); por defecto el del proyecto
 
-            annotated_image = box_annotator.annotate(image.copy(), detections)
-            annotated_image = label_annotator.annotate(annotated_image, detections, labels=labels)
+        Returns:
+            ScanResult: Reporte, reporte codificado y rutas de los archivos generados
+        """
+        lexicon = self.lexicons.get(project)
+        profile = self.resolve_ocr_profile(project, ocr_profile)
+        # Coordenadas de salida en la imagen subida (con los textos que se vayan leyendo)
+        factor = self.decode_factor(extra_metadata)
+        out = dets if factor == 1 else dets.scaled(factor)
+
+        # 3. Relaciones, OCR y estructura del reporte
+        if on_event is not None:
+            on_event("detections", self.detection_list(out))
+        components, parents = self.resolve_relations(dets)
+        # El OCR debe terminar con tiempo para guardar el reporte y la imagen anotada
+        ocr_deadline = deadline - self.save_seconds if deadline is not None else None
+        if on_event is None:
+            pending = self.run_ocr(image, dets, self.ocr_targets(dets, components), ocr_deadline, lexicon, profile)
+        else:
+            # Componente a componente para notificar cada uno en cuanto tiene sus textos
+            pending = []
+            class_names, confidences = dets.class_names, dets.confidence.tolist()
+            for c_idx, subs in components:
+                pending += self.run_ocr(image, dets, self.ocr_targets(dets, [(c_idx, subs)]), ocr_deadline,
+                                        lexicon, profile)
+                on_event("component", self.build_component(out, c_idx, subs, class_names, confidences,
+                                                           set(pending)))
+        pending = set(pending)
+        save_start = time.monotonic()
+        metadata = {
+            "scan_id": self.store.new_id(),
+            "analysis_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "source_image": image_path,
+            "model_used": self.model_id,
+            **(extra_metadata or {})
+        }
+        if project:
+            metadata["project"] = project
+        if profile is not None:
+            metadata["ocr_profile"] = profile.name
+        if deadline is not None:
+            metadata["ocr"] = {"complete": not pending, "pending": len(pending)}
+        report = self.build_report(out, components, parents, metadata, pending)
+
+        # 4. Guardar JSON (codificado una sola vez, nombre direccionado por contenido)
+        report_json, json_filename = self.save_report(report)
+
+        # 5. Visualización
+        box_annotator = sv.BoxAnnotator(thickness=2, color=sv.Color(r=0, g=255, b=0))
+        label_annotator = sv.LabelAnnotator(text_scale=0.7, text_color=sv.Color.BLACK)
+
+        detections = dets.to_supervision()
+        labels = [
+            f"{class_name} {confidence:.2f}"
+            for class_name, confidence in
+            zip(detections.data['class_name'], detections.confidence)
+        ]
+
+        annotated_image = box_annotator.annotate(image.copy(), detections)
+        annotated_image = label_annotator.annotate(annotated_image, detections, labels=labels)
+
+        ok, encoded = cv2.imencode(".png", annotated_image)
+        if not ok:
+            raise ValueError("No se pudo codificar la imagen anotada")
+        image_filename = self.store.put_bytes(encoded.tobytes(), prefix="annotated_", suffix=".png")
+        self.save_seconds = self.moving_average(self.save_seconds, time.monotonic() - save_start)
+
+        result = ScanResult(report, report_json, json_filename, image_filename, metadata["scan_id"])
+        if pending:
+            result.completion = lambda: self.complete_scan(image, dets, components, parents, metadata,
+                                                           image_filename, lexicon, profile, json_filename)
+        if on_event is not None:
+            on_event("saved", result)
+        return result
+
+    def save_report(self, report):
+        """Codifica el reporte y lo guarda con nombre direccionado por contenido; devuelve bytes y ruta."""
+        report_json = serialization.dumps_json(report)
+        return report_json, self.store.put_bytes(report_json, prefix="ui_analysis_", suffix=".json")
+
+    def complete_scan(self, image, dets, components, parents, metadata, image_path, lexicon=None, profile=None,
+                      partial_path=None):
+        """
+        Termina el OCR pendiente de un escaneo hecho con límite de tiempo.
+
+        La imagen anotada no depende del OCR y se reutiliza; el reporte se vuelve a
+        generar con el mismo ``scan_id`` y sustituye al parcial, que se elimina.
+
+        Args:
+            image (numpy.ndarray): Imagen BGR escaneada
+            dets (DetectionSet): Detecciones (con los textos ya leídos)
+            components (list): Resultado de ``resolve_relations``
+            parents (numpy.ndarray): Padre de cada detección en el árbol de anidamiento
+            metadata (dict): Metadatos del reporte original
+            image_path (str): Ruta de la imagen anotada
+            lexicon (Lexicon): Vocabulario para corregir los textos; opcional
+            profile (OCRProfile): Perfil de OCR del escaneo; opcional
+            partial_path (str): Ruta del reporte parcial; opcional
+
+        Returns:
+            ScanResult: Resultado completo
+        """
+        self.run_ocr(image, dets, self.ocr_targets(dets, components), lexicon=lexicon, profile=profile)
+        metadata = dict(metadata, ocr={"complete": True, "pending": 0})
+        factor = self.decode_factor(metadata)
+        report = self.build_report(dets if factor == 1 else dets.scaled(factor), components, parents, metadata)
+        report_json, json_filename = self.save_report(report)
+        if partial_path is not None and partial_path != json_filename:
+            try:
+                os.remove(partial_path)
+            except OSError:
+                pass
+        return ScanResult(report, report_json, json_filename, image_path, metadata["scan_id"])
+
+    def scan_incremental(self, image_path, previous_report, project=None, ocr_profile=None):
+        """
+        Re-escanea una captura que difiere poco de un escaneo anterior de la misma pantalla.
+
+        Solo las regiones que cambiaron (con margen) pasan por el modelo; las detecciones
+        fuera de ellas y sus textos se reutilizan del reporte anterior, y las que tocan
+        parcialmente una región conservan su caja pero repiten el OCR.
+
+        Args:
+            image_path (str): Ruta de la nueva imagen
+            previous_report (dict): Reporte del escaneo anterior (con ``layout``)
+            project (str): Proyecto cuyo vocabulario corrige el OCR; por defecto el del escaneo anterior
+            ocr_profile (str): Perfil de OCR; por defecto el del escaneo anterior (o el del proyecto)
 
-            image_filename = os.path.join(self.output_dir, f"annotated_{timestamp}.png")
-            cv2.imwrite(image_filename, annotated_image)
+        Returns:
+            ScanResult: Reporte combinado; ``metadata.incremental`` resume lo reutilizado
+            list: Cambios respecto al escaneo anterior (``incremental.diff_detections``)
+        """
+        try:
+            image, ingest = self.read_image(image_path)
+        except Exception as e:
+            raise Exception(f"Error al escanear imagen: {str(e)}")
+        return self.scan_incremental_array(image, image_path, previous_report,
+                                           {"ingest": ingest} if ingest is not None else None,
+                                           project=project, ocr_profile=ocr_profile)
+
+    def scan_incremental_array(self, image, image_path, previous_report, extra_metadata=None, on_event=None,
+                               deadline=None, project=None, ocr_profile=None):
+        """
+        Como ``scan_incremental``, con la imagen ya decodificada.
 
-            return report, json_filename, image_filename
+        Las detecciones de otra versión del modelo no se reutilizan (escaneo completo), y
+        los textos corregidos con el vocabulario de otro proyecto o leídos con otro perfil
+        de OCR se vuelven a leer.
+
+        Args:
+            image (numpy.ndarray): Imagen BGR
+            image_path (str): Ruta de la imagen
+            previous_report (dict): Reporte del escaneo anterior (con ``layout``)
+            extra_metadata (dict): Campos adicionales para ``metadata``
+            on_event (callable): Recibe ``(evento, datos)``; opcional (ver ``finish_scan``)
+            deadline (float): Instante límite para el OCR; opcional
+            project (str): Proyecto cuyo vocabulario corrige el OCR; por defecto el del escaneo anterior
+            ocr_profile (str): Perfil de OCR (con ``ocr_profiles``); por defecto el del escaneo anterior
+                si es del mismo proyecto, o el del proyecto
+
+        Returns:
+            ScanResult: Reporte combinado
+            list: Cambios respecto al escaneo anterior
+        """
+        try:
+            previous_metadata = previous_report.get("metadata", {})
+            if project is None:
+                project = previous_metadata.get("project")
+            if (ocr_profile is None and self.ocr_profiles is not None and project == previous_metadata.get("project")
+                    and previous_metadata.get("ocr_profile") in self.ocr_profiles.profiles):
+                ocr_profile = previous_metadata["ocr_profile"]
+            profile = self.resolve_ocr_profile(project, ocr_profile)
+            same_texts = (previous_metadata.get("project") == (project or None)
+                          and previous_metadata.get("ocr_profile") == (profile.name if profile else None))
+
+            # El reporte anterior está en coordenadas de la imagen subida; el escaneo, en la decodificada
+            factor = self.decode_factor(extra_metadata)
+            previous_dets = DetectionSet.from_layout(previous_report.get("layout", []))
+            regions = None
+            # Detecciones de otra versión del modelo: escaneo completo
+            if previous_metadata.get("model_used") == self.model_id:
+                try:
+                    # Decodificada igual que la nueva para que sus tamaños coincidan
+                    previous_image, _ = self.read_image(previous_metadata.get("source_image", ""))
+                except (FileNotFoundError, ValueError):
+                    previous_image = None
+                if previous_image is not None and previous_image.shape == image.shape:
+                    regions = incremental.changed_regions(previous_image, image)
+
+            # Sin imagen anterior comparable o con demasiados cambios: escaneo completo
+            if regions is None or incremental.area_fraction(regions, image.shape) > incremental.MAX_CHANGED_FRACTION:
+                dets, pruned = self.detect(image)
+                metadata = {"postprocessing": pruned, "incremental": {
+                    "previous_scan_id": previous_metadata.get("scan_id"),
+                    "full_rescan": True
+                }}
+            else:
+                decoded_dets = previous_dets if factor == 1 else previous_dets.scaled(1 / factor)
+                keep, stale = incremental.split_detections(decoded_dets, regions)
+                reused = decoded_dets.subset(keep)
+                # Sin el mismo proyecto y perfil de OCR se conservan las cajas, no los textos
+                for i in (np.flatnonzero(stale[keep]).tolist() if same_texts else range(len(reused))):
+                    reused.clear_text(i)
+
+                # Detección solo en las regiones cambiadas, con coordenadas de la imagen completa
+                found = []
+                for region in regions.tolist():
+                    crop_dets = self.infer_region(image, region)
+                    found.append(crop_dets.subset(incremental.inside_region(crop_dets.xyxy, region, image.shape)))
+
+                dets, pruned = self.postprocess(DetectionSet.concat([reused] + found))
+                metadata = {"postprocessing": pruned, "incremental": {
+                    "previous_scan_id": previous_metadata.get("scan_id"),
+                    "full_rescan": False,
+                    "regions": (regions * factor).tolist(),
+                    "reused": int(len(reused)),
+                    "redetected": int(sum(len(f) for f in found))
+                }}
+
+            result = self.finish_scan(image, image_path, dets, {**(extra_metadata or {}), **metadata}, on_event,
+                                      deadline, project, ocr_profile)
+            changes = incremental.diff_detections(previous_dets, DetectionSet.from_layout(result.report["layout"]))
+            return result, changes
 
         except Exception as e:
             raise Exception(f"Error al escanear imagen: {str(e)}")
@@ -0,0 +1,298 @@
+import gzip
+import json
+import queue
+import threading
+
+try:
+    import orjson  # Codificador JSON rápido (opcional)
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack  # Formato binario (opcional)
+except ImportError:
+    msgpack = None
+
+
+# Tipos MIME de cada formato de reporte
+MIME_TYPES = {
+    "json": "application/json",
+    "msgpack": "application/msgpack",
+    "columnar": "application/vnd.widgetscanner.columnar+json",
+    "columnar-msgpack": "application/vnd.widgetscanner.columnar+msgpack",
+}
+
+# Tipos aceptados en la cabecera Accept para cada formato
+ACCEPT_ALIASES = {
+    "application/json": "json",
+    "application/msgpack": "msgpack",
+    "application/x-msgpack": "msgpack",
+    "application/vnd.msgpack": "msgpack",
+    "application/vnd.widgetscanner.columnar+json": "columnar",
+    "application/vnd.widgetscanner.columnar+msgpack": "columnar-msgpack",
+}
+
+# Tamaño mínimo (bytes) para comprimir una respuesta
+COMPRESSION_MIN_SIZE = 4 * 1024
+
+
+def available_formats():
+    """Formatos que se pueden generar con las dependencias instaladas."""
+    formats = ["json", "columnar"]
+    if msgpack is not None:
+        formats += ["msgpack", "columnar-msgpack"]
+    return formats
+
+
+def dumps_json(data):
+    """
+    Codifica a JSON compacto (sin indentación), en UTF-8.
+
+    Usa ``orjson`` si está instalado y, si no, ``json`` con separadores mínimos.
+
+    Args:
+        data: Objeto serializable
+
+    Returns:
+        bytes: JSON codificado
+    """
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def to_columnar(report):
+    """
+    Convierte un reporte a representación columnar.
+
+    Cada campo de los componentes pasa a ser una lista paralela; los subcomponentes
+    se aplanan con ``parent`` apuntando a la fila de su componente. Las tablas y el
+    árbol ``layout`` se mantienen anidados en ``tables`` y ``layout``.
+
+    Args:
+        report (dict): Reporte de ``WidgetScanner``
+
+    Returns:
+        dict: Reporte en columnas
+    """
+    columns = {key: [] for key in ("parent", "type", "x1", "y1", "x2", "y2", "confidence", "text")}
+    tables = {}
+
+    def add_row(item, parent):
+        coordinates = item["coordinates"]
+        columns["parent"].append(parent)
+        columns["type"].append(item["type"])
+        for key in ("x1", "y1", "x2", "y2"):
+            columns[key].append(coordinates[key])
+        columns["confidence"].append(item.get("confidence"))
+        columns["text"].append(item.get("text"))
+        return len(columns["type"]) - 1
+
+    for component in report.get("components", []):
+        row = add_row(component, -1)
+        for sub in component.get("subcomponents", []):
+            add_row(sub, row)
+        if "estructure" in component:
+            tables[str(row)] = component["estructure"]
+
+    return {
+        "metadata": report.get("metadata", {}),
+        "components": columns,
+        "tables": tables,
+        "layout": report.get("layout", []),
+    }
+
+
+def encode(data, fmt="json"):
+    """
+    Codifica un objeto en el formato indicado.
+
+    Args:
+        data (dict): Reporte o respuesta a codificar
+        fmt (str): Uno de ``MIME_TYPES``
+
+    Returns:
+        bytes: Datos codificados
+    """
+    if fmt in ("columnar", "columnar-msgpack") and "components" in data:
+        data = to_columnar(data)
+    if fmt in ("msgpack", "columnar-msgpack"):
+        if msgpack is None:
+            raise ValueError("msgpack no está instalado")
+        return msgpack.packb(data, use_bin_type=True)
+    if fmt not in MIME_TYPES:
+        raise ValueError(f"Formato no soportado: {fmt}")
+    return dumps_json(data)
+
+
+def negotiate_format(accept_header, default="json"):
+    """
+    Elige el formato de respuesta según la cabecera ``Accept``.
+
+    Args:
+        accept_header (str): Valor de la cabecera ``Accept`` (puede ser vacío)
+        default (str): Formato si ningún tipo aceptado es soportado
+
+    Returns:
+        str: Formato elegido
+    """
+    available = available_formats()
+    best, best_q = default, 0.0
+    for part in (accept_header or "").split(","):
+        fields = [f.strip() for f in part.split(";")]
+        fmt = ACCEPT_ALIASES.get(fields[0].lower())
+        if fmt is None or fmt not in available:
+            continue
+        q = 1.0
+        for param in fields[1:]:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if q > best_q:
+            best, best_q = fmt, q
+    return best
+
+
+def accepts_gzip(accept_encoding):
+    """Indica si la cabecera ``Accept-Encoding`` admite gzip."""
+    for part in (accept_encoding or "").split(","):
+        fields = [f.strip() for f in part.split(";")]
+        if fields[0].lower() in ("gzip", "*") and "q=0" not in fields[1:]:
+            return True
+    return False
+
+
+def maybe_compress(body, accept_encoding, min_size=COMPRESSION_MIN_SIZE):
+    """
+    Comprime el cuerpo con gzip si el cliente lo admite y supera ``min_size``.
+
+    Args:
+        body (bytes): Cuerpo de la respuesta
+        accept_encoding (str): Cabecera ``Accept-Encoding`` de la petición
+        min_size (int): Tamaño mínimo para comprimir
+
+    Returns:
+        bytes: Cuerpo (comprimido o no)
+        str: ``"gzip"`` si se comprimió, ``None`` en caso contrario
+    """
+    if len(body) < min_size or not accepts_gzip(accept_encoding):
+        return body, None
+    return gzip.compress(body, compresslevel=5), "gzip"
+
+
+def api_response_body(report, report_json, files, fmt="json", extra=None):
+    """
+    Genera el cuerpo de ``/api/scan`` reutilizando el reporte ya codificado.
+
+    En JSON el reporte no se vuelve a serializar: sus bytes se insertan tal cual.
+
+    Args:
+        report (dict): Reporte de ``WidgetScanner``
+        report_json (bytes): El mismo reporte codificado en JSON compacto
+        files (dict): URLs de los archivos generados
+        fmt (str): Formato de la respuesta
+        extra (dict): Campos adicionales de la respuesta (opcional)
+
+    Returns:
+        bytes: Cuerpo de la respuesta
+    """
+    if fmt == "json":
+        body = b'{"success":true,"report":' + report_json + b',"files":' + dumps_json(files)
+        for key, value in (extra or {}).items():
+            body += b',' + dumps_json(key) + b':' + dumps_json(value)
+        return body + b'}'
+    if fmt in ("columnar", "columnar-msgpack"):
+        report = to_columnar(report)
+        fmt = "json" if fmt == "columnar" else "msgpack"
+    return encode({"success": True, "report": report, "files": files, **(extra or {})}, fmt)
+
+
+def video_response_body(video_url, screens, fmt="json"):
+    """
+    Genera el cuerpo de ``/api/scan/video`` reutilizando los reportes ya codificados.
+
+    Args:
+        video_url (str): URL del video subido
+        screens (list): Tuplas ``(ScanResult, files)`` de cada pantalla, en orden
+        fmt (str): Formato de la respuesta
+
+    Returns:
+        bytes: Cuerpo de la respuesta
+    """
+    if fmt == "json":
+        parts = []
+        for result, files in screens:
+            video = result.report.get("metadata", {}).get("video", {})
+            parts.append(b'{"start":' + dumps_json(video.get("start")) + b',"end":' + dumps_json(video.get("end")) +
+                         b',"report":' + result.report_json + b',"files":' + dumps_json(files) + b'}')
+        return (b'{"success":true,"video":' + dumps_json(video_url) + b',"screens":[' + b','.join(parts) + b']}')
+
+    columnar = fmt in ("columnar", "columnar-msgpack")
+    data = {"success": True, "video": video_url, "screens": [{
+        "start": result.report.get("metadata", {}).get("video", {}).get("start"),
+        "end": result.report.get("metadata", {}).get("video", {}).get("end"),
+        "report": to_columnar(result.report) if columnar else result.report,
+        "files": files,
+    } for result, files in screens]}
+    return encode(data, "msgpack" if fmt in ("msgpack", "columnar-msgpack") else "json")
+
+
+def sse_event(event, data):
+    """
+    Codifica un evento Server-Sent Events.
+
+    El JSON compacto no contiene saltos de línea, así que cabe en una sola línea ``data``.
+
+    Args:
+        event (str): Nombre del evento
+        data: Datos serializables a JSON
+
+    Returns:
+        bytes: Evento listo para enviar
+    """
+    return b"event: " + event.encode("utf-8") + b"\ndata: " + dumps_json(data) + b"\n\n"
+
+
+def sse_stream(scan, on_saved):
+    """
+    Ejecuta un escaneo en un hilo y genera sus eventos Server-Sent Events a medida que llegan.
+
+    Los eventos del escáner (``detections`` y ``component``) se reenvían tal cual; ``saved``
+    se convierte en ``files`` y ``done`` (ID del escaneo), y si el escaneo falla se envía
+    ``error``.
+
+    Args:
+        scan (callable): Recibe ``on_event`` y ejecuta el escaneo (ver ``WidgetScanner.finish_scan``)
+        on_saved (callable): Recibe el ``ScanResult`` guardado y devuelve los datos de ``files``
+
+    Returns:
+        generator: Eventos codificados con ``sse_event``; el escaneo ya está en marcha
+    """
+    events = queue.Queue()
+
+    def on_event(event, data):
+        if event == "saved":
+            events.put(("files", on_saved(data)))
+            events.put(("done", {"scan_id": data.scan_id}))
+        else:
+            events.put((event, data))
+
+    def run():
+        try:
+            scan(on_event)
+        except Exception as e:
+            events.put(("error", {"error": str(e)}))
+        finally:
+            events.put(None)
+
+    def generate():
+        while True:
+            item = events.get()
+            if item is None:
+                break
+            yield sse_event(*item)
+
+    threading.Thread(target=run, name="scan-stream", daemon=True).start()
+    return generate()
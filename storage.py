@@ -0,0 +1,333 @@
+import hashlib
+import os
+import re
+import threading
+import time
+import uuid
+
+import cv2
+
+from ingest import HEADER_LIMIT, REDUCED_FLAGS, image_size
+
+# Nombres direccionados por contenido: <prefijo><hash><sufijo>
+CONTENT_NAME = re.compile(r"^(?P<prefix>[A-Za-z_]*?)(?P<digest>[0-9a-f]{32})(?P<suffix>(_thumb)?\.[A-Za-z0-9]+)$")
+
+# Antigüedad a partir de la cual un temporal (``*.tmp``) se considera abandonado y el barrido lo elimina
+TMP_MAX_AGE = 3600
+
+
+class OutputStore:
+    """
+    Almacén de archivos generados (reportes, imágenes anotadas, subidas).
+
+    - IDs únicos (``uuid4``) para que peticiones simultáneas no se sobrescriban.
+    - Nombres direccionados por contenido (hash SHA-256) para artefactos inmutables.
+    - Directorios fragmentados (``ab/cd/``) para que ningún directorio crezca sin límite.
+    - Retención por antigüedad (TTL) y por tamaño total, expulsando primero los
+      archivos usados hace más tiempo (LRU por ``mtime``; ``touch`` lo actualiza).
+    - Barrido periódico opcional en un hilo en segundo plano.
+
+    Como el estado vive en el sistema de archivos, varios procesos pueden compartir
+    el mismo directorio.
+    """
+
+    def __init__(self, root, ttl_seconds=None, max_bytes=None, shard_depth=2, on_remove=None):
+        """
+        Args:
+            root (str): Directorio raíz del almacén
+            ttl_seconds (float): Antigüedad máxima (desde el último uso) de un archivo
+            max_bytes (int): Tamaño total máximo del almacén
+            shard_depth (int): Niveles de subdirectorios (2 caracteres hex por nivel)
+            on_remove (callable): Recibe la lista de rutas eliminadas en cada barrido (p. ej.
+                ``ResultStore.delete_files``, para que la base no apunte a archivos expulsados)
+        """
+        self.root = root
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.shard_depth = shard_depth
+        self.on_remove = on_remove
+        self._lock = threading.Lock()
+        self._sweeper = None
+        self._stop = threading.Event()
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def new_id():
+        """Genera un ID único para un conjunto de artefactos."""
+        return uuid.uuid4().hex
+
+    def shard_dir(self, artifact_id):
+        """Directorio (creado si no existe) donde se guardan los artefactos de ``artifact_id``."""
+        parts = [artifact_id[2 * i:2 * i + 2] for i in range(self.shard_depth)]
+        directory = os.path.join(self.root, *parts)
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def path_for(self, artifact_id, filename):
+        """
+        Ruta absoluta para un artefacto.
+
+        Args:
+            artifact_id (str): ID del escaneo o de la subida
+            filename (str): Nombre del archivo (normalmente contiene el ID)
+
+        Returns:
+            str: Ruta dentro del fragmento correspondiente
+        """
+        return os.path.join(self.shard_dir(artifact_id), filename)
+
+    @staticmethod
+    def content_digest(data):
+        """Hash de contenido (32 caracteres hex) de unos bytes."""
+        return hashlib.sha256(data).hexdigest()[:32]
+
+    def _publish(self, tmp_path, path):
+        # Si ya existe el mismo contenido basta con renovar su uso
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            os.utime(path)
+        else:
+            os.replace(tmp_path, path)
+
+    def put_bytes(self, data, prefix="", suffix=""):
+        """
+        Guarda unos bytes con nombre direccionado por contenido.
+
+        La escritura es atómica (archivo temporal + ``os.replace``) y un contenido
+        repetido no se vuelve a escribir.
+
+        Args:
+            data (bytes): Contenido del archivo
+            prefix (str): Prefijo del nombre (``annotated_``, ``ui_analysis_``...)
+            suffix (str): Extensión, con punto
+
+        Returns:
+            str: Ruta del archivo
+        """
+        digest = self.content_digest(data)
+        path = self.path_for(digest, f"{prefix}{digest}{suffix}")
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        self._publish(tmp_path, path)
+        return path
+
+    def put_stream(self, stream, prefix="", suffix="", chunk_size=1024 * 1024):
+        """
+        Guarda un flujo de bytes con nombre direccionado por contenido, sin cargarlo entero en memoria.
+
+        Args:
+            stream: Objeto con ``read(n)``
+            prefix (str): Prefijo del nombre
+            suffix (str): Extensión, con punto
+            chunk_size (int): Tamaño de cada lectura
+
+        Returns:
+            str: Ruta del archivo
+        """
+        tmp_path = os.path.join(self.root, f".{uuid.uuid4().hex}.tmp")
+        sha = hashlib.sha256()
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in iter(lambda: stream.read(chunk_size), b""):
+                    sha.update(chunk)
+                    f.write(chunk)
+        except BaseException:
+            # Subida interrumpida o rechazada a medias: no dejar el temporal
+            os.remove(tmp_path)
+            raise
+        digest = sha.hexdigest()[:32]
+        path = self.path_for(digest, f"{prefix}{digest}{suffix}")
+        self._publish(tmp_path, path)
+        return path
+
+    @staticmethod
+    def content_etag(relative_path):
+        """
+        ETag fuerte de un archivo direccionado por contenido.
+
+        Returns:
+            str: El hash del nombre (más ``-thumb`` en miniaturas), o ``None`` si el
+            nombre no está direccionado por contenido
+        """
+        match = CONTENT_NAME.match(os.path.basename(relative_path))
+        if match is None:
+            return None
+        return match.group("digest") + ("-thumb" if match.group("suffix").startswith("_thumb") else "")
+
+    def thumbnail(self, relative_path, max_width=320):
+        """
+        Ruta de la miniatura JPEG de una imagen, generándola la primera vez.
+
+        Args:
+            relative_path (str): Ruta relativa de la imagen original
+            max_width (int): Ancho máximo de la miniatura
+
+        Returns:
+            str: Ruta relativa de la miniatura, o ``None`` si el original no existe, no es una imagen
+            o está fuera del almacén
+        """
+        source = self.resolve(relative_path)
+        if source is None:
+            return None
+        stem, _ = os.path.splitext(relative_path)
+        thumb_relative = f"{stem}_thumb.jpg"
+        thumb = os.path.join(self.root, thumb_relative)
+        if os.path.exists(thumb):
+            return thumb_relative
+
+        image = cv2.imread(source, self.thumbnail_flag(source, max_width))
+        if image is None:
+            return None
+        h, w = image.shape[:2]
+        if w > max_width:
+            image = cv2.resize(image, (max_width, max(1, round(h * max_width / w))), interpolation=cv2.INTER_AREA)
+        ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 80])
+        if not ok:
+            return None
+        tmp_path = f"{thumb}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(encoded.tobytes())
+        self._publish(tmp_path, thumb)
+        return thumb_relative
+
+    @staticmethod
+    def thumbnail_flag(path, max_width):
+        """
+        Modo de ``imread`` para una miniatura: reducida (``IMREAD_REDUCED_*``) al mayor factor
+        que deja el ancho en al menos ``max_width``, para no decodificar la imagen completa.
+        """
+        try:
+            with open(path, "rb") as f:
+                size = image_size(f.read(HEADER_LIMIT))
+        except OSError:
+            size = None
+        if size is not None:
+            for factor in (8, 4, 2):
+                if size[1] // factor >= max_width:
+                    return REDUCED_FLAGS[factor]
+        return cv2.IMREAD_COLOR
+
+    def relative(self, path):
+        """Ruta relativa a la raíz (la que se usa en las URLs)."""
+        return os.path.relpath(path, self.root).replace(os.sep, "/")
+
+    def resolve(self, relative_path):
+        """
+        Ruta absoluta de un archivo del almacén a partir de su ruta relativa (la de las URLs).
+
+        Returns:
+            str: La ruta, o ``None`` si sale de la raíz (``..``, ruta absoluta o enlace simbólico)
+        """
+        root = os.path.realpath(self.root)
+        path = os.path.realpath(os.path.join(root, relative_path))
+        if os.path.commonpath([root, path]) != root or path == root:
+            return None
+        return path
+
+    def touch(self, relative_path):
+        """Marca un archivo como usado recientemente (para la expulsión LRU)."""
+        path = self.resolve(relative_path)
+        if path is None:
+            return
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _entries(self):
+        """Lista ``(mtime, tamaño, ruta)`` de todos los archivos del almacén."""
+        entries = []
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                path = os.path.join(directory, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def usage(self):
+        """
+        Uso actual del almacén.
+
+        Returns:
+            dict: ``files`` (número de archivos) y ``bytes`` (tamaño total)
+        """
+        entries = self._entries()
+        return {"files": len(entries), "bytes": sum(size for _, size, _ in entries)}
+
+    def sweep(self, now=None):
+        """
+        Elimina los archivos caducados y, si se supera ``max_bytes``, los menos usados.
+
+        Los temporales de escrituras en curso (``*.tmp``) se respetan hasta ``TMP_MAX_AGE``.
+
+        Args:
+            now (float): Instante de referencia (por defecto ``time.time()``)
+
+        Returns:
+            dict: Archivos y bytes eliminados
+        """
+        now = time.time() if now is None else now
+        removed, removed_bytes = [], 0
+        with self._lock:
+            entries = sorted(self._entries())  # Los menos usados primero
+            total = sum(size for _, size, _ in entries)
+            for mtime, size, path in entries:
+                if path.endswith(".tmp") and now - mtime <= TMP_MAX_AGE:
+                    # Escritura en curso (una subida lenta): no se toca
+                    continue
+                expired = self.ttl_seconds is not None and now - mtime > self.ttl_seconds
+                over_size = self.max_bytes is not None and total > self.max_bytes
+                if not (expired or over_size):
+                    # Ordenados por mtime: el resto es más reciente y cabe en el límite
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                removed.append(path)
+                removed_bytes += size
+            self._remove_empty_dirs(now)
+        if removed and self.on_remove is not None:
+            self.on_remove(removed)
+        return {"files": len(removed), "bytes": removed_bytes}
+
+    def _remove_empty_dirs(self, now, min_age=60):
+        # Solo directorios vacíos antiguos: uno recién creado puede estar a punto de recibir un archivo
+        for directory, _, _ in sorted(os.walk(self.root), key=lambda w: -len(w[0])):
+            if directory == self.root:
+                continue
+            try:
+                if now - os.stat(directory).st_mtime > min_age:
+                    os.rmdir(directory)
+            except OSError:
+                pass
+
+    def start_sweeper(self, interval=60):
+        """
+        Inicia el barrido periódico en un hilo en segundo plano (daemon).
+
+        Args:
+            interval (float): Segundos entre barridos
+        """
+        if self._sweeper is not None or (self.ttl_seconds is None and self.max_bytes is None):
+            return
+
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.sweep()
+                except Exception as e:
+                    print(f"⚠️ Error en el barrido de {self.root}: {str(e)}")
+
+        self._sweeper = threading.Thread(target=loop, name=f"sweeper-{self.root}", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self):
+        """Detiene el barrido periódico."""
+        self._stop.set()
+        self._sweeper = None
@@ -0,0 +1,194 @@
+import numpy as np
+
+
+# Distancia mínima (px) entre bordes para considerarlos filas/columnas distintas
+ROW_THRESHOLD = 20
+COLUMN_THRESHOLD = 20
+
+# Margen de tolerancia para considerar que un texto está dentro de una celda
+TEXT_MARGIN = 5
+
+
+def cluster_1d(values, threshold):
+    """
+    Agrupa valores escalares en clústeres contiguos (enlace simple vectorizado).
+
+    Dos valores consecutivos (una vez ordenados) pertenecen al mismo clúster si
+    su diferencia es menor que ``threshold``.
+
+    Args:
+        values (numpy.ndarray): Valores a agrupar (1-D)
+        threshold (float): Separación mínima entre clústeres
+
+    Returns:
+        numpy.ndarray: Índice de clúster para cada valor (en el orden original)
+        numpy.ndarray: Centro de cada clúster, en orden ascendente
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.size == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float64)
+
+    order = np.argsort(values, kind="stable")
+    sorted_values = values[order]
+    breaks = np.diff(sorted_values) >= threshold
+    sorted_labels = np.concatenate(([0], np.cumsum(breaks)))
+
+    labels = np.empty(values.size, dtype=np.intp)
+    labels[order] = sorted_labels
+    counts = np.bincount(sorted_labels)
+    centers = np.bincount(sorted_labels, weights=sorted_values) / counts
+    return labels, centers
+
+
+def build_grid(cell_xyxy, row_threshold=ROW_THRESHOLD, column_threshold=COLUMN_THRESHOLD):
+    """
+    Calcula la rejilla de una tabla a partir de las cajas de sus celdas.
+
+    Las filas se obtienen agrupando los ``y1`` y las columnas agrupando los ``x1``
+    de todas las celdas. Los spans se calculan contando cuántos inicios de
+    fila/columna quedan cubiertos por la caja de cada celda.
+
+    Args:
+        cell_xyxy (numpy.ndarray): Cajas de las celdas, forma (N, 4)
+        row_threshold (float): Separación mínima entre filas
+        column_threshold (float): Separación mínima entre columnas
+
+    Returns:
+        dict: ``row``, ``row_span``, ``column``, ``column_span`` (arrays de N
+        elementos) y ``row_starts``, ``column_starts`` (bordes de la rejilla)
+    """
+    boxes = np.asarray(cell_xyxy, dtype=np.float64).reshape(-1, 4)
+
+    rows, row_starts = cluster_1d(boxes[:, 1], row_threshold)
+    columns, column_starts = cluster_1d(boxes[:, 0], column_threshold)
+
+    # Un span termina en el último inicio de fila/columna cubierto por la caja
+    row_end = np.searchsorted(row_starts, boxes[:, 3] - row_threshold, side="left")
+    column_end = np.searchsorted(column_starts, boxes[:, 2] - column_threshold, side="left")
+
+    return {
+        "row": rows,
+        "row_span": np.maximum(1, row_end - rows),
+        "column": columns,
+        "column_span": np.maximum(1, column_end - columns),
+        "row_starts": row_starts,
+        "column_starts": column_starts,
+    }
+
+
+def assign_texts(cell_xyxy, text_xyxy, grid=None, margin=TEXT_MARGIN):
+    """
+    Asigna cada texto a la celda que lo contiene mediante búsqueda en la rejilla.
+
+    El centro de cada texto se ubica en la rejilla con ``searchsorted`` sobre los
+    inicios de filas y columnas, y la celda candidata se valida con la misma
+    tolerancia que ``WidgetScanner.is_related`` usa para ``celda``/``celda_text``.
+
+    Args:
+        cell_xyxy (numpy.ndarray): Cajas de las celdas, forma (N, 4)
+        text_xyxy (numpy.ndarray): Cajas de los textos, forma (M, 4)
+        grid (dict): Rejilla ya calculada con ``build_grid`` (opcional)
+        margin (float): Tolerancia en píxeles para la contención
+
+    Returns:
+        numpy.ndarray: Índice de la celda de cada texto, o -1 si no tiene celda
+    """
+    cells = np.asarray(cell_xyxy, dtype=np.float64).reshape(-1, 4)
+    texts = np.asarray(text_xyxy, dtype=np.float64).reshape(-1, 4)
+    if len(cells) == 0 or len(texts) == 0:
+        return np.full(len(texts), -1, dtype=np.intp)
+    if grid is None:
+        grid = build_grid(cells)
+
+    n_rows = len(grid["row_starts"])
+    n_columns = len(grid["column_starts"])
+
+    # Mapa de ocupación: cada posición de la rejilla apunta a su celda
+    occupancy = np.full((n_rows, n_columns), -1, dtype=np.intp)
+    single = (grid["row_span"] == 1) & (grid["column_span"] == 1)
+    occupancy[grid["row"][single], grid["column"][single]] = np.flatnonzero(single)
+    for idx in np.flatnonzero(~single):
+        r, c = grid["row"][idx], grid["column"][idx]
+        occupancy[r:r + grid["row_span"][idx], c:c + grid["column_span"][idx]] = idx
+
+    centers_x = (texts[:, 0] + texts[:, 2]) / 2
+    centers_y = (texts[:, 1] + texts[:, 3]) / 2
+    text_rows = np.clip(np.searchsorted(grid["row_starts"], centers_y, side="right") - 1, 0, n_rows - 1)
+    text_columns = np.clip(np.searchsorted(grid["column_starts"], centers_x, side="right") - 1, 0, n_columns - 1)
+    assigned = occupancy[text_rows, text_columns]
+
+    # Validar la contención con tolerancia
+    candidates = cells[np.maximum(assigned, 0)]
+    inside = (
+            (texts[:, 0] >= candidates[:, 0] - margin) &
+            (texts[:, 2] <= candidates[:, 2] + margin) &
+            (texts[:, 1] >= candidates[:, 1] - margin) &
+            (texts[:, 3] <= candidates[:, 3] + margin)
+    )
+    return np.where((assigned >= 0) & inside, assigned, -1)
+
+
+def organize_table(cell_xyxy, cell_children=None, grid=None):
+    """
+    Construye la estructura ``TableRow``/``TableCell`` del reporte.
+
+    Args:
+        cell_xyxy (numpy.ndarray): Cajas de las celdas, forma (N, 4)
+        cell_children (list): Hijo (``dict`` o ``None``) de cada celda
+        grid (dict): Rejilla ya calculada con ``build_grid`` (opcional)
+
+    Returns:
+        list: Filas de la tabla, cada una con sus celdas en ``children``
+    """
+    boxes = np.asarray(cell_xyxy).reshape(-1, 4).astype(np.int64)
+    if len(boxes) == 0:
+        return []
+    if grid is None:
+        grid = build_grid(boxes)
+    if cell_children is None:
+        cell_children = [None] * len(boxes)
+
+    # Ordenar por fila y luego por x1; cada fila es un tramo contiguo
+    order = np.lexsort((boxes[:, 0], grid["row"]))
+    sorted_rows = grid["row"][order]
+    starts = np.flatnonzero(np.concatenate(([True], sorted_rows[1:] != sorted_rows[:-1])))
+    sorted_boxes = boxes[order]
+    row_x1 = np.minimum.reduceat(sorted_boxes[:, 0], starts)
+    row_y1 = np.minimum.reduceat(sorted_boxes[:, 1], starts)
+    row_x2 = np.maximum.reduceat(sorted_boxes[:, 2], starts)
+    row_y2 = np.maximum.reduceat(sorted_boxes[:, 3], starts)
+    ends = np.append(starts[1:], len(order))
+
+    columns = grid["column"].tolist()
+    column_spans = grid["column_span"].tolist()
+    rows = grid["row"].tolist()
+    row_spans = grid["row_span"].tolist()
+    box_list = boxes.tolist()
+
+    organized_rows = []
+    for r, (start, end) in enumerate(zip(starts.tolist(), ends.tolist())):
+        children = []
+        for idx in order[start:end].tolist():
+            x1, y1, x2, y2 = box_list[idx]
+            children.append({
+                'type': 'TableCell',
+                'row': rows[idx],
+                'column': columns[idx],
+                'row_span': row_spans[idx],
+                'column_span': column_spans[idx],
+                'coordinates': {'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2},
+                'child': cell_children[idx]
+            })
+
+        organized_rows.append({
+            'type': 'TableRow',
+            'coordinates': {
+                'x1': int(row_x1[r]),
+                'y1': int(row_y1[r]),
+                'x2': int(row_x2[r]),
+                'y2': int(row_y2[r])
+            },
+            'children': children
+        })
+
+    return organized_rows
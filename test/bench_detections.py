@@ -0,0 +1,98 @@
+"""
+Benchmark del pipeline de escaneo con muchas detecciones (sin conexión).
+
+Mide el tiempo y las asignaciones de memoria (tracemalloc) de cada etapa de
+``WidgetScanner`` usando un modelo y un lector OCR falsos.
+
+Uso:
+    python test/bench_detections.py [filas_tabla] [botones]
+"""
+import contextlib
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from scanner import WidgetScanner  # noqa: E402
+
+
+def prediction(class_name, x1, y1, x2, y2, confidence=0.9):
+    return {"x": (x1 + x2) / 2, "y": (y1 + y2) / 2, "width": x2 - x1, "height": y2 - y1,
+            "confidence": confidence, "class": class_name, "class_id": 0, "detection_id": f"{class_name}-{x1}-{y1}"}
+
+
+def heavy_predictions(table_rows=40, buttons=100):
+    predictions = []
+    for i in range(buttons):
+        x, y = (i % 10) * 200, 2000 + (i // 10) * 80
+        predictions += [prediction("button", x, y, x + 180, y + 60), prediction("button_text", x + 10, y + 10, x + 170, y + 50)]
+    predictions.append(prediction("Table", 0, 0, 2000, table_rows * 40 + 10))
+    for r in range(table_rows):
+        for c in range(10):
+            x, y = 5 + c * 199, 5 + r * 40
+            predictions += [prediction("celda", x, y, x + 195, y + 38), prediction("celda_text", x + 10, y + 5, x + 150, y + 30)]
+    return predictions
+
+
+class StaticModel:
+    """Modelo falso que devuelve siempre las mismas predicciones."""
+
+    def __init__(self, predictions):
+        self.predictions = predictions
+
+    def infer(self, image, **kwargs):
+        h, w = image.shape[:2]
+        return [{"predictions": self.predictions, "image": {"width": w, "height": h}}]
+
+
+class NullReader:
+    def readtext(self, image, **kwargs):
+        return ["texto"]
+
+
+def run_stages(scanner, image, trace):
+    """Ejecuta las etapas una vez; devuelve el tiempo (o el pico de memoria) de cada una."""
+    values = {}
+
+    def stage(name, fn, *args):
+        if trace:
+            tracemalloc.start()
+        start = time.perf_counter()
+        result = fn(*args)
+        if trace:
+            values[name] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        else:
+            values[name] = time.perf_counter() - start
+        return result
+
+    dets, _ = stage("detect", scanner.detect, image)
+    components, parents = stage("resolve_relations", scanner.resolve_relations, dets)
+    stage("run_ocr", scanner.run_ocr, image, dets, scanner.ocr_targets(dets, components))
+    stage("build_report", scanner.build_report, dets, components, parents, {})
+    return values
+
+
+def main():
+    table_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    buttons = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    predictions = heavy_predictions(table_rows, buttons)
+    scanner = WidgetScanner("bench/1", None, output_dir="bench_output",
+                            model=StaticModel(predictions), reader=NullReader())
+    image = np.full((3000, 2000, 3), 255, dtype=np.uint8)
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        times = run_stages(scanner, image, trace=False)
+        peaks = run_stages(scanner, image, trace=True)
+
+    print(f"Detecciones: {len(predictions)}")
+    for name in times:
+        print(f"  {name:<18} {times[name] * 1000:8.2f} ms   pico {peaks[name] / 1024:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark de rendimiento (escaneos por segundo) del OCR según el reparto de núcleos.
+
+Escanea capturas sintéticas con varias peticiones simultáneas y compara el OCR en el
+hilo de la petición (un lector con todos los hilos de torch) con pools de procesos
+(``ocr_pool.OCRPool``) de distintos tamaños. La detección se reproduce
+(``synthetic.ReplayModel``), así que solo se mide el escáner y el OCR.
+
+Uso:
+    python test/bench_ocr_pool.py                        # EasyOCR real (modelos ya descargados)
+    python test/bench_ocr_pool.py --simulate-ms 20       # Lector simulado (20 ms de CPU por lectura)
+    python test/bench_ocr_pool.py --cores 16 --concurrency 4 --scans 40
+"""
+import argparse
+import contextlib
+import functools
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ocr_pool import OCR_LANGUAGES, OCRPool, ResourcePlan, available_cores, configure_threads, easyocr_reader  # noqa: E402
+from scanner import WidgetScanner  # noqa: E402
+from synthetic import BusyReader, ReplayModel, generate_screen  # noqa: E402
+
+
+def configurations(cores):
+    """Configuraciones a comparar: ``(nombre, workers de OCR, hilos por lector)``."""
+    configs = [("inline", 0, cores)]
+    threads = 1
+    while threads <= cores:
+        workers = max(1, (cores - 1) // threads)
+        configs.append((f"pool {workers}x{threads}", workers, threads))
+        threads *= 2
+    # La que elige ResourcePlan para un solo proceso web
+    plan = ResourcePlan.from_cores(cores, web_workers=1)
+    if plan.ocr_workers and (plan.ocr_workers, plan.ocr_threads) not in [c[1:] for c in configs]:
+        configs.append((f"plan {plan.ocr_workers}x{plan.ocr_threads}", plan.ocr_workers, plan.ocr_threads))
+    return configs
+
+
+def run(scanner, paths, scans, concurrency):
+    """Escanea ``scans`` imágenes con ``concurrency`` peticiones simultáneas; devuelve escaneos por segundo."""
+    jobs = [paths[i % len(paths)] for i in range(scans)]
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        list(executor.map(scanner.scan, jobs))
+        return scans / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rendimiento del OCR según el reparto de núcleos")
+    parser.add_argument("--cores", type=int, default=available_cores(), help="Núcleos a repartir")
+    parser.add_argument("--concurrency", type=int, default=2, help="Peticiones simultáneas")
+    parser.add_argument("--scans", type=int, default=20, help="Escaneos por configuración")
+    parser.add_argument("--widgets", type=int, default=20, help="Widgets por captura")
+    parser.add_argument("--simulate-ms", type=float, help="Usar un lector simulado con este coste por lectura")
+    parser.add_argument("--output", help="Guardar los resultados en este archivo JSON")
+    args = parser.parse_args()
+
+    if args.simulate_ms:
+        factory = functools.partial(BusyReader, args.simulate_ms)
+    else:
+        factory = easyocr_reader
+
+    screens = [generate_screen(widgets=args.widgets, seed=seed) for seed in range(4)]
+    results = {"cores": args.cores, "concurrency": args.concurrency, "scans": args.scans,
+               "reader": f"simulado {args.simulate_ms} ms" if args.simulate_ms else "easyocr", "configs": {}}
+    with tempfile.TemporaryDirectory(prefix="bench_ocr_") as output_dir:
+        paths = []
+        for i, screen in enumerate(screens):
+            paths.append(os.path.join(output_dir, f"screen_{i}.png"))
+            cv2.imwrite(paths[-1], screen.image)
+
+        baseline = None
+        for name, workers, threads in configurations(args.cores):
+            if workers:
+                configure_threads(cv2_threads=max(1, args.cores - workers * threads))
+                reader = OCRPool(workers, threads, reader_factory=factory)
+                reader.start()
+            else:
+                configure_threads(torch_threads=threads, cv2_threads=args.cores)
+                reader = factory(OCR_LANGUAGES)
+            scanner = WidgetScanner("bench/1", None, output_dir=os.path.join(output_dir, "out"),
+                                    model=ReplayModel.from_screens(screens), reader=reader)
+            try:
+                # Las trazas de cada lectura no cuentan
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                    run(scanner, paths, min(args.scans, args.concurrency), args.concurrency)  # Calentamiento
+                    throughput = run(scanner, paths, args.scans, args.concurrency)
+            finally:
+                if workers:
+                    reader.close()
+            baseline = baseline or throughput
+            results["configs"][name] = {"ocr_workers": workers, "ocr_threads": threads,
+                                        "scans_per_second": round(throughput, 3),
+                                        "speedup": round(throughput / baseline, 2)}
+            print(f"{name:<14} {throughput:8.2f} escaneos/s   x{throughput / baseline:.2f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
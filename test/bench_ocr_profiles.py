@@ -0,0 +1,129 @@
+"""
+Benchmark de los perfiles de OCR: tiempo de carga, memoria y latencia por recorte.
+
+Cada perfil se mide en un proceso nuevo (``spawn``) para que la memoria y la carga
+no dependan de los anteriores: se crea su lector (segundos y aumento de RSS), se leen
+los recortes de texto de pantallas sintéticas tal como los prepara el escáner
+(``WidgetScanner.ocr_input``) y se calculan la latencia por recorte (p50/p90) y el
+error por carácter (CER) frente al texto dibujado.
+
+Uso:
+    python test/bench_ocr_profiles.py                              # Todos los perfiles (EasyOCR real)
+    python test/bench_ocr_profiles.py --profiles default,en,full --rois 200
+    python test/bench_ocr_profiles.py --config ocr_profiles.json --output ocr_profiles_bench.json
+    python test/bench_ocr_profiles.py --simulate-ms 20             # Lector simulado (sin modelos)
+"""
+import argparse
+import functools
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import memory  # noqa: E402
+import ocr_profiles  # noqa: E402
+from evaluate import percentile  # noqa: E402
+from lexicon import edit_distance  # noqa: E402
+from ocr_pool import configure_threads  # noqa: E402
+from ocr_profiles import OCRProfiles  # noqa: E402
+from scanner import WidgetScanner  # noqa: E402
+from synthetic import BusyReader, generate_screen  # noqa: E402
+
+MIB = 2 ** 20
+
+
+def text_rois(count, seed=0):
+    """Recortes de texto preprocesados y su texto real, de pantallas sintéticas."""
+    rois = []
+    while len(rois) < count:
+        screen = generate_screen(widgets=20, seed=seed)
+        rois += [(WidgetScanner.ocr_input(screen.image, t["box"]), t["text"]) for t in screen.truth if t["text"]]
+        seed += 1
+    return rois[:count]
+
+
+def measure(profile, factory, rois, threads, warmup=3):
+    """Mide un perfil en el proceso actual; devuelve un ``dict`` con carga, memoria, latencia y CER."""
+    configure_threads(torch_threads=threads, cv2_threads=1)
+    rss_before = memory.rss_bytes()
+    start = time.perf_counter()
+    reader = ocr_profiles.get_reader(profile, factory)
+    load_seconds = time.perf_counter() - start
+    rss_loaded = memory.rss_bytes()
+
+    options = profile.readtext_options(WidgetScanner.OCR_CONFIG)
+    for image, _ in rois[:warmup]:
+        reader.readtext(image, **options)
+    latencies, errors, chars = [], 0, 0
+    for image, expected in rois:
+        start = time.perf_counter()
+        text = " ".join(reader.readtext(image, **options)).strip()
+        latencies.append((time.perf_counter() - start) * 1000)
+        errors += edit_distance(text, expected, max(len(text), len(expected)))
+        chars += len(expected)
+    return {
+        "profile": profile.name,
+        **profile.as_dict(),
+        "load_seconds": round(load_seconds, 3),
+        "reader_rss_mib": round((rss_loaded - rss_before) / MIB, 1),
+        "peak_rss_mib": round((memory.peak_rss_bytes() or 0) / MIB, 1),
+        "roi_ms": {"p50": round(percentile(latencies, 50), 2), "p90": round(percentile(latencies, 90), 2),
+                   "mean": round(sum(latencies) / len(latencies), 2)},
+        "cer": round(errors / chars, 4) if chars else None,
+    }
+
+
+def _worker(profile, factory, roi_count, threads, results):
+    try:
+        results.put(measure(profile, factory, text_rois(roi_count), threads))
+    except Exception as e:
+        results.put({"profile": profile.name, "error": str(e)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga, memoria y latencia de los perfiles de OCR")
+    parser.add_argument("--config", help="Archivo de perfiles (por defecto, los incluidos)")
+    parser.add_argument("--profiles", help="Perfiles a medir, separados por comas (por defecto todos)")
+    parser.add_argument("--rois", type=int, default=100, help="Recortes de texto por perfil")
+    parser.add_argument("--threads", type=int, default=1, help="Hilos de torch del lector")
+    parser.add_argument("--simulate-ms", type=float, help="Usar un lector simulado con este coste por lectura")
+    parser.add_argument("--output", help="Guardar los resultados en este archivo JSON")
+    args = parser.parse_args()
+
+    factory = functools.partial(BusyReader, args.simulate_ms) if args.simulate_ms else ocr_profiles.easyocr_reader
+    profiles = OCRProfiles.from_file(args.config)
+    names = args.profiles.split(",") if args.profiles else list(profiles.profiles)
+
+    context = multiprocessing.get_context("spawn")
+    rows = []
+    print(f"{'perfil':<12} {'idiomas':<8} {'cuant.':>6} {'carga':>7} {'RSS lector':>11} {'p50':>8} {'p90':>8} {'CER':>6}")
+    for name in names:
+        results = context.Queue()
+        process = context.Process(target=_worker, args=(profiles.resolve(name), factory, args.rois, args.threads,
+                                                        results))
+        process.start()
+        row = results.get()
+        process.join()
+        rows.append(row)
+        if "error" in row:
+            print(f"⚠️ {name}: {row['error']}")
+            continue
+        cer = f"{row['cer']:.3f}" if row["cer"] is not None else "-"
+        print(f"{name:<12} {'+'.join(row['languages']):<8} {'sí' if row['quantize'] else 'no':>6} "
+              f"{row['load_seconds']:>6.2f}s {row['reader_rss_mib']:>8.1f} MiB {row['roi_ms']['p50']:>6.2f}ms "
+              f"{row['roi_ms']['p90']:>6.2f}ms {cer:>6}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"rois": args.rois, "threads": args.threads,
+                       "reader": f"simulado {args.simulate_ms} ms" if args.simulate_ms else "easyocr",
+                       "profiles": rows}, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
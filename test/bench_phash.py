@@ -0,0 +1,55 @@
+"""
+Benchmark del índice de pantallas casi idénticas (``phash.HashIndex``).
+
+Indexa hashes aleatorios y mide la búsqueda del más cercano con consultas que
+están a 1-``max_distance`` bits de una pantalla indexada y con consultas nuevas.
+
+Uso:
+    python test/bench_phash.py [pantallas] [max_distance]
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from phash import HASH_SIZE, MAX_DISTANCE, HashIndex  # noqa: E402
+
+
+def flip_bits(value, count, bits, rng):
+    for bit in rng.sample(range(bits), count):
+        value ^= 1 << bit
+    return value
+
+
+def main():
+    screens = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    max_distance = int(sys.argv[2]) if len(sys.argv) > 2 else MAX_DISTANCE
+    bits = HASH_SIZE * HASH_SIZE
+    rng = random.Random(0)
+    hashes = [rng.getrandbits(bits) for _ in range(screens)]
+
+    index = HashIndex(bits, max_distance)
+    start = time.perf_counter()
+    for i, value in enumerate(hashes):
+        index.add(value, i)
+    print(f"Indexadas {len(index)} pantallas en {time.perf_counter() - start:.2f} s")
+
+    near = [flip_bits(rng.choice(hashes), rng.randint(1, max_distance), bits, rng) for _ in range(5000)]
+    new = [rng.getrandbits(bits) for _ in range(5000)]
+    for name, queries in (("casi idénticas", near), ("nuevas", new)):
+        times, found = [], 0
+        for query in queries:
+            start = time.perf_counter()
+            match = index.nearest(query)
+            times.append((time.perf_counter() - start) * 1e6)
+            found += match is not None
+        times.sort()
+        print(f"  {name:<15} media {statistics.mean(times):7.1f} µs   p99 {times[int(len(times) * 0.99)]:7.1f} µs"
+              f"   encontradas {found}/{len(queries)}")
+
+
+if __name__ == "__main__":
+    main()
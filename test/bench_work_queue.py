@@ -0,0 +1,130 @@
+"""
+Benchmark del escalado horizontal: trabajos por segundo según el número de nodos de escaneo.
+
+Para cada número de workers se arrancan procesos nuevos (``spawn``) con un
+``worker.ScanWorker`` cada uno, se encolan los trabajos en una cola SQLite compartida
+(como haría la API con ``SCAN_MODE=queue``) y se mide desde el primer encolado hasta
+el último trabajo terminado: trabajos por segundo, latencia de extremo a extremo
+(p50/p90, encolado -> terminado) y aceleración frente a un solo worker. La detección
+se reproduce (``synthetic.ReplayModel``) y el OCR se simula con ``BusyReader``.
+
+Uso:
+    python test/bench_work_queue.py                          # 1, 2 y 4 workers, 10 ms por lectura
+    python test/bench_work_queue.py --workers 1,2,4,8 --jobs 200 --batch-size 8
+    python test/bench_work_queue.py --simulate-ms 0 --output work_queue_bench.json
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from evaluate import percentile  # noqa: E402
+from ocr_pool import available_cores, configure_threads  # noqa: E402
+from result_store import ResultStore  # noqa: E402
+from scanner import WidgetScanner  # noqa: E402
+from storage import OutputStore  # noqa: E402
+from synthetic import BusyReader, ReplayModel, ReplayReader, generate_screen  # noqa: E402
+from work_queue import DONE, FAILED, SQLiteQueue  # noqa: E402
+from worker import ScanWorker  # noqa: E402
+
+SCREENS = 4
+
+
+def screens(widgets):
+    return [generate_screen(widgets=widgets, seed=seed) for seed in range(SCREENS)]
+
+
+def _worker(root, queue_path, widgets, simulate_ms, batch_size, ready, results):
+    configure_threads(torch_threads=1, cv2_threads=1)
+    reader = BusyReader(simulate_ms) if simulate_ms else ReplayReader()
+    scanner = WidgetScanner("bench/1", None, output_dir=os.path.join(root, "output"),
+                            model=ReplayModel.from_screens(screens(widgets)), reader=reader)
+    worker = ScanWorker(SQLiteQueue(queue_path), lambda: scanner, ResultStore(os.path.join(root, "results.sqlite")),
+                        OutputStore(os.path.join(root, "uploads")), OutputStore(os.path.join(root, "output")),
+                        batch_size=batch_size, poll_interval=0.01)
+    ready.wait()
+    # Las trazas de cada escaneo no cuentan
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        stats = worker.run(exit_when_idle=True)
+    results.put(stats)
+
+
+def run(workers, jobs, widgets, simulate_ms, batch_size):
+    """Escanea ``jobs`` trabajos con ``workers`` procesos; devuelve un ``dict`` con el rendimiento."""
+    with tempfile.TemporaryDirectory(prefix="bench_queue_") as root:
+        uploads = OutputStore(os.path.join(root, "uploads"))
+        files = [uploads.relative(uploads.put_bytes(cv2.imencode(".png", screen.image)[1].tobytes(), suffix=".png"))
+                 for screen in screens(widgets)]
+        queue_path = os.path.join(root, "cola.sqlite")
+        queue = SQLiteQueue(queue_path)
+
+        context = multiprocessing.get_context("spawn")
+        ready, results = context.Event(), context.Queue()
+        processes = [context.Process(target=_worker, args=(root, queue_path, widgets, simulate_ms, batch_size,
+                                                           ready, results)) for _ in range(workers)]
+        for process in processes:
+            process.start()
+        # Los workers ya cargaron el escáner y esperan; los trabajos llegan todos a la vez
+        time.sleep(1.0)
+        start = time.time()
+        ids = [queue.enqueue({"file": files[i % len(files)]}) for i in range(jobs)]
+        ready.set()
+        stats = [results.get() for _ in processes]
+        elapsed = time.time() - start
+        for process in processes:
+            process.join()
+
+        finished = [queue.get(job_id) for job_id in ids]
+        latencies = [(job.updated_at - job.created_at) * 1000 for job in finished if job.status == DONE]
+        return {
+            "workers": workers,
+            "jobs_per_second": round(len(latencies) / elapsed, 2),
+            "latency_ms": {"p50": round(percentile(latencies, 50), 1), "p90": round(percentile(latencies, 90), 1)},
+            "done": len(latencies),
+            "failed": sum(job.status == FAILED for job in finished),
+            "per_worker": [s["done"] for s in stats],
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trabajos por segundo según el número de nodos de escaneo")
+    parser.add_argument("--workers", default="1,2,4", help="Números de workers a medir, separados por comas")
+    parser.add_argument("--jobs", type=int, default=60, help="Trabajos por medición")
+    parser.add_argument("--batch-size", type=int, default=4, help="Trabajos por lote de cada worker")
+    parser.add_argument("--widgets", type=int, default=12, help="Widgets por captura")
+    parser.add_argument("--simulate-ms", type=float, default=10.0,
+                        help="Coste simulado de cada lectura OCR (0 = lector instantáneo)")
+    parser.add_argument("--output", help="Guardar los resultados en este archivo JSON")
+    args = parser.parse_args()
+
+    rows = []
+    print(f"Núcleos disponibles: {available_cores()}")
+    print(f"{'workers':>7} {'trabajos/s':>11} {'p50':>9} {'p90':>9} {'aceleración':>12}  reparto")
+    for workers in (int(n) for n in args.workers.split(",")):
+        row = run(workers, args.jobs, args.widgets, args.simulate_ms, args.batch_size)
+        row["speedup"] = round(row["jobs_per_second"] / rows[0]["jobs_per_second"], 2) if rows else 1.0
+        rows.append(row)
+        print(f"{workers:>7} {row['jobs_per_second']:>11.2f} {row['latency_ms']['p50']:>7.1f}ms "
+              f"{row['latency_ms']['p90']:>7.1f}ms {'x' + str(row['speedup']):>12}  {row['per_worker']}")
+        if row["failed"]:
+            print(f"⚠️ {row['failed']} trabajos fallidos con {workers} workers")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"jobs": args.jobs, "batch_size": args.batch_size, "cores": available_cores(),
+                       "reader": f"simulado {args.simulate_ms} ms" if args.simulate_ms else "instantáneo",
+                       "results": rows}, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
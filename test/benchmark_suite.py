@@ -0,0 +1,264 @@
+"""
+Suite de benchmarks reproducible del escáner (sin conexión).
+
+Usa capturas sintéticas (``synthetic.generate_screen``), un modelo que reproduce
+detecciones grabadas y un lector OCR de reemplazo, así que no necesita Roboflow ni
+descargar modelos. Mide cada etapa en varios escenarios de densidad, guarda los
+resultados en JSON y los compara con la ejecución anterior, marcando regresiones.
+
+Uso:
+    python test/benchmark_suite.py                        # Ejecuta y compara con la línea base
+    python test/benchmark_suite.py --repeat 10 --scenario dense
+    python test/benchmark_suite.py --real-ocr             # EasyOCR real (modelos ya descargados)
+    python test/benchmark_suite.py --fail-on-regression   # Código de salida 1 si hay regresiones
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from model_registry import percentile  # noqa: E402
+from scanner import WidgetScanner  # noqa: E402
+from synthetic import ReplayModel, ReplayReader, generate_screen  # noqa: E402
+
+# Escenarios: argumentos de generate_screen
+SCENARIOS = {
+    "small": {"widgets": 6},
+    "form": {"widgets": 30},
+    "table": {"widgets": 4, "table_rows": 20, "table_columns": 6},
+    "dense": {"widgets": 60, "table_rows": 40, "table_columns": 8},
+}
+
+# Línea base por defecto: resultados de la ejecución anterior
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmark_results", "baseline.json")
+# Una etapa es regresión si su mediana supera la de la línea base en más de esta fracción...
+DEFAULT_TOLERANCE = 0.25
+# ...y en más de estos milisegundos (evita falsos positivos en etapas muy rápidas)
+NOISE_FLOOR_MS = 1.0
+
+
+def measure(fn, repeat):
+    """
+    Ejecuta ``fn`` ``repeat`` veces (más una de calentamiento).
+
+    Returns:
+        dict: ``median_ms``, ``p90_ms``, ``min_ms`` y ``runs``
+    """
+    fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return {
+        "median_ms": round(statistics.median(times), 4),
+        "p90_ms": round(percentile(times, 90), 4),
+        "min_ms": round(times[0], 4),
+        "runs": repeat,
+    }
+
+
+def peak_memory(fn):
+    """Pico de memoria (KiB) asignada por Python/NumPy durante ``fn``."""
+    tracemalloc.start()
+    try:
+        fn()
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def bench_scenario(name, options, repeat, reader, output_dir):
+    """
+    Mide las etapas del escáner en un escenario.
+
+    - ``scan_image``: escaneo completo (inferencia reproducida, relaciones, OCR, reporte y archivos)
+    - ``extract_ui_text``: todas las lecturas OCR de la pantalla
+    - ``is_related``: comprobación de todos los pares componente/subcomponente candidatos
+    - ``organize_table_cells``: estructuración de las celdas de la tabla
+
+    Returns:
+        dict: Resultados de cada etapa, más el tamaño del escenario
+    """
+    screen = generate_screen(seed=1, **options)
+    image_path = os.path.join(output_dir, f"{name}.png")
+    cv2.imwrite(image_path, screen.image)
+    scanner = WidgetScanner("bench/1", None, output_dir=os.path.join(output_dir, name),
+                            model=ReplayModel.from_screens([screen]), reader=reader)
+
+    # Entradas de las etapas aisladas, preparadas fuera de la medición
+    image = scanner.load_image(image_path)
+    dets, _ = scanner.detect(image)
+    components, _ = scanner.resolve_relations(dets)
+    targets = scanner.ocr_targets(dets, components)
+    class_names = dets.class_names
+    boxes = dets.xyxy.tolist()
+    pairs = [
+        (boxes[p], boxes[c], class_names[p], class_names[c])
+        for p in range(len(dets)) if class_names[p] in scanner.COMPONENT_HIERARCHY
+        for c in range(len(dets)) if class_names[c] in scanner.COMPONENT_HIERARCHY[class_names[p]]
+    ]
+    cells = [
+        {"coordinates": dict(zip(("x1", "y1", "x2", "y2"), t["box"])),
+         "subcomponents": [{"text": screen.truth[child]["text"],
+                            "coordinates": dict(zip(("x1", "y1", "x2", "y2"), screen.truth[child]["box"]))}
+                           for parent, child in screen.relations if parent == i]}
+        for i, t in enumerate(screen.truth) if t["class"] == "celda"
+    ]
+
+    def ocr_all():
+        for idx in targets:
+            scanner.extract_ui_text(image, dets.xyxy[idx], class_names[idx])
+
+    def relate_all():
+        for pair in pairs:
+            scanner.is_related(*pair)
+
+    stages = {
+        "scan_image": lambda: scanner.scan_image(image_path),
+        "extract_ui_text": ocr_all,
+        "is_related": relate_all,
+    }
+    if cells:
+        stages["organize_table_cells"] = lambda: scanner.organize_table_cells(cells)
+
+    results = {"detections": len(screen.predictions), "ocr_calls": len(targets), "pairs": len(pairs),
+               "cells": len(cells), "stages": {}}
+    for stage, fn in stages.items():
+        results["stages"][stage] = measure(fn, repeat)
+    results["stages"]["scan_image"]["peak_kib"] = peak_memory(stages["scan_image"])
+    return results
+
+
+def environment():
+    """Datos del entorno para interpretar los resultados."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE, noise_floor_ms=NOISE_FLOOR_MS):
+    """
+    Compara los resultados con una línea base.
+
+    Args:
+        results (dict): Resultados actuales (``scenarios``)
+        baseline (dict): Resultados anteriores (``scenarios``)
+        tolerance (float): Aumento relativo de la mediana permitido
+        noise_floor_ms (float): Aumento absoluto mínimo para considerar regresión
+
+    Returns:
+        list: Un ``dict`` por etapa comparada con ``scenario``, ``stage``, ``baseline_ms``,
+        ``current_ms``, ``change`` (relativo) y ``regression``
+    """
+    rows = []
+    for scenario, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(scenario)
+        if previous is None:
+            continue
+        for stage, stats in current["stages"].items():
+            before = previous["stages"].get(stage)
+            if before is None:
+                continue
+            base, now = before["median_ms"], stats["median_ms"]
+            change = (now - base) / base if base > 0 else 0.0
+            rows.append({
+                "scenario": scenario,
+                "stage": stage,
+                "baseline_ms": base,
+                "current_ms": now,
+                "change": round(change, 4),
+                "regression": change > tolerance and now - base > noise_floor_ms,
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del escáner sin conexión")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="Escenario a ejecutar (se puede repetir; por defecto todos)")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticiones por etapa")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Archivo JSON de la línea base")
+    parser.add_argument("--output", help="Archivo JSON de resultados (por defecto, actualiza la línea base)")
+    parser.add_argument("--no-save", action="store_true", help="No guardar los resultados")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Aumento relativo de la mediana que se considera regresión")
+    parser.add_argument("--real-ocr", action="store_true", help="Usar EasyOCR real en lugar del lector de reemplazo")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Salir con código 1 si hay regresiones")
+    args = parser.parse_args()
+
+    if args.real_ocr:
+        import easyocr
+        reader = easyocr.Reader(["es", "en"])
+    else:
+        reader = ReplayReader()
+
+    results = {"environment": environment(), "ocr": "easyocr" if args.real_ocr else "replay", "scenarios": {}}
+    with tempfile.TemporaryDirectory(prefix="bench_") as output_dir:
+        for name in args.scenario or list(SCENARIOS):
+            # Los métodos del escáner imprimen trazas por cada llamada
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                results["scenarios"][name] = bench_scenario(name, SCENARIOS[name], args.repeat, reader, output_dir)
+
+    print(f"{'escenario':<8} {'etapa':<22} {'mediana':>10} {'p90':>10}")
+    for name, scenario in results["scenarios"].items():
+        for stage, stats in scenario["stages"].items():
+            print(f"{name:<8} {stage:<22} {stats['median_ms']:>8.2f}ms {stats['p90_ms']:>8.2f}ms")
+
+    regressions = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("ocr") != results["ocr"]:
+            print("\n⚠️ La línea base usa otro lector OCR; no se compara")
+        else:
+            rows = compare(results, baseline, args.tolerance)
+            results["comparison"] = {"baseline_commit": baseline.get("environment", {}).get("commit"), "rows": rows}
+            print(f"\nComparación con {args.baseline} ({results['comparison']['baseline_commit']}):")
+            for row in rows:
+                flag = "  ⚠️ REGRESIÓN" if row["regression"] else ""
+                print(f"{row['scenario']:<8} {row['stage']:<22} {row['baseline_ms']:>8.2f}ms -> "
+                      f"{row['current_ms']:>8.2f}ms ({row['change'] * 100:+.1f}%){flag}")
+            regressions = [row for row in rows if row["regression"]]
+
+    if not args.no_save:
+        output = args.output or args.baseline
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {output}")
+
+    if regressions:
+        print(f"\n⚠️ {len(regressions)} etapa(s) con regresión")
+        if args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
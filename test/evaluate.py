@@ -0,0 +1,419 @@
+"""
+Evaluación de precisión frente a latencia de la configuración del escáner (sin conexión).
+
+Ejecuta ``WidgetScanner`` sobre un conjunto de capturas etiquetadas con cada
+configuración de una matriz (escala de entrada del modelo, ``confidence`` e
+``iou_threshold`` de ``model.infer``, opciones de ``readtext`` y OCR sí/no) y, para
+cada una, mide:
+
+- Precisión y exhaustividad de las detecciones por clase (emparejadas por IoU).
+- Tasa de error por carácter (CER) del OCR ya corregido (``correct_text``).
+- Exactitud de las relaciones componente/subcomponente.
+- Latencia (p50, p90, p99) de detección, relaciones y OCR.
+
+Las configuraciones que ninguna otra supera a la vez en latencia y calidad forman
+el frente de Pareto (marcadas con ``*``).
+
+Sin ``--dataset`` se usan pantallas sintéticas (``synthetic.generate_screen``) con
+un modelo que reproduce la verdad de referencia y un lector que devuelve el texto
+real de cada recorte conocido: sirve para medir el coste de cada ajuste, no la
+calidad del modelo. Un conjunto etiquetado es un directorio con cada captura
+(``.png``/``.jpg``) junto a un ``.json`` del mismo nombre con ``truth`` y
+``relations`` en el formato de ``synthetic.Screen``.
+
+Uso:
+    python test/evaluate.py                                   # Sintéticas, matriz por defecto
+    python test/evaluate.py --scale 1,0.75,0.5 --confidence 0.5,0.35 --ocr text_threshold=0.5,0.65
+    python test/evaluate.py --dataset capturas/ --model-id ui_component_flutter/14 --record grabacion.json
+    python test/evaluate.py --dataset capturas/ --replay grabacion.json --real-ocr --output evaluacion.json
+"""
+import argparse
+import contextlib
+import glob
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from lexicon import edit_distance  # noqa: E402
+from model_registry import percentile  # noqa: E402
+from scanner import WidgetScanner  # noqa: E402
+from synthetic import RecordingModel, ReplayModel, TruthReader, generate_screen  # noqa: E402
+
+# IoU mínimo para emparejar una detección con la verdad de referencia
+MATCH_IOU = 0.5
+# Percentiles de latencia del informe
+PERCENTILES = (50, 90, 99)
+
+
+def box_iou(a, b):
+    """IoU de dos cajas [x1, y1, x2, y2]."""
+    w = min(a[2], b[2]) - max(a[0], b[0])
+    h = min(a[3], b[3]) - max(a[1], b[1])
+    if w <= 0 or h <= 0:
+        return 0.0
+    inter = w * h
+    return inter / ((a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter)
+
+
+def match_detections(truth, predicted, min_iou=MATCH_IOU):
+    """
+    Empareja detecciones con la verdad de referencia (misma clase, mayor IoU primero).
+
+    Args:
+        truth (list): ``dict`` con ``class`` y ``box`` de cada widget real
+        predicted (list): ``dict`` con ``class`` y ``box`` de cada detección
+        min_iou (float): IoU mínimo de una pareja
+
+    Returns:
+        dict: Índice real -> índice detectado
+    """
+    pairs = [
+        (box_iou(t["box"], p["box"]), ti, pi)
+        for ti, t in enumerate(truth) for pi, p in enumerate(predicted)
+        if t["class"] == p["class"]
+    ]
+    matches, used = {}, set()
+    for iou, ti, pi in sorted(pairs, reverse=True):
+        if iou < min_iou:
+            break
+        if ti not in matches and pi not in used:
+            matches[ti] = pi
+            used.add(pi)
+    return matches
+
+
+def score_screen(truth, relations, predicted, predicted_relations, min_iou=MATCH_IOU):
+    """
+    Cuentas de una captura para ``summarize``.
+
+    El CER solo cuenta los widgets detectados (los no detectados ya penalizan la
+    exhaustividad), y una relación es correcta si sus dos extremos se detectaron y
+    el escáner los relacionó.
+
+    Args:
+        truth (list): Widgets reales (``class``, ``box``, ``text``)
+        relations (list): Pares ``(padre, hijo)`` reales (índices de ``truth``)
+        predicted (list): Detecciones (``class``, ``box``, ``text``)
+        predicted_relations (list): Pares ``(padre, hijo)`` del escáner (índices de ``predicted``)
+        min_iou (float): IoU mínimo para emparejar
+
+    Returns:
+        dict: ``classes`` (tp/fp/fn por clase), ``ocr`` (errores y caracteres) y
+        ``relations`` (correctas, reales y detectadas)
+    """
+    matches = match_detections(truth, predicted, min_iou)
+    classes = {}
+    for t in truth:
+        classes.setdefault(t["class"], {"tp": 0, "fp": 0, "fn": 0})["fn"] += 1
+    for p in predicted:
+        classes.setdefault(p["class"], {"tp": 0, "fp": 0, "fn": 0})["fp"] += 1
+    for ti in matches:
+        counts = classes[truth[ti]["class"]]
+        counts["tp"] += 1
+        counts["fp"] -= 1
+        counts["fn"] -= 1
+
+    errors = chars = 0
+    for ti, pi in matches.items():
+        expected = truth[ti]["text"]
+        if expected:
+            text = predicted[pi].get("text") or ""
+            errors += edit_distance(text, expected, max(len(text), len(expected)))
+            chars += len(expected)
+
+    predicted_pairs = {tuple(pair) for pair in predicted_relations}
+    correct = sum((matches.get(parent), matches.get(child)) in predicted_pairs for parent, child in relations)
+    return {
+        "classes": classes,
+        "ocr": {"errors": errors, "chars": chars},
+        "relations": {"correct": correct, "truth": len(relations), "predicted": len(predicted_pairs)},
+    }
+
+
+def summarize(scores):
+    """
+    Métricas de un conjunto de capturas a partir de sus ``score_screen``.
+
+    La exactitud de las relaciones es ``correctas / (reales + detectadas - correctas)``:
+    penaliza tanto las relaciones perdidas como las inventadas.
+
+    Returns:
+        dict: ``classes`` (precisión y exhaustividad por clase), ``precision``, ``recall``
+        y ``f1`` globales, ``cer`` (``None`` sin texto leído) y ``relation_accuracy``
+    """
+    totals = {}
+    for score in scores:
+        for name, counts in score["classes"].items():
+            total = totals.setdefault(name, {"tp": 0, "fp": 0, "fn": 0})
+            for key in total:
+                total[key] += counts[key]
+
+    def ratio(num, den):
+        return round(num / den, 4) if den else None
+
+    classes = {
+        name: {"precision": ratio(c["tp"], c["tp"] + c["fp"]), "recall": ratio(c["tp"], c["tp"] + c["fn"]), **c}
+        for name, c in sorted(totals.items())
+    }
+    tp = sum(c["tp"] for c in totals.values())
+    precision = ratio(tp, tp + sum(c["fp"] for c in totals.values())) or 0.0
+    recall = ratio(tp, tp + sum(c["fn"] for c in totals.values())) or 0.0
+    errors = sum(s["ocr"]["errors"] for s in scores)
+    chars = sum(s["ocr"]["chars"] for s in scores)
+    correct = sum(s["relations"]["correct"] for s in scores)
+    union = sum(s["relations"]["truth"] + s["relations"]["predicted"] for s in scores) - correct
+    return {
+        "classes": classes,
+        "precision": precision,
+        "recall": recall,
+        "f1": ratio(2 * precision * recall, precision + recall) or 0.0,
+        "cer": ratio(errors, chars),
+        "relation_accuracy": ratio(correct, union) if union else 1.0,
+    }
+
+
+def pareto_front(rows):
+    """
+    Índices de las filas del frente de Pareto.
+
+    Una fila queda fuera si otra no es peor en ningún objetivo (latencia p50, F1,
+    CER y exactitud de relaciones) y es mejor en alguno. Sin OCR el CER cuenta como 1.
+    """
+    def objectives(row):
+        cer = row["cer"] if row["cer"] is not None else 1.0
+        return (row["latency_ms"]["p50"], -row["f1"], cer, -row["relation_accuracy"])
+
+    points = [objectives(row) for row in rows]
+    return [
+        i for i, a in enumerate(points)
+        if not any(all(x <= y for x, y in zip(b, a)) and b != a for b in points)
+    ]
+
+
+def predict(scanner, image):
+    """
+    Detección, relaciones y OCR de una captura (lo que cambia con la configuración).
+
+    Returns:
+        list: Detecciones (``class``, ``box``, ``text``)
+        list: Pares ``(padre, hijo)`` relacionados
+    """
+    dets, _ = scanner.detect(image)
+    components, _ = scanner.resolve_relations(dets)
+    scanner.run_ocr(image, dets, scanner.ocr_targets(dets, components))
+
+    predicted = [
+        {"class": name, "box": box, "text": dets.text(i) if dets.has_text(i) else None}
+        for i, (name, box) in enumerate(zip(dets.class_names, dets.xyxy.tolist()))
+    ]
+    relations = []
+    for c_idx, subs in components:
+        if isinstance(subs, tuple):
+            cells, _, cell_texts = subs
+            relations += [(c_idx, cell) for cell in cells.tolist()]
+            relations += [(cell, text) for cell, text in zip(cells.tolist(), cell_texts.tolist()) if text >= 0]
+        else:
+            relations += [(c_idx, s_idx) for s_idx in subs.tolist()]
+    return predicted, relations
+
+
+def evaluate_config(scanner, samples, repeat=1):
+    """
+    Evalúa una configuración sobre ``samples`` (``(imagen, truth, relations)``).
+
+    Cada captura se procesa ``repeat`` veces; la calidad se mide en la primera y la
+    latencia con todas. Sin OCR no hay CER.
+
+    Returns:
+        dict: Métricas de ``summarize`` más ``latency_ms`` (percentiles en ms)
+    """
+    scores, times = [], []
+    for image, truth, relations in samples:
+        for run in range(repeat):
+            start = time.perf_counter()
+            predicted, predicted_relations = predict(scanner, image)
+            times.append((time.perf_counter() - start) * 1000)
+            if run == 0:
+                scores.append(score_screen(truth, relations, predicted, predicted_relations))
+    result = summarize(scores)
+    if scanner.skip_ocr:
+        result["cer"] = None
+    result["latency_ms"] = {f"p{q}": round(percentile(times, q), 3) for q in PERCENTILES}
+    return result
+
+
+def config_matrix(scales, confidences, ious, ocr_options, ocr_modes):
+    """
+    Producto cartesiano de los ajustes.
+
+    Args:
+        scales (list): Escalas de entrada del modelo
+        confidences (list): Valores de ``confidence``
+        ious (list): Valores de ``iou_threshold``
+        ocr_options (dict): Opción de ``readtext`` -> lista de valores
+        ocr_modes (list): ``False`` (con OCR) y/o ``True`` (sin OCR)
+
+    Returns:
+        list: Configuraciones (``scale``, ``confidence``, ``iou_threshold``, ``ocr``, ``skip_ocr``)
+    """
+    configs = []
+    names = sorted(ocr_options)
+    for scale, confidence, iou, skip_ocr in itertools.product(scales, confidences, ious, ocr_modes):
+        # Sin OCR las opciones de readtext no cambian nada
+        variants = [()] if skip_ocr else itertools.product(*(ocr_options[n] for n in names))
+        for values in variants:
+            configs.append({
+                "scale": scale, "confidence": confidence, "iou_threshold": iou,
+                "ocr": dict(zip(names, values)), "skip_ocr": skip_ocr,
+            })
+    return configs
+
+
+def config_label(config):
+    parts = [f"s={config['scale']:g}", f"conf={config['confidence']:g}", f"iou={config['iou_threshold']:g}"]
+    if config["skip_ocr"]:
+        parts.append("sin OCR")
+    parts += [f"{key}={value}" for key, value in config["ocr"].items()]
+    return " ".join(parts)
+
+
+def load_dataset(directory):
+    """
+    Capturas etiquetadas de un directorio (cada imagen con su ``.json``).
+
+    Returns:
+        list: ``(imagen, truth, relations)`` de cada captura
+    """
+    samples = []
+    for path in sorted(glob.glob(os.path.join(directory, "*"))):
+        stem, ext = os.path.splitext(path)
+        if ext.lower() not in (".png", ".jpg", ".jpeg") or not os.path.exists(stem + ".json"):
+            continue
+        with open(stem + ".json", encoding="utf-8") as f:
+            label = json.load(f)
+        samples.append((WidgetScanner.load_image(path), label["truth"], [tuple(r) for r in label["relations"]]))
+    if not samples:
+        raise FileNotFoundError(f"No hay capturas etiquetadas en {directory}")
+    return samples
+
+
+def parse_values(text, cast=float):
+    return [cast(value) for value in text.split(",")]
+
+
+def parse_ocr_options(items):
+    """``["text_threshold=0.5,0.65", ...]`` -> ``{"text_threshold": [0.5, 0.65]}`` (JSON o texto)."""
+    options = {}
+    for item in items or []:
+        key, _, values = item.partition("=")
+        parsed = []
+        for value in values.split(","):
+            try:
+                parsed.append(json.loads(value))
+            except ValueError:
+                parsed.append(value)
+        options[key] = parsed
+    return options
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precisión frente a latencia de la configuración del escáner")
+    parser.add_argument("--dataset", help="Directorio de capturas etiquetadas (por defecto, sintéticas)")
+    parser.add_argument("--screens", type=int, default=8, help="Pantallas sintéticas")
+    parser.add_argument("--model-id", help="Modelo de Roboflow (usa ROBOFLOW_API_KEY)")
+    parser.add_argument("--replay", help="Grabaciones de RecordingModel a reproducir")
+    parser.add_argument("--record", help="Guardar aquí las respuestas del modelo (con --model-id)")
+    parser.add_argument("--real-ocr", action="store_true", help="Usar EasyOCR real")
+    parser.add_argument("--scale", default="1,0.75,0.5", help="Escalas de entrada del modelo")
+    parser.add_argument("--confidence", default="0.5", help="Valores de confidence")
+    parser.add_argument("--iou", default="0.7", help="Valores de iou_threshold")
+    parser.add_argument("--ocr", action="append", metavar="OPCIÓN=V1,V2",
+                        help="Valores de una opción de readtext (se puede repetir)")
+    parser.add_argument("--skip-ocr", choices=("no", "yes", "both"), default="both",
+                        help="Evaluar con OCR, sin OCR o ambos")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por captura para la latencia")
+    parser.add_argument("--per-class", action="store_true", help="Mostrar precisión y exhaustividad por clase")
+    parser.add_argument("--output", help="Archivo JSON de resultados")
+    args = parser.parse_args()
+
+    ocr_modes = {"no": [False], "yes": [True], "both": [False, True]}[args.skip_ocr]
+    configs = config_matrix(parse_values(args.scale), parse_values(args.confidence), parse_values(args.iou),
+                            parse_ocr_options(args.ocr), ocr_modes)
+
+    if args.dataset:
+        samples = load_dataset(args.dataset)
+        if args.replay:
+            model = ReplayModel.load(args.replay)
+        elif args.model_id:
+            from inference import get_model
+            model = get_model(model_id=args.model_id, api_key=os.getenv("ROBOFLOW_API_KEY"))
+            if args.record:
+                model = RecordingModel(model)
+        else:
+            parser.error("--dataset necesita --model-id o --replay")
+        if not args.real_ocr:
+            parser.error("--dataset necesita --real-ocr (el lector sintético solo conoce las pantallas generadas)")
+    else:
+        screens = [generate_screen(widgets=12, table_rows=4 if i % 2 else 0, seed=i) for i in range(args.screens)]
+        samples = [(s.image, s.truth, s.relations) for s in screens]
+        model = ReplayModel()
+        for screen in screens:
+            for scale in {c["scale"] for c in configs}:
+                model.add_screen(screen, WidgetScanner.scale_input(screen.image, scale) if scale != 1 else None)
+
+    if args.real_ocr:
+        import easyocr
+        reader = easyocr.Reader(["es", "en"])
+    else:
+        reader = TruthReader.from_screens(screens, WidgetScanner.ocr_input)
+
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="eval_") as output_dir:
+        for config in configs:
+            scanner = WidgetScanner(
+                "eval/1", None, output_dir=output_dir, model=model, reader=reader,
+                inference_config={"confidence": config["confidence"], "iou_threshold": config["iou_threshold"]},
+                ocr_config=config["ocr"], input_scale=config["scale"], skip_ocr=config["skip_ocr"]
+            )
+            # Los métodos del escáner imprimen trazas por cada llamada
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                rows.append({"config": config, "label": config_label(config),
+                             **evaluate_config(scanner, samples, args.repeat)})
+    if args.record and isinstance(model, RecordingModel):
+        model.save(args.record)
+        print(f"Respuestas del modelo guardadas en {args.record}")
+
+    front = set(pareto_front(rows))
+    width = max(len(row["label"]) for row in rows)
+    print(f"  {'configuración':<{width}} {'prec.':>6} {'exh.':>6} {'F1':>6} {'CER':>6} {'rel.':>6} "
+          f"{'p50':>9} {'p90':>9} {'p99':>9}")
+    for i, row in enumerate(rows):
+        cer = f"{row['cer']:.3f}" if row["cer"] is not None else "-"
+        latency = row["latency_ms"]
+        print(f"{'*' if i in front else ' '} {row['label']:<{width}} {row['precision']:>6.3f} {row['recall']:>6.3f} "
+              f"{row['f1']:>6.3f} {cer:>6} {row['relation_accuracy']:>6.3f} {latency['p50']:>7.2f}ms "
+              f"{latency['p90']:>7.2f}ms {latency['p99']:>7.2f}ms")
+        row["pareto"] = i in front
+        if args.per_class:
+            for name, stats in row["classes"].items():
+                precision = "-" if stats["precision"] is None else f"{stats['precision']:.3f}"
+                recall = "-" if stats["recall"] is None else f"{stats['recall']:.3f}"
+                print(f"      {name:<20} precisión {precision:>6}  exhaustividad {recall:>6}")
+    print("\n* frente de Pareto (latencia p50, F1, CER, relaciones)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"samples": len(samples), "ocr": "easyocr" if args.real_ocr else "truth", "results": rows},
+                      f, indent=2, ensure_ascii=False)
+        print(f"Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
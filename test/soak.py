@@ -0,0 +1,199 @@
+"""
+Prueba de resistencia (soak) de memoria: miles de escaneos sintéticos seguidos.
+
+Registra la curva de memoria cada ``--every`` escaneos en un CSV y, al terminar,
+la pendiente de crecimiento del RSS tras el calentamiento (KiB cada 100 escaneos):
+si sigue subiendo con un número de pantallas distintas acotado, hay una fuga o
+fragmentación. ``--trim`` llama a ``malloc_trim`` tras cada escaneo: si así la
+pendiente desaparece, el crecimiento es fragmentación del heap y no una fuga.
+
+Modos:
+
+- Local (por defecto): ``WidgetScanner`` en este proceso con detecciones
+  reproducidas y un lector OCR de reemplazo (o EasyOCR con ``--real-ocr``); con
+  ``--tracemalloc`` registra también la memoria de Python/NumPy.
+- Remoto (``--url``): envía las capturas a ``/api/scan`` de un servidor en marcha y
+  lee la memoria de cada worker en ``/api/metrics`` (una curva por PID).
+
+Uso:
+    python test/soak.py --scans 5000 --every 100 --output soak.csv
+    python test/soak.py --scans 5000 --trim --tracemalloc
+    python test/soak.py --url http://localhost:8000 --scans 20000 --concurrency 4
+"""
+import argparse
+import contextlib
+import csv
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import memory  # noqa: E402
+from synthetic import ReplayModel, ReplayReader, generate_screen  # noqa: E402
+
+MIB = 2 ** 20
+
+
+def growth_per_100(samples, warmup=0.2):
+    """
+    Pendiente del RSS (KiB cada 100 escaneos) por mínimos cuadrados, sin el calentamiento.
+
+    Args:
+        samples (list): ``(escaneos, rss_bytes)``
+        warmup (float): Fracción inicial de las muestras que se descarta
+
+    Returns:
+        float: KiB por cada 100 escaneos (``None`` con menos de 3 muestras)
+    """
+    samples = samples[int(len(samples) * warmup):]
+    if len(samples) < 3:
+        return None
+    x = np.array([s[0] for s in samples], dtype=np.float64)
+    y = np.array([s[1] for s in samples], dtype=np.float64)
+    return float(np.polyfit(x, y, 1)[0] * 100 / 1024)
+
+
+def screen_images(count, widgets):
+    """Pantallas sintéticas distintas (la mitad con tabla)."""
+    return [generate_screen(widgets=widgets, table_rows=6 if i % 2 else 0, seed=i) for i in range(count)]
+
+
+def run_local(args, screens, writer):
+    from scanner import WidgetScanner
+    from storage import OutputStore
+
+    if args.real_ocr:
+        import easyocr
+        reader = easyocr.Reader(["es", "en"])
+    else:
+        reader = ReplayReader()
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    samples = []
+    with tempfile.TemporaryDirectory(prefix="soak_") as work_dir:
+        paths = []
+        for i, screen in enumerate(screens):
+            paths.append(os.path.join(work_dir, f"screen_{i}.png"))
+            cv2.imwrite(paths[-1], screen.image)
+        # Los archivos generados no deben llenar el disco durante miles de escaneos
+        store = OutputStore(os.path.join(work_dir, "out"), max_bytes=64 * MIB)
+        scanner = WidgetScanner("soak/1", None, output_dir=store, model=ReplayModel.from_screens(screens),
+                                reader=reader)
+        start = time.monotonic()
+        for n in range(1, args.scans + 1):
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                scanner.scan(paths[n % len(paths)])
+            if args.trim:
+                memory.trim()
+            if n % args.every == 0 or n == args.scans:
+                store.sweep()
+                rss = memory.rss_bytes()
+                traced = tracemalloc.get_traced_memory()[0] if args.tracemalloc else None
+                writer.writerow([n, round(time.monotonic() - start, 2), os.getpid(), round(rss / MIB, 2),
+                                 round(memory.peak_rss_bytes() / MIB, 2), "",
+                                 round(traced / MIB, 2) if traced is not None else ""])
+                samples.append((n, rss))
+                print(f"{n:>7} escaneos  RSS {rss / MIB:8.1f} MiB"
+                      + (f"  tracemalloc {traced / MIB:7.1f} MiB" if traced is not None else ""))
+    return {os.getpid(): samples}
+
+
+def multipart(image_bytes, filename):
+    boundary = uuid.uuid4().hex
+    body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{filename}\"\r\n"
+            f"Content-Type: image/png\r\n\r\n").encode() + image_bytes + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def run_remote(args, screens, writer):
+    url = args.url.rstrip("/")
+    bodies = [multipart(cv2.imencode(".png", s.image)[1].tobytes(), f"soak_{i}.png") for i, s in enumerate(screens)]
+    samples = {}
+    errors = 0
+    lock = threading.Lock()
+    start = time.monotonic()
+
+    def scan(n):
+        body, content_type = bodies[n % len(bodies)]
+        request = urllib.request.Request(f"{url}/api/scan", data=body, headers={"Content-Type": content_type})
+        with urllib.request.urlopen(request, timeout=args.timeout) as response:
+            response.read()
+
+    def sample(n):
+        # Cada petición la atiende un worker cualquiera: se muestrea varias veces para ver a todos
+        for _ in range(args.workers_hint):
+            with urllib.request.urlopen(f"{url}/api/metrics", timeout=args.timeout) as response:
+                metrics = json.load(response)
+            mem = metrics.get("memory") or {}
+            if mem.get("rss") is None:
+                continue
+            children = sum(v for v in (mem.get("children") or {}).values() if v)
+            traced = (mem.get("tracemalloc") or {}).get("current")
+            with lock:
+                writer.writerow([n, round(time.monotonic() - start, 2), metrics["pid"], round(mem["rss"] / MIB, 2),
+                                 round((mem.get("peak_rss") or 0) / MIB, 2), round(children / MIB, 2),
+                                 round(traced / MIB, 2) if traced is not None else ""])
+                samples.setdefault(metrics["pid"], []).append((n, mem["rss"]))
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for first in range(0, args.scans, args.every):
+            batch = range(first, min(first + args.every, args.scans))
+            for future in [pool.submit(scan, n) for n in batch]:
+                try:
+                    future.result()
+                except Exception as e:
+                    errors += 1
+                    print(f"⚠️ Error en el escaneo: {str(e)}")
+            sample(batch[-1] + 1)
+            print(f"{batch[-1] + 1:>7} escaneos  workers vistos {len(samples)}  errores {errors}")
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de resistencia de memoria del escáner")
+    parser.add_argument("--scans", type=int, default=2000, help="Escaneos totales")
+    parser.add_argument("--every", type=int, default=50, help="Escaneos entre muestras de memoria")
+    parser.add_argument("--screens", type=int, default=20, help="Pantallas sintéticas distintas")
+    parser.add_argument("--widgets", type=int, default=20, help="Widgets por pantalla")
+    parser.add_argument("--output", default="soak.csv", help="Archivo CSV con la curva de memoria")
+    parser.add_argument("--url", help="Servidor a probar (por defecto, escáner local)")
+    parser.add_argument("--concurrency", type=int, default=2, help="Peticiones simultáneas (modo remoto)")
+    parser.add_argument("--workers-hint", type=int, default=4,
+                        help="Lecturas de /api/metrics por muestra (modo remoto)")
+    parser.add_argument("--timeout", type=float, default=120, help="Timeout de cada petición (segundos)")
+    parser.add_argument("--real-ocr", action="store_true", help="Usar EasyOCR real (modo local)")
+    parser.add_argument("--tracemalloc", action="store_true", help="Registrar la memoria de Python (modo local)")
+    parser.add_argument("--trim", action="store_true", help="malloc_trim tras cada escaneo (modo local)")
+    args = parser.parse_args()
+
+    screens = screen_images(args.screens, args.widgets)
+    with open(args.output, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["scans", "seconds", "pid", "rss_mib", "peak_rss_mib", "children_mib", "traced_mib"])
+        samples = (run_remote if args.url else run_local)(args, screens, writer)
+
+    print(f"\nCurva de memoria guardada en {args.output}")
+    for pid, points in samples.items():
+        growth = growth_per_100(points)
+        if growth is None:
+            continue
+        print(f"  PID {pid}: RSS {points[0][1] / MIB:.1f} -> {points[-1][1] / MIB:.1f} MiB, "
+              f"crecimiento tras el calentamiento {growth:+.1f} KiB / 100 escaneos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+Capturas sintéticas de pantallas Flutter y modelos de reemplazo para pruebas sin conexión.
+
+- ``generate_screen``: dibuja una pantalla (AppBar, campos, botones, casillas, textos
+  y una tabla opcional) y devuelve las predicciones y textos reales de cada widget.
+- ``ReplayModel``: sustituye a ``model.infer`` devolviendo detecciones grabadas.
+- ``RecordingModel``: envuelve un modelo real y graba sus detecciones para reproducirlas.
+- ``ReplayReader``: lector OCR que devuelve un texto fijo.
+- ``TruthReader``: lector OCR que devuelve el texto real de cada recorte conocido.
+- ``BusyReader``: lector OCR que simula el coste de CPU de EasyOCR.
+"""
+import hashlib
+import json
+import random
+import time
+
+import cv2
+import numpy as np
+
+# Textos de ejemplo para los widgets
+WORDS = ["Nombre", "Apellido", "Correo", "Contraseña", "Usuario", "Guardar", "Editar", "Enviar", "Buscar",
+         "Ciudad", "Edad", "Dirección", "Producto", "Cantidad", "Registro", "Cuenta", "Idioma", "Consulta"]
+
+WHITE = (255, 255, 255)
+BLACK = (20, 20, 20)
+GREY = (150, 150, 150)
+BLUE = (200, 120, 30)
+
+
+class Screen:
+    """
+    Pantalla sintética.
+
+    Atributos:
+        image (numpy.ndarray): Captura BGR
+        predictions (list): Predicciones en el formato de Roboflow (``x``, ``y``, ``width``, ``height``, ``class``...)
+        truth (list): Un ``dict`` por predicción con ``class``, ``box`` [x1, y1, x2, y2] y ``text`` (o ``None``)
+        relations (list): Pares ``(índice_padre, índice_hijo)`` de las predicciones relacionadas
+    """
+
+    __slots__ = ("image", "predictions", "truth", "relations")
+
+    def __init__(self, image):
+        self.image = image
+        self.predictions = []
+        self.truth = []
+        self.relations = []
+
+    def add(self, class_name, box, text=None, confidence=0.9, parent=None):
+        """Registra un widget; devuelve su índice."""
+        x1, y1, x2, y2 = (int(v) for v in box)
+        index = len(self.predictions)
+        self.predictions.append({
+            "x": (x1 + x2) / 2, "y": (y1 + y2) / 2, "width": x2 - x1, "height": y2 - y1,
+            "confidence": confidence, "class": class_name, "class_id": 0,
+            "detection_id": f"{class_name}-{index}",
+        })
+        self.truth.append({"class": class_name, "box": [x1, y1, x2, y2], "text": text})
+        if parent is not None:
+            self.relations.append((parent, index))
+        return index
+
+    def inference_result(self):
+        """Resultado de ``model.infer`` para esta pantalla."""
+        h, w = self.image.shape[:2]
+        return {"predictions": self.predictions, "image": {"width": w, "height": h}}
+
+
+def _text(image, text, x, y, scale=0.8, color=BLACK):
+    """Dibuja un texto y devuelve su caja [x1, y1, x2, y2] (``y`` es la línea base)."""
+    (w, h), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, 2)
+    cv2.putText(image, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX, scale, color, 2, cv2.LINE_AA)
+    return [x - 2, y - h - 4, x + w + 2, y + baseline + 2]
+
+
+def generate_screen(width=1080, height=1920, widgets=12, table_rows=0, table_columns=4, seed=0):
+    """
+    Genera una captura sintética con su verdad de referencia.
+
+    Los widgets se apilan en una columna (como un formulario Flutter) y la tabla, si
+    se pide, va al final; si no caben, la pantalla crece en altura.
+
+    Args:
+        width (int): Ancho de la captura
+        height (int): Alto mínimo de la captura
+        widgets (int): Número de widgets (campos, botones, casillas y textos) sin contar el AppBar
+        table_rows (int): Filas de la tabla (0 = sin tabla)
+        table_columns (int): Columnas de la tabla
+        seed (int): Semilla (misma semilla = misma pantalla)
+
+    Returns:
+        Screen: Captura, predicciones, textos y relaciones
+    """
+    rng = random.Random(seed)
+    needed = 160 + widgets * 130 + (table_rows * 60 + 40 if table_rows else 0)
+    screen = Screen(np.full((max(height, needed), width, 3), 245, dtype=np.uint8))
+    image = screen.image
+    margin = 40
+
+    # AppBar con icono y título
+    cv2.rectangle(image, (0, 0), (width, 120), BLUE, -1)
+    appbar = screen.add("AppBar", [0, 0, width, 120])
+    cv2.rectangle(image, (30, 35), (80, 85), WHITE, 3)
+    screen.add("AppBar_icon", [25, 30, 85, 90], parent=appbar)
+    title = rng.choice(WORDS)
+    screen.add("AppBar_title", _text(image, title, 120, 75, 1.2, WHITE), title, parent=appbar)
+
+    y = 160
+    kinds = ["TextField", "button", "checkbox", "Text"]
+    for _ in range(widgets):
+        kind = rng.choice(kinds)
+        word = rng.choice(WORDS)
+        if kind == "TextField":
+            label_box = _text(image, word + ":", margin, y + 25, 0.8)
+            field = [margin, y + 40, width - margin, y + 110]
+            cv2.rectangle(image, tuple(field[:2]), tuple(field[2:]), GREY, 2)
+            parent = screen.add("TextField", field)
+            screen.add("texfield_label", label_box, word + ":", parent=parent)
+            hint = f"Ingrese {word.lower()}"
+            screen.add("texfield_hinttext", _text(image, hint, margin + 20, y + 85, 0.8, GREY), hint, parent=parent)
+        elif kind == "button":
+            button = [margin, y + 20, margin + 360, y + 100]
+            cv2.rectangle(image, tuple(button[:2]), tuple(button[2:]), BLUE, -1)
+            parent = screen.add("button", button)
+            screen.add("button_text", _text(image, word, margin + 40, y + 72, 1.0, WHITE), word, parent=parent)
+        elif kind == "checkbox":
+            box = [margin, y + 30, margin + 50, y + 80]
+            cv2.rectangle(image, tuple(box[:2]), tuple(box[2:]), BLACK, 3)
+            parent = screen.add("checkbox", [margin - 5, y + 25, margin + 400, y + 85])
+            screen.add("checkbox_text", _text(image, word, margin + 70, y + 68, 0.9), word, parent=parent)
+        else:
+            screen.add("Text", _text(image, word, margin, y + 70, 1.0), word)
+        y += 130
+
+    if table_rows:
+        top = y + 20
+        cell_width = (width - 2 * margin) // table_columns
+        bottom = top + table_rows * 60
+        table = screen.add("Table", [margin - 5, top - 5, margin + cell_width * table_columns + 5, bottom + 5])
+        for r in range(table_rows):
+            for c in range(table_columns):
+                x1, y1 = margin + c * cell_width, top + r * 60
+                cv2.rectangle(image, (x1, y1), (x1 + cell_width, y1 + 60), GREY, 1)
+                cell = screen.add("celda", [x1 + 2, y1 + 2, x1 + cell_width - 2, y1 + 58], parent=table)
+                word = rng.choice(WORDS) if r else f"Col {c + 1}"
+                screen.add("celda_text", _text(image, word, x1 + 10, y1 + 40, 0.7), word, parent=cell)
+
+    return screen
+
+
+def image_key(image):
+    """Clave de una imagen para las grabaciones (hash de sus píxeles y su forma)."""
+    image = np.ascontiguousarray(image)
+    return hashlib.sha1(str(image.shape).encode() + image.tobytes()).hexdigest()
+
+
+class ReplayModel:
+    """
+    Modelo de reemplazo que devuelve detecciones grabadas (``infer`` como el de Roboflow).
+
+    Las grabaciones se buscan por el contenido de la imagen; una imagen desconocida
+    (por ejemplo, un recorte) devuelve ``default`` o, si es ``None``, lanza ``KeyError``.
+    Como el modelo real, descarta las predicciones por debajo de ``confidence``.
+    """
+
+    def __init__(self, recordings=None, default=None):
+        """
+        Args:
+            recordings (dict): Clave de imagen (``image_key``) -> resultado de ``infer``
+            default (list): Predicciones para imágenes desconocidas (``None`` = error)
+        """
+        self.recordings = dict(recordings or {})
+        self.default = default
+        self.calls = 0
+
+    @classmethod
+    def from_screens(cls, screens, default=None):
+        """Modelo que reproduce la verdad de referencia de pantallas sintéticas."""
+        return cls({image_key(s.image): s.inference_result() for s in screens}, default)
+
+    def add_screen(self, screen, image=None):
+        """
+        Graba la verdad de referencia de una pantalla para ``image`` (por defecto, su captura).
+
+        Con una versión reescalada de la captura las coordenadas se escalan a su tamaño,
+        como si el modelo hubiera recibido esa imagen.
+        """
+        image = screen.image if image is None else image
+        h, w = screen.image.shape[:2]
+        sx, sy = image.shape[1] / w, image.shape[0] / h
+        predictions = [
+            {**p, "x": p["x"] * sx, "y": p["y"] * sy, "width": p["width"] * sx, "height": p["height"] * sy}
+            for p in screen.predictions
+        ]
+        self.recordings[image_key(image)] = {
+            "predictions": predictions, "image": {"width": image.shape[1], "height": image.shape[0]}
+        }
+
+    @classmethod
+    def load(cls, path, default=None):
+        """Carga grabaciones guardadas por ``RecordingModel.save``."""
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f), default)
+
+    def infer(self, image, **kwargs):
+        self.calls += 1
+        result = self.recordings.get(image_key(image))
+        if result is None:
+            if self.default is None:
+                raise KeyError("Imagen sin detecciones grabadas")
+            h, w = image.shape[:2]
+            result = {"predictions": self.default, "image": {"width": w, "height": h}}
+        confidence = kwargs.get("confidence")
+        if confidence is not None:
+            result = {**result, "predictions": [p for p in result["predictions"] if p["confidence"] >= confidence]}
+        return [result]
+
+
+class RecordingModel:
+    """Envuelve un modelo real y graba sus resultados para reproducirlos con ``ReplayModel``."""
+
+    def __init__(self, model):
+        self.model = model
+        self.recordings = {}
+
+    def infer(self, image, **kwargs):
+        results = self.model.infer(image, **kwargs)
+        result = results[0]
+        if hasattr(result, "dict"):
+            result = result.dict(by_alias=True, exclude_none=True)
+        self.recordings[image_key(image)] = result
+        return results
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.recordings, f)
+
+
+class ReplayReader:
+    """
+    Lector OCR de reemplazo (``readtext`` como el de EasyOCR).
+
+    Devuelve siempre ``text``; es determinista y su coste es despreciable, de modo
+    que los benchmarks miden el código del escáner y no el OCR.
+    """
+
+    def __init__(self, text="Nombre"):
+        self.text = text
+        self.calls = 0
+
+    def readtext(self, image, **kwargs):
+        self.calls += 1
+        return [self.text]
+
+
+class TruthReader:
+    """
+    Lector OCR que devuelve el texto real de cada recorte de una pantalla sintética.
+
+    Los textos se buscan por el contenido del recorte ya preprocesado, así que solo
+    se "leen" las cajas idénticas a las de la verdad de referencia; cualquier otra
+    (desplazada por un reescalado, por ejemplo) se lee vacía.
+    """
+
+    def __init__(self, texts=None):
+        """
+        Args:
+            texts (dict): Clave del recorte (``image_key``) -> texto
+        """
+        self.texts = dict(texts or {})
+        self.calls = 0
+
+    @classmethod
+    def from_screens(cls, screens, prepare):
+        """
+        Args:
+            screens (list): Pantallas sintéticas
+            prepare (callable): Recibe ``(imagen, caja)`` y devuelve el recorte que se pasa a
+                ``readtext`` (``WidgetScanner.ocr_input``)
+        """
+        return cls({image_key(prepare(s.image, t["box"])): t["text"]
+                    for s in screens for t in s.truth if t["text"]})
+
+    def readtext(self, image, **kwargs):
+        self.calls += 1
+        text = self.texts.get(image_key(image))
+        return [text] if text else []
+
+
+class BusyReader:
+    """
+    Lector OCR que ocupa la CPU ``milliseconds`` por lectura sin soltar el GIL.
+
+    Simula el coste de EasyOCR para medir el paralelismo (hilos frente a procesos)
+    sin descargar modelos. Para ``ocr_pool.OCRPool`` se usa como fábrica con
+    ``functools.partial(BusyReader, milliseconds)``.
+    """
+
+    def __init__(self, milliseconds=20.0, languages=None, text="Nombre"):
+        self.milliseconds = milliseconds
+        self.text = text
+
+    def readtext(self, image, **kwargs):
+        end = time.perf_counter() + self.milliseconds / 1000
+        while time.perf_counter() < end:
+            pass
+        return [self.text]
@@ -0,0 +1,65 @@
+import contextlib
+import os
+
+import numpy as np
+
+from evaluate import evaluate_config, match_detections, pareto_front, score_screen, summarize
+from scanner import WidgetScanner
+from synthetic import ReplayModel, TruthReader, generate_screen
+
+
+def test_emparejado_y_metricas():
+    truth = [
+        {"class": "button", "box": [0, 0, 100, 40], "text": None},
+        {"class": "button_text", "box": [10, 10, 90, 30], "text": "Guardar"},
+        {"class": "Text", "box": [0, 100, 100, 130], "text": "Nombre"},
+    ]
+    predicted = [
+        {"class": "button", "box": [2, 0, 100, 42], "text": None},
+        {"class": "button_text", "box": [10, 10, 90, 30], "text": "Guarder"},
+        {"class": "Text", "box": [0, 300, 100, 330], "text": "Edad"},  # Lejos: falso positivo
+    ]
+    assert match_detections(truth, predicted) == {0: 0, 1: 1}
+    score = score_screen(truth, [(0, 1)], predicted, [(0, 1), (0, 2)])
+    assert score["classes"]["Text"] == {"tp": 0, "fp": 1, "fn": 1}
+    assert score["ocr"] == {"errors": 1, "chars": 7}
+    metrics = summarize([score])
+    assert (metrics["precision"], metrics["recall"]) == (0.6667, 0.6667)
+    assert metrics["classes"]["button"]["precision"] == 1.0
+    assert metrics["cer"] == round(1 / 7, 4)
+    # Una relación correcta y una inventada
+    assert metrics["relation_accuracy"] == 0.5
+
+
+def test_frente_de_pareto():
+    rows = [
+        {"latency_ms": {"p50": 100}, "f1": 0.95, "cer": 0.05, "relation_accuracy": 0.9},
+        {"latency_ms": {"p50": 60}, "f1": 0.93, "cer": 0.05, "relation_accuracy": 0.9},
+        {"latency_ms": {"p50": 70}, "f1": 0.90, "cer": 0.06, "relation_accuracy": 0.9},  # Peor que la anterior
+        {"latency_ms": {"p50": 20}, "f1": 0.93, "cer": None, "relation_accuracy": 0.9},  # Sin OCR
+    ]
+    assert pareto_front(rows) == [0, 1, 3]
+
+
+def test_escala_de_entrada(tmp_path):
+    screen = generate_screen(widgets=6, seed=2)
+    model = ReplayModel.from_screens([screen])
+    model.add_screen(screen, WidgetScanner.scale_input(screen.image, 0.7))
+    reader = TruthReader.from_screens([screen], WidgetScanner.ocr_input)
+    samples = [(screen.image, screen.truth, screen.relations)]
+
+    results = {}
+    for scale in (1.0, 0.7):
+        scanner = WidgetScanner("eval/1", None, output_dir=str(tmp_path), model=model, reader=reader,
+                                input_scale=scale)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            results[scale] = evaluate_config(scanner, samples)
+        assert results[scale]["recall"] == 1.0
+        # Las cajas vuelven a la escala original
+        boxes = np.array([t["box"] for t in screen.truth])
+        assert np.abs(scanner.infer(screen.image).xyxy - boxes).max() <= 1.0
+    assert results[0.7]["cer"] == results[1.0]["cer"]
+
+    scanner = WidgetScanner("eval/1", None, output_dir=str(tmp_path), model=model, reader=reader, skip_ocr=True)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        assert evaluate_config(scanner, samples)["cer"] is None
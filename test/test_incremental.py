@@ -0,0 +1,64 @@
+import numpy as np
+
+import incremental
+from detections import DetectionSet
+
+
+def detections(boxes, names, texts=None):
+    dets = DetectionSet(np.array(boxes, dtype=np.float32), np.full(len(boxes), 0.9), np.zeros(len(boxes)), names)
+    for i, text in enumerate(texts or []):
+        if text is not None:
+            dets.set_text(i, text)
+    return dets
+
+
+def test_regiones_cambiadas():
+    previous = np.full((200, 100, 3), 255, np.uint8)
+    current = previous.copy()
+    current[50:60, 20:40] = 0      # Cambio real
+    current[54:58, 45:50] = 0      # Cambio cercano: se une al anterior
+    current[150, 90] = 0           # Ruido de un píxel: se ignora
+
+    regions = incremental.changed_regions(previous, current, margin=4)
+    assert regions.tolist() == [[16, 46, 54, 64]]
+    assert incremental.area_fraction(regions, current.shape) == (38 * 18) / (200 * 100)
+
+
+def test_sin_cambios():
+    image = np.zeros((50, 50, 3), np.uint8)
+    assert incremental.changed_regions(image, image).shape == (0, 4)
+
+
+def test_clasificar_detecciones():
+    dets = detections([[0, 0, 100, 20], [10, 50, 90, 70], [0, 40, 100, 100]], ["AppBar", "button", "TextField"])
+    keep, stale = incremental.split_detections(dets, np.array([[5, 45, 95, 75]]))
+    assert keep.tolist() == [True, False, True]
+    assert stale.tolist() == [False, False, True]
+
+
+def test_detecciones_cortadas_por_el_recorte():
+    xyxy = np.array([[15, 15, 40, 40], [0, 30, 20, 50], [60, 60, 100, 98]], dtype=np.float32)
+    # La región llega al borde derecho/inferior de la imagen (100x100): esos bordes no cortan
+    ok = incremental.inside_region(xyxy, (10, 10, 100, 100), (100, 100, 3))
+    assert ok.tolist() == [True, False, True]
+
+
+def test_diferencias_entre_escaneos():
+    previous = detections([[0, 0, 100, 20], [10, 50, 90, 70], [10, 80, 90, 90]],
+                          ["AppBar_title", "button_text", "Text"], ["Inicio", "Guardar", "Hola"])
+    current = detections([[0, 0, 100, 20], [11, 51, 90, 70], [10, 120, 90, 140]],
+                         ["AppBar_title", "button_text", "Text"], ["Inicio", "Enviar", "Nuevo"])
+
+    changes = incremental.diff_detections(previous, current)
+    assert [c["change"] for c in changes] == ["text_changed", "removed", "added"]
+    assert changes[0]["previous_text"] == "Guardar" and changes[0]["text"] == "Enviar"
+    assert changes[2]["text"] == "Nuevo"
+
+
+def test_reconstruir_desde_layout():
+    layout = [{"type": "button", "coordinates": {"x1": 0, "y1": 0, "x2": 50, "y2": 20}, "confidence": 0.8,
+               "children": [{"type": "button_text", "coordinates": {"x1": 5, "y1": 5, "x2": 45, "y2": 15},
+                             "confidence": 0.7, "text": "OK"}]}]
+    dets = DetectionSet.from_layout(layout)
+    assert dets.class_names == ["button", "button_text"]
+    assert dets.text(0) is None and dets.text(1) == "OK"
@@ -0,0 +1,122 @@
+import io
+import tracemalloc
+
+import cv2
+import numpy as np
+import pytest
+
+from ingest import REDUCED_FLAGS, ImageIngest, UploadRejected, image_size
+from scanner import WidgetScanner
+from storage import OutputStore
+from synthetic import ReplayModel, ReplayReader, generate_screen
+
+
+def encoded(fmt, width, height, seed=0):
+    image = (np.random.default_rng(seed).random((height, width, 3)) * 255).astype(np.uint8)
+    return cv2.imencode(f".{fmt}", image)[1].tobytes()
+
+
+def test_dimensiones_de_la_cabecera():
+    assert image_size(encoded("png", 300, 200)) == ("png", 300, 200)
+    jpeg = encoded("jpg", 320, 240)
+    # Un segmento APP1 (EXIF) antes del SOF no impide leer las dimensiones
+    exif = b"\xff\xe1" + (2 + 5000).to_bytes(2, "big") + b"\x00" * 5000
+    assert image_size(jpeg) == ("jpeg", 320, 240)
+    assert image_size(jpeg[:2] + exif + jpeg[2:]) == ("jpeg", 320, 240)
+    assert image_size(jpeg[:2] + exif[:100]) is None
+    assert image_size(b"GIF89a" + b"\x00" * 20) is None
+
+
+def test_limites_de_la_subida(tmp_path):
+    store = OutputStore(str(tmp_path))
+    png = encoded("png", 400, 300)
+    with pytest.raises(UploadRejected) as error:
+        ImageIngest(max_bytes=len(png) - 1).receive(io.BytesIO(png), store, ".png")
+    assert error.value.status == 413
+    with pytest.raises(UploadRejected):
+        ImageIngest(max_pixels=100_000).receive(io.BytesIO(png), store, ".png")
+    with pytest.raises(UploadRejected) as error:
+        ImageIngest().receive(io.BytesIO(b"no es una imagen" * 100), store, ".png")
+    assert error.value.status == 400
+    # Los rechazos no dejan archivos en el almacén
+    assert not [p for p in tmp_path.rglob("*") if p.is_file()]
+
+    ingest = ImageIngest()
+    path, plan = ingest.receive(io.BytesIO(png), store, ".png")
+    assert (plan.width, plan.height, plan.factor, plan.file_bytes) == (400, 300, 1, len(png))
+    with open(path, "rb") as f:
+        assert f.read() == png
+    assert ingest.stats()["accepted"] == 1 and ingest.stats()["rejected"] == 0
+
+
+def test_decodificacion_reducida(tmp_path):
+    path = str(tmp_path / "captura.jpg")
+    with open(path, "wb") as f:
+        f.write(encoded("jpg", 2000, 1500))
+
+    full, plan = ImageIngest().decode(path)
+    assert full.shape == (1500, 2000, 3) and plan.factor == 1
+    tracemalloc.start()
+    try:
+        image, plan = ImageIngest(working_side=480).decode(path)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert image.shape == (375, 500, 3)
+    assert plan.as_dict()["scale"] == 0.25 and plan.reason == "working"
+    assert peak < full.nbytes / 4 and image.nbytes <= plan.peak_bytes
+
+    # Con límite de memoria un JPEG se reduce hasta caber; un PNG (sin decodificación reducida) se rechaza
+    limit = 3 * 2 ** 20
+    plan = ImageIngest(max_decode_bytes=limit).plan("jpeg", 2000, 1500, file_bytes=500_000)
+    assert plan.factor == 2 and plan.reason == "memory" and plan.peak_bytes <= limit
+    with pytest.raises(UploadRejected):
+        ImageIngest(max_decode_bytes=limit).plan("png", 2000, 1500, file_bytes=500_000)
+
+
+def _layout_boxes(report):
+    boxes, stack = [], list(report["layout"])
+    while stack:
+        node = stack.pop()
+        boxes.append((node["type"], tuple(node["coordinates"][k] for k in ("x1", "y1", "x2", "y2"))))
+        stack.extend(node.get("children", []))
+    return sorted(boxes)
+
+
+def test_coordenadas_en_la_imagen_subida(tmp_path):
+    screen = generate_screen(widgets=8, seed=4)
+    h, w = screen.image.shape[:2]
+    path = str(tmp_path / "captura.png")
+    cv2.imwrite(path, cv2.resize(screen.image, (w * 2, h * 2), interpolation=cv2.INTER_NEAREST))
+    ingest = ImageIngest(working_side=1000)
+    decoded, plan = ingest.decode(path)
+    assert plan.factor == 2
+    model = ReplayModel(default=[])
+    model.add_screen(screen, image=decoded)
+    scanner = WidgetScanner("test/1", None, output_dir=str(tmp_path / "output"), model=model,
+                            reader=ReplayReader(), ingest=ingest)
+
+    # El escaneo se hace a la mitad, pero el reporte está en la imagen subida
+    reduced = scanner.scan_array(decoded).report
+    report = scanner.scan(path).report
+    assert report["metadata"]["ingest"]["factor"] == 2
+    assert _layout_boxes(report) == [(t, tuple(v * 2 for v in box)) for t, box in _layout_boxes(reduced)]
+
+    # Las regiones se piden y se devuelven en la imagen subida
+    roi = scanner.scan(path, regions=[[0, 0, w * 2, 400]]).report
+    assert roi["metadata"]["roi"]["regions"] == [[0, 0, w * 2, 400]]
+
+    # El re-escaneo incremental reutiliza las cajas del reporte anterior sin cambiar su escala
+    result, changes = scanner.scan_incremental(path, report)
+    assert not result.report["metadata"]["incremental"]["full_rescan"]
+    assert result.report["metadata"]["incremental"]["reused"] == len(_layout_boxes(report))
+    assert _layout_boxes(result.report) == _layout_boxes(report) and changes == []
+
+
+def test_miniatura_decodificada_reducida(tmp_path):
+    store = OutputStore(str(tmp_path))
+    path = store.put_bytes(encoded("jpg", 2000, 1500), suffix=".jpg")
+    assert OutputStore.thumbnail_flag(path, 320) == REDUCED_FLAGS[4]
+    assert OutputStore.thumbnail_flag(path, 1500) == cv2.IMREAD_COLOR
+    thumb = store.thumbnail(store.relative(path), max_width=320)
+    assert cv2.imread(str(tmp_path / thumb)).shape == (240, 320, 3)
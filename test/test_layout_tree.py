@@ -0,0 +1,36 @@
+import numpy as np
+
+from layout_tree import BoxIndex, LayoutTreeBuilder
+
+
+def test_consulta_del_indice():
+    rng = np.random.default_rng(0)
+    xy = rng.uniform(0, 2000, size=(500, 2))
+    boxes = np.hstack([xy, xy + rng.uniform(5, 80, size=(500, 2))])
+    index = BoxIndex(boxes)
+    window = np.array([500, 500, 800, 700])
+    expected = np.flatnonzero(
+        (boxes[:, 0] <= 800) & (boxes[:, 2] >= 500) & (boxes[:, 1] <= 700) & (boxes[:, 3] >= 500)
+    )
+    assert index.query(window).tolist() == expected.tolist()
+    assert index.query([0, 0, 0, 0], (0, 0, float("inf"), float("inf"))).tolist() == list(range(500))
+
+
+def test_anidamiento_por_contencion():
+    boxes = [[0, 0, 400, 400], [10, 10, 200, 200], [20, 20, 60, 40], [250, 250, 300, 300]]
+    names = ["card", "form", "button", "Text"]
+    parents = LayoutTreeBuilder().build_parents(boxes, names)
+    assert parents.tolist() == [-1, 0, 1, 0]
+
+    tree = LayoutTreeBuilder.to_tree([{"type": n} for n in names], parents)
+    assert len(tree) == 1
+    assert [child["type"] for child in tree[0]["children"]] == ["form", "Text"]
+    assert tree[0]["children"][0]["children"][0]["type"] == "button"
+
+
+def test_restriccion_por_clase():
+    # La etiqueta queda fuera del TextField, pero la regla registrada la acepta
+    builder = LayoutTreeBuilder()
+    builder.register("TextField", "texfield_label", lambda p, c, pt, ct: abs(p[1] - c[3]) < 20, (0, 30, 0, 0))
+    parents = builder.build_parents([[0, 40, 200, 80], [0, 20, 80, 35]], ["TextField", "texfield_label"])
+    assert parents.tolist() == [-1, 0]
@@ -0,0 +1,61 @@
+import os
+import time
+
+from lexicon import Lexicon, LexiconStore, edit_distance
+
+VOCABULARIO = ["Nombre", "Apellido", "Contraseña", "Recuperar Contraseña", "Guardar", "Editar", "Si", "No"]
+
+
+def test_distancia_de_edicion():
+    assert edit_distance("nombre", "nombre", 2) == 0
+    assert edit_distance("nmobre", "nombre", 2) == 1  # Transposición
+    assert edit_distance("nambr", "nombre", 2) == 2
+    assert edit_distance("xyz", "nombre", 2) == 3
+
+
+def test_correcciones():
+    lexicon = Lexicon(VOCABULARIO)
+    assert lexicon.correct("Nambr") == "Nombre"
+    assert lexicon.correct("Ncmbre:") == "Nombre:"
+    assert lexicon.correct("Contrasena") == "Contraseña"
+    assert lexicon.correct("Recuperar Contrasena") == "Recuperar Contraseña"
+    assert lexicon.correct("Gusrdar") == "Guardar"
+
+
+def test_textos_sin_coincidencia():
+    lexicon = Lexicon(VOCABULARIO)
+    assert lexicon.correct("Hola mundo") == "Hola mundo"
+    assert lexicon.correct("Mo") == "Mo"  # Textos muy cortos: sin margen de error
+    assert lexicon.correct("12345") == "12345"
+    # Por palabras solo se admite un error y las palabras correctas no cambian
+    assert lexicon.correct("Ingrese su nombre") == "Ingrese su nombre"
+    assert lexicon.correct("Edtar perfil") == "Editar perfil"
+
+
+def test_frecuencia_desempata():
+    lexicon = Lexicon({"Casa": 1, "Cosa": 5})
+    assert lexicon.correct("Cisa") == "Cosa"
+
+
+def test_recarga_en_caliente(tmp_path):
+    path = tmp_path / "tienda.txt"
+    path.write_text("# Vocabulario de prueba\nProducto\n", encoding="utf-8")
+    store = LexiconStore(str(tmp_path), check_interval=0)
+
+    assert store.get("tienda").correct("Pcducto") == "Producto"
+    assert store.get("otro") is None
+
+    path.write_text("Producto\nCantidad\n", encoding="utf-8")
+    later = time.time() + 5
+    os.utime(path, (later, later))
+    assert store.get("tienda").correct("Cantdad") == "Cantidad"
+
+
+def test_nombre_de_proyecto_invalido(tmp_path):
+    store = LexiconStore(str(tmp_path))
+    try:
+        store.get("../secreto")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Se esperaba ValueError")
@@ -0,0 +1,48 @@
+import signal
+
+import numpy as np
+
+import memory
+from memory import MemoryMonitor
+
+
+def test_medicion_por_peticion():
+    monitor = MemoryMonitor(history=2)
+    for _ in range(3):
+        state = monitor.begin()
+        data = np.ones(4 * 2 ** 20, dtype=np.uint8)  # Asignación de 4 MiB durante la petición
+        entry = monitor.end("api_scan_image", state)
+        del data
+    assert memory.rss_bytes() > 0
+    assert entry["route"] == "api_scan_image" and entry["rss"] > 0
+    assert len(monitor.history()) == 2
+    stats = monitor.stats()
+    assert stats["routes"]["api_scan_image"]["requests"] == 3
+    assert stats["recycle_bytes"] is None and not stats["recycling"]
+
+
+def test_top_de_tracemalloc():
+    monitor = MemoryMonitor()
+    assert monitor.top() == []
+    monitor.start_tracing()
+    try:
+        monitor.top()
+        kept = [bytearray(1024) for _ in range(200)]
+        top = monitor.top(limit=5, compare=True)
+        assert any(entry["size_diff"] >= 200 * 1024 and "test_memory.py" in entry["traceback"][0]
+                   for entry in top)
+        assert monitor.stats()["tracemalloc"]["current"] > 0
+        del kept
+    finally:
+        monitor.stop_tracing()
+
+
+def test_reciclaje_por_umbral(monkeypatch):
+    signals = []
+    monkeypatch.setattr(memory.os, "kill", lambda pid, sig: signals.append(sig))
+    monitor = MemoryMonitor(recycle_bytes=1)
+    monitor.end("scan", monitor.begin())
+    monitor.end("scan", monitor.begin())
+    # Una sola señal aunque el umbral se siga superando
+    assert signals == [signal.SIGTERM]
+    assert monitor.stats()["recycling"]
@@ -0,0 +1,119 @@
+import threading
+import time
+
+from detections import DetectionSet
+from model_registry import FAILED, READY, ModelRegistry, compare_detections, percentile
+
+
+def dets(*boxes):
+    return DetectionSet([box for _, box in boxes], [0.9] * len(boxes), [0] * len(boxes), [name for name, _ in boxes])
+
+
+def wait_for(condition, timeout=2.0):
+    end = time.monotonic() + timeout
+    while not condition() and time.monotonic() < end:
+        time.sleep(0.01)
+    assert condition()
+
+
+def test_comparacion_de_detecciones():
+    active = dets(("button", [0, 0, 100, 40]), ("button_text", [10, 10, 90, 30]), ("Text", [0, 100, 80, 120]))
+    candidate = dets(("button", [2, 0, 100, 42]), ("button_text", [10, 10, 90, 30]), ("Text", [0, 300, 80, 320]),
+                     ("checkbox", [0, 200, 40, 240]))
+    result = compare_detections(active, candidate)
+    assert (result["active"], result["candidate"], result["matched"]) == (3, 4, 2)
+    assert result["agreement"] == 0.5
+    assert result["classes"] == {"checkbox": 1}
+
+
+def test_percentiles():
+    assert percentile([], 50) is None
+    assert percentile([30.0, 10.0, 20.0], 50) == 20.0
+    assert percentile(range(1, 11), 90) == 9
+
+
+def test_carga_sombra_y_promocion(tmp_path):
+    release = threading.Event()
+
+    def loader(model_id):
+        release.wait(2)
+        if model_id == "ui/99":
+            raise RuntimeError("Modelo no encontrado")
+        return f"modelo {model_id}"
+
+    activated = []
+    state = str(tmp_path / "model_state.json")
+    registry = ModelRegistry(loader, "ui/14", "modelo ui/14", state_path=state,
+                             on_activate=lambda model_id, model: activated.append((model_id, model)))
+    registry.set_candidate("ui/15", shadow_ratio=0.5)
+    # Mientras carga no hay sombra y la activa sigue siendo la misma
+    assert registry.status()["versions"]["ui/15"]["status"] == "loading"
+    assert not registry.shadow(lambda *a: None, lambda: None)
+    release.set()
+    wait_for(lambda: registry.versions["ui/15"].status == READY)
+
+    calls = []
+
+    def detect(model_id, model, image):
+        calls.append(model_id)
+        return dets(("button", [0, 0, 100, 40])) if model_id == "ui/14" else dets()
+
+    sent = [registry.shadow(detect, lambda: "imagen") for _ in range(4)]
+    registry.wait_shadow()
+    assert sent == [False, True, False, True]
+    assert calls == ["ui/14", "ui/15", "ui/14", "ui/15"]
+    summary = registry.status()["shadow"]
+    assert summary["samples"] == 2 and summary["agreement"]["mean"] == 0.0
+    assert summary["classes"] == {"button": -1.0}
+
+    registry.promote()
+    assert activated == [("ui/15", "modelo ui/15")]
+    assert (registry.active_id, registry.previous_id, registry.candidate_id) == ("ui/15", "ui/14", None)
+
+    # Una versión que no carga no sustituye a la activa
+    registry.promote("ui/99")
+    wait_for(lambda: registry.versions["ui/99"].status == FAILED)
+    assert registry.active_id == "ui/15"
+    assert registry.status()["pending_activation"] is None
+    registry.promote("ui/14")  # Vuelta atrás inmediata: sigue cargada
+    assert registry.active_id == "ui/14"
+
+
+def test_estado_compartido_entre_workers(tmp_path):
+    state = str(tmp_path / "model_state.json")
+    first = ModelRegistry(lambda model_id: f"modelo {model_id}", "ui/14", "modelo ui/14", state_path=state)
+    second = ModelRegistry(lambda model_id: f"modelo {model_id}", "ui/14", "modelo ui/14", state_path=state)
+    first.set_candidate("ui/15", shadow_ratio=0.1)
+    second.sync(force=True)
+    assert (second.candidate_id, second.shadow_ratio) == ("ui/15", 0.1)
+
+    first.promote("ui/15")
+    wait_for(lambda: first.active_id == "ui/15")
+    second.sync(force=True)
+    wait_for(lambda: second.active_id == "ui/15")
+    # Un worker nuevo arranca con la versión promocionada
+    assert ModelRegistry.read_state(state)["active"] == "ui/15"
+
+
+def test_promocion_de_version_que_no_carga(tmp_path):
+    state = str(tmp_path / "model_state.json")
+    release = threading.Event()
+
+    def loader(model_id):
+        release.wait(2)
+        raise RuntimeError("Versión no encontrada")
+
+    registry = ModelRegistry(loader, "ui/14", "modelo ui/14", state_path=state)
+    registry.promote("ui/99")
+    # Mientras carga, los workers que arranquen siguen con la versión activa
+    assert registry.status()["pending_activation"] == "ui/99"
+    assert ModelRegistry.read_state(state)["active"] == "ui/14"
+    release.set()
+    wait_for(lambda: registry.versions["ui/99"].status == FAILED)
+    assert registry.status()["pending_activation"] is None and registry.active_id == "ui/14"
+    assert ModelRegistry.read_state(state)["active"] == "ui/14"
+
+    # Otro worker que ve el estado no intenta cargarla
+    other = ModelRegistry(loader, "ui/14", "modelo ui/14", state_path=state)
+    other.sync(force=True)
+    assert "ui/99" not in other.versions
@@ -0,0 +1,48 @@
+import numpy as np
+
+from ocr_cache import OCRCache
+
+CONFIG = {"detail": 0, "min_size": 20}
+
+
+def crop(seed, shape=(20, 60)):
+    return (np.random.default_rng(seed).random(shape) > 0.5).astype(np.uint8) * 255
+
+
+def test_clave_por_contenido_y_configuracion():
+    cache = OCRCache()
+    assert cache.key(crop(1), CONFIG) == cache.key(crop(1).copy(), dict(CONFIG))
+    assert cache.key(crop(1), CONFIG) != cache.key(crop(2), CONFIG)
+    assert cache.key(crop(1), CONFIG) != cache.key(crop(1), {**CONFIG, "min_size": 10})
+    # Misma imagen a otra escala: solo coincide con normalización
+    big = np.repeat(np.repeat(crop(1), 2, axis=0), 2, axis=1)
+    assert cache.key(big, CONFIG) != cache.key(crop(1), CONFIG)
+    normalized = OCRCache(normalize_height=20)
+    assert normalized.key(big, CONFIG) == normalized.key(crop(1), CONFIG)
+
+
+def test_lru_y_metricas():
+    cache = OCRCache(max_entries=2)
+    keys = [cache.key(crop(i), CONFIG) for i in range(3)]
+    cache.put(keys[0], ["Guardar"])
+    cache.put(keys[1], ["Nombre:"])
+    assert cache.get(keys[0]) == ["Guardar"]
+    cache.put(keys[2], ["Editar"])  # Expulsa keys[1], la usada hace más tiempo
+    assert cache.get(keys[1]) is None
+    stats = cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"], stats["hit_rate"]) == (2, 1, 1, 0.5)
+    assert stats["bytes"] > 0
+    cache.clear()
+    assert cache.stats()["bytes"] == 0
+
+
+def test_archivo_compartido(tmp_path):
+    path = str(tmp_path / "ocr.sqlite")
+    first = OCRCache(path=path)
+    key = first.key(crop(5), CONFIG)
+    first.put(key, ["Contraseña:"])
+    # Otro worker (otra instancia) lo encuentra en el archivo
+    second = OCRCache(path=path)
+    assert second.get(key) == ["Contraseña:"]
+    assert second.get(key) == ["Contraseña:"]
+    assert (second.stats()["disk_hits"], second.stats()["hits"]) == (1, 1)
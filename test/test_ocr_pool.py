@@ -0,0 +1,44 @@
+import os
+
+import numpy as np
+
+from ocr_pool import OCRPool, ResourcePlan
+
+
+class PidReader:
+    def __init__(self, languages):
+        self.languages = languages
+
+    def readtext(self, image, **options):
+        return [f"{os.getpid()}:{image.shape[1]}:{options.get('detail')}"]
+
+
+def test_plan_reparte_los_nucleos():
+    plan = ResourcePlan.from_cores(16)
+    assert (plan.web_workers, plan.ocr_workers, plan.ocr_threads) == (2, 3, 2)
+    # Cada proceso web usa su porción: OCR + hilos de OpenCV
+    assert plan.web_workers * (plan.ocr_workers * plan.ocr_threads + plan.cv2_threads) == 16
+
+    small = ResourcePlan.from_cores(4)
+    assert (small.web_workers, small.ocr_workers, small.ocr_threads, small.cv2_threads) == (1, 3, 1, 1)
+
+
+def test_plan_sin_pool():
+    plan = ResourcePlan.from_cores(1)
+    assert plan.ocr_workers == 0 and plan.ocr_threads == 1 and plan.web_threads == 1
+    inline = ResourcePlan.from_cores(8, ocr_workers=0)
+    assert (inline.ocr_workers, inline.ocr_threads, inline.cv2_threads) == (0, 8, 8)
+
+
+def test_pool_lee_en_otros_procesos():
+    pool = OCRPool(2, reader_factory=PidReader)
+    # El pool se puede volver a crear desde el hilo de una petición: no se usa fork por defecto
+    assert pool.start_method == "forkserver"
+    try:
+        futures = [pool.submit(np.zeros((4, width), np.uint8), detail=0) for width in (5, 6, 7)]
+        results = [future.result(timeout=30)[0].split(":") for future in futures]
+        assert [r[1:] for r in results] == [["5", "0"], ["6", "0"], ["7", "0"]]
+        assert all(int(r[0]) != os.getpid() for r in results)
+        assert pool.readtext(np.zeros((2, 3), np.uint8))[0].endswith(":3:None")
+    finally:
+        pool.close()
@@ -0,0 +1,106 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+import ocr_profiles
+from ocr_cache import OCRCache
+from ocr_pool import OCRPool
+from ocr_profiles import OCRProfiles
+from scanner import WidgetScanner
+from synthetic import ReplayModel, generate_screen
+
+
+class ProfileReader:
+    """Lector de prueba: devuelve el idioma del perfil, el PID, la allowlist recibida y la GPU del perfil."""
+
+    created = []
+
+    def __init__(self, profile):
+        self.languages = "+".join(profile.languages)
+        self.gpu = profile.gpu
+        ProfileReader.created.append(profile.name)
+
+    def readtext(self, image, **options):
+        return [f"{self.languages}:{os.getpid()}:{len(options.get('allowlist') or '')}:{self.gpu}"]
+
+
+@pytest.fixture(autouse=True)
+def readers():
+    ocr_profiles.clear_readers()
+    ProfileReader.created = []
+    yield
+    ocr_profiles.clear_readers()
+
+
+def test_perfil_por_peticion_y_proyecto(tmp_path):
+    path = tmp_path / "ocr_profiles.json"
+    path.write_text(json.dumps({
+        "profiles": {"digits": {"languages": ["en"], "allowlist": "0123456789"}},
+        "projects": {"tienda": "en", "facturas": "digits"},
+    }))
+    profiles = OCRProfiles.from_file(str(path))
+    assert profiles.resolve().name == "default"
+    assert profiles.resolve(project="tienda").name == "en"
+    assert profiles.resolve("full", project="tienda").name == "full"
+    assert profiles.resolve(project="facturas").readtext_options({"detail": 0}) == {
+        "detail": 0, "allowlist": "0123456789"}
+    with pytest.raises(ValueError):
+        profiles.resolve("ruso")
+    with pytest.raises(ValueError):
+        OCRProfiles(projects={"tienda": "ruso"})
+    assert OCRProfiles.from_file(str(tmp_path / "no_existe.json")).profiles.keys() == ocr_profiles.DEFAULT_PROFILES.keys()
+
+
+def test_lectores_perezosos_por_proceso(tmp_path):
+    profiles = OCRProfiles({"en_digits": {"languages": ["en"], "allowlist": "0123456789"}},
+                           projects={"tienda": "en"}, factory=ProfileReader)
+    screen = generate_screen(widgets=6, seed=3)
+    cache = OCRCache(1024)
+    scanner = WidgetScanner("test/1", None, output_dir=str(tmp_path), model=ReplayModel.from_screens([screen]),
+                            ocr_profiles=profiles, ocr_cache=cache)
+    # Ningún lector hasta el primer escaneo
+    assert ProfileReader.created == []
+
+    report = scanner.scan_array(screen.image, project="tienda").report
+    assert report["metadata"]["ocr_profile"] == "en"
+    texts = [node["text"] for node in report["layout"] if node.get("text")]
+    assert texts and all(text.startswith("en:") for text in texts)
+    # Un perfil con los mismos idiomas y reconocedor comparte el lector ya cargado
+    report = scanner.scan_array(screen.image, project="tienda", ocr_profile="en_digits").report
+    assert ProfileReader.created == ["en"]
+    # La caché distingue el perfil: la allowlist cambia la lectura
+    allowlists = [node["text"].split(":")[2] for node in report["layout"] if node.get("text")]
+    assert "10" in allowlists
+    scanner.scan_array(screen.image)
+    assert ProfileReader.created == ["en", "default"]
+    assert [load["profile"] for load in ocr_profiles.loaded_readers()] == ["en", "default"]
+
+
+def test_opciones_del_lector():
+    profiles = OCRProfiles({"cpu": {"languages": ["en"], "gpu": False}})
+    # Sin ``gpu`` EasyOCR decide (la GPU si está disponible)
+    assert "gpu" not in profiles.resolve().reader_options()
+    assert profiles.resolve("cpu").reader_options()["gpu"] is False
+    assert profiles.resolve().on_cpu().reader_options()["gpu"] is False
+    assert profiles.resolve().on_cpu().key != profiles.resolve().key
+    with pytest.raises(ValueError):
+        OCRProfiles({"gpu": {"languages": ["en"], "cuda": True}})
+
+
+def test_pool_con_perfiles():
+    profiles = OCRProfiles(factory=ProfileReader)
+    pool = OCRPool(1, profile_factory=ProfileReader, preload=profiles.resolve(), start_method="fork")
+    try:
+        image = np.zeros((4, 8), np.uint8)
+        default = pool.submit(image, profile=profiles.resolve()).result(timeout=30)[0].split(":")
+        spanish = pool.readtext(image, profile=profiles.resolve("es"), allowlist="ab")[0].split(":")
+        assert default[0] == "es+en" and spanish[0] == "es" and spanish[2] == "2"
+        assert default[1] == spanish[1] != str(os.getpid())
+        # Un proceso creado con fork no puede iniciar CUDA: sus lectores van en CPU
+        assert default[3] == spanish[3] == "False"
+    finally:
+        pool.close()
+    # Los lectores se crearon en el proceso del pool, no en este
+    assert ProfileReader.created == []
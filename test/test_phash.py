@@ -0,0 +1,96 @@
+import random
+
+import cv2
+import numpy as np
+
+from phash import HashIndex, ScreenIndex, dhash, hamming
+from scanner import WidgetScanner
+from storage import OutputStore
+from synthetic import ReplayModel, ReplayReader, generate_screen
+
+
+def screen(seed):
+    rng = np.random.default_rng(seed)
+    image = np.full((640, 360, 3), 245, np.uint8)
+    for _ in range(8):
+        x, y = rng.integers(0, 300), rng.integers(40, 600)
+        cv2.rectangle(image, (int(x), int(y)), (int(x) + 60, int(y) + 30), tuple(int(c) for c in rng.integers(0, 200, 3)), -1)
+    return image
+
+
+def test_hash_tolera_cambios_pequenos():
+    base = screen(1)
+    clock = base.copy()
+    cv2.putText(clock, "12:41", (300, 15), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 0, 0), 1)
+    jpeg = cv2.imdecode(cv2.imencode(".jpg", base, [cv2.IMWRITE_JPEG_QUALITY, 60])[1], cv2.IMREAD_COLOR)
+    assert hamming(dhash(base), dhash(clock)) <= 2
+    assert hamming(dhash(base), dhash(jpeg)) <= 2
+    assert hamming(dhash(base), dhash(screen(2))) > 8
+    assert dhash(base).bit_length() <= 64
+
+
+def test_indice_igual_que_fuerza_bruta():
+    rng = random.Random(0)
+    hashes = [rng.getrandbits(64) for _ in range(3000)]
+    index = HashIndex(64, max_distance=6)
+    for i, value in enumerate(hashes):
+        index.add(value, i)
+    queries = [h ^ sum(1 << b for b in rng.sample(range(64), rng.randint(1, 8))) for h in hashes[:300]]
+    for query in queries:
+        best = min(hamming(query, h) for h in hashes)
+        match = index.nearest(query)
+        if best <= 6:
+            assert match is not None and match[2] == best and hamming(match[0], query) == best
+        else:
+            assert match is None
+    index.remove(hashes[0])
+    assert len(index) == 2999 and index.nearest(hashes[0], max_distance=0) is None
+
+
+def test_indice_de_pantallas_con_cargador():
+    rows = [(1, "00000000000000ff", "a", "a.json")]
+    loads = []
+
+    def loader(after):
+        loads.append(after)
+        return [row for row in rows if row[0] > after]
+
+    index = ScreenIndex(loader, check_interval=0)
+    assert index.lookup(0xff ^ 0b1) == (0xff, ("a", "a.json"), 1)
+    rows.append((2, "ff00000000000000", "b", "b.json"))
+    assert index.lookup(0xff << 56)[1] == ("b", "b.json")
+    assert loads == [0, 1] and len(index) == 2
+    index.discard(0xff)
+    assert index.lookup(0xff) is None
+
+
+def test_escaneo_parcial_no_se_indexa(tmp_path):
+    shot = generate_screen(widgets=10, seed=4)
+    path = str(tmp_path / "captura.png")
+    cv2.imwrite(path, shot.image)
+    store = OutputStore(str(tmp_path / "out"))
+    scanner = WidgetScanner("test/1", None, output_dir=store, model=ReplayModel.from_screens([shot]),
+                            reader=ReplayReader(), screen_index=ScreenIndex(max_distance=4))
+
+    partial = scanner.scan(path, classes=["button"])
+    assert "phash" not in partial.report["metadata"] and len(scanner.screen_index) == 0
+    full = scanner.scan(path)
+    assert "near_duplicate" not in full.report["metadata"]
+    assert {c["type"] for c in full.report["components"]} > {c["type"] for c in partial.report["components"]}
+    again = scanner.scan(path)
+    assert again.report["metadata"]["near_duplicate"]["scan_id"] == full.scan_id
+
+
+def test_no_se_reutiliza_el_escaneo_de_otro_proyecto(tmp_path):
+    shot = generate_screen(widgets=10, seed=5)
+    path = str(tmp_path / "captura.png")
+    cv2.imwrite(path, shot.image)
+    scanner = WidgetScanner("test/1", None, output_dir=str(tmp_path / "out"), model=ReplayModel.from_screens([shot]),
+                            reader=ReplayReader(), screen_index=ScreenIndex(max_distance=4))
+
+    first = scanner.scan(path, project="tienda")
+    assert scanner.scan(path, project="tienda").report["metadata"]["near_duplicate"]["scan_id"] == first.scan_id
+    # El índice guarda el último escaneo de cada pantalla: el de otro proyecto no se reutiliza
+    other = scanner.scan(path, project="facturas")
+    assert "near_duplicate" not in other.report["metadata"]
+    assert "near_duplicate" not in scanner.scan(path).report["metadata"]
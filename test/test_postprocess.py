@@ -0,0 +1,27 @@
+import numpy as np
+
+from postprocess import PostProcessor
+
+
+def test_reglas_por_clase():
+    xyxy = np.array([
+        [0, 0, 400, 60],      # AppBar
+        [2, 1, 398, 61],      # AppBar duplicado (NMS)
+        [5, 5, 40, 55],       # AppBar_icon
+        [300, 5, 340, 55],    # AppBar_icon de menor confianza (max_per_class)
+        [20, 200, 200, 250],  # button_text
+        [25, 205, 195, 245],  # Text dentro de button_text
+        [20, 300, 200, 350],  # Text suelto
+    ])
+    confidence = np.array([0.9, 0.8, 0.9, 0.6, 0.9, 0.7, 0.4])
+    names = np.array(["AppBar", "AppBar", "AppBar_icon", "AppBar_icon", "button_text", "Text", "Text"])
+
+    keep, pruned = PostProcessor({"min_confidence": {"Text": 0.5}}).run(xyxy, confidence, names)
+    assert keep.tolist() == [True, False, True, False, True, False, False]
+    assert pruned == {"min_confidence": 1, "nms": 1, "max_per_class": 1, "suppress_inside": 1}
+
+
+def test_sin_detecciones():
+    keep, pruned = PostProcessor().run(np.empty((0, 4)), np.empty(0), np.empty(0, dtype=str))
+    assert keep.size == 0
+    assert sum(pruned.values()) == 0
@@ -0,0 +1,91 @@
+import os
+import time
+
+from result_store import ResultStore
+from scanner import ScanResult
+from storage import OutputStore
+
+
+def _result(scan_id, components):
+    report = {"metadata": {"scan_id": scan_id, "model_used": "ui_component_flutter/14"}, "components": components}
+    return ScanResult(report, b"", f"{scan_id}.json", f"{scan_id}.png", scan_id)
+
+
+def _box(component_type, text=None, **extra):
+    item = {"type": component_type, "coordinates": {"x1": 0, "y1": 0, "x2": 10, "y2": 10}, "confidence": 0.9}
+    if text is not None:
+        item["text"] = text
+    item.update(extra)
+    return item
+
+
+def _table(n_cells):
+    cells = [{"type": "TableCell", "child": {"type": "Text", "text": f"c{i}", "coordinates": _box("x")["coordinates"]}}
+             for i in range(n_cells)]
+    return _box("Table", estructure={"type": "Table", "children": [{"type": "TableRow", "children": cells}]})
+
+
+def test_busquedas(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite"))
+    store.write_batch([
+        (_result("a", [_box("button", subcomponents=[_box("text", "Guardar")]), _table(25)]), 100.0),
+        (_result("b", [_box("button", subcomponents=[_box("text", "Editar")]), _table(4)]), 200.0),
+    ])
+
+    tables = store.search(component_type="Table", min_cells=20)
+    assert [m["scan_id"] for m in tables] == ["a"]
+    assert tables[0]["component"]["cell_count"] == 25
+
+    buttons = store.search(component_type="button", text="guardar")
+    assert [(m["scan_id"], m["component"]["text"]) for m in buttons] == [("a", "Guardar")]
+    assert {m["scan_id"] for m in store.search(component_type="button", since=150)} == {"b"}
+
+
+def test_escritura_en_segundo_plano_y_reemplazo(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite"))
+    store.add(_result("a", [_box("Text", "Hola")]))
+    store.add(_result("a", [_box("Text", "Adiós")]))
+    store.flush()
+    assert store.search(text="Hola") == []
+    assert len(store.search(text="Adiós")) == 1
+
+    store.delete_scans(["a"])
+    assert store.get_scan("a") is None and store.search(text="Adiós") == []
+
+
+def test_hashes_de_pantalla(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite"))
+    a, b = _result("a", []), _result("b", [])
+    a.report["metadata"]["phash"] = "00000000000000ff"
+    b.report["metadata"]["phash"] = "ff00000000000000"
+    store.write_batch([(a, 100.0), (b, 200.0), (a, 300.0)])
+    rows = store.screen_hashes()
+    assert [row[1:] for row in rows] == [("00000000000000ff", "a", "a.json"), ("ff00000000000000", "b", "b.json")]
+    assert [row[2] for row in store.screen_hashes(after=rows[0][0])] == ["b"]
+    # El reporte completo de un escaneo parcial cambia de ruta: la fila se vuelve a leer con su ruta nueva
+    a.json_path = "a-completo.json"
+    store.write_batch([(a, 400.0)])
+    assert [row[2:] for row in store.screen_hashes(after=rows[-1][0])] == [("a", "a-completo.json")]
+    store.delete_scans(["a"])
+    assert [row[2] for row in store.screen_hashes()] == ["b"]
+
+
+def test_barrido_elimina_los_escaneos_expulsados(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite"))
+    output = OutputStore(str(tmp_path / "output"), ttl_seconds=3600, on_remove=store.delete_files)
+    results = []
+    for scan_id, age in (("viejo", 7200), ("nuevo", 0)):
+        json_path = output.put_bytes(scan_id.encode(), prefix="ui_analysis_", suffix=".json")
+        image_path = output.put_bytes(scan_id.encode() * 2, prefix="annotated_", suffix=".png")
+        for path in (json_path, image_path):
+            os.utime(path, (time.time() - age,) * 2)
+        result = _result(scan_id, [_box("Text", f"texto {scan_id}")])
+        result.json_path, result.image_path = json_path, image_path
+        result.report["metadata"]["phash"] = "00000000000000ff" if scan_id == "viejo" else "ff00000000000000"
+        results.append((result, 100.0))
+    store.write_batch(results)
+
+    assert output.sweep()["files"] == 2
+    assert store.get_scan("viejo") is None and store.search(text="viejo") == []
+    assert [row[2] for row in store.screen_hashes()] == ["nuevo"]
+    assert store.get_scan("nuevo") is not None
@@ -0,0 +1,206 @@
+import os
+import time
+
+import cv2
+
+from phash import ScreenIndex
+from scanner import WidgetScanner
+from synthetic import BusyReader, ReplayModel, ReplayReader, generate_screen
+
+
+class OrderScanner(WidgetScanner):
+    """Escáner que anota la clase de cada detección en el orden en que la lee el OCR."""
+
+    def extract_ui_text(self, image, bbox, component_type, lexicon=None, profile=None):
+        self.read.append(component_type)
+        return super().extract_ui_text(image, bbox, component_type, lexicon, profile)
+
+
+def scanner_for(tmp_path, screen, reader=None, cls=WidgetScanner):
+    scanner = cls("test/1", None, output_dir=str(tmp_path / "output"), model=ReplayModel.from_screens([screen]),
+                  reader=reader or ReplayReader())
+    scanner.read = []
+    return scanner
+
+
+def texts(report):
+    return [sub.get("text") for c in report["components"] for sub in c.get("subcomponents", [])]
+
+
+def test_limite_vencido_deja_el_ocr_pendiente(tmp_path):
+    screen = generate_screen(widgets=8, seed=1)
+    scanner = scanner_for(tmp_path, screen)
+    result = scanner.scan_array(screen.image, deadline=time.monotonic() - 1)
+
+    targets = result.report["metadata"]["ocr"]["pending"]
+    assert scanner.reader.calls == 0 and targets > 0
+    assert result.report["metadata"]["ocr"]["complete"] is False
+    pending = [c for c in result.report["components"] if c.get("pending")]
+    assert pending and all(
+        c.get("text") is None and all(sub.get("text") is None for sub in c.get("subcomponents", []))
+        for c in pending)
+
+    # ``completion`` termina el OCR y regenera el reporte con el mismo scan_id
+    assert result.completion is not None
+    complete = result.completion()
+    assert scanner.reader.calls == targets
+    assert complete.scan_id == result.scan_id and complete.image_path == result.image_path
+    assert complete.report["metadata"]["ocr"] == {"complete": True, "pending": 0}
+    assert not any(c.get("pending") for c in complete.report["components"])
+    assert "Nombre" in texts(complete.report)
+
+
+def test_limite_holgado_completa_el_ocr(tmp_path):
+    screen = generate_screen(widgets=8, seed=1)
+    scanner = scanner_for(tmp_path, screen)
+    result = scanner.scan_array(screen.image, deadline=time.monotonic() + 60)
+
+    assert result.report["metadata"]["ocr"] == {"complete": True, "pending": 0}
+    assert result.completion is None
+    assert not any(c.get("pending") for c in result.report["components"])
+    assert scanner.reader.calls > 0 and "Nombre" in texts(result.report)
+
+
+def test_ocr_por_prioridad_hasta_el_limite(tmp_path):
+    screen = generate_screen(widgets=12, seed=1)
+    # Sin límite se leen todos los textos, en orden de aparición
+    full = scanner_for(tmp_path, screen, cls=OrderScanner)
+    full.scan_array(screen.image)
+    targets = full.read
+
+    scanner = scanner_for(tmp_path, screen, BusyReader(30), OrderScanner)
+    priority = lambda name: scanner.OCR_PRIORITY.get(name, 1)
+    # La duración media de cada lectura ya es conocida: caben unas pocas antes del límite
+    scanner.ocr_seconds = 0.03
+    result = scanner.scan_array(screen.image, deadline=time.monotonic() + 0.3)
+
+    ocr = result.report["metadata"]["ocr"]
+    assert not ocr["complete"] and len(scanner.read) + ocr["pending"] == len(targets)
+    assert scanner.read, "ninguna lectura cupo antes del límite"
+    assert [priority(name) for name in targets] != sorted(priority(name) for name in targets)
+    # Lo leído es lo más prioritario: títulos, botones y etiquetas antes que los textos sueltos
+    unread = list(targets)
+    for name in scanner.read:
+        unread.remove(name)
+    assert [priority(name) for name in scanner.read] == sorted(priority(name) for name in scanner.read)
+    assert max(priority(name) for name in scanner.read) <= min(priority(name) for name in unread)
+
+
+def _prediction(class_name, box):
+    x1, y1, x2, y2 = box
+    return {"x": (x1 + x2) / 2, "y": (y1 + y2) / 2, "width": x2 - x1, "height": y2 - y1, "confidence": 0.9,
+            "class": class_name, "class_id": 0, "detection_id": f"{class_name}-{x1}"}
+
+
+def _boxes(report, component_type):
+    return [[c["coordinates"][k] for k in ("x1", "y1", "x2", "y2")]
+            for c in report["components"] if c["type"] == component_type]
+
+
+def test_regiones_en_coordenadas_de_la_imagen_completa(tmp_path):
+    screen = generate_screen(widgets=6, seed=2)
+    # Cada recorte es una imagen desconocida para el modelo: detecta un botón en (10, 10)-(110, 60) del recorte
+    model = ReplayModel(default=[_prediction("button", (10, 10, 110, 60)),
+                                 _prediction("button_text", (20, 20, 100, 50))])
+    scanner = WidgetScanner("test/1", None, output_dir=str(tmp_path / "output"), model=model, reader=ReplayReader())
+    h, w = screen.image.shape[:2]
+    result = scanner.scan_array(screen.image, regions=[[200, 300, 600, 700], [w - 300, h - 100, w + 50, h + 80]])
+
+    # El segundo recorte se sale de la imagen y se ajusta a ella
+    assert result.report["metadata"]["roi"]["regions"] == [[200, 300, 600, 700], [w - 300, h - 100, w, h]]
+    assert sorted(_boxes(result.report, "button")) == [[210, 310, 310, 360], [w - 290, h - 90, w - 190, h - 40]]
+    assert model.calls == 2
+
+
+def test_recortes_fuera_de_la_imagen():
+    assert WidgetScanner.clip_regions([[-10, -10, 50, 40.6], [90, 10, 20, 30]], (100, 80, 3)) == \
+        [[0, 0, 50, 41], [20, 10, 80, 30]]
+    try:
+        WidgetScanner.clip_regions([[100, 0, 200, 50]], (100, 80, 3))
+    except ValueError as e:
+        assert "Ningún recorte" in str(e)
+    else:
+        raise AssertionError("un recorte fuera de la imagen debe rechazarse")
+
+
+def test_filtro_de_clases_conserva_los_subcomponentes(tmp_path):
+    screen = generate_screen(widgets=12, seed=1)
+    scanner = scanner_for(tmp_path, screen)
+    assert scanner.expand_classes(["button", "TextField"]) == {"button", "button_text", "TextField",
+                                                               "texfield_label", "texfield_hinttext"}
+
+    result = scanner.scan_array(screen.image, classes=["button"])
+    assert result.report["metadata"]["roi"] == {"regions": None, "classes": ["button"]}
+    buttons = result.report["components"]
+    assert buttons and {c["type"] for c in buttons} == {"button"}
+    assert all(sub["type"] == scanner.NAME_MAPPING["button_text"] and sub.get("text") == "Nombre"
+               for c in buttons for sub in c["subcomponents"])
+    assert any(c["subcomponents"] for c in buttons)
+
+
+def test_opciones_de_escaneo_de_la_peticion():
+    parse = WidgetScanner.parse_scan_options
+    assert parse(None, None) == (None, None)
+    assert parse("[1, 2, 30, 40]", "button, Text,") == ([[1, 2, 30, 40]], ["button", "Text"])
+    assert parse("[[0, 0, 10, 10], [5, 5, 20, 20.5]]", '["AppBar"]') == ([[0, 0, 10, 10], [5, 5, 20, 20.5]],
+                                                                          ["AppBar"])
+    # Cada uno de estos valores es un 400 en /api/scan
+    for regions, classes in (("[1, 2", None), ("[1, 2, 3]", None), ("[10, 0, 5, 20]", None), ("{}", None),
+                             ('{"x": 1}', None), ("[[0, 0, 10, 10], 5]", None), ('[0, 0, "a", 10]', None),
+                             ("[]", None), (None, "[1, 2]"), (None, "[button")):
+        try:
+            parse(regions, classes)
+        except ValueError:
+            continue
+        raise AssertionError(f"regions={regions!r}, classes={classes!r} debería ser inválido")
+
+
+def test_incremental_respeta_modelo_proyecto_y_perfil(tmp_path):
+    screen = generate_screen(widgets=8, seed=1)
+    first = str(tmp_path / "antes.png")
+    cv2.imwrite(first, screen.image)
+    # Segunda captura: cambia una zona vacía; los recortes no tienen detecciones grabadas
+    changed = screen.image.copy()
+    changed[-60:-20, -200:-100] = 0
+    second = str(tmp_path / "despues.png")
+    cv2.imwrite(second, changed)
+    scanner = WidgetScanner("test/1", None, output_dir=str(tmp_path / "output"),
+                            model=ReplayModel.from_screens([screen], default=[]), reader=ReplayReader())
+    previous = scanner.scan(first, project="tienda").report
+
+    # Sin proyecto en la petición se usa el del escaneo anterior y sus textos se reutilizan
+    calls = scanner.reader.calls
+    result, _ = scanner.scan_incremental(second, previous)
+    assert result.report["metadata"]["project"] == "tienda"
+    assert not result.report["metadata"]["incremental"]["full_rescan"]
+    assert scanner.reader.calls == calls
+
+    # Con otro proyecto las cajas se reutilizan pero los textos se vuelven a leer
+    result, _ = scanner.scan_incremental(second, previous, project="otro")
+    assert result.report["metadata"]["project"] == "otro"
+    assert result.report["metadata"]["incremental"]["reused"] > 0
+    assert scanner.reader.calls == 2 * calls
+
+    # Un reporte de otra versión del modelo no se mezcla con las detecciones nuevas
+    old_model = {**previous, "metadata": {**previous["metadata"], "model_used": "test/0"}}
+    result, _ = scanner.scan_incremental(second, old_model)
+    assert result.report["metadata"]["incremental"]["full_rescan"]
+
+
+def test_reporte_completo_sustituye_al_parcial(tmp_path):
+    screen = generate_screen(widgets=8, seed=1)
+    path = str(tmp_path / "pantalla.png")
+    cv2.imwrite(path, screen.image)
+    scanner = WidgetScanner("test/1", None, output_dir=str(tmp_path / "output"),
+                            model=ReplayModel.from_screens([screen]), reader=ReplayReader(),
+                            screen_index=ScreenIndex())
+    partial = scanner.scan(path, deadline=time.monotonic() - 1)
+    assert os.path.exists(partial.json_path)
+
+    complete = partial.completion()
+    assert complete.json_path != partial.json_path
+    assert os.path.exists(complete.json_path) and not os.path.exists(partial.json_path)
+    # El índice de pantallas apunta ya al reporte completo
+    signature = scanner.screen_index.signature(cv2.imread(path))
+    _, (scan_id, json_path), _ = scanner.screen_index.lookup(signature)
+    assert (scan_id, json_path) == (partial.scan_id, complete.json_path)
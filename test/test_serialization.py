@@ -0,0 +1,89 @@
+import gzip
+import json
+import os
+
+import serialization
+from scanner import WidgetScanner
+from synthetic import ReplayModel, ReplayReader, generate_screen
+
+REPORT = {
+    "metadata": {"model_used": "ui_component_flutter/14"},
+    "components": [
+        {"type": "button", "coordinates": {"x1": 1, "y1": 2, "x2": 3, "y2": 4}, "confidence": 0.9,
+         "subcomponents": [{"type": "text", "coordinates": {"x1": 1, "y1": 2, "x2": 3, "y2": 4},
+                            "confidence": 0.8, "text": "Guardar"}]},
+    ],
+}
+
+
+def test_respuesta_json_reutiliza_los_bytes():
+    report_json = serialization.dumps_json(REPORT)
+    body = serialization.api_response_body(REPORT, report_json, {"json_file": "x"})
+    assert report_json in body
+    assert json.loads(body) == {"success": True, "report": REPORT, "files": {"json_file": "x"}}
+
+
+def test_formato_columnar():
+    columns = serialization.to_columnar(REPORT)["components"]
+    assert columns["type"] == ["button", "text"]
+    assert columns["parent"] == [-1, 0]
+    assert columns["text"] == [None, "Guardar"]
+
+
+def test_negociacion():
+    assert serialization.negotiate_format(None) == "json"
+    assert serialization.negotiate_format("text/html, */*") == "json"
+    accept = "application/json;q=0.5, application/vnd.widgetscanner.columnar+json"
+    assert serialization.negotiate_format(accept) == "columnar"
+
+
+def test_compresion():
+    body = b"x" * 10000
+    compressed, encoding = serialization.maybe_compress(body, "gzip, deflate")
+    assert encoding == "gzip" and gzip.decompress(compressed) == body
+    assert serialization.maybe_compress(body, "identity") == (body, None)
+    assert serialization.maybe_compress(b"{}", "gzip") == (b"{}", None)
+
+
+def test_evento_sse():
+    event = serialization.sse_event("component", {"type": "button", "text": "Línea\nnueva"})
+    name, data, end = event.split(b"\n", 2)
+    assert name == b"event: component"
+    assert json.loads(data[len(b"data: "):]) == {"type": "button", "text": "Línea\nnueva"}
+    assert end == b"\n"
+
+
+def _events(stream):
+    events = []
+    for chunk in stream:
+        name, data, _ = chunk.split(b"\n", 2)
+        events.append((name[len(b"event: "):].decode(), json.loads(data[len(b"data: "):])))
+    return events
+
+
+def test_flujo_de_eventos_del_escaneo(tmp_path):
+    screen = generate_screen(widgets=8, seed=1)
+    scanner = WidgetScanner("test/1", None, output_dir=str(tmp_path / "output"),
+                            model=ReplayModel.from_screens([screen]), reader=ReplayReader())
+    saved = []
+    on_saved = lambda result: saved.append(result) or {"json_file": os.path.basename(result.json_path)}
+    events = _events(serialization.sse_stream(lambda on_event: scanner.scan_array(screen.image, on_event=on_event),
+                                              on_saved))
+
+    # detections, un component por componente del reporte, files y done
+    names = [name for name, _ in events]
+    report = saved[0].report
+    assert names == ["detections"] + ["component"] * len(report["components"]) + ["files", "done"]
+    assert len(events[0][1]) == len(screen.predictions)
+    assert [data for name, data in events if name == "component"] == report["components"]
+    assert events[-2][1] == {"json_file": os.path.basename(saved[0].json_path)}
+    assert events[-1][1] == {"scan_id": saved[0].scan_id}
+
+
+def test_flujo_de_eventos_con_error():
+    def scan(on_event):
+        on_event("detections", [])
+        raise Exception("Error al escanear imagen: sin modelo")
+
+    events = _events(serialization.sse_stream(scan, lambda result: {}))
+    assert events == [("detections", []), ("error", {"error": "Error al escanear imagen: sin modelo"})]
@@ -0,0 +1,96 @@
+import os
+import time
+
+import cv2
+import numpy as np
+
+from storage import OutputStore
+
+
+def _write(store, size, age, now):
+    artifact_id = store.new_id()
+    path = store.path_for(artifact_id, f"ui_analysis_{artifact_id}.json")
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    os.utime(path, (now - age, now - age))
+    return path
+
+
+def test_ids_unicos_y_fragmentados(tmp_path):
+    store = OutputStore(str(tmp_path))
+    ids = {store.new_id() for _ in range(1000)}
+    assert len(ids) == 1000
+    path = store.path_for("abcdef0123", "annotated_abcdef0123.png")
+    assert store.relative(path) == "ab/cd/annotated_abcdef0123.png"
+
+
+def test_barrido_por_ttl_y_tamano(tmp_path):
+    now = time.time()
+    store = OutputStore(str(tmp_path), ttl_seconds=3600, max_bytes=250)
+    expired = _write(store, 100, 7200, now)
+    oldest = _write(store, 100, 300, now)
+    recent = [_write(store, 100, age, now) for age in (200, 100)]
+
+    removed = store.sweep(now)
+    assert removed == {"files": 2, "bytes": 200}
+    assert not os.path.exists(expired) and not os.path.exists(oldest)
+    assert all(os.path.exists(path) for path in recent)
+    assert store.usage() == {"files": 2, "bytes": 200}
+
+
+def test_touch_protege_de_la_expulsion(tmp_path):
+    now = time.time()
+    store = OutputStore(str(tmp_path), max_bytes=100)
+    first = _write(store, 100, 300, now)
+    second = _write(store, 100, 200, now)
+    store.touch(store.relative(first))
+    store.sweep()
+    assert os.path.exists(first) and not os.path.exists(second)
+
+
+def test_nombres_direccionados_por_contenido(tmp_path):
+    store = OutputStore(str(tmp_path))
+    path = store.put_bytes(b"{}", prefix="ui_analysis_", suffix=".json")
+    assert store.put_bytes(b"{}", prefix="ui_analysis_", suffix=".json") == path
+    digest = store.content_digest(b"{}")
+    assert store.relative(path) == f"{digest[:2]}/{digest[2:4]}/ui_analysis_{digest}.json"
+    assert store.content_etag(store.relative(path)) == digest
+    assert store.content_etag("ab/cd/otro_nombre.json") is None
+    assert store.usage()["files"] == 1
+
+
+def test_rutas_fuera_de_la_raiz(tmp_path):
+    store = OutputStore(str(tmp_path / "uploads"))
+    outside = tmp_path / "secreto.png"
+    outside.write_bytes(b"x")
+    os.utime(outside, (1000, 1000))
+    for relative in ("../secreto.png", "ab/../../secreto.png", str(outside), "", "."):
+        assert store.resolve(relative) is None
+        store.touch(relative)
+    assert outside.stat().st_mtime == 1000
+    path = store.put_bytes(b"{}", suffix=".json")
+    assert store.resolve(store.relative(path)) == os.path.realpath(path)
+
+
+def test_barrido_respeta_temporales(tmp_path):
+    now = time.time()
+    store = OutputStore(str(tmp_path), ttl_seconds=10, max_bytes=1)
+    writing = tmp_path / ".subida.tmp"
+    writing.write_bytes(b"x" * 100)
+    os.utime(writing, (now - 60, now - 60))
+    abandoned = tmp_path / ".abandonado.tmp"
+    abandoned.write_bytes(b"x" * 100)
+    os.utime(abandoned, (now - 2 * 3600, now - 2 * 3600))
+    old = _write(store, 100, 60, now)
+
+    store.sweep(now)
+    assert writing.exists() and not abandoned.exists() and not os.path.exists(old)
+
+
+def test_miniatura_fuera_de_la_raiz(tmp_path):
+    store = OutputStore(str(tmp_path / "uploads"))
+    cv2.imwrite(str(tmp_path / "secreto.png"), np.zeros((20, 20, 3), np.uint8))
+    assert store.thumbnail("../secreto.png") is None
+    assert not (tmp_path / "secreto_thumb.jpg").exists()
+    path = store.put_bytes(cv2.imencode(".png", np.zeros((20, 20, 3), np.uint8))[1].tobytes(), suffix=".png")
+    assert store.thumbnail(store.relative(path)).endswith("_thumb.jpg")
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from synthetic import ReplayModel, ReplayReader, generate_screen, image_key
+
+
+def test_pantalla_determinista():
+    a = generate_screen(widgets=10, table_rows=3, seed=7)
+    b = generate_screen(widgets=10, table_rows=3, seed=7)
+    assert np.array_equal(a.image, b.image)
+    assert a.predictions == b.predictions
+    # AppBar (3) + tabla (1 + 3 filas x 4 columnas x 2)
+    assert sum(t["class"] == "celda" for t in a.truth) == 12
+    assert len(a.predictions) >= 3 + 25 + 10
+
+
+def test_relaciones_dentro_del_padre():
+    screen = generate_screen(widgets=20, table_rows=2, seed=3)
+    for parent, child in screen.relations:
+        px1, py1, px2, py2 = screen.truth[parent]["box"]
+        cx1, cy1, cx2, cy2 = screen.truth[child]["box"]
+        # Las etiquetas de TextField van encima del campo; el resto, dentro
+        if screen.truth[child]["class"] != "texfield_label":
+            assert px1 <= cx1 and py1 <= cy1 and cx2 <= px2 and cy2 <= py2
+
+
+def test_modelo_reproduce_grabaciones():
+    screen = generate_screen(widgets=4, seed=1)
+    model = ReplayModel.from_screens([screen])
+    result = model.infer(screen.image.copy())[0]
+    assert result["predictions"] == screen.predictions
+    with pytest.raises(KeyError):
+        model.infer(screen.image[:100])
+    assert ReplayModel({}, default=[]).infer(screen.image[:100])[0]["predictions"] == []
+    assert image_key(screen.image) != image_key(screen.image[:100])
+    assert ReplayReader("Guardar").readtext(screen.image) == ["Guardar"]
@@ -0,0 +1,46 @@
+import numpy as np
+
+import table_engine
+
+
+def _grid_boxes(n_rows, n_cols, width=60, height=30):
+    xs, ys = np.meshgrid(np.arange(n_cols) * width, np.arange(n_rows) * height)
+    return np.stack([xs.ravel(), ys.ravel(), xs.ravel() + width - 2, ys.ravel() + height - 2], axis=1)
+
+
+def test_filas_desalineadas():
+    # El y1 varía dentro de la fila: todas deben caer en la misma fila
+    boxes = np.array([[0, 0, 58, 28], [60, 8, 118, 36], [120, 15, 178, 43], [0, 40, 58, 68]])
+    grid = table_engine.build_grid(boxes)
+    assert grid["row"].tolist() == [0, 0, 0, 1]
+    assert grid["column"].tolist() == [0, 1, 2, 0]
+
+
+def test_spans_de_filas_y_columnas():
+    boxes = np.vstack([_grid_boxes(2, 2), [[120, 0, 178, 58], [0, 60, 178, 88]]])
+    grid = table_engine.build_grid(boxes)
+    assert grid["row_span"].tolist() == [1, 1, 1, 1, 2, 1]
+    assert grid["column_span"].tolist() == [1, 1, 1, 1, 1, 3]
+
+
+def test_asignacion_de_textos():
+    boxes = _grid_boxes(10, 10)
+    texts = boxes[::-1] + np.array([5, 5, -5, -5])
+    owners = table_engine.assign_texts(boxes, np.vstack([texts, [[1000, 1000, 1010, 1010]]]))
+    assert owners[:-1].tolist() == list(range(len(boxes)))[::-1]
+    assert owners[-1] == -1
+
+
+def test_estructura_de_filas():
+    rows = table_engine.organize_table(_grid_boxes(3, 4))
+    assert len(rows) == 3
+    assert [cell["column"] for cell in rows[0]["children"]] == [0, 1, 2, 3]
+    assert rows[1]["coordinates"] == {"x1": 0, "y1": 30, "x2": 238, "y2": 58}
+
+
+if __name__ == "__main__":
+    test_filas_desalineadas()
+    test_spans_de_filas_y_columnas()
+    test_asignacion_de_textos()
+    test_estructura_de_filas()
+    print("✓ table_engine OK")
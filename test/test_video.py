@@ -0,0 +1,43 @@
+import cv2
+import numpy as np
+
+import video
+
+
+def write_video(path, screens, fps=10, size=(160, 120)):
+    """Escribe un video con una pantalla de color liso por cada ``(color, fotogramas)``."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    for color, count in screens:
+        for _ in range(count):
+            writer.write(np.full((size[1], size[0], 3), color, np.uint8))
+    writer.release()
+
+
+def test_fotogramas_muestreados(tmp_path):
+    path = str(tmp_path / "grabacion.avi")
+    write_video(path, [(255, 20)])
+    times = [round(t, 2) for t, _ in video.iter_frames(path, sample_interval=0.5)]
+    assert times == [0.0, 0.5, 1.0, 1.5]
+
+
+def test_pantallas_distintas(tmp_path):
+    path = str(tmp_path / "grabacion.avi")
+    # Blanco 2 s, transición de 1 fotograma, negro 1.5 s, gris 1 s
+    write_video(path, [(255, 20), (128, 1), (0, 15), (200, 10)])
+
+    scenes = list(video.detect_scenes(video.iter_frames(path, sample_interval=0.1)))
+    assert [s.index for s in scenes] == [0, 1, 2]
+    assert [(round(s.start, 1), round(s.end, 1)) for s in scenes] == [(0.0, 2.0), (2.0, 3.6), (3.6, 4.5)]
+    # Se escanea el primer fotograma estable, no el de la transición
+    assert scenes[1].frame.mean() < 10
+
+
+def test_video_invalido(tmp_path):
+    path = tmp_path / "roto.mp4"
+    path.write_bytes(b"no es un video")
+    try:
+        list(video.iter_frames(str(path)))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Se esperaba ValueError")
@@ -0,0 +1,115 @@
+import multiprocessing
+import os
+import time
+
+import cv2
+
+from result_store import ResultStore
+from scanner import WidgetScanner
+from storage import OutputStore
+from synthetic import ReplayModel, ReplayReader, generate_screen
+from work_queue import DONE, FAILED, QUEUED, SQLiteQueue
+from worker import ScanWorker
+
+
+def stores(root):
+    return (OutputStore(os.path.join(root, "uploads")), OutputStore(os.path.join(root, "output")),
+            ResultStore(os.path.join(root, "results.sqlite")))
+
+
+def upload(store, screen):
+    path = store.put_bytes(cv2.imencode(".png", screen.image)[1].tobytes(), suffix=".png")
+    return store.relative(path)
+
+
+def test_reclamar_latido_y_reintentos(tmp_path):
+    queue = SQLiteQueue(str(tmp_path / "cola.sqlite"), visibility_timeout=0.2, max_attempts=2, retry_delay=0)
+    first, second, third = (queue.enqueue({"file": f"{i}.png"}) for i in range(3))
+    jobs = queue.claim("a", 2)
+    assert [job.id for job in jobs] == [first, second] and jobs[0].attempts == 1
+    assert [job.id for job in queue.claim("b", 5)] == [third]
+    assert queue.claim("b") == []
+    assert queue.heartbeat("a", [first, second, third]) == [first, second]
+
+    # Un fallo vuelve a la cola hasta agotar los intentos
+    assert queue.fail(first, "a", "sin memoria") == QUEUED
+    assert queue.claim("b")[0].attempts == 2
+    assert queue.fail(first, "b", "sin memoria") == FAILED
+    assert queue.get(first).error == "sin memoria"
+
+    # Sin latido el plazo vence y otro worker lo reclama; el primero ya no puede terminarlo
+    time.sleep(0.25)
+    queue.heartbeat("b", [third])
+    reclaimed = queue.claim("c")
+    assert [job.id for job in reclaimed] == [second] and reclaimed[0].attempts == 2
+    assert queue.heartbeat("a", [second]) == []
+    assert not queue.complete(second, "a", {"scan_id": "x"})
+    assert queue.complete(second, "c", {"scan_id": "y"})
+    assert queue.get(second).status == DONE and queue.get(second).result == {"scan_id": "y"}
+
+    # Un trabajo devuelto sin empezar no gasta el intento
+    queue.release(third, "b")
+    assert (queue.get(third).status, queue.get(third).attempts) == (QUEUED, 0)
+    stats = queue.stats()
+    assert stats["jobs"] == {QUEUED: 1, "running": 0, DONE: 1, FAILED: 1}
+    assert set(stats["workers"]) == {"a", "b"}
+
+
+def test_worker_escanea_lotes(tmp_path):
+    upload_store, output_store, result_store = stores(str(tmp_path))
+    screens = [generate_screen(widgets=6, seed=seed) for seed in range(3)]
+    scanner = WidgetScanner("test/1", None, output_dir=output_store, model=ReplayModel.from_screens(screens),
+                            reader=ReplayReader())
+    queue = SQLiteQueue(str(tmp_path / "cola.sqlite"), max_attempts=2, retry_delay=0)
+    ids = [queue.enqueue({"file": upload(upload_store, screen), "classes": None}) for screen in screens]
+    missing = queue.enqueue({"file": "no/existe.png"})
+
+    batches = []
+    worker = ScanWorker(queue, lambda: scanner, result_store, upload_store, output_store, batch_size=2,
+                        name="nodo-1", before_batch=lambda: batches.append(1))
+    stats = worker.run(exit_when_idle=True)
+    assert (stats["done"], stats["failed"], stats["lost"]) == (3, 2, 0)
+    assert queue.get(missing).status == FAILED and "no/existe.png" in queue.get(missing).error
+
+    for job_id, screen in zip(ids, screens):
+        job = queue.get(job_id)
+        assert job.status == DONE and job.result["worker"] == "nodo-1"
+        scan = result_store.get_scan(job.result["scan_id"])
+        assert scan is not None and os.path.exists(os.path.join(output_store.root, job.result["json_file"]))
+    assert queue.stats()["workers"]["nodo-1"]["stopped"]
+
+
+def _run_worker(root, queue_path, ready, results):
+    upload_store, output_store, result_store = stores(root)
+    screens = [generate_screen(widgets=6, seed=seed) for seed in range(2)]
+    scanner = WidgetScanner("test/1", None, output_dir=output_store, model=ReplayModel.from_screens(screens),
+                            reader=ReplayReader())
+    worker = ScanWorker(SQLiteQueue(queue_path), lambda: scanner, result_store, upload_store, output_store,
+                        batch_size=2, poll_interval=0.05)
+    ready.wait()
+    results.put(worker.run(exit_when_idle=True))
+
+
+def test_varios_procesos_vacian_la_cola(tmp_path):
+    root, queue_path = str(tmp_path), str(tmp_path / "cola.sqlite")
+    upload_store, _, result_store = stores(root)
+    files = [upload(upload_store, generate_screen(widgets=6, seed=seed)) for seed in range(2)]
+    queue = SQLiteQueue(queue_path)
+    ids = [queue.enqueue({"file": files[i % 2]}) for i in range(12)]
+
+    context = multiprocessing.get_context("spawn")
+    ready, results = context.Barrier(3), context.Queue()
+    processes = [context.Process(target=_run_worker, args=(root, queue_path, ready, results)) for _ in range(2)]
+    for process in processes:
+        process.start()
+    ready.wait(timeout=60)
+    stats = [results.get(timeout=60) for _ in processes]
+    for process in processes:
+        process.join(timeout=10)
+
+    # Cada trabajo se escaneó una vez y los dos nodos participaron
+    jobs = [queue.get(job_id) for job_id in ids]
+    assert all(job.status == DONE and job.attempts == 1 for job in jobs)
+    assert sum(s["done"] for s in stats) == 12 and all(s["done"] > 0 for s in stats)
+    assert len({job.result["worker"] for job in jobs}) == 2
+    assert all(result_store.get_scan(job.result["scan_id"]) is not None for job in jobs)
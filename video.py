@@ -0,0 +1,231 @@
+import argparse
+import os
+
+import cv2
+import numpy as np
+
+# Extensiones de video aceptadas
+VIDEO_EXTENSIONS = {'mp4', 'mov', 'm4v', 'webm', 'mkv', 'avi'}
+# Segundos entre fotogramas analizados
+SAMPLE_INTERVAL = 0.25
+# Diferencia media (0-1) con la pantalla actual a partir de la cual hay una pantalla nueva
+SCENE_THRESHOLD = 0.04
+# Diferencia media (0-1) máxima entre dos muestras seguidas para considerar la pantalla estable
+STABLE_THRESHOLD = 0.01
+# Ancho (px) de la miniatura en escala de grises con la que se comparan los fotogramas
+SIGNATURE_WIDTH = 64
+
+
+class Scene:
+    """
+    Pantalla distinta dentro de un video.
+
+    Atributos:
+        index (int): Posición de la pantalla en el video (desde 0)
+        start (float): Segundo en que aparece
+        end (float): Segundo en que cambia a la siguiente (o termina el video)
+        timestamp (float): Segundo del fotograma elegido para escanearla
+        frame (numpy.ndarray): Fotograma BGR elegido (el primero estable)
+        signature (numpy.ndarray): Miniatura con la que se compara
+    """
+
+    __slots__ = ("index", "start", "end", "timestamp", "frame", "signature")
+
+    def __init__(self, index, start, timestamp, frame, signature):
+        self.index = index
+        self.start = start
+        self.end = start
+        self.timestamp = timestamp
+        self.frame = frame
+        self.signature = signature
+
+    def metadata(self, source_video=None):
+        """Datos de la pantalla para ``metadata.video`` del reporte."""
+        return {
+            "source_video": source_video,
+            "screen": self.index,
+            "start": round(self.start, 3),
+            "end": round(self.end, 3),
+            "frame_time": round(self.timestamp, 3),
+        }
+
+
+def iter_frames(video_path, sample_interval=SAMPLE_INTERVAL):
+    """
+    Decodifica un video como flujo, devolviendo un fotograma cada ``sample_interval`` segundos.
+
+    Los fotogramas intermedios solo se avanzan (``grab``) sin convertirlos, y nunca
+    hay más de un fotograma en memoria.
+
+    Args:
+        video_path (str): Ruta del video
+        sample_interval (float): Segundos entre fotogramas devueltos (0 = todos)
+
+    Yields:
+        tuple: ``(segundo, fotograma BGR)``
+    """
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise ValueError(f"No se pudo abrir el video: {video_path}")
+
+    fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+    index = 0
+    next_time = 0.0
+    try:
+        while capture.grab():
+            # Marca de tiempo real (las grabaciones de pantalla suelen tener fps variable)
+            timestamp = capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            if timestamp <= 0 and index > 0 and fps > 0:
+                timestamp = index / fps
+            index += 1
+            if timestamp + 1e-6 < next_time:
+                continue
+            ok, frame = capture.retrieve()
+            if not ok:
+                continue
+            next_time = timestamp + sample_interval
+            yield timestamp, frame
+    finally:
+        capture.release()
+
+
+def frame_signature(frame, width=SIGNATURE_WIDTH):
+    """Miniatura en escala de grises de un fotograma, para compararlo de forma barata."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    h, w = gray.shape[:2]
+    if w > width:
+        gray = cv2.resize(gray, (width, max(1, round(h * width / w))), interpolation=cv2.INTER_AREA)
+    return gray
+
+
+def frame_difference(a, b):
+    """Diferencia media (0-1) entre dos miniaturas; 1 si tienen distinto tamaño."""
+    if a.shape != b.shape:
+        return 1.0
+    return float(np.mean(cv2.absdiff(a, b))) / 255.0
+
+
+def detect_scenes(frames, threshold=SCENE_THRESHOLD, stable_threshold=STABLE_THRESHOLD):
+    """
+    Agrupa fotogramas en pantallas distintas.
+
+    Hay una pantalla nueva cuando un fotograma difiere de la pantalla actual más de
+    ``threshold``; se elige el primer fotograma estable (igual que el anterior) para
+    no escanear transiciones o animaciones a medias. La pantalla empieza cuando se
+    detectó el cambio.
+
+    Args:
+        frames: Iterable de ``(segundo, fotograma)`` (por ejemplo ``iter_frames``)
+        threshold (float): Diferencia mínima con la pantalla actual
+        stable_threshold (float): Diferencia máxima entre muestras seguidas para considerarla estable
+
+    Yields:
+        Scene: Cada pantalla, cuando ya se conoce su final
+    """
+    scene = None
+    previous = None
+    change_start = None
+    last_time = 0.0
+
+    for timestamp, frame in frames:
+        last_time = timestamp
+        signature = frame_signature(frame)
+        stable = previous is not None and frame_difference(signature, previous) <= stable_threshold
+        previous = signature
+
+        if scene is None:
+            scene = Scene(0, timestamp, timestamp, frame, signature)
+            continue
+
+        if frame_difference(signature, scene.signature) <= threshold:
+            change_start = None
+            continue
+
+        if change_start is None:
+            change_start = timestamp
+        if stable:
+            scene.end = change_start
+            yield scene
+            scene = Scene(scene.index + 1, change_start, timestamp, frame, signature)
+            change_start = None
+
+    if scene is not None:
+        scene.end = last_time
+        yield scene
+
+
+def scan_video(scanner, video_path, frame_store=None, sample_interval=SAMPLE_INTERVAL, threshold=SCENE_THRESHOLD,
+               max_screens=None):
+    """
+    Escanea cada pantalla distinta de una grabación de pantalla.
+
+    El video se procesa como flujo: en memoria solo están el fotograma actual y el
+    de la pantalla en curso, sea cual sea la duración del video.
+
+    Args:
+        scanner (WidgetScanner): Escáner a usar
+        video_path (str): Ruta del video
+        frame_store (OutputStore): Almacén donde guardar el fotograma de cada pantalla
+            (por defecto el del escáner)
+        sample_interval (float): Segundos entre fotogramas analizados
+        threshold (float): Diferencia mínima para considerar una pantalla nueva
+        max_screens (int): Número máximo de pantallas a escanear (``None`` = sin límite)
+
+    Yields:
+        ScanResult: Un resultado por pantalla; ``metadata.video`` tiene sus tiempos
+    """
+    frame_store = frame_store or scanner.store
+    frames = iter_frames(video_path, sample_interval)
+    try:
+        for scene in detect_scenes(frames, threshold):
+            if max_screens is not None and scene.index >= max_screens:
+                break
+            ok, encoded = cv2.imencode(".png", scene.frame)
+            if not ok:
+                raise ValueError(f"No se pudo codificar el fotograma del segundo {scene.timestamp:.2f}")
+            frame_path = frame_store.put_bytes(encoded.tobytes(), prefix="frame_", suffix=".png")
+            yield scanner.scan_array(scene.frame, frame_path, {"video": scene.metadata(video_path)})
+    finally:
+        # Libera el VideoCapture aunque se deje de consumir el generador
+        frames.close()
+
+
+def format_time(seconds):
+    """Formatea segundos como ``mm:ss.cc``."""
+    minutes, seconds = divmod(seconds, 60)
+    return f"{int(minutes):02d}:{seconds:05.2f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Escanea las pantallas distintas de una grabación de pantalla")
+    parser.add_argument("video", help="Ruta del video")
+    parser.add_argument("--model-id", default="ui_component_flutter/14", help="ID del modelo de Roboflow")
+    parser.add_argument("--output-dir", default="output_results", help="Directorio de resultados")
+    parser.add_argument("--sample-interval", type=float, default=SAMPLE_INTERVAL,
+                        help="Segundos entre fotogramas analizados")
+    parser.add_argument("--threshold", type=float, default=SCENE_THRESHOLD,
+                        help="Diferencia mínima (0-1) para considerar una pantalla nueva")
+    parser.add_argument("--max-screens", type=int, default=None, help="Número máximo de pantallas")
+    parser.add_argument("--scenes-only", action="store_true",
+                        help="Solo lista las pantallas detectadas, sin cargar el modelo")
+    args = parser.parse_args()
+
+    if args.scenes_only:
+        for scene in detect_scenes(iter_frames(args.video, args.sample_interval), args.threshold):
+            print(f"[{format_time(scene.start)} - {format_time(scene.end)}] pantalla {scene.index + 1}")
+        return
+
+    from dotenv import load_dotenv
+    from scanner import WidgetScanner
+
+    load_dotenv()
+    scanner = WidgetScanner(args.model_id, os.getenv("ROBOFLOW_API_KEY"), output_dir=args.output_dir)
+    for result in scan_video(scanner, args.video, sample_interval=args.sample_interval, threshold=args.threshold,
+                             max_screens=args.max_screens):
+        video = result.report["metadata"]["video"]
+        print(f"[{format_time(video['start'])} - {format_time(video['end'])}] pantalla {video['screen'] + 1}: "
+              f"{len(result.report['components'])} componentes -> {result.json_path}")
+
+
+if __name__ == "__main__":
+    main()
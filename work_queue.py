@@ -0,0 +1,584 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from urllib.parse import unquote, urlparse
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Segundos que un trabajo reclamado queda oculto a los demás workers sin un latido
+VISIBILITY_TIMEOUT = 60.0
+# Intentos máximos de un trabajo (el primero incluido) y espera antes de cada reintento
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 2.0
+# Segundos que se conservan los trabajos terminados
+JOB_TTL = 24 * 3600
+
+
+class Job:
+    """
+    Trabajo de escaneo en la cola.
+
+    Atributos:
+        id (str): ID del trabajo
+        payload (dict): Datos del trabajo (imagen y opciones del escaneo)
+        status (str): ``queued``, ``running``, ``done`` o ``failed``
+        attempts (int): Veces que se ha reclamado
+        worker (str): Worker que lo tiene reclamado (o que lo terminó)
+        result (dict): Resultado, al terminar
+        error (str): Último error
+        created_at (float): Instante en que se encoló
+        updated_at (float): Instante del último cambio
+    """
+
+    __slots__ = ("id", "payload", "status", "attempts", "worker", "result", "error", "created_at", "updated_at")
+
+    def __init__(self, id, payload, status=QUEUED, attempts=0, worker=None, result=None, error=None,
+                 created_at=None, updated_at=None):
+        self.id = id
+        self.payload = payload
+        self.status = status
+        self.attempts = attempts
+        self.worker = worker
+        self.result = result
+        self.error = error
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def open_queue(url, **options):
+    """
+    Abre la cola de trabajos indicada por una URL.
+
+    Args:
+        url (str): ``sqlite:///ruta.sqlite`` (un solo host o volumen compartido) o
+            ``redis://[:contraseña@]host:puerto/db`` (varios nodos)
+        **options: Opciones de la cola (``visibility_timeout``, ``max_attempts``...)
+
+    Returns:
+        SQLiteQueue | RedisQueue: La cola
+    """
+    parsed = urlparse(url)
+    if parsed.scheme == "sqlite":
+        return SQLiteQueue(unquote(url[len("sqlite:///"):]) or "work_queue.sqlite", **options)
+    if parsed.scheme in ("redis", "rediss"):
+        return RedisQueue(url, **options)
+    raise ValueError(f"Cola de trabajos no soportada: {url}")
+
+
+def worker_name():
+    """Nombre único de un worker: host, PID y sufijo aleatorio."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    visible_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs(status, visible_at, created_at);
+
+CREATE TABLE IF NOT EXISTS workers (
+    id TEXT PRIMARY KEY,
+    seen_at REAL NOT NULL,
+    info TEXT
+);
+"""
+
+
+class SQLiteQueue:
+    """
+    Cola de trabajos en SQLite, compartida por los procesos de un host (o de un volumen).
+
+    Un trabajo reclamado pasa a ``running`` con un plazo de visibilidad; el worker lo
+    renueva con ``heartbeat`` mientras lo procesa. Si el plazo vence (el worker murió)
+    el trabajo vuelve a la cola en la siguiente reclamación, hasta ``max_attempts``
+    intentos. Cada reclamación es una transacción ``IMMEDIATE``: dos workers nunca
+    reciben el mismo trabajo.
+    """
+
+    def __init__(self, path, visibility_timeout=VISIBILITY_TIMEOUT, max_attempts=MAX_ATTEMPTS,
+                 retry_delay=RETRY_DELAY, job_ttl=JOB_TTL):
+        """
+        Args:
+            path (str): Ruta del archivo SQLite
+            visibility_timeout (float): Segundos de un trabajo reclamado sin latido
+            max_attempts (int): Intentos máximos de cada trabajo
+            retry_delay (float): Espera antes de un reintento (se multiplica por el número de intento)
+            job_ttl (float): Segundos que se conservan los trabajos terminados
+        """
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.job_ttl = job_ttl
+        self._local = threading.local()
+        conn = self._connection()
+        conn.executescript(SQLITE_SCHEMA)
+
+    def _connection(self):
+        """Conexión propia de cada hilo (en modo autocommit; las transacciones son explícitas)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        return conn
+
+    def enqueue(self, payload):
+        """Encola un trabajo; devuelve su ID."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._connection().execute(
+            "INSERT INTO jobs (id, payload, status, visible_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, json.dumps(payload), QUEUED, now, now, now))
+        return job_id
+
+    def claim(self, worker, max_jobs=1):
+        """
+        Reclama hasta ``max_jobs`` trabajos (los más antiguos primero).
+
+        Los trabajos cuyo plazo de visibilidad venció vuelven antes a la cola (o se
+        marcan ``failed`` si agotaron sus intentos).
+
+        Returns:
+            list: Trabajos reclamados (``Job``)
+        """
+        now = time.time()
+        conn = self._transaction()
+        try:
+            self._expire(conn, now)
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE status = ? AND visible_at <= ? ORDER BY created_at, rowid LIMIT ?",
+                (QUEUED, now, max_jobs)).fetchall()
+            jobs = []
+            for row in rows:
+                conn.execute("UPDATE jobs SET status = ?, worker = ?, attempts = attempts + 1, visible_at = ?, "
+                             "updated_at = ? WHERE id = ?",
+                             (RUNNING, worker, now + self.visibility_timeout, now, row["id"]))
+                job = self._job(row)
+                job.status, job.worker, job.attempts = RUNNING, worker, job.attempts + 1
+                jobs.append(job)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return jobs
+
+    def _expire(self, conn, now):
+        conn.execute("UPDATE jobs SET status = ?, error = ?, updated_at = ? "
+                     "WHERE status = ? AND visible_at <= ? AND attempts >= ?",
+                     (FAILED, "Plazo de visibilidad vencido", now, RUNNING, now, self.max_attempts))
+        conn.execute("UPDATE jobs SET status = ?, worker = NULL, error = ?, updated_at = ? "
+                     "WHERE status = ? AND visible_at <= ?",
+                     (QUEUED, "Plazo de visibilidad vencido", now, RUNNING, now))
+
+    def heartbeat(self, worker, job_ids=(), info=None):
+        """
+        Renueva el plazo de los trabajos de un worker y registra que sigue vivo.
+
+        Returns:
+            list: IDs que el worker sigue teniendo (un trabajo vencido y reclamado por
+            otro worker ya no está)
+        """
+        now = time.time()
+        conn = self._transaction()
+        try:
+            owned = []
+            for job_id in job_ids:
+                cursor = conn.execute("UPDATE jobs SET visible_at = ? WHERE id = ? AND worker = ? AND status = ?",
+                                      (now + self.visibility_timeout, job_id, worker, RUNNING))
+                if cursor.rowcount:
+                    owned.append(job_id)
+            conn.execute("INSERT OR REPLACE INTO workers (id, seen_at, info) VALUES (?, ?, ?)",
+                         (worker, now, json.dumps(info or {})))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return owned
+
+    def complete(self, job_id, worker, result):
+        """Marca un trabajo como terminado; devuelve ``False`` si el worker ya no lo tenía."""
+        now = time.time()
+        cursor = self._connection().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = NULL, updated_at = ?, visible_at = ? "
+            "WHERE id = ? AND worker = ? AND status = ?",
+            (DONE, json.dumps(result), now, now, job_id, worker, RUNNING))
+        return cursor.rowcount > 0
+
+    def fail(self, job_id, worker, error, retry=True):
+        """
+        Registra el fallo de un trabajo: vuelve a la cola tras ``retry_delay`` o, sin
+        intentos restantes (o con ``retry=False``), queda ``failed``.
+
+        Returns:
+            str: Estado resultante (``None`` si el worker ya no lo tenía)
+        """
+        now = time.time()
+        conn = self._transaction()
+        try:
+            row = conn.execute("SELECT attempts FROM jobs WHERE id = ? AND worker = ? AND status = ?",
+                               (job_id, worker, RUNNING)).fetchone()
+            status = None
+            if row is not None:
+                status = QUEUED if retry and row["attempts"] < self.max_attempts else FAILED
+                conn.execute("UPDATE jobs SET status = ?, error = ?, updated_at = ?, visible_at = ?, "
+                             "worker = CASE WHEN ? = 'failed' THEN worker END WHERE id = ?",
+                             (status, str(error), now, now + self.retry_delay * row["attempts"], status, job_id))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return status
+
+    def release(self, job_id, worker):
+        """Devuelve a la cola un trabajo reclamado que no se llegó a empezar (sin gastar el intento)."""
+        self._connection().execute(
+            "UPDATE jobs SET status = ?, worker = NULL, attempts = attempts - 1, visible_at = ?, updated_at = ? "
+            "WHERE id = ? AND worker = ? AND status = ?",
+            (QUEUED, time.time(), time.time(), job_id, worker, RUNNING))
+
+    def get(self, job_id):
+        """Trabajo por ID (``None`` si no existe)."""
+        row = self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row) if row is not None else None
+
+    def prune(self):
+        """Elimina los trabajos terminados hace más de ``job_ttl`` segundos; devuelve cuántos."""
+        cursor = self._connection().execute("DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                                            (DONE, FAILED, time.time() - self.job_ttl))
+        return cursor.rowcount
+
+    def stats(self, active_seconds=None):
+        """Trabajos por estado, antigüedad del más antiguo en cola y workers con latido reciente."""
+        active_seconds = active_seconds or 3 * self.visibility_timeout
+        conn = self._connection()
+        counts = {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED)}
+        for row in conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"):
+            counts[row["status"]] = row["n"]
+        oldest = conn.execute("SELECT MIN(created_at) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+        workers = {row["id"]: {"seen": round(time.time() - row["seen_at"], 1), **json.loads(row["info"] or "{}")}
+                   for row in conn.execute("SELECT * FROM workers WHERE seen_at >= ?",
+                                           (time.time() - active_seconds,))}
+        return {"backend": "sqlite", "jobs": counts,
+                "oldest_queued": round(time.time() - oldest, 1) if oldest is not None else None,
+                "workers": workers}
+
+    @staticmethod
+    def _job(row):
+        return Job(row["id"], json.loads(row["payload"]), row["status"], row["attempts"], row["worker"],
+                   json.loads(row["result"]) if row["result"] else None, row["error"],
+                   row["created_at"], row["updated_at"])
+
+
+def wait_for(queue, job_id, timeout, poll_interval=0.1):
+    """
+    Espera a que un trabajo termine.
+
+    Returns:
+        Job: El trabajo (terminado o no al vencer ``timeout``), o ``None`` si no existe
+    """
+    end = time.monotonic() + timeout
+    while True:
+        job = queue.get(job_id)
+        if job is None or job.finished or time.monotonic() >= end:
+            return job
+        time.sleep(min(poll_interval, max(0.0, end - time.monotonic())))
+
+
+class RedisConnection:
+    """
+    Cliente mínimo del protocolo de Redis (RESP), sin dependencias.
+
+    Una conexión por hilo; se reconecta si el servidor la cierra.
+    """
+
+    def __init__(self, url, timeout=10.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.username = unquote(parsed.username) if parsed.username else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.ssl = parsed.scheme == "rediss"
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        if self.ssl:
+            import ssl
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=self.host)
+        self._local.sock, self._local.reader = sock, sock.makefile("rb")
+        if self.password:
+            self._command(*(("AUTH", self.username, self.password) if self.username else ("AUTH", self.password)))
+        if self.db:
+            self._command("SELECT", self.db)
+
+    @staticmethod
+    def encode(args):
+        """Codifica un comando como array RESP de cadenas."""
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+        return b"".join(parts)
+
+    @classmethod
+    def read_reply(cls, reader):
+        """Lee una respuesta RESP; los errores del servidor se lanzan como ``RuntimeError``."""
+        line = reader.readline()
+        if not line:
+            raise ConnectionError("Conexión cerrada por el servidor de Redis")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body.decode()
+        if kind == b"-":
+            raise RuntimeError(f"Redis: {body.decode()}")
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            length = int(body)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)[:-2]
+            return data.decode()
+        if kind == b"*":
+            count = int(body)
+            return None if count < 0 else [cls.read_reply(reader) for _ in range(count)]
+        raise ConnectionError(f"Respuesta de Redis no válida: {line[:40]!r}")
+
+    def _command(self, *args):
+        self._local.sock.sendall(self.encode(args))
+        return self.read_reply(self._local.reader)
+
+    def execute(self, *args):
+        """Ejecuta un comando y devuelve su respuesta."""
+        if getattr(self._local, "sock", None) is None:
+            self._connect()
+        try:
+            return self._command(*args)
+        except (ConnectionError, OSError):
+            # Conexión caída: se reintenta una vez con una nueva
+            self._local.sock = None
+            self._connect()
+            return self._command(*args)
+
+
+# Scripts Lua: cada operación sobre la cola es atómica en el servidor.
+# Claves: {prefijo}:queued (lista), {prefijo}:delayed (reintentos, por instante),
+# {prefijo}:running (reclamados, por plazo), {prefijo}:job:<id> (hash) y {prefijo}:workers (hash)
+_CLAIM = """
+local now = tonumber(ARGV[1])
+local job = ARGV[6]
+for _, id in ipairs(redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', now)) do
+  redis.call('ZREM', KEYS[3], id)
+  if tonumber(redis.call('HGET', job .. id, 'attempts') or '0') >= tonumber(ARGV[5]) then
+    redis.call('HSET', job .. id, 'status', 'failed', 'error', 'Plazo de visibilidad vencido', 'updated_at', ARGV[1])
+    redis.call('EXPIRE', job .. id, ARGV[7])
+  else
+    redis.call('HSET', job .. id, 'status', 'queued', 'worker', '', 'error', 'Plazo de visibilidad vencido',
+               'updated_at', ARGV[1])
+    redis.call('RPUSH', KEYS[1], id)
+  end
+end
+for _, id in ipairs(redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now)) do
+  redis.call('ZREM', KEYS[2], id)
+  redis.call('RPUSH', KEYS[1], id)
+end
+local claimed = {}
+for _ = 1, tonumber(ARGV[2]) do
+  local id = redis.call('RPOP', KEYS[1])
+  if not id then break end
+  redis.call('HINCRBY', job .. id, 'attempts', 1)
+  redis.call('HSET', job .. id, 'status', 'running', 'worker', ARGV[3], 'updated_at', ARGV[1])
+  redis.call('ZADD', KEYS[3], now + tonumber(ARGV[4]), id)
+  table.insert(claimed, id)
+end
+return claimed
+"""
+
+_HEARTBEAT = """
+local owned = {}
+for i = 4, #ARGV do
+  local id = ARGV[i]
+  if redis.call('HGET', ARGV[3] .. id, 'worker') == ARGV[1] and redis.call('ZSCORE', KEYS[1], id) then
+    redis.call('ZADD', KEYS[1], ARGV[2], id)
+    table.insert(owned, id)
+  end
+end
+return owned
+"""
+
+_FINISH = """
+local key = ARGV[1]
+if redis.call('HGET', key, 'worker') ~= ARGV[2] or redis.call('HGET', key, 'status') ~= 'running' then
+  return false
+end
+redis.call('ZREM', KEYS[1], ARGV[3])
+local status = ARGV[4]
+if status == 'retry' then
+  if tonumber(redis.call('HGET', key, 'attempts')) >= tonumber(ARGV[8]) then
+    status = 'failed'
+  else
+    redis.call('ZADD', KEYS[2], tonumber(ARGV[6]) + tonumber(ARGV[9]) * tonumber(redis.call('HGET', key, 'attempts')),
+               ARGV[3])
+    status = 'queued'
+  end
+elseif status == 'release' then
+  redis.call('HINCRBY', key, 'attempts', -1)
+  redis.call('RPUSH', KEYS[3], ARGV[3])
+  status = 'queued'
+end
+redis.call('HSET', key, 'status', status, 'updated_at', ARGV[6])
+if status == 'done' then
+  redis.call('HSET', key, 'result', ARGV[5])
+  redis.call('HDEL', key, 'error')
+elseif ARGV[5] ~= '' then
+  redis.call('HSET', key, 'error', ARGV[5])
+end
+if status == 'queued' then
+  redis.call('HSET', key, 'worker', '')
+end
+if status == 'done' or status == 'failed' then
+  redis.call('EXPIRE', key, ARGV[7])
+end
+return status
+"""
+
+
+class RedisQueue:
+    """
+    Cola de trabajos en un servidor con protocolo de Redis (Redis, Valkey, KeyDB...),
+    compartida por nodos de API y de escaneo en distintos hosts.
+
+    Mismo comportamiento que ``SQLiteQueue``: reclamación atómica por lotes, plazo de
+    visibilidad renovado con ``heartbeat`` y reintentos con espera. Cada operación es un
+    script Lua, así que un worker que muere a mitad no deja trabajos a medias.
+    """
+
+    def __init__(self, url, prefix="scan_queue", visibility_timeout=VISIBILITY_TIMEOUT, max_attempts=MAX_ATTEMPTS,
+                 retry_delay=RETRY_DELAY, job_ttl=JOB_TTL):
+        """
+        Args:
+            url (str): ``redis://[:contraseña@]host:puerto/db``
+            prefix (str): Prefijo de las claves
+            visibility_timeout (float): Segundos de un trabajo reclamado sin latido
+            max_attempts (int): Intentos máximos de cada trabajo
+            retry_delay (float): Espera antes de un reintento (se multiplica por el número de intento)
+            job_ttl (float): Segundos que se conservan los trabajos terminados
+        """
+        self.redis = RedisConnection(url)
+        self.prefix = prefix
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.job_ttl = int(job_ttl)
+
+    def _key(self, name):
+        return f"{self.prefix}:{name}"
+
+    def enqueue(self, payload):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self.redis.execute("HSET", self._key(f"job:{job_id}"), "payload", json.dumps(payload), "status", QUEUED,
+                           "attempts", 0, "created_at", now, "updated_at", now)
+        self.redis.execute("LPUSH", self._key("queued"), job_id)
+        return job_id
+
+    def claim(self, worker, max_jobs=1):
+        ids = self.redis.execute("EVAL", _CLAIM, 3, self._key("queued"), self._key("delayed"), self._key("running"),
+                                 time.time(), max_jobs, worker, self.visibility_timeout, self.max_attempts,
+                                 self._key("job:"), self.job_ttl)
+        return [job for job in (self.get(job_id) for job_id in ids or []) if job is not None]
+
+    def heartbeat(self, worker, job_ids=(), info=None):
+        self.redis.execute("HSET", self._key("workers"), worker, json.dumps({"seen_at": time.time(), **(info or {})}))
+        if not job_ids:
+            return []
+        return self.redis.execute("EVAL", _HEARTBEAT, 1, self._key("running"), worker,
+                                  time.time() + self.visibility_timeout, self._key("job:"), *job_ids) or []
+
+    def _finish(self, job_id, worker, status, value=""):
+        return self.redis.execute("EVAL", _FINISH, 3, self._key("running"), self._key("delayed"), self._key("queued"),
+                                  self._key(f"job:{job_id}"), worker, job_id, status, value, time.time(),
+                                  self.job_ttl, self.max_attempts, self.retry_delay)
+
+    def complete(self, job_id, worker, result):
+        return self._finish(job_id, worker, DONE, json.dumps(result)) == DONE
+
+    def fail(self, job_id, worker, error, retry=True):
+        return self._finish(job_id, worker, "retry" if retry else FAILED, str(error))
+
+    def release(self, job_id, worker):
+        self._finish(job_id, worker, "release")
+
+    def get(self, job_id):
+        values = self.redis.execute("HGETALL", self._key(f"job:{job_id}"))
+        if not values:
+            return None
+        data = dict(zip(values[::2], values[1::2]))
+        return Job(job_id, json.loads(data["payload"]), data.get("status", QUEUED), int(data.get("attempts", 0)),
+                   data.get("worker") or None, json.loads(data["result"]) if data.get("result") else None,
+                   data.get("error"), float(data.get("created_at", 0)), float(data.get("updated_at", 0)))
+
+    def prune(self):
+        # Los trabajos terminados caducan solos (EXPIRE); se limpian los workers sin latido
+        workers = self.redis.execute("HGETALL", self._key("workers")) or []
+        limit = time.time() - self.job_ttl
+        stale = [worker for worker, info in zip(workers[::2], workers[1::2]) if json.loads(info)["seen_at"] < limit]
+        if stale:
+            self.redis.execute("HDEL", self._key("workers"), *stale)
+        return 0
+
+    def stats(self, active_seconds=None):
+        active_seconds = active_seconds or 3 * self.visibility_timeout
+        now = time.time()
+        workers = self.redis.execute("HGETALL", self._key("workers")) or []
+        active = {}
+        for worker, info in zip(workers[::2], workers[1::2]):
+            info = json.loads(info)
+            seen_at = info.pop("seen_at")
+            if now - seen_at <= active_seconds:
+                active[worker] = {"seen": round(now - seen_at, 1), **info}
+        oldest = self.redis.execute("LINDEX", self._key("queued"), -1)
+        oldest_job = self.get(oldest) if oldest else None
+        return {
+            "backend": "redis",
+            "jobs": {
+                QUEUED: self.redis.execute("LLEN", self._key("queued"))
+                + self.redis.execute("ZCARD", self._key("delayed")),
+                RUNNING: self.redis.execute("ZCARD", self._key("running")),
+            },
+            "oldest_queued": round(now - oldest_job.created_at, 1) if oldest_job is not None else None,
+            "workers": active,
+        }
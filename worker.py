@@ -0,0 +1,213 @@
+"""
+Nodo de escaneo: toma trabajos de la cola compartida (``work_queue``) y los escanea.
+
+Los nodos de la API con ``SCAN_MODE=queue`` solo guardan la imagen y encolan el
+trabajo; cada nodo de escaneo carga el modelo y el OCR una vez y procesa lotes de
+trabajos. La capacidad crece añadiendo nodos. Los archivos (``uploads/``,
+``output_results/``) y ``RESULTS_DB`` deben estar en un volumen compartido por todos.
+
+Uso:
+    python worker.py                                # Cola de WORK_QUEUE_URL, lotes de WORK_QUEUE_BATCH
+    python worker.py --batch-size 8 --exit-when-idle
+"""
+import argparse
+import os
+import signal
+import socket
+import threading
+import time
+
+from work_queue import worker_name
+
+
+class ScanWorker:
+    """
+    Procesa trabajos de escaneo de una cola por lotes.
+
+    Cada lote se reclama de una vez; mientras se procesa, un hilo renueva el plazo
+    de visibilidad de sus trabajos (``heartbeat``), así que un escaneo lento no se
+    reparte a otro worker y uno que muere se reintenta al vencer el plazo. Los
+    reportes del lote se guardan en ``result_store`` en una sola transacción antes
+    de marcar los trabajos como terminados.
+    """
+
+    def __init__(self, queue, get_scanner, result_store, upload_store, output_store, batch_size=4,
+                 heartbeat_interval=None, poll_interval=0.5, name=None, before_batch=None):
+        """
+        Args:
+            queue (SQLiteQueue | RedisQueue): Cola de trabajos
+            get_scanner (callable): Devuelve el ``WidgetScanner`` a usar (el actual, si cambia de versión)
+            result_store (ResultStore): Base de datos de resultados compartida
+            upload_store (OutputStore): Almacén de las imágenes subidas (rutas de los trabajos)
+            output_store (OutputStore): Almacén de los reportes (rutas del resultado)
+            batch_size (int): Trabajos reclamados por lote
+            heartbeat_interval (float): Segundos entre latidos (por defecto, un tercio del plazo de visibilidad)
+            poll_interval (float): Espera con la cola vacía
+            name (str): Nombre del worker (por defecto host, PID y sufijo aleatorio)
+            before_batch (callable): Se llama antes de cada lote (p. ej. sincronizar la versión del modelo)
+        """
+        self.queue = queue
+        self.get_scanner = get_scanner
+        self.result_store = result_store
+        self.upload_store = upload_store
+        self.output_store = output_store
+        self.batch_size = batch_size
+        self.heartbeat_interval = heartbeat_interval or queue.visibility_timeout / 3
+        self.poll_interval = poll_interval
+        self.name = name or worker_name()
+        self.before_batch = before_batch
+        self._active = set()
+        self._active_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat = None
+        self._stats = {"batches": 0, "done": 0, "failed": 0, "lost": 0, "busy_seconds": 0.0}
+
+    def run(self, exit_when_idle=False, max_batches=None):
+        """
+        Procesa lotes hasta ``stop`` (o hasta vaciar la cola con ``exit_when_idle``).
+
+        Returns:
+            dict: Estadísticas del worker
+        """
+        self._start_heartbeat()
+        try:
+            batches = 0
+            while not self._stop.is_set() and (max_batches is None or batches < max_batches):
+                if self.before_batch is not None:
+                    self.before_batch()
+                jobs = self.queue.claim(self.name, self.batch_size)
+                if not jobs:
+                    if exit_when_idle:
+                        break
+                    self._stop.wait(self.poll_interval)
+                    continue
+                self.process_batch(jobs)
+                batches += 1
+        finally:
+            self._stop.set()
+            self._heartbeat.join()
+            self.queue.heartbeat(self.name, (), self.info(stopped=True))
+        return self.stats()
+
+    def stop(self):
+        """Termina después del trabajo en curso; los del lote sin empezar vuelven a la cola."""
+        self._stop.set()
+
+    def process_batch(self, jobs):
+        """Escanea un lote de trabajos y guarda sus resultados."""
+        start = time.perf_counter()
+        with self._active_lock:
+            self._active.update(job.id for job in jobs)
+        scanner = self.get_scanner()
+        results = []
+        try:
+            for job in jobs:
+                if self._stop.is_set():
+                    self.queue.release(job.id, self.name)
+                    self._finish(job.id)
+                    continue
+                try:
+                    results.append((job, self.scan(scanner, job)))
+                except Exception as e:
+                    print(f"⚠️ Error en el trabajo {job.id} (intento {job.attempts}): {str(e)}")
+                    self.queue.fail(job.id, self.name, str(e))
+                    self._stats["failed"] += 1
+                    self._finish(job.id)
+            if results:
+                self.result_store.write_batch([(result, time.time()) for _, result in results])
+            for job, result in results:
+                if self.queue.complete(job.id, self.name, self.job_result(result)):
+                    self._stats["done"] += 1
+                else:
+                    # El plazo venció y otro worker lo reclamó: su resultado sustituirá a este
+                    self._stats["lost"] += 1
+                self._finish(job.id)
+        except Exception as e:
+            # Fallo al guardar el lote: los trabajos escaneados se reintentan
+            print(f"⚠️ Error al guardar el lote de {len(results)} escaneos: {str(e)}")
+            for job, _ in results:
+                self.queue.fail(job.id, self.name, str(e))
+                self._finish(job.id)
+        finally:
+            self._stats["batches"] += 1
+            self._stats["busy_seconds"] += time.perf_counter() - start
+
+    def scan(self, scanner, job):
+        """Escanea la imagen de un trabajo con sus opciones."""
+        payload = job.payload
+        path = os.path.join(self.upload_store.root, payload["file"])
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"La imagen del trabajo no está en el almacén compartido: {payload['file']}")
+        return scanner.scan(path, regions=payload.get("regions"), classes=payload.get("classes"),
+                            project=payload.get("project"), ocr_profile=payload.get("ocr_profile"))
+
+    def job_result(self, result):
+        """Resultado guardado en la cola: ID del escaneo y rutas relativas de sus archivos."""
+        return {
+            "scan_id": result.scan_id,
+            "json_file": self.output_store.relative(result.json_path),
+            "image_file": self.output_store.relative(result.image_path),
+            "worker": self.name,
+        }
+
+    def _finish(self, job_id):
+        with self._active_lock:
+            self._active.discard(job_id)
+
+    def _start_heartbeat(self):
+        def loop():
+            while True:
+                with self._active_lock:
+                    active = list(self._active)
+                try:
+                    owned = self.queue.heartbeat(self.name, active, self.info())
+                    if len(owned) < len(active):
+                        print(f"⚠️ {len(active) - len(owned)} trabajos de {self.name} reclamados por otro worker")
+                except Exception as e:
+                    print(f"⚠️ Error en el latido de {self.name}: {str(e)}")
+                if self._stop.wait(self.heartbeat_interval):
+                    return
+
+        self._stop.clear()
+        self._heartbeat = threading.Thread(target=loop, name="queue-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def info(self, stopped=False):
+        """Datos publicados con cada latido (visibles en ``/api/metrics``)."""
+        return {"host": socket.gethostname(), "pid": os.getpid(), "active": len(self._active),
+                "stopped": stopped, **self.stats()}
+
+    def stats(self):
+        return {**self._stats, "busy_seconds": round(self._stats["busy_seconds"], 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nodo de escaneo de la cola de trabajos")
+    parser.add_argument("--queue", help="URL de la cola (por defecto WORK_QUEUE_URL)")
+    parser.add_argument("--batch-size", type=int, help="Trabajos por lote (por defecto WORK_QUEUE_BATCH)")
+    parser.add_argument("--poll", type=float, default=0.5, help="Segundos de espera con la cola vacía")
+    parser.add_argument("--exit-when-idle", action="store_true", help="Terminar al vaciar la cola")
+    args = parser.parse_args()
+
+    # El worker escanea: carga el modelo y el OCR con la misma configuración que la API
+    os.environ["SCAN_MODE"] = "local"
+    import app
+
+    if not app.MODEL_LOADED:
+        raise SystemExit(1)
+    from work_queue import open_queue
+    queue = open_queue(args.queue or app.WORK_QUEUE_URL, **app.WORK_QUEUE_OPTIONS)
+    registry = app.model_registry
+    worker = ScanWorker(queue, lambda: app.scanner, app.result_store, app.upload_store, app.output_store,
+                        batch_size=args.batch_size or app.WORK_QUEUE_BATCH, poll_interval=args.poll,
+                        before_batch=registry.sync if registry is not None else None)
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    signal.signal(signal.SIGINT, lambda *_: worker.stop())
+    print(f"✅ Worker {worker.name} esperando trabajos (lotes de {worker.batch_size})")
+    stats = worker.run(exit_when_idle=args.exit_when_idle)
+    app.result_store.flush()
+    print(f"✅ Worker {worker.name} detenido: {stats}")
+
+
+if __name__ == "__main__":
+    main()